@@ -0,0 +1,29 @@
+"""
+Convert the property view event table to monthly range partitions
+
+PostgreSQL only (see analytics.partitions). Copies every row inside one
+transaction while holding the table lock; run it during a maintenance
+window. Afterwards the purge task drops expired months instead of
+deleting rows.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from analytics.partitions import convert_to_partitioned, is_partitioned
+
+
+class Command(BaseCommand):
+    help = 'Partition analytics_propertyviewevent by month of viewed_at (PostgreSQL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int,
+                            help='Future monthly partitions to create (ANALYTICS_PARTITION_MONTHS_AHEAD)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Range partitioning needs PostgreSQL')
+        if is_partitioned():
+            self.stdout.write('View events are already partitioned')
+            return
+        copied = convert_to_partitioned(options['months_ahead'])
+        self.stdout.write(self.style.SUCCESS(f'Partitioned view events, {copied} rows copied'))
@@ -0,0 +1,32 @@
+"""
+Backfill PropertyDailyStats from the raw view events and inquiries
+
+The hourly task only rolls up today and yesterday; run this once after
+deploying the rollups, or after restoring raw events, to rebuild older
+days. Days older than the view event retention have no raw rows left and
+are skipped so their rollups are not overwritten.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from analytics.rollups import refresh_property_analytics, rollup_day
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily property view and inquiry rollups for the last N days'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Days to roll up, today included')
+
+    def handle(self, *args, **options):
+        retention = getattr(settings, 'ANALYTICS_VIEW_EVENT_RETENTION_DAYS', 90)
+        days = max(1, min(options['days'], retention))
+        today = timezone.localdate()
+        touched = set()
+        for offset in range(days - 1, -1, -1):
+            touched.update(rollup_day(today - timedelta(days=offset)))
+        refresh_property_analytics(touched, today)
+        self.stdout.write(self.style.SUCCESS(f'Rolled up {days} days for {len(touched)} properties'))
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.12 on 2026-10-19 17:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_propertyinquiry_propertyviewevent'),
+        ('properties', '0013_propertysearchsync'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertyDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('unique_views', models.PositiveIntegerField(default=0)),
+                ('inquiries', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Property daily stats',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='propertyinquiry',
+            index=models.Index(fields=['created_at'], name='analytics_p_created_eafcf3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propertyviewevent',
+            index=models.Index(fields=['viewed_at'], name='analytics_p_viewed__360d66_idx'),
+        ),
+        migrations.AddField(
+            model_name='propertydailystats',
+            name='property',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='properties.property'),
+        ),
+        migrations.AddIndex(
+            model_name='propertydailystats',
+            index=models.Index(fields=['date'], name='analytics_p_date_34e109_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='propertydailystats',
+            constraint=models.UniqueConstraint(fields=('property', 'date'), name='unique_property_daily_stats'),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.12 on 2026-10-19 17:48
+
+from datetime import datetime, time
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.utils import timezone
+
+
+def seed_baselines(apps, schema_editor):
+    """
+    Keep the lifetime counters the request path used to increment. They
+    already include today's raw events, which the rollups count from today
+    on, so those are taken out of the baseline.
+    """
+    PropertyAnalytics = apps.get_model('analytics', 'PropertyAnalytics')
+    PropertyViewEvent = apps.get_model('analytics', 'PropertyViewEvent')
+    PropertyInquiry = apps.get_model('analytics', 'PropertyInquiry')
+
+    today = timezone.localdate()
+    start = timezone.make_aware(datetime.combine(today, time.min))
+    views_today = {
+        row['property_id']: row for row in PropertyViewEvent.objects.filter(viewed_at__gte=start)
+        .values('property_id').annotate(
+            views=Count('pk'),
+            users=Count('user', distinct=True),
+            anonymous=Count('ip_address', distinct=True, filter=Q(user__isnull=True)),
+        ).order_by()
+    }
+    inquiries_today = dict(
+        PropertyInquiry.objects.filter(created_at__gte=start).values('property_id')
+        .annotate(count=Count('pk')).order_by().values_list('property_id', 'count')
+    )
+
+    rows = list(PropertyAnalytics.objects.all())
+    for row in rows:
+        today_views = views_today.get(row.property_id, {'views': 0, 'users': 0, 'anonymous': 0})
+        row.baseline_views = max(row.total_views - today_views['views'], 0)
+        row.baseline_unique_views = max(row.unique_views - today_views['users'] - today_views['anonymous'], 0)
+        row.baseline_inquiries = max(row.total_inquiries - inquiries_today.get(row.property_id, 0), 0)
+        row.baseline_date = today
+    PropertyAnalytics.objects.bulk_update(
+        rows, ['baseline_views', 'baseline_unique_views', 'baseline_inquiries', 'baseline_date'], batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_property_daily_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propertyanalytics',
+            name='baseline_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='propertyanalytics',
+            name='baseline_inquiries',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='propertyanalytics',
+            name='baseline_unique_views',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='propertyanalytics',
+            name='baseline_views',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='propertyanalytics',
+            name='unique_views',
+            field=models.PositiveIntegerField(default=0, help_text='Sum of daily unique viewers: a viewer is counted once per day, not once ever'),
+        ),
+        migrations.RunPython(seed_baselines, migrations.RunPython.noop),
+    ]
@@ -70,13 +70,23 @@ class PropertyAnalytics(models.Model):
 
     # View Statistics
     total_views = models.PositiveIntegerField(default=0)
-    unique_views = models.PositiveIntegerField(default=0)
+    unique_views = models.PositiveIntegerField(
+        default=0,
+        help_text="Sum of daily unique viewers: a viewer is counted once per day, not once ever",
+    )
     this_month_views = models.PositiveIntegerField(default=0)
 
     # Inquiry Statistics
     total_inquiries = models.PositiveIntegerField(default=0)
     this_month_inquiries = models.PositiveIntegerField(default=0)
 
+    # Lifetime counts from before the daily rollups (analytics.rollups); the
+    # totals are these plus the rollups from baseline_date on
+    baseline_views = models.PositiveIntegerField(default=0)
+    baseline_unique_views = models.PositiveIntegerField(default=0)
+    baseline_inquiries = models.PositiveIntegerField(default=0)
+    baseline_date = models.DateField(null=True, blank=True)
+
     # Performance Metrics
     days_on_market = models.PositiveIntegerField(default=0)
     average_time_to_respond = models.DecimalField(
@@ -214,6 +224,8 @@ class PropertyViewEvent(models.Model):
         indexes = [
             models.Index(fields=['property', 'viewed_at']),
             models.Index(fields=['property', 'user']),
+            # Rollup scans and retention purges by time range
+            models.Index(fields=['viewed_at']),
         ]
 
     def __str__(self):
@@ -245,7 +257,37 @@ class PropertyInquiry(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['property', 'created_at']),
+            models.Index(fields=['created_at']),
         ]
 
     def __str__(self):
         return f"Inquiry on {self.property.title} by {self.user}"
+
+
+class PropertyDailyStats(models.Model):
+    """
+    Daily per-property rollup of PropertyViewEvent and PropertyInquiry
+    (analytics.rollups). Kept after the raw events are purged.
+    """
+    property = models.ForeignKey(
+        'properties.Property', on_delete=models.CASCADE,
+        related_name='daily_stats',
+    )
+    date = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+    unique_views = models.PositiveIntegerField(default=0)
+    inquiries = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name_plural = "Property daily stats"
+        constraints = [
+            models.UniqueConstraint(fields=['property', 'date'], name='unique_property_daily_stats'),
+        ]
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+
+    def __str__(self):
+        return f"{self.property_id} on {self.date}: {self.views} views"
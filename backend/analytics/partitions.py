@@ -0,0 +1,167 @@
+"""
+Optional monthly range partitioning of PropertyViewEvent (PostgreSQL)
+
+convert_to_partitioned() (the partition_view_events command) rebuilds
+the view event table as PARTITION BY RANGE (viewed_at) with one partition
+per month, named <table>_yYYYYmMM. The primary key becomes (id,
+viewed_at), as PostgreSQL requires the partition key in it; ids still
+come from the same sequence. The purge task then drops whole expired
+months (drop_partitions_before) and creates the coming ones
+(ensure_partitions). On other databases, or before conversion, every
+function here is a no-op and retention deletes rows in chunks.
+
+Conversion copies the table inside one transaction and locks it while
+doing so; run it in a maintenance window.
+"""
+import re
+from datetime import date
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import PropertyViewEvent
+
+TABLE = PropertyViewEvent._meta.db_table
+PARTITION_NAME = re.compile(rf'^{TABLE}_y(\d{{4}})m(\d{{2}})$')
+
+
+def _next_month(day):
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{TABLE}_y{month.year:04d}m{month.month:02d}'
+
+
+def month_ranges(first, last):
+    """(name, start, end) of every month from first's month to last's month."""
+    month = date(first.year, first.month, 1)
+    while month <= last:
+        yield partition_name(month), month, _next_month(month)
+        month = _next_month(month)
+
+
+def is_partitioned():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid '
+            'WHERE c.relname = %s AND c.relnamespace = current_schema()::regnamespace',
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions():
+    """{partition name: first day of its month}"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits i '
+            'JOIN pg_class parent ON parent.oid = i.inhparent JOIN pg_class child ON child.oid = i.inhrelid '
+            'WHERE parent.relname = %s AND parent.relnamespace = current_schema()::regnamespace',
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    months = {}
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            months[name] = date(int(match.group(1)), int(match.group(2)), 1)
+    return months
+
+
+def _create_partitions(cursor, first, last):
+    for name, start, end in month_ranges(first, last):
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {connection.ops.quote_name(name)} PARTITION OF '
+            f'{connection.ops.quote_name(TABLE)} FOR VALUES FROM (%s) TO (%s)',
+            [start.isoformat(), end.isoformat()],
+        )
+
+
+def ensure_partitions(months_ahead=None, now=None):
+    """Create this month's partition and the next months_ahead ones."""
+    if not is_partitioned():
+        return
+    months_ahead = getattr(settings, 'ANALYTICS_PARTITION_MONTHS_AHEAD', 2) if months_ahead is None else months_ahead
+    first = timezone.localdate(now).replace(day=1)
+    last = first
+    for _ in range(months_ahead):
+        last = _next_month(last)
+    with connection.cursor() as cursor:
+        _create_partitions(cursor, first, last)
+
+
+def drop_partitions_before(cutoff):
+    """Drop partitions whose whole month lies before cutoff; returns their names."""
+    if not is_partitioned():
+        return []
+    cutoff_day = timezone.localtime(cutoff).date()
+    expired = sorted(name for name, month in list_partitions().items() if _next_month(month) <= cutoff_day)
+    with connection.cursor() as cursor:
+        for name in expired:
+            cursor.execute(f'DROP TABLE {connection.ops.quote_name(name)}')
+    return expired
+
+
+def convert_to_partitioned(months_ahead=None):
+    """Rebuild the view event table partitioned by month; returns the number of rows copied."""
+    if connection.vendor != 'postgresql':
+        raise NotImplementedError('Range partitioning needs PostgreSQL')
+    if is_partitioned():
+        return 0
+
+    quote = connection.ops.quote_name
+    old = f'{TABLE}_unpartitioned'
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {quote(TABLE)} RENAME TO {quote(old)}')
+        cursor.execute(
+            f'CREATE TABLE {quote(TABLE)} (LIKE {quote(old)} INCLUDING DEFAULTS INCLUDING IDENTITY) '
+            f'PARTITION BY RANGE (viewed_at)'
+        )
+
+        # Keep ids unique: continue the identity, or hand the serial sequence to the new table
+        cursor.execute('SELECT pg_get_serial_sequence(%s, %s), pg_get_serial_sequence(%s, %s)',
+                       [TABLE, 'id', old, 'id'])
+        new_sequence, old_sequence = cursor.fetchone()
+        if new_sequence:
+            cursor.execute(f'SELECT setval(%s, COALESCE((SELECT MAX(id) FROM {quote(old)}), 0) + 1, false)',
+                           [new_sequence])
+        elif old_sequence:
+            cursor.execute(f'ALTER SEQUENCE {old_sequence} OWNED BY {quote(TABLE)}.id')
+
+        cursor.execute(f'SELECT MIN(viewed_at), MAX(viewed_at) FROM {quote(old)}')
+        first, last = cursor.fetchone()
+        today = timezone.localdate()
+        months_ahead = getattr(settings, 'ANALYTICS_PARTITION_MONTHS_AHEAD', 2) if months_ahead is None else months_ahead
+        horizon = today.replace(day=1)
+        for _ in range(months_ahead):
+            horizon = _next_month(horizon)
+        first_day = min(timezone.localtime(first).date(), today) if first else today
+        last_day = max(timezone.localtime(last).date(), horizon) if last else horizon
+        _create_partitions(cursor, first_day, last_day)
+
+        cursor.execute(f'INSERT INTO {quote(TABLE)} SELECT * FROM {quote(old)}')
+        copied = cursor.rowcount
+
+        # Move indexes and foreign keys over under their Django names
+        cursor.execute(
+            'SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s AND schemaname = current_schema() '
+            'AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass)',
+            [old, old],
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'",
+            [old],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(f'DROP TABLE {quote(old)}')
+        cursor.execute(f'ALTER TABLE {quote(TABLE)} ADD PRIMARY KEY (id, viewed_at)')
+        for name, definition in indexes:
+            cursor.execute(re.sub(rf'\bON (\S+\.)?{old}\b', f'ON {quote(TABLE)}', definition))
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {quote(TABLE)} ADD CONSTRAINT {quote(name)} {definition}')
+    return copied
@@ -0,0 +1,157 @@
+"""
+Daily property rollups and raw event retention
+
+PropertyViewEvent gets a row per detail view and PropertyInquiry a row per
+inquiry. Charts and PropertyAnalytics read PropertyDailyStats instead: one
+row per property and day with views, unique viewers and inquiries.
+
+- rollup_day() recomputes one day from the raw rows with grouped
+  aggregates and upserts it, so it can run again as the day fills up;
+  the hourly task rolls up today and yesterday.
+- refresh_property_analytics() sets PropertyAnalytics totals of the
+  touched properties to their baseline (the lifetime counts from before
+  the rollups, seeded by migration 0004) plus the rollups from the
+  baseline date on; this-month counts come from the rollups alone.
+- purge_raw_events() deletes raw rows older than
+  ANALYTICS_VIEW_EVENT_RETENTION_DAYS / ANALYTICS_INQUIRY_RETENTION_DAYS
+  in primary-key chunks, so no single DELETE holds locks for long. When
+  the view table is partitioned by month (analytics.partitions), whole
+  expired months are dropped instead.
+
+A unique view is a distinct signed-in user, or a distinct IP address for
+anonymous views, on that day; PropertyAnalytics.unique_views is a sum of
+those daily counts, not a count of distinct viewers ever.
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from . import partitions
+from .models import PropertyAnalytics, PropertyDailyStats, PropertyInquiry, PropertyViewEvent
+
+STAT_FIELDS = ['views', 'unique_views', 'inquiries']
+ANALYTICS_FIELDS = ['total_views', 'unique_views', 'this_month_views', 'total_inquiries', 'this_month_inquiries']
+# Total field -> the baseline it is added to
+BASELINE_FIELDS = {
+    'total_views': 'baseline_views',
+    'unique_views': 'baseline_unique_views',
+    'total_inquiries': 'baseline_inquiries',
+}
+# Days already in the baseline are left out of the totals
+AFTER_BASELINE = (
+    Q(property__detailed_analytics__baseline_date__isnull=True)
+    | Q(date__gte=F('property__detailed_analytics__baseline_date'))
+)
+
+
+def _chunk_size():
+    return getattr(settings, 'ANALYTICS_PURGE_CHUNK_SIZE', 5000)
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def rollup_day(day):
+    """Upsert PropertyDailyStats of `day` from the raw events; returns the property ids rolled up."""
+    start, end = day_start(day), day_start(day + timedelta(days=1))
+    views = PropertyViewEvent.objects.filter(viewed_at__gte=start, viewed_at__lt=end).values('property_id').annotate(
+        views=Count('pk'),
+        users=Count('user', distinct=True),
+        anonymous=Count('ip_address', distinct=True, filter=Q(user__isnull=True)),
+    ).order_by()
+    inquiries = dict(
+        PropertyInquiry.objects.filter(created_at__gte=start, created_at__lt=end)
+        .values('property_id').annotate(count=Count('pk')).order_by().values_list('property_id', 'count')
+    )
+
+    stats = {}
+    for row in views:
+        stats[row['property_id']] = PropertyDailyStats(
+            property_id=row['property_id'], date=day, views=row['views'],
+            unique_views=row['users'] + row['anonymous'], inquiries=inquiries.get(row['property_id'], 0),
+        )
+    for property_id, count in inquiries.items():
+        stats.setdefault(property_id, PropertyDailyStats(property_id=property_id, date=day, inquiries=count))
+
+    with transaction.atomic():
+        PropertyDailyStats.objects.bulk_create(
+            stats.values(), batch_size=500, update_conflicts=True,
+            unique_fields=['property', 'date'], update_fields=STAT_FIELDS + ['updated_at'],
+        )
+    return list(stats)
+
+
+def refresh_property_analytics(property_ids, today=None):
+    """Set PropertyAnalytics view and inquiry totals of property_ids from their baselines and the rollups."""
+    today = today or timezone.localdate()
+    month_start = today.replace(day=1)
+    property_ids = list(property_ids)
+    for offset in range(0, len(property_ids), 500):
+        chunk = property_ids[offset:offset + 500]
+        totals = {
+            row['property_id']: row for row in PropertyDailyStats.objects.filter(property_id__in=chunk)
+            .values('property_id').annotate(
+                total_views=Sum('views', filter=AFTER_BASELINE),
+                unique_views=Sum('unique_views', filter=AFTER_BASELINE),
+                this_month_views=Sum('views', filter=Q(date__gte=month_start)),
+                total_inquiries=Sum('inquiries', filter=AFTER_BASELINE),
+                this_month_inquiries=Sum('inquiries', filter=Q(date__gte=month_start)),
+            ).order_by()
+        }
+        existing = {row.property_id: row for row in PropertyAnalytics.objects.filter(property_id__in=totals)}
+        created, updated = [], []
+        for property_id, row in totals.items():
+            analytics = existing.get(property_id)
+            if analytics is None:
+                analytics = PropertyAnalytics(property_id=property_id)
+                created.append(analytics)
+            else:
+                updated.append(analytics)
+            for field in ANALYTICS_FIELDS:
+                baseline = getattr(analytics, BASELINE_FIELDS[field]) if field in BASELINE_FIELDS else 0
+                setattr(analytics, field, baseline + (row[field] or 0))
+        with transaction.atomic():
+            PropertyAnalytics.objects.bulk_create(created)
+            PropertyAnalytics.objects.bulk_update(updated, ANALYTICS_FIELDS)
+
+
+def rollup_recent(now=None):
+    """Roll up yesterday and today and refresh the touched PropertyAnalytics rows."""
+    today = timezone.localdate(now)
+    touched = set()
+    for day in (today - timedelta(days=1), today):
+        touched.update(rollup_day(day))
+    refresh_property_analytics(touched, today)
+    return len(touched)
+
+
+def _delete_in_chunks(queryset):
+    deleted = 0
+    while True:
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:_chunk_size()])
+        if not ids:
+            return deleted
+        deleted += queryset.model.objects.filter(pk__in=ids).delete()[0]
+
+
+def retention_cutoff(days, now=None):
+    """Start of the oldest kept day; never later than yesterday, which may still be rolled up."""
+    today = timezone.localdate(now)
+    return day_start(min(today - timedelta(days=days), today - timedelta(days=1)))
+
+
+def purge_raw_events(now=None):
+    """Delete raw view events and inquiries past their retention; returns counts."""
+    view_cutoff = retention_cutoff(getattr(settings, 'ANALYTICS_VIEW_EVENT_RETENTION_DAYS', 90), now)
+    inquiry_cutoff = retention_cutoff(getattr(settings, 'ANALYTICS_INQUIRY_RETENTION_DAYS', 365), now)
+
+    dropped = partitions.drop_partitions_before(view_cutoff) if partitions.is_partitioned() else []
+    return {
+        'partitions_dropped': len(dropped),
+        'views': _delete_in_chunks(PropertyViewEvent.objects.filter(viewed_at__lt=view_cutoff)),
+        'inquiries': _delete_in_chunks(PropertyInquiry.objects.filter(created_at__lt=inquiry_cutoff)),
+    }
@@ -3,10 +3,13 @@ from django.utils import timezone
 from datetime import timedelta
 import logging
 
+from utils.db_routing import replica_reads
+
 logger = logging.getLogger(__name__)
 
 
 @shared_task(ignore_result=True)
+@replica_reads
 def aggregate_daily_analytics():
     """Aggregate daily analytics metrics from raw data."""
     from .models import AnalyticsMetric, PropertyAnalytics, MarketAnalytics
@@ -79,3 +82,26 @@ def update_property_view_counts():
             this_month_inquiries=0,
         )
         logger.info('Monthly property view/inquiry counts reset')
+
+
+@shared_task(ignore_result=True)
+def rollup_property_stats():
+    """Roll up today's and yesterday's views and inquiries into PropertyDailyStats.
+
+    Runs on the primary: PropertyAnalytics totals are summed from the rollups just written.
+    """
+    from .rollups import rollup_recent
+
+    touched = rollup_recent()
+    logger.info('Property daily stats rolled up for %d properties', touched)
+
+
+@shared_task(ignore_result=True)
+def purge_raw_analytics_events():
+    """Delete raw view events and inquiries past retention; keep monthly partitions ahead."""
+    from .partitions import ensure_partitions
+    from .rollups import purge_raw_events
+
+    ensure_partitions()
+    result = purge_raw_events()
+    logger.info('Raw analytics purge: %s', result)
@@ -1,3 +1,147 @@
-from django.test import TestCase
+from datetime import date, timedelta
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from agents.models import AgentProfile
+from locations.models import Area, City, Country, Region
+from properties.models import Property, PropertyStatus, PropertyType
+
+from . import partitions
+from .models import PropertyAnalytics, PropertyDailyStats, PropertyInquiry, PropertyViewEvent
+from .rollups import purge_raw_events, rollup_day, rollup_recent
+
+User = get_user_model()
+
+
+class PropertyRollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='rollup-agent', email='rollup@example.com', password='testpass123', user_type='agent',
+            phone_number='+237600000020',
+        )
+        self.agent = AgentProfile.objects.create(
+            user=self.user, license_number='ROLLUP1', license_expiry=date(2030, 12, 31),
+            years_experience='1-3', specialization='residential', agency_name='Rollup Agency',
+        )
+        self.viewer = User.objects.create_user(
+            username='viewer', email='viewer@example.com', password='testpass123', phone_number='+237600000021',
+        )
+        region = Region.objects.create(
+            name='Centre', code='centre', country=Country.objects.create(name='Cameroon', code='CM'),
+        )
+        self.property = Property.objects.create(
+            title='Studio', property_type=PropertyType.objects.create(name='Studio', category='studio'),
+            status=PropertyStatus.objects.create(name='available'), listing_type='rent', price=100000,
+            currency='XAF', area=Area.objects.create(name='Bastos', city=City.objects.create(name='Yaounde', region=region)),
+            agent=self.agent, description='Rollup test',
+        )
+        self.today = timezone.localdate()
+
+    def _view(self, user=None, ip='10.0.0.1', days_ago=0):
+        event = PropertyViewEvent.objects.create(property=self.property, user=user, ip_address=ip)
+        if days_ago:
+            PropertyViewEvent.objects.filter(pk=event.pk).update(viewed_at=timezone.now() - timedelta(days=days_ago))
+        return event
+
+    def _inquiry(self, days_ago=0):
+        inquiry = PropertyInquiry.objects.create(property=self.property, user=self.viewer, inquiry_type='message')
+        if days_ago:
+            PropertyInquiry.objects.filter(pk=inquiry.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+        return inquiry
+
+    def test_rollup_counts_unique_viewers_and_upserts(self):
+        self._view(self.viewer)
+        self._view(self.viewer)
+        self._view(ip='10.0.0.1')
+        self._view(ip='10.0.0.2')
+        self._inquiry()
+
+        rollup_day(self.today)
+        self._view(ip='10.0.0.2')
+        rollup_day(self.today)
+
+        stats = PropertyDailyStats.objects.get(property=self.property, date=self.today)
+        self.assertEqual((stats.views, stats.unique_views, stats.inquiries), (5, 3, 1))
+
+    def test_recent_rollup_refreshes_property_analytics(self):
+        self._view(self.viewer)
+        self._view(self.viewer, days_ago=1)
+        self._inquiry(days_ago=1)
+        PropertyDailyStats.objects.create(property=self.property, date=self.today - timedelta(days=40), views=7,
+                                          unique_views=4)
+
+        self.assertEqual(rollup_recent(), 1)
+
+        analytics = PropertyAnalytics.objects.get(property=self.property)
+        self.assertEqual(analytics.total_views, 9)
+        self.assertEqual(analytics.unique_views, 6)
+        self.assertEqual(analytics.total_inquiries, 1)
+
+    def test_existing_totals_survive_the_first_rollup(self):
+        PropertyAnalytics.objects.create(
+            property=self.property, total_views=50, unique_views=20, total_inquiries=5,
+            baseline_views=49, baseline_unique_views=19, baseline_inquiries=5, baseline_date=self.today,
+        )
+        self._view(self.viewer)
+        self._view(self.viewer, days_ago=1)  # already counted in the baseline
+        self._inquiry(days_ago=1)
+
+        rollup_recent()
+
+        analytics = PropertyAnalytics.objects.get(property=self.property)
+        self.assertEqual((analytics.total_views, analytics.unique_views, analytics.total_inquiries), (50, 20, 5))
+        self.assertEqual(analytics.this_month_views, PropertyDailyStats.objects.filter(
+            property=self.property, date__gte=self.today.replace(day=1)).aggregate(total=Sum('views'))['total'])
+
+    @override_settings(ANALYTICS_VIEW_EVENT_RETENTION_DAYS=30, ANALYTICS_INQUIRY_RETENTION_DAYS=60,
+                       ANALYTICS_PURGE_CHUNK_SIZE=2)
+    def test_purge_deletes_expired_raw_events_in_chunks(self):
+        for _ in range(5):
+            self._view(days_ago=31)
+        kept_view = self._view(days_ago=29)
+        self._inquiry(days_ago=61)
+        kept_inquiry = self._inquiry(days_ago=31)
+
+        with self.assertNumQueries(10):  # select + delete per chunk (3 view, 1 inquiry), then an empty select each
+            result = purge_raw_events()
+
+        self.assertEqual(result, {'partitions_dropped': 0, 'views': 5, 'inquiries': 1})
+        self.assertEqual(list(PropertyViewEvent.objects.values_list('pk', flat=True)), [kept_view.pk])
+        self.assertEqual(list(PropertyInquiry.objects.values_list('pk', flat=True)), [kept_inquiry.pk])
+
+    def test_timelines_read_the_rollups(self):
+        PropertyDailyStats.objects.create(property=self.property, date=self.today - timedelta(days=2), views=4,
+                                          unique_views=3, inquiries=2)
+        PropertyDailyStats.objects.create(property=self.property, date=self.today - timedelta(days=120), views=9,
+                                          unique_views=9)
+        api = APIClient()
+        api.force_authenticate(self.user)
+
+        views = api.get(f'/api/analytics/property/{self.property.id}/views/')
+        inquiries = api.get(f'/api/analytics/property/{self.property.id}/inquiries/')
+        summary = api.get('/api/analytics/agent/analytics/')
+
+        self.assertEqual(views.data['timeline'], [{'date': self.today - timedelta(days=2), 'total': 4, 'unique': 3}])
+        self.assertEqual(inquiries.data['timeline'], [{'date': self.today - timedelta(days=2), 'count': 2}])
+        self.assertEqual(summary.data['daily_views'], views.data['timeline'])
+
+
+class PartitionTests(TestCase):
+    def test_monthly_partition_names_and_ranges(self):
+        ranges = list(partitions.month_ranges(date(2025, 11, 20), date(2026, 1, 3)))
+        self.assertEqual([name for name, _, _ in ranges], [
+            'analytics_propertyviewevent_y2025m11',
+            'analytics_propertyviewevent_y2025m12',
+            'analytics_propertyviewevent_y2026m01',
+        ])
+        self.assertEqual(ranges[1][1:], (date(2025, 12, 1), date(2026, 1, 1)))
+
+    def test_partitioning_is_a_no_op_without_postgresql(self):
+        self.assertFalse(partitions.is_partitioned())
+        self.assertEqual(partitions.drop_partitions_before(timezone.now()), [])
+        with self.assertRaises(NotImplementedError):
+            partitions.convert_to_partitioned()
@@ -11,6 +11,7 @@ urlpatterns = [
     path('agent/analytics/', views.agent_analytics_summary, name='agent-analytics'),
     path('tenant/dashboard/', views.tenant_dashboard_stats, name='tenant-dashboard'),
     path('admin/dashboard/', views.admin_dashboard_stats, name='admin-dashboard'),
+    path('admin/metrics/', views.request_metrics, name='request-metrics'),
     path('property/<int:property_id>/', views.property_stats, name='property-stats'),
     path('property/<int:property_id>/inquiry/', views.record_inquiry, name='record-inquiry'),
     path('property/<int:property_id>/views/', views.property_view_timeline, name='view-timeline'),
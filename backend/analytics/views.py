@@ -2,25 +2,29 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework import status as http_status
-from django.db.models import Count, Sum, Avg, Q
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+from django.db.models import Count, F, Sum, Avg, Q
 from django.utils import timezone
 from datetime import timedelta
 from properties.models import Property
 from tenants.models import TenantApplication
+from .rollups import day_start
+from users.permissions import get_request_agent_profile
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def agent_dashboard_stats(request):
     """Get dashboard statistics for agents"""
-    user = request.user
-
     # Only agents can access this
-    if not hasattr(user, 'agent_profile'):
+    agent = get_request_agent_profile(request)
+    if agent is None:
         return Response({'error': 'Only agents can access analytics'}, status=403)
 
-    agent = user.agent_profile
-
     # Get agent's properties
     properties = Property.objects.filter(agent=agent)
 
@@ -198,7 +202,7 @@ def property_stats(request, property_id):
 @permission_classes([IsAuthenticated])
 def record_inquiry(request, property_id):
     """Record an inquiry on a property."""
-    from .models import PropertyInquiry, PropertyAnalytics
+    from .models import PropertyInquiry
     from django.shortcuts import get_object_or_404
 
     prop = get_object_or_404(Property, id=property_id, is_active=True)
@@ -213,12 +217,6 @@ def record_inquiry(request, property_id):
         message=message,
     )
 
-    # Update PropertyAnalytics
-    analytics, _ = PropertyAnalytics.objects.get_or_create(property=prop)
-    analytics.total_inquiries += 1
-    analytics.this_month_inquiries += 1
-    analytics.save(update_fields=['total_inquiries', 'this_month_inquiries'])
-
     return Response({
         'id': inquiry.id,
         'message': 'Inquiry recorded',
@@ -229,33 +227,29 @@ def record_inquiry(request, property_id):
 @permission_classes([IsAuthenticated])
 def property_view_timeline(request, property_id):
     """Get daily view counts for a property over the last N days."""
-    from .models import PropertyViewEvent
+    from .models import PropertyDailyStats
     from django.shortcuts import get_object_or_404
 
     prop = get_object_or_404(Property, id=property_id)
 
     # Only property owner/agent can see detailed analytics
-    if hasattr(request.user, 'agents_profile'):
-        if prop.agent != request.user.agents_profile:
+    agent_profile = get_request_agent_profile(request)
+    if agent_profile is not None:
+        if prop.agent_id != agent_profile.id:
             return Response({'error': 'Permission denied'}, status=403)
     elif request.user.user_type != 'admin':
         return Response({'error': 'Permission denied'}, status=403)
 
     days = int(request.query_params.get('days', 30))
     days = min(days, 90)
-    start_date = timezone.now() - timedelta(days=days)
+    start_date = timezone.localdate() - timedelta(days=days)
 
-    from django.db.models.functions import TruncDate
+    # Daily rollups (analytics.rollups), refreshed hourly
     daily_views = (
-        PropertyViewEvent.objects.filter(
-            property=prop, viewed_at__gte=start_date,
-        )
-        .annotate(date=TruncDate('viewed_at'))
-        .values('date')
-        .annotate(
-            total=Count('id'),
-            unique=Count('user', distinct=True),
+        PropertyDailyStats.objects.filter(
+            property=prop, date__gte=start_date, views__gt=0,
         )
+        .values('date', total=F('views'), unique=F('unique_views'))
         .order_by('date')
     )
 
@@ -270,36 +264,34 @@ def property_view_timeline(request, property_id):
 @permission_classes([IsAuthenticated])
 def property_inquiry_timeline(request, property_id):
     """Get daily inquiry counts for a property."""
-    from .models import PropertyInquiry
+    from .models import PropertyDailyStats, PropertyInquiry
     from django.shortcuts import get_object_or_404
 
     prop = get_object_or_404(Property, id=property_id)
 
-    if hasattr(request.user, 'agents_profile'):
-        if prop.agent != request.user.agents_profile:
+    agent_profile = get_request_agent_profile(request)
+    if agent_profile is not None:
+        if prop.agent_id != agent_profile.id:
             return Response({'error': 'Permission denied'}, status=403)
     elif request.user.user_type != 'admin':
         return Response({'error': 'Permission denied'}, status=403)
 
     days = int(request.query_params.get('days', 30))
     days = min(days, 90)
-    start_date = timezone.now() - timedelta(days=days)
+    start_date = timezone.localdate() - timedelta(days=days)
 
-    from django.db.models.functions import TruncDate
     daily_inquiries = (
-        PropertyInquiry.objects.filter(
-            property=prop, created_at__gte=start_date,
+        PropertyDailyStats.objects.filter(
+            property=prop, date__gte=start_date, inquiries__gt=0,
         )
-        .annotate(date=TruncDate('created_at'))
-        .values('date')
-        .annotate(count=Count('id'))
+        .values('date', count=F('inquiries'))
         .order_by('date')
     )
 
-    # Breakdown by type
+    # Breakdown by type, from the raw inquiries (kept ANALYTICS_INQUIRY_RETENTION_DAYS)
     type_breakdown = (
         PropertyInquiry.objects.filter(
-            property=prop, created_at__gte=start_date,
+            property=prop, created_at__gte=day_start(start_date),
         )
         .values('inquiry_type')
         .annotate(count=Count('id'))
@@ -317,41 +309,35 @@ def property_inquiry_timeline(request, property_id):
 @permission_classes([IsAuthenticated])
 def agent_analytics_summary(request):
     """Comprehensive analytics for agent dashboard charts."""
-    if not hasattr(request.user, 'agents_profile'):
+    agent = get_request_agent_profile(request)
+    if agent is None:
         return Response({'error': 'Agents only'}, status=403)
-
-    agent = request.user.agents_profile
     properties = Property.objects.filter(agent=agent)
     prop_ids = list(properties.values_list('id', flat=True))
 
-    from .models import PropertyViewEvent, PropertyInquiry, PropertyAnalytics
-    from django.db.models.functions import TruncDate
+    from .models import PropertyAnalytics, PropertyDailyStats
 
     days = int(request.query_params.get('days', 30))
     days = min(days, 90)
-    start = timezone.now() - timedelta(days=days)
+    start = timezone.localdate() - timedelta(days=days)
 
-    # Daily views across all properties
-    daily_views = (
-        PropertyViewEvent.objects.filter(
-            property_id__in=prop_ids, viewed_at__gte=start,
-        )
-        .annotate(date=TruncDate('viewed_at'))
-        .values('date')
-        .annotate(total=Count('id'), unique=Count('user', distinct=True))
-        .order_by('date')
-    )
-
-    # Daily inquiries across all properties
-    daily_inquiries = (
-        PropertyInquiry.objects.filter(
-            property_id__in=prop_ids, created_at__gte=start,
+    # Daily views and inquiries across all properties, from the daily rollups
+    daily_stats = (
+        PropertyDailyStats.objects.filter(
+            property_id__in=prop_ids, date__gte=start,
         )
-        .annotate(date=TruncDate('created_at'))
         .values('date')
-        .annotate(count=Count('id'))
+        .annotate(total=Sum('views'), unique=Sum('unique_views'), inquiries=Sum('inquiries'))
         .order_by('date')
     )
+    daily_views = [
+        {'date': row['date'], 'total': row['total'], 'unique': row['unique']}
+        for row in daily_stats if row['total']
+    ]
+    daily_inquiries = [
+        {'date': row['date'], 'count': row['inquiries']}
+        for row in daily_stats if row['inquiries']
+    ]
 
     # Per-property performance
     per_property = []
@@ -383,3 +369,38 @@ def agent_analytics_summary(request):
         'daily_inquiries': list(daily_inquiries),
         'per_property': sorted(per_property, key=lambda x: x['total_views'], reverse=True),
     })
+
+
+@require_GET
+def request_metrics(request):
+    """
+    Route-level request metrics in Prometheus text format.
+
+    Plain Django view so a scraper can send REQUEST_METRICS_TOKEN as a
+    Bearer token without it being parsed as a JWT; admins can also read it
+    with their usual JWT or session.
+    """
+    from django.conf import settings
+    from utils.metrics import collect_snapshots, merge_snapshots, render_prometheus
+
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    token = getattr(settings, 'REQUEST_METRICS_TOKEN', '')
+    allowed = bool(token) and header.startswith('Bearer ') and constant_time_compare(header[7:], token)
+
+    if not allowed:
+        user = request.user
+        try:
+            authenticated = JWTAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            authenticated = None
+        if authenticated is not None:
+            user = authenticated[0]
+        allowed = user.is_authenticated and (user.user_type == 'admin' or user.is_staff)
+
+    if not allowed:
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+
+    return HttpResponse(
+        render_prometheus(merge_snapshots(collect_snapshots())),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -0,0 +1,226 @@
+"""
+Login Lockout Store
+Sliding-window failure counters in the cache and batched LoginAttempt auditing
+"""
+import atexit
+import hashlib
+import logging
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils import timezone
+
+from .models import LoginAttempt
+
+logger = logging.getLogger(__name__)
+
+LOCKOUT_CACHE_PREFIX = 'auth:lockout:v1'
+BUCKET_SECONDS = 60
+
+SCOPE_IDENTIFIER = 'identifier'
+SCOPE_IP = 'ip'
+
+
+def _digest(value):
+    return hashlib.sha256(str(value).encode('utf-8')).hexdigest()[:32]
+
+
+def _window_seconds():
+    return int(LoginAttempt.LOCKOUT_WINDOW.total_seconds())
+
+
+def _bucket_keys(scope, value, now):
+    """One counter key per minute of the window, newest last."""
+    digest = _digest(value)
+    current = int(now // BUCKET_SECONDS)
+    count = _window_seconds() // BUCKET_SECONDS
+    return [
+        f'{LOCKOUT_CACHE_PREFIX}:{scope}:{digest}:{bucket}'
+        for bucket in range(current - count + 1, current + 1)
+    ]
+
+
+def _last_attempt_key(scope, value):
+    return f'{LOCKOUT_CACHE_PREFIX}:{scope}:{_digest(value)}:last'
+
+
+def _scopes(identifier, ip_address):
+    scopes = [(SCOPE_IDENTIFIER, identifier, LoginAttempt.LOCKOUT_THRESHOLD)]
+    if ip_address:
+        scopes.append((SCOPE_IP, ip_address, LoginAttempt.LOCKOUT_THRESHOLD * 2))  # Higher threshold for IP
+    return scopes
+
+
+def is_locked_out(identifier, ip_address=None):
+    """
+    Cache-only equivalent of LoginAttempt.is_locked_out
+    Returns: (is_locked: bool, unlock_time: datetime)
+    """
+    now = time.time()
+    scopes = _scopes(identifier, ip_address)
+
+    keys_by_scope = {}
+    all_keys = []
+    for scope, value, _threshold in scopes:
+        keys = _bucket_keys(scope, value, now) + [_last_attempt_key(scope, value)]
+        keys_by_scope[scope] = keys
+        all_keys.extend(keys)
+
+    try:
+        values = cache.get_many(all_keys)
+    except Exception:
+        logger.warning('Lockout cache unavailable, falling back to database check.', exc_info=True)
+        return LoginAttempt.is_locked_out(identifier, ip_address)
+
+    for scope, _value, threshold in scopes:
+        *bucket_keys, last_key = keys_by_scope[scope]
+        failures = sum(int(values.get(key) or 0) for key in bucket_keys)
+        last_attempt = values.get(last_key)
+        if failures < threshold or last_attempt is None:
+            continue
+
+        unlock_time = datetime.fromtimestamp(last_attempt, tz=dt_timezone.utc) + LoginAttempt.LOCKOUT_DURATION
+        if timezone.now() < unlock_time:
+            return True, unlock_time
+
+    return False, None
+
+
+def _record_in_cache(identifier, ip_address, success, now):
+    window = _window_seconds()
+    for scope, value, _threshold in _scopes(identifier, ip_address):
+        cache.set(_last_attempt_key(scope, value), now, timeout=window)
+        if success:
+            continue
+
+        key = _bucket_keys(scope, value, now)[-1]
+        cache.add(key, 0, timeout=window + BUCKET_SECONDS)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Evicted between add and incr
+            cache.set(key, 1, timeout=window + BUCKET_SECONDS)
+
+
+class LoginAttemptBuffer:
+    """
+    In-process buffer of LoginAttempt rows written with bulk_create.
+
+    Flushes when the batch is full, and from a timer thread once the oldest
+    row has waited LOGIN_ATTEMPT_FLUSH_SECONDS, so quiet workers do not hold
+    rows; whatever is left is flushed at interpreter exit. With
+    LOGIN_ATTEMPT_AUDIT_ASYNC the batch is handed to a Celery task instead
+    of being written by the request thread.
+    """
+
+    def __init__(self):
+        self._rows = []
+        self._oldest = None
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def add(self, row):
+        with self._lock:
+            self._rows.append(row)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+                self._schedule()
+            if not self._should_flush():
+                return
+            rows = self._drain()
+        self._write(rows)
+
+    def flush(self):
+        with self._lock:
+            rows = self._drain()
+        self._write(rows)
+
+    def flush_if_due(self):
+        with self._lock:
+            if self._oldest is None or time.monotonic() - self._oldest < self._max_wait():
+                return
+            rows = self._drain()
+        self._write(rows)
+
+    def _max_wait(self):
+        return getattr(settings, 'LOGIN_ATTEMPT_FLUSH_SECONDS', 5)
+
+    def _schedule(self):
+        self._timer = threading.Timer(self._max_wait(), self._flush_from_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush_from_timer(self):
+        try:
+            self.flush_if_due()
+        finally:
+            # The timer thread's own connection would otherwise stay open
+            connections.close_all()
+
+    def _should_flush(self):
+        batch_size = getattr(settings, 'LOGIN_ATTEMPT_BATCH_SIZE', 50)
+        return len(self._rows) >= batch_size or time.monotonic() - self._oldest >= self._max_wait()
+
+    def _drain(self):
+        if self._timer is not None and self._timer is not threading.current_thread():
+            self._timer.cancel()
+        rows, self._rows, self._oldest, self._timer = self._rows, [], None, None
+        return rows
+
+    def _write(self, rows):
+        if not rows:
+            return
+
+        try:
+            if getattr(settings, 'LOGIN_ATTEMPT_AUDIT_ASYNC', False):
+                from .tasks import write_login_attempts
+
+                write_login_attempts.delay(rows)
+            else:
+                write_login_attempt_rows(rows)
+        except Exception:
+            logger.exception('Failed to write %s login attempt audit rows', len(rows))
+
+
+def write_login_attempt_rows(rows):
+    attempts = [
+        LoginAttempt(
+            identifier=row['identifier'],
+            ip_address=row['ip_address'],
+            user_agent=row['user_agent'],
+            success=row['success'],
+            failure_reason=row['failure_reason'],
+            user_id=row['user_id'],
+            created_at=datetime.fromtimestamp(row['timestamp'], tz=dt_timezone.utc),
+        )
+        for row in rows
+    ]
+    LoginAttempt.objects.bulk_create(attempts)
+    return len(attempts)
+
+
+login_attempt_buffer = LoginAttemptBuffer()
+atexit.register(login_attempt_buffer.flush)
+
+
+def record_login_attempt(identifier, ip_address, user_agent='', success=False, failure_reason='', user=None):
+    """Update the lockout counters and queue the audit row."""
+    now = time.time()
+    try:
+        _record_in_cache(identifier, ip_address, success, now)
+    except Exception:
+        logger.warning('Lockout cache unavailable, attempt only recorded for audit.', exc_info=True)
+
+    login_attempt_buffer.add({
+        'identifier': identifier,
+        'ip_address': ip_address,
+        'user_agent': user_agent or '',
+        'success': success,
+        'failure_reason': failure_reason,
+        'user_id': user.pk if user else None,
+        'timestamp': now,
+    })
@@ -142,6 +142,10 @@ class LoginAttempt(models.Model):
     """
     Track login attempts for security monitoring
     """
+    LOCKOUT_THRESHOLD = 5  # Lock after 5 failed attempts
+    LOCKOUT_DURATION = timedelta(minutes=15)
+    LOCKOUT_WINDOW = timedelta(minutes=30)
+
     identifier = models.CharField(
         max_length=255,
         help_text="Username, email, or phone number"
@@ -160,7 +164,8 @@ class LoginAttempt(models.Model):
         related_name='login_attempts'
     )
 
-    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Not auto_now_add: audit rows are bulk written after the attempt happened
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
 
     class Meta:
         verbose_name = "Login Attempt"
@@ -181,10 +186,12 @@ class LoginAttempt(models.Model):
         """
         Check if identifier or IP is locked out due to failed attempts
         Returns: (is_locked: bool, unlock_time: datetime)
+
+        Database fallback for authentication.lockout.is_locked_out
         """
-        LOCKOUT_THRESHOLD = 5  # Lock after 5 failed attempts
-        LOCKOUT_DURATION = timedelta(minutes=15)
-        TIME_WINDOW = timedelta(minutes=30)
+        LOCKOUT_THRESHOLD = cls.LOCKOUT_THRESHOLD
+        LOCKOUT_DURATION = cls.LOCKOUT_DURATION
+        TIME_WINDOW = cls.LOCKOUT_WINDOW
 
         cutoff_time = timezone.now() - TIME_WINDOW
 
@@ -8,7 +8,8 @@ from django.utils import timezone
 from django.conf import settings
 import secrets
 import hashlib
-from .models import OTPVerification, LoginAttempt, PasswordResetToken
+from . import lockout
+from .models import OTPVerification, PasswordResetToken
 
 User = get_user_model()
 
@@ -57,7 +58,7 @@ class AuthService:
         Returns: (success: bool, user: User, message: str)
         """
         # Check if locked out
-        is_locked, unlock_time = LoginAttempt.is_locked_out(identifier, ip_address)
+        is_locked, unlock_time = lockout.is_locked_out(identifier, ip_address)
         if is_locked:
             minutes = int((unlock_time - timezone.now()).total_seconds() / 60)
             return False, None, f"Account locked. Try again in {minutes} minutes"
@@ -76,7 +77,7 @@ class AuthService:
                 user = User.objects.get(username__iexact=identifier)
         except User.DoesNotExist:
             # Record failed attempt
-            LoginAttempt.objects.create(
+            lockout.record_login_attempt(
                 identifier=identifier,
                 ip_address=ip_address,
                 user_agent=user_agent or '',
@@ -87,7 +88,7 @@ class AuthService:
 
         # Check if user is active
         if not user.is_active:
-            LoginAttempt.objects.create(
+            lockout.record_login_attempt(
                 identifier=identifier,
                 ip_address=ip_address,
                 user_agent=user_agent or '',
@@ -99,7 +100,7 @@ class AuthService:
 
         # Check if suspended
         if user.is_suspended:
-            LoginAttempt.objects.create(
+            lockout.record_login_attempt(
                 identifier=identifier,
                 ip_address=ip_address,
                 user_agent=user_agent or '',
@@ -111,7 +112,7 @@ class AuthService:
 
         # Verify password
         if not user.check_password(password):
-            LoginAttempt.objects.create(
+            lockout.record_login_attempt(
                 identifier=identifier,
                 ip_address=ip_address,
                 user_agent=user_agent or '',
@@ -122,7 +123,7 @@ class AuthService:
             return False, None, "Invalid credentials"
 
         # Success
-        LoginAttempt.objects.create(
+        lockout.record_login_attempt(
             identifier=identifier,
             ip_address=ip_address,
             user_agent=user_agent or '',
@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .lockout import write_login_attempt_rows
+
+
+@shared_task(ignore_result=True)
+def write_login_attempts(rows):
+    """Bulk write a batch of buffered LoginAttempt audit rows."""
+    return write_login_attempt_rows(rows)
@@ -1,4 +1,73 @@
 # Authentication app tests
-from django.test import TestCase
+import threading
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from . import lockout
+from .models import LoginAttempt
+from .services import AuthService
+
+User = get_user_model()
+
+
+@override_settings(LOGIN_ATTEMPT_AUDIT_ASYNC=False, LOGIN_ATTEMPT_BATCH_SIZE=1)
+class LoginLockoutTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='lockout',
+            email='lockout@example.com',
+            password='StrongPass123!',
+            phone_number='+237600000099',
+        )
+
+    def fail_login(self, ip_address='10.0.0.1'):
+        return AuthService.login_user('lockout@example.com', 'WrongPassword!', ip_address=ip_address)
+
+    def test_lockout_after_threshold_failures(self):
+        for _ in range(LoginAttempt.LOCKOUT_THRESHOLD):
+            self.fail_login()
+
+        success, _user, message = AuthService.login_user(
+            'lockout@example.com', 'StrongPass123!', ip_address='10.0.0.2'
+        )
+
+        self.assertFalse(success)
+        self.assertIn('Account locked', message)
+
+    def test_lockout_check_does_not_query_database(self):
+        with self.assertNumQueries(0):
+            is_locked, unlock_time = lockout.is_locked_out('lockout@example.com', '10.0.0.1')
+
+        self.assertFalse(is_locked)
+        self.assertIsNone(unlock_time)
+
+    def test_failures_are_written_for_audit(self):
+        self.fail_login()
+
+        attempt = LoginAttempt.objects.get()
+        self.assertEqual(attempt.user, self.user)
+        self.assertEqual(attempt.failure_reason, 'Invalid password')
+
+    @override_settings(LOGIN_ATTEMPT_BATCH_SIZE=3, LOGIN_ATTEMPT_FLUSH_SECONDS=60)
+    def test_audit_rows_are_batched(self):
+        self.fail_login()
+        self.fail_login()
+        self.assertFalse(LoginAttempt.objects.exists())
+
+        self.fail_login()
+        self.assertEqual(LoginAttempt.objects.count(), 3)
+
+    @override_settings(LOGIN_ATTEMPT_BATCH_SIZE=50, LOGIN_ATTEMPT_FLUSH_SECONDS=0.05)
+    def test_old_rows_are_flushed_without_another_attempt(self):
+        written = threading.Event()
+        buffer = lockout.LoginAttemptBuffer()
+        with patch.object(buffer, '_write', side_effect=lambda rows: rows and written.set()) as write:
+            buffer.add({'identifier': 'lockout@example.com'})
+            self.assertTrue(written.wait(timeout=5))
+
+        write.assert_called_once_with([{'identifier': 'lockout@example.com'}])
+        self.assertIsNone(buffer._oldest)
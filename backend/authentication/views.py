@@ -2,6 +2,8 @@
 Authentication Views
 API endpoints for authentication
 """
+import logging
+
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
@@ -21,6 +23,7 @@ from .services import AuthService, OTPService, PasswordResetService
 from utils.throttles import LoginThrottle, OTPThrottle, PasswordResetThrottle, SignupThrottle
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
 
 
 def get_tokens_for_user(user):
@@ -105,8 +108,6 @@ def signup(request):
 
     except Exception as e:
         # Log the error for debugging
-        import logging
-        logger = logging.getLogger(__name__)
         logger.error(f"Signup error: {str(e)}", exc_info=True)
 
         return Response({
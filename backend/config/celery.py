@@ -1,5 +1,5 @@
 import os
-from celery import Celery
+from celery import Celery, signals
 from celery.schedules import crontab
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
@@ -11,12 +11,142 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Auto-discover tasks in all installed apps
 app.autodiscover_tasks()
 
+# Task queues, most latency-sensitive first. Run one worker per group, e.g.
+#   celery -A config worker -Q realtime,default
+#   celery -A config worker -Q media,batch
+# so chat and notification delivery never waits behind nightly jobs.
+# Concurrency defaults to the sum of the consumed queues' values unless
+# --concurrency is given; CELERY_CONCURRENCY_<QUEUE> overrides a queue.
+TASK_QUEUES = {
+    'realtime': {
+        'concurrency': 2,
+        'priority': 0,
+        'time_limit': 60,
+        'soft_time_limit': 45,
+        'tasks': [
+            'notifications.tasks.notify_new_message',
+            'notifications.tasks.dispatch_notification',
+            'notifications.tasks.send_email_notification',
+            'notifications.tasks.send_sms_notification',
+            'payment.tasks.reconcile_mobile_money_payment',
+        ],
+    },
+    'default': {
+        'concurrency': 1,
+        'priority': 3,
+        'time_limit': 300,
+        'soft_time_limit': 240,
+        'tasks': [
+            'notifications.tasks.process_scheduled_notifications',
+            'properties.tasks.sync_property_search_event',
+            'properties.tasks.sync_property_search_events',
+            'properties.tasks.refresh_property_sitemap_entries_cache',
+            'properties.tasks.send_saved_search_digests',
+            'properties.tasks.rebuild_typeahead_entries',
+            'moderation.tasks.run_listing_auto_checks',
+            'authentication.tasks.write_login_attempts',
+            'payment.tasks.run_escrow_timers',
+            'payment.tasks.reconcile_mobile_money_payments',
+        ],
+    },
+    'media': {
+        'concurrency': 1,
+        'priority': 5,
+        'time_limit': 600,
+        'soft_time_limit': 540,
+        'tasks': [
+            'media.tasks.generate_property_image_variants',
+            'leases.tasks.render_lease_pdf',
+        ],
+    },
+    'batch': {
+        'concurrency': 1,
+        'priority': 9,
+        'time_limit': 3600,
+        'soft_time_limit': 3300,
+        'tasks': [
+            'notifications.tasks.process_bulk_notification',
+            'moderation.tasks.run_listing_auto_checks_batch',
+            'properties.tasks.match_saved_search_listings',
+            'leases.tasks.check_lease_expiry_reminders',
+            'leases.tasks.check_rent_due_reminders',
+            'leases.tasks.auto_expire_leases',
+            'analytics.tasks.aggregate_daily_analytics',
+            'analytics.tasks.update_property_view_counts',
+            'analytics.tasks.rollup_property_stats',
+            'analytics.tasks.purge_raw_analytics_events',
+            'tenants.tasks.refresh_tenant_credit_scores',
+            'tariffplans.tasks.reconcile_subscription_usage',
+            'tariffplans.tasks.run_subscription_lifecycle',
+        ],
+    },
+}
+
+app.conf.task_default_queue = 'default'
+app.conf.task_default_priority = TASK_QUEUES['default']['priority']
+app.conf.task_routes = {
+    task: {'queue': queue, 'priority': options['priority']}
+    for queue, options in TASK_QUEUES.items()
+    for task in options['tasks']
+}
+app.conf.task_annotations = {
+    task: {'time_limit': options['time_limit'], 'soft_time_limit': options['soft_time_limit']}
+    for options in TASK_QUEUES.values()
+    for task in options['tasks']
+}
+# Redis: 0 is the highest priority, and queues are drained in -Q order
+app.conf.broker_transport_options = {
+    'priority_steps': list(range(10)),
+    'sep': ':',
+    'queue_order_strategy': 'priority',
+}
+# A long task must not hold prefetched realtime messages hostage
+app.conf.worker_prefetch_multiplier = 1
+
+
+def queue_concurrency(queue):
+    default = TASK_QUEUES.get(queue, TASK_QUEUES['default'])['concurrency']
+    return int(os.getenv(f'CELERY_CONCURRENCY_{queue.upper()}', default))
+
+
+@signals.celeryd_init.connect
+def set_queue_concurrency(conf=None, options=None, **kwargs):
+    options = options or {}
+    if options.get('concurrency'):
+        return
+    queues = options.get('queues') or list(TASK_QUEUES)
+    if isinstance(queues, str):
+        queues = queues.split(',')
+    conf.worker_concurrency = sum(queue_concurrency(queue.strip()) for queue in queues if queue.strip())
+
+
+@signals.worker_init.connect
+def warm_up_worker(**kwargs):
+    # Runs in the parent before the pool forks, so every child starts with
+    # serializers and task modules imported; response caches are the web's job
+    from django.conf import settings
+    if settings.WARMUP_ON_START:
+        from config.warmup import warm_up
+        warm_up(prime=False)
+
+
+# Task timing and retry metrics (utils.metrics)
+import utils.task_metrics  # noqa: E402,F401
+
 # Periodic task schedule
 app.conf.beat_schedule = {
     'process-scheduled-notifications': {
         'task': 'notifications.tasks.process_scheduled_notifications',
         'schedule': 60.0,  # every minute
     },
+    'run-escrow-timers': {
+        'task': 'payment.tasks.run_escrow_timers',
+        'schedule': 60.0,  # every minute; the run_escrow_timers command is finer
+    },
+    'reconcile-mobile-money-payments': {
+        'task': 'payment.tasks.reconcile_mobile_money_payments',
+        'schedule': 60.0,  # every minute; rows back off between checks
+    },
     'check-lease-expiry-reminders': {
         'task': 'leases.tasks.check_lease_expiry_reminders',
         'schedule': crontab(hour=8, minute=0),  # daily at 8 AM
@@ -37,6 +167,31 @@ app.conf.beat_schedule = {
         'task': 'analytics.tasks.update_property_view_counts',
         'schedule': crontab(hour=0, minute=5),  # daily at 00:05
     },
+    'send-saved-search-digests': {
+        'task': 'properties.tasks.send_saved_search_digests',
+        'schedule': crontab(minute=0),  # hourly
+    },
+    'rollup-property-stats': {
+        'task': 'analytics.tasks.rollup_property_stats',
+        'schedule': crontab(minute=5),  # hourly
+    },
+    'purge-raw-analytics-events': {
+        'task': 'analytics.tasks.purge_raw_analytics_events',
+        'schedule': crontab(hour=3, minute=45),  # daily at 03:45
+    },
+    'refresh-tenant-credit-scores': {
+        'task': 'tenants.tasks.refresh_tenant_credit_scores',
+        'schedule': crontab(hour=2, minute=0),  # daily at 2 AM
+        'kwargs': {'replica': True},  # runs after a write read the primary
+    },
+    'run-subscription-lifecycle': {
+        'task': 'tariffplans.tasks.run_subscription_lifecycle',
+        'schedule': crontab(minute=15),  # hourly
+    },
+    'reconcile-subscription-usage': {
+        'task': 'tariffplans.tasks.reconcile_subscription_usage',
+        'schedule': crontab(hour=2, minute=30),  # daily at 02:30
+    },
 }
 
 
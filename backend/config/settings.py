@@ -90,6 +90,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'utils.middleware.AuditLoggingMiddleware',
+    'utils.db_routing.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -137,6 +138,18 @@ if DATABASE_URL:
         # Fallback: parse DATABASE_URL manually (basic PostgreSQL support)
         pass
 
+# Optional read replicas (comma-separated URLs); utils.db_routing sends safe
+# reads there and pins clients to the primary for REPLICA_PIN_SECONDS after a write
+DATABASE_REPLICAS = []
+for _index, _url in enumerate(url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()):
+    import dj_database_url
+    _alias = f'replica{_index + 1}'
+    DATABASES[_alias] = dj_database_url.parse(_url, conn_max_age=600)
+    DATABASES[_alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(_alias)
+DATABASE_ROUTERS = ['utils.db_routing.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '10'))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -442,10 +455,196 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
+# Fallback limits; per-queue limits are set in config/celery.py TASK_QUEUES
 CELERY_TASK_TIME_LIMIT = 300  # 5 min hard limit
 CELERY_TASK_SOFT_TIME_LIMIT = 240  # 4 min soft limit
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 
+# ==============================
+# Login Lockout & Attempt Auditing
+# ==============================
+# Lockout counters live in the cache; LoginAttempt rows are buffered and bulk written
+LOGIN_ATTEMPT_AUDIT_ASYNC = os.getenv(
+    'LOGIN_ATTEMPT_AUDIT_ASYNC',
+    'False' if DEBUG else 'True'
+).lower() in ['true', '1', 'yes']
+LOGIN_ATTEMPT_BATCH_SIZE = int(os.getenv('LOGIN_ATTEMPT_BATCH_SIZE', '1' if DEBUG else '50'))
+LOGIN_ATTEMPT_FLUSH_SECONDS = int(os.getenv('LOGIN_ATTEMPT_FLUSH_SECONDS', '5'))
+
+# ==============================
+# Lease PDF Rendering
+# ==============================
+# Rendered PDFs are private documents: keep them outside MEDIA_ROOT
+LEASE_PDF_ROOT = os.getenv(
+    'LEASE_PDF_ROOT',
+    '/data/private/lease_pdfs' if os.getenv('RENDER') else str(BASE_DIR / 'private' / 'lease_pdfs')
+)
+LEASE_PDF_AUTO_RENDER = os.getenv(
+    'LEASE_PDF_AUTO_RENDER',
+    'False' if DEBUG else 'True'
+).lower() in ['true', '1', 'yes']
+LEASE_PDF_RENDER_WORKERS = int(os.getenv('LEASE_PDF_RENDER_WORKERS', '2'))
+LEASE_PDF_RENDER_TIMEOUT = int(os.getenv('LEASE_PDF_RENDER_TIMEOUT', '60'))
+
+# ==============================
+# Tenant Credit Scoring
+# ==============================
+# Rescore a tenant in the background when their leases, rent schedule or profile change
+TENANT_SCORE_AUTO_REFRESH = os.getenv(
+    'TENANT_SCORE_AUTO_REFRESH',
+    'False' if DEBUG else 'True'
+).lower() in ['true', '1', 'yes']
+
+# ==============================
+# Property Image Variants
+# ==============================
+# Resized WebP/JPEG copies (and a blurhash) are generated beside each uploaded image
+PROPERTY_IMAGE_VARIANTS_AUTO_DISPATCH = os.getenv(
+    'PROPERTY_IMAGE_VARIANTS_AUTO_DISPATCH',
+    'False' if DEBUG else 'True'
+).lower() in ['true', '1', 'yes']
+PROPERTY_IMAGE_VARIANT_WIDTHS = tuple(
+    int(width) for width in os.getenv('PROPERTY_IMAGE_VARIANT_WIDTHS', '320,640,1280').split(',') if width.strip()
+)
+# Width of the card thumbnail returned in listing payloads
+PROPERTY_IMAGE_THUMBNAIL_WIDTH = int(os.getenv('PROPERTY_IMAGE_THUMBNAIL_WIDTH', '640'))
+
+# ==============================
+# ImageKit Uploads
+# ==============================
+# utils.imagekit_storage spools uploads on the web host and pushes them from a
+# bounded thread pool in the web process
+IMAGEKIT_UPLOAD_ASYNC = os.getenv('IMAGEKIT_UPLOAD_ASYNC', 'True').lower() in ['true', '1', 'yes']
+IMAGEKIT_UPLOAD_WORKERS = int(os.getenv('IMAGEKIT_UPLOAD_WORKERS', '4'))
+# Pushes waiting for a thread; beyond this they wait for the reconcile run
+IMAGEKIT_UPLOAD_BACKLOG = int(os.getenv('IMAGEKIT_UPLOAD_BACKLOG', '100'))
+IMAGEKIT_UPLOAD_RETRIES = int(os.getenv('IMAGEKIT_UPLOAD_RETRIES', '5'))
+IMAGEKIT_UPLOAD_TIMEOUT = int(os.getenv('IMAGEKIT_UPLOAD_TIMEOUT', '120'))
+# Local to the web host (defaults to <tmp>/imagekit_spool); every web process there shares it
+IMAGEKIT_SPOOL_ROOT = os.getenv('IMAGEKIT_SPOOL_ROOT', '')
+# Spooled copies older than this (seconds) are pushed again by the reconcile run,
+# which each web process starts at most once per this interval
+IMAGEKIT_SPOOL_RECONCILE_AGE = int(os.getenv('IMAGEKIT_SPOOL_RECONCILE_AGE', '900'))
+
+# ==============================
+# Request Profiling
+# ==============================
+# Share of API requests profiled for SQL/cache usage by AuditLoggingMiddleware
+# (latency is always recorded); 0 disables profiling, 1 profiles every request
+REQUEST_PROFILING_SAMPLE_RATE = float(os.getenv(
+    'REQUEST_PROFILING_SAMPLE_RATE',
+    '1.0' if DEBUG else '0'
+))
+# How often each worker publishes its metrics to the shared cache
+REQUEST_METRICS_FLUSH_SECONDS = int(os.getenv('REQUEST_METRICS_FLUSH_SECONDS', '15'))
+# Bearer token a Prometheus scraper can use instead of an admin session
+REQUEST_METRICS_TOKEN = os.getenv('REQUEST_METRICS_TOKEN', '')
+
+# ==============================
+# Response Cache
+# ==============================
+# utils.response_cache: public lookup endpoints cached until a watched model is written
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'True').lower() in ['true', '1', 'yes']
+# Only lets superseded versions age out; freshness comes from the version keys
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', str(60 * 60 * 24)))
+# Rendered bodies kept in each process in front of the shared cache
+RESPONSE_CACHE_LOCAL_ENTRIES = int(os.getenv('RESPONSE_CACHE_LOCAL_ENTRIES', '256'))
+
+# ==============================
+# Subscription Quotas
+# ==============================
+# tariffplans.quotas: active subscription and plan limits cached per user
+QUOTA_CACHE_TIMEOUT = int(os.getenv('QUOTA_CACHE_TIMEOUT', '300'))
+# Photo counters re-seed from the database after this long
+QUOTA_COUNTER_TIMEOUT = int(os.getenv('QUOTA_COUNTER_TIMEOUT', str(60 * 60 * 24)))
+# tariffplans.lifecycle: notice lead time and rows per UPDATE batch
+SUBSCRIPTION_RENEWAL_NOTICE_DAYS = int(os.getenv('SUBSCRIPTION_RENEWAL_NOTICE_DAYS', '3'))
+SUBSCRIPTION_SWEEP_BATCH_SIZE = int(os.getenv('SUBSCRIPTION_SWEEP_BATCH_SIZE', '1000'))
+
+# ==============================
+# Escrow Timers
+# ==============================
+# payment.escrow_timers: escrows moved per locked batch
+ESCROW_TIMER_BATCH_SIZE = int(os.getenv('ESCROW_TIMER_BATCH_SIZE', '500'))
+# run_escrow_timers command: wheel tick, deadlines held in memory, database refill interval
+ESCROW_TIMER_TICK_SECONDS = float(os.getenv('ESCROW_TIMER_TICK_SECONDS', '1'))
+ESCROW_TIMER_LOOKAHEAD_SECONDS = int(os.getenv('ESCROW_TIMER_LOOKAHEAD_SECONDS', '120'))
+ESCROW_TIMER_REFRESH_SECONDS = int(os.getenv('ESCROW_TIMER_REFRESH_SECONDS', '10'))
+
+# ==============================
+# Mobile Money
+# ==============================
+# payment.mobile_money: MTN MoMo collection API; payments are simulated when unset
+MOMO_API_BASE_URL = os.getenv('MOMO_API_BASE_URL', '')
+MOMO_SUBSCRIPTION_KEY = os.getenv('MOMO_SUBSCRIPTION_KEY', '')
+MOMO_API_USER = os.getenv('MOMO_API_USER', '')
+MOMO_API_KEY = os.getenv('MOMO_API_KEY', '')
+MOMO_TARGET_ENVIRONMENT = os.getenv('MOMO_TARGET_ENVIRONMENT', 'sandbox')
+MOMO_TIMEOUT_SECONDS = int(os.getenv('MOMO_TIMEOUT_SECONDS', '10'))
+# Pooled connections per process, also the most concurrent provider calls
+MOMO_POOL_SIZE = int(os.getenv('MOMO_POOL_SIZE', '8'))
+# payment.reconciliation: pending payments checked per batch and in parallel
+MOMO_RECONCILE_BATCH_SIZE = int(os.getenv('MOMO_RECONCILE_BATCH_SIZE', '100'))
+MOMO_RECONCILE_CONCURRENCY = int(os.getenv('MOMO_RECONCILE_CONCURRENCY', '8'))
+# Delay before re-checking a pending payment, doubled per check up to the max
+MOMO_RECONCILE_BACKOFF_SECONDS = int(os.getenv('MOMO_RECONCILE_BACKOFF_SECONDS', '30'))
+MOMO_RECONCILE_MAX_BACKOFF_SECONDS = int(os.getenv('MOMO_RECONCILE_MAX_BACKOFF_SECONDS', '1800'))
+MOMO_RECONCILE_TIMEOUT_HOURS = int(os.getenv('MOMO_RECONCILE_TIMEOUT_HOURS', '24'))
+
+# ==============================
+# Analytics Retention
+# ==============================
+# analytics.rollups: raw view events and inquiries are deleted after these many days;
+# the daily per-property rollups are kept
+ANALYTICS_VIEW_EVENT_RETENTION_DAYS = int(os.getenv('ANALYTICS_VIEW_EVENT_RETENTION_DAYS', '90'))
+ANALYTICS_INQUIRY_RETENTION_DAYS = int(os.getenv('ANALYTICS_INQUIRY_RETENTION_DAYS', '365'))
+# Rows deleted per DELETE statement
+ANALYTICS_PURGE_CHUNK_SIZE = int(os.getenv('ANALYTICS_PURGE_CHUNK_SIZE', '5000'))
+# analytics.partitions (PostgreSQL, after partition_view_events): monthly partitions created ahead
+ANALYTICS_PARTITION_MONTHS_AHEAD = int(os.getenv('ANALYTICS_PARTITION_MONTHS_AHEAD', '2'))
+
+# ==============================
+# Search Facets, Typeahead & Saved Searches
+# ==============================
+# properties.facets: facet counts are cached per filter set until a listing or
+# lookup changes; the timeout covers bulk updates that skip model signals
+PROPERTY_FACETS_CACHE_SECONDS = int(os.getenv('PROPERTY_FACETS_CACHE_SECONDS', '300'))
+PROPERTY_FACETS_PRICE_BINS = int(os.getenv('PROPERTY_FACETS_PRICE_BINS', '10'))
+# properties.typeahead: after a location or listing change, each process keeps its
+# in-memory index at least this long before rebuilding it
+TYPEAHEAD_REFRESH_SECONDS = int(os.getenv('TYPEAHEAD_REFRESH_SECONDS', '30'))
+# The shared typeahead documents are rebuilt by a Celery task, once per delay
+# however many changes come in; the lock timeout bounds a crashed builder
+TYPEAHEAD_AUTO_DISPATCH = os.getenv(
+    'TYPEAHEAD_AUTO_DISPATCH',
+    'False' if DEBUG else 'True'
+).lower() in ['true', '1', 'yes']
+TYPEAHEAD_REBUILD_DELAY_SECONDS = int(os.getenv('TYPEAHEAD_REBUILD_DELAY_SECONDS', '10'))
+TYPEAHEAD_REBUILD_LOCK_SECONDS = int(os.getenv('TYPEAHEAD_REBUILD_LOCK_SECONDS', '300'))
+# properties.saved_searches: listings are matched against saved searches on the
+# batch queue after their save commits (in the process when off)
+SAVED_SEARCH_AUTO_DISPATCH = os.getenv(
+    'SAVED_SEARCH_AUTO_DISPATCH',
+    'False' if DEBUG else 'True'
+).lower() in ['true', '1', 'yes']
+# properties.saved_searches: listings spelled out per hourly alert digest
+SAVED_SEARCH_DIGEST_MAX_LISTINGS = int(os.getenv('SAVED_SEARCH_DIGEST_MAX_LISTINGS', '10'))
+
+# ==============================
+# Startup Warm-up
+# ==============================
+# config.warmup: each web/worker process loads URLconf, serializers and hot
+# caches before taking traffic, so the first requests don't pay for it
+WARMUP_ON_START = os.getenv('WARMUP_ON_START', 'False' if DEBUG else 'True').lower() in ['true', '1', 'yes']
+# Public lookup endpoints rendered once at boot to fill the response cache
+WARMUP_PATHS = [
+    path.strip() for path in os.getenv(
+        'WARMUP_PATHS',
+        '/api/properties/types/,/api/properties/statuses/,/api/credits/pricing/,'
+        '/api/tariffs/plans/,/api/locations/countries/',
+    ).split(',') if path.strip()
+]
+
 # ==============================
 # Public URLs & Search Indexing
 # ==============================
@@ -479,29 +678,16 @@ PROPERTY_SITEMAP_AUTO_DISPATCH = os.getenv(
 # ==============================
 # MEDIA STORAGE CONFIGURATION
 # ==============================
-print("="*60)
-print("MEDIA STORAGE CONFIGURATION")
-print("="*60)
-
 # Use file system storage (simple, reliable, enterprise-ready)
 # For production on Render: use persistent disk at /data/media
 if os.getenv('RENDER'):
     # Production on Render - use persistent disk
     MEDIA_ROOT = '/data/media'
-    print(f"✓ Production media storage configured")
-    print(f"  Storage: Render Persistent Disk")
-    print(f"  Path: {MEDIA_ROOT}")
 else:
     # Local development
     MEDIA_ROOT = BASE_DIR / 'media'
-    print(f"✓ Development media storage configured")
-    print(f"  Path: {MEDIA_ROOT}")
 
 MEDIA_URL = '/media/'
-print(f"  Media URL: {MEDIA_URL}")
-print(f"  ✓ No third-party dependencies!")
-print(f"  ✓ Full control of your files!")
-print("="*60)
 
 # Static files
 STATIC_URL = '/static/'
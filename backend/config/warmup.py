@@ -0,0 +1,97 @@
+"""
+Process warm-up for web and worker processes
+
+Django loads serializers, viewsets and most of DRF lazily, on the first
+request that resolves a URL, so the first requests after a deploy or
+worker restart paid for imports, the first DB connection and empty
+caches. warm_up() does that work at boot instead: it loads the URLconf
+and every app's serializers/tasks modules, opens a connection, and
+renders the hot public lookups so the shared and per-process response
+caches are filled.
+
+Called from config/wsgi.py (before gunicorn forks when started with
+--preload) and from Celery's worker_init signal, which fires in the
+parent worker before the pool forks, so every child inherits the loaded
+modules.
+"""
+import importlib
+import logging
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, connections
+from django.test import RequestFactory
+from django.urls import get_resolver, resolve
+
+logger = logging.getLogger(__name__)
+
+APP_MODULES = ('serializers', 'tasks', 'signals')
+
+
+def import_app_modules():
+    """Import the lazily loaded modules of every project app."""
+    for app_config in apps.get_app_configs():
+        for name in APP_MODULES:
+            module_name = f'{app_config.name}.{name}'
+            try:
+                importlib.import_module(module_name)
+            except ModuleNotFoundError as exc:
+                if exc.name != module_name:
+                    raise
+
+
+def _warmup_host():
+    hosts = [host for host in settings.ALLOWED_HOSTS if host and host != '*' and not host.startswith('.')]
+    return hosts[0] if hosts else 'localhost'
+
+
+def prime_caches():
+    """Fill the location tree, the typeahead index and the response cache of WARMUP_PATHS."""
+    from locations.tree import get_location_tree_payload
+    from properties.typeahead import get_typeahead
+
+    get_location_tree_payload()
+    get_typeahead()
+
+    factory = RequestFactory(HTTP_HOST=_warmup_host())
+    for path in getattr(settings, 'WARMUP_PATHS', []):
+        match = resolve(path.split('?', 1)[0])
+        response = match.func(factory.get(path), *match.args, **match.kwargs)
+        if response.status_code != 200:
+            logger.warning('Warm-up request %s returned %s', path, response.status_code)
+
+
+def warm_up(prime=True, close_connections=True):
+    """
+    Load code and caches before the process takes traffic.
+
+    Failures are logged, never raised: a cold process is better than one
+    that refuses to start because the cache or database was briefly down.
+    Returns {phase: seconds}.
+    """
+    timings = {}
+    started = time.perf_counter()
+    try:
+        get_resolver().url_patterns
+        import_app_modules()
+        timings['code'] = time.perf_counter() - started
+
+        phase_started = time.perf_counter()
+        connection.ensure_connection()
+        timings['database'] = time.perf_counter() - phase_started
+
+        if prime:
+            phase_started = time.perf_counter()
+            prime_caches()
+            timings['caches'] = time.perf_counter() - phase_started
+    except Exception:
+        logger.warning('Process warm-up incomplete', exc_info=True)
+    finally:
+        if close_connections:
+            # Sockets must not be shared by processes forked after this
+            connections.close_all()
+
+    timings['total'] = time.perf_counter() - started
+    logger.info('Process warm-up finished in %.2fs', timings['total'])
+    return timings
@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# With gunicorn --preload this runs once in the master and workers fork warm
+from django.conf import settings  # noqa: E402
+
+if settings.WARMUP_ON_START:
+    from config.warmup import warm_up
+    warm_up()
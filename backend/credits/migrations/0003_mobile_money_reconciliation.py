@@ -0,0 +1,29 @@
+# Generated by Django 5.2.12 on 2026-10-19 16:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credits', '0002_referral'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='credittransaction',
+            name='next_status_check_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='credittransaction',
+            name='status_checks',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='credittransaction',
+            index=models.Index(fields=['status', 'next_status_check_at'], name='credits_cre_status_2cd8c7_idx'),
+        ),
+    ]
@@ -242,6 +242,10 @@ class CreditTransaction(models.Model):
     user_agent = models.TextField(blank=True)
     metadata = models.JSONField(default=dict, blank=True)
 
+    # Provider status polling of pending purchases (payment.reconciliation)
+    status_checks = models.PositiveSmallIntegerField(default=0)
+    next_status_check_at = models.DateTimeField(null=True, blank=True)
+
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     completed_at = models.DateTimeField(null=True, blank=True)
 
@@ -254,6 +258,7 @@ class CreditTransaction(models.Model):
             models.Index(fields=['transaction_type', 'status']),
             models.Index(fields=['reference_id']),
             models.Index(fields=['payment_reference']),
+            models.Index(fields=['status', 'next_status_check_at']),
         ]
 
     def __str__(self):
@@ -81,6 +81,77 @@ class CreditService:
         except Exception as e:
             return False, None, f"Purchase failed: {str(e)}"
 
+    @staticmethod
+    def start_purchase(user, package, payment_method, payment_reference, metadata=None):
+        """
+        Record a pending purchase paid outside the request (mobile money).
+        Credits are added by complete_purchase once the payment settles.
+        """
+        balance, _ = CreditBalance.objects.get_or_create(user=user)
+        return CreditTransaction.objects.create(
+            user=user,
+            transaction_type=CreditTransaction.PURCHASE,
+            amount=Decimal(str(package.total_credits)),
+            status=CreditTransaction.STATUS_PENDING,
+            balance_before=balance.balance,
+            balance_after=balance.balance,
+            description=f"Purchase of {package.name} package",
+            package=package,
+            payment_method=payment_method,
+            payment_reference=payment_reference,
+            payment_amount=package.price,
+            payment_currency=package.currency,
+            metadata=metadata or {},
+            next_status_check_at=timezone.now(),
+        )
+
+    @staticmethod
+    @transaction.atomic
+    def complete_purchase(transaction_id, provider_response=None):
+        """
+        Add the credits of a pending purchase whose payment succeeded.
+        Idempotent: returns False when the purchase was already settled.
+        """
+        transaction_obj = CreditTransaction.objects.select_for_update().filter(
+            id=transaction_id,
+            status=CreditTransaction.STATUS_PENDING
+        ).first()
+        if transaction_obj is None:
+            return False
+
+        balance, _ = CreditBalance.objects.select_for_update().get_or_create(user_id=transaction_obj.user_id)
+        transaction_obj.balance_before = balance.balance
+        transaction_obj.balance_after = balance.add_credits(
+            amount=transaction_obj.amount,
+            transaction_type=CreditTransaction.PURCHASE,
+            description=transaction_obj.description
+        )
+        transaction_obj.status = CreditTransaction.STATUS_COMPLETED
+        transaction_obj.completed_at = timezone.now()
+        transaction_obj.next_status_check_at = None
+        if provider_response:
+            transaction_obj.metadata['provider'] = provider_response
+        transaction_obj.save()
+        return True
+
+    @staticmethod
+    @transaction.atomic
+    def fail_purchase(transaction_id, provider_response=None):
+        """Mark a pending purchase failed; returns False when it was already settled."""
+        transaction_obj = CreditTransaction.objects.select_for_update().filter(
+            id=transaction_id,
+            status=CreditTransaction.STATUS_PENDING
+        ).first()
+        if transaction_obj is None:
+            return False
+
+        transaction_obj.status = CreditTransaction.STATUS_FAILED
+        transaction_obj.next_status_check_at = None
+        if provider_response:
+            transaction_obj.metadata['provider'] = provider_response
+        transaction_obj.save()
+        return True
+
     @staticmethod
     @transaction.atomic
     def use_credits(user, action, reference_id, metadata=None):
@@ -7,9 +7,12 @@ from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from .models import CreditBalance, CreditTransaction, CreditPricing
 from decimal import Decimal
+from utils.response_cache import watch_models
 
 User = get_user_model()
 
+watch_models(CreditPricing)
+
 
 @receiver(post_save, sender=User)
 def create_credit_balance(sender, instance, created, **kwargs):
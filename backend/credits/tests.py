@@ -1,4 +1,58 @@
 # Credits app tests
-from django.test import TestCase
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from .models import CreditPackage, CreditTransaction
+
+User = get_user_model()
+
+
+class MomoPaymentFlowTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='buyer', email='buyer@example.com', password='testpass123', phone_number='+237600000010',
+        )
+        self.package = CreditPackage.objects.create(name='Starter', credits=100, price=5000)
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def _initiate(self):
+        response = self.api.post('/api/credits/payment/momo/initiate/', {
+            'package_id': str(self.package.id), 'phone_number': '+237670000000',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data['payment_reference']
+
+    def test_initiate_records_pending_purchase_without_credits(self):
+        reference = self._initiate()
+
+        purchase = CreditTransaction.objects.get(payment_reference=reference)
+        self.assertEqual(purchase.status, 'pending')
+        self.assertEqual(purchase.balance_before, purchase.balance_after)
+        self.assertIsNotNone(purchase.next_status_check_at)
+
+    @override_settings(MOMO_API_BASE_URL='http://momo.invalid', MOMO_SUBSCRIPTION_KEY='key')
+    @patch('credits.views.reconcile_mobile_money_payment.delay')
+    @patch('payment.mobile_money.MobileMoneyClient.request_to_pay')
+    def test_verify_queues_a_provider_check_while_pending(self, request_to_pay, delay):
+        reference = self._initiate()
+        request_to_pay.assert_called_once()
+
+        response = self.api.post('/api/credits/payment/momo/verify/', {'payment_reference': reference}, format='json')
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'pending')
+        delay.assert_called_once_with('credit', str(CreditTransaction.objects.get(payment_reference=reference).id))
+
+    def test_verify_without_provider_simulates_payment_once(self):
+        reference = self._initiate()
+
+        first = self.api.post('/api/credits/payment/momo/verify/', {'payment_reference': reference}, format='json')
+        second = self.api.post('/api/credits/payment/momo/verify/', {'payment_reference': reference}, format='json')
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data['balance']['balance'], first.data['balance']['balance'])
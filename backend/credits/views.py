@@ -2,6 +2,10 @@
 Credit System Views
 API endpoints for credit management
 """
+import logging
+import uuid
+
+import requests
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
@@ -28,6 +32,12 @@ from .serializers import (
     ReferralSerializer,
 )
 from .services import CreditService
+from payment import mobile_money
+from payment.reconciliation import get_client
+from payment.tasks import reconcile_mobile_money_payment
+from utils.response_cache import VersionedCacheMixin
+
+logger = logging.getLogger(__name__)
 
 
 class CreditBalanceView(generics.RetrieveAPIView):
@@ -221,7 +231,7 @@ class PropertyViewHistoryView(generics.ListAPIView):
         ).select_related('property', 'transaction').order_by('-viewed_at')
 
 
-class CreditPricingListView(generics.ListAPIView):
+class CreditPricingListView(VersionedCacheMixin, generics.ListAPIView):
     """
     List credit pricing rules
     GET /api/credits/pricing/
@@ -229,6 +239,7 @@ class CreditPricingListView(generics.ListAPIView):
     serializer_class = CreditPricingSerializer
     permission_classes = [AllowAny]
     queryset = CreditPricing.objects.filter(is_active=True)
+    cache_models = (CreditPricing,)
 
 
 @api_view(['GET'])
@@ -261,6 +272,9 @@ def initiate_momo_payment(request):
         "package_id": "uuid",
         "phone_number": "+237XXXXXXXXX"
     }
+
+    Records a pending purchase; payment.reconciliation settles it from the
+    provider's status in the background.
     """
     package_id = request.data.get('package_id')
     phone_number = request.data.get('phone_number')
@@ -277,15 +291,34 @@ def initiate_momo_payment(request):
             'error': 'Invalid credit package'
         }, status=status.HTTP_400_BAD_REQUEST)
 
-    # TODO: Integrate with MTN Mobile Money API
-    # For now, return mock response
+    payment_reference = str(uuid.uuid4())
+    purchase = CreditService.start_purchase(
+        user=request.user,
+        package=package,
+        payment_method='momo',
+        payment_reference=payment_reference,
+        metadata={'ip_address': request.META.get('REMOTE_ADDR'), 'phone_number': phone_number}
+    )
 
-    payment_reference = f"MOMO-{timezone.now().strftime('%Y%m%d%H%M%S')}"
+    if mobile_money.is_configured():
+        try:
+            get_client().request_to_pay(
+                payment_reference, package.price, package.currency, phone_number, f"{package.name} credits"
+            )
+        except mobile_money.MobileMoneyOutcomeUnknown:
+            # The payer may have been prompted; reconciliation settles the purchase either way
+            logger.warning('Mobile money purchase %s may not have reached the provider', purchase.id)
+        except (mobile_money.MobileMoneyError, requests.RequestException):
+            CreditService.fail_purchase(purchase.id)
+            return Response({
+                'error': 'Mobile money is unavailable right now. Please try again.'
+            }, status=status.HTTP_502_BAD_GATEWAY)
 
     return Response({
         'success': True,
         'message': 'Payment initiated. Please check your phone for the payment prompt.',
         'payment_reference': payment_reference,
+        'status': purchase.status,
         'amount': float(package.price),
         'currency': package.currency,
         'package': CreditPackageSerializer(package).data
@@ -301,45 +334,59 @@ def verify_momo_payment(request):
 
     Body:
     {
-        "payment_reference": "MOMO-XXXX",
-        "package_id": "uuid"
+        "payment_reference": "uuid"
     }
+
+    Returns 202 while the payment is pending and queues an immediate
+    provider check; the payer is also notified when it settles. Without a
+    configured provider the payment is simulated as successful.
     """
     payment_reference = request.data.get('payment_reference')
-    package_id = request.data.get('package_id')
 
-    if not payment_reference or not package_id:
+    if not payment_reference:
         return Response({
-            'error': 'payment_reference and package_id are required'
+            'error': 'payment_reference is required'
         }, status=status.HTTP_400_BAD_REQUEST)
 
-    # TODO: Verify payment with MTN Mobile Money API
-    # For now, simulate successful payment
-
-    # Process credit purchase
-    success, transaction_obj, message = CreditService.purchase_credits(
+    purchase = CreditTransaction.objects.filter(
         user=request.user,
-        package_id=package_id,
-        payment_method='momo',
-        payment_reference=payment_reference,
-        metadata={
-            'ip_address': request.META.get('REMOTE_ADDR'),
-            'verified_at': timezone.now().isoformat()
-        }
-    )
+        transaction_type=CreditTransaction.PURCHASE,
+        payment_reference=payment_reference
+    ).first()
+    if purchase is None:
+        return Response({
+            'error': 'Payment not found'
+        }, status=status.HTTP_404_NOT_FOUND)
 
-    if success:
+    if purchase.status == CreditTransaction.STATUS_PENDING:
+        if mobile_money.is_configured():
+            reconcile_mobile_money_payment.delay('credit', str(purchase.id))
+        else:
+            CreditService.complete_purchase(purchase.id, {'status': 'SIMULATED'})
+        purchase.refresh_from_db()
+
+    if purchase.status == CreditTransaction.STATUS_PENDING:
         return Response({
             'success': True,
+            'status': purchase.status,
+            'message': 'Waiting for the payment to be approved. You will be notified when it completes.',
+            'transaction': CreditTransactionSerializer(purchase).data
+        }, status=status.HTTP_202_ACCEPTED)
+
+    if purchase.status == CreditTransaction.STATUS_COMPLETED:
+        return Response({
+            'success': True,
+            'status': purchase.status,
             'message': 'Payment verified and credits added to your account',
-            'transaction': CreditTransactionSerializer(transaction_obj).data,
+            'transaction': CreditTransactionSerializer(purchase).data,
             'balance': CreditBalanceSerializer(request.user.credit_balance).data
         })
-    else:
-        return Response({
-            'success': False,
-            'message': message
-        }, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'success': False,
+        'status': purchase.status,
+        'message': 'The payment did not go through'
+    }, status=status.HTTP_400_BAD_REQUEST)
 
 
 # ========================
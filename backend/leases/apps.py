@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class LeasesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'leases'
+
+    def ready(self):
+        import leases.signals  # noqa: F401
@@ -0,0 +1,181 @@
+import hashlib
+import hmac
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.signals import setting_changed
+from django.db.models import Q
+from django.dispatch import receiver
+from django.template.loader import render_to_string
+from django.utils.functional import LazyObject, empty
+
+from .models import LeaseAgreement
+
+logger = logging.getLogger(__name__)
+
+# Bump when leases/lease_pdf.html changes so stored PDFs are re-rendered
+LEASE_PDF_TEMPLATE_VERSION = 1
+
+# Everything the template touches, so renders on the pool thread never hit the DB
+LEASE_PDF_SELECT_RELATED = (
+    'rental_property', 'rental_property__area__city',
+    'tenant__user', 'landlord', 'agent__user',
+)
+
+# Related rows the template renders; edits to any of them make a new version
+LEASE_PDF_RELATED_ROWS = (
+    'rental_property', 'rental_property__area', 'tenant', 'tenant__user', 'landlord', 'agent', 'agent__user',
+)
+
+
+class LeasePDFStorage(LazyObject):
+    """Private file storage for rendered lease PDFs (never under MEDIA_ROOT)."""
+
+    def _setup(self):
+        self._wrapped = FileSystemStorage(location=settings.LEASE_PDF_ROOT)
+
+
+lease_pdf_storage = LeasePDFStorage()
+
+
+@receiver(setting_changed)
+def _reset_lease_pdf_storage(setting, **kwargs):
+    if setting == 'LEASE_PDF_ROOT':
+        lease_pdf_storage._wrapped = empty
+
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+_html_class = None
+
+
+def _get_render_pool():
+    global _render_pool
+    if _render_pool is None:
+        with _render_pool_lock:
+            if _render_pool is None:
+                _render_pool = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'LEASE_PDF_RENDER_WORKERS', 2),
+                    thread_name_prefix='lease-pdf',
+                )
+    return _render_pool
+
+
+def _get_html_class():
+    # WeasyPrint is heavy to import; pay for it once per process, on first render
+    global _html_class
+    if _html_class is None:
+        from weasyprint import HTML
+
+        _html_class = HTML
+    return _html_class
+
+
+def _related_row(lease, path):
+    row = lease
+    for name in path.split('__'):
+        row = getattr(row, name, None)
+        if row is None:
+            break
+    return row
+
+
+def lease_pdf_digest(lease):
+    """
+    Content key for a lease version: keyed hash of id, updated_at, status (bulk
+    updates such as auto-expiry may not touch updated_at), the updated_at of
+    the related rows the template renders and the template version.
+    """
+    parts = [str(lease.pk), lease.updated_at.isoformat(), lease.status]
+    for path in LEASE_PDF_RELATED_ROWS:
+        row = _related_row(lease, path)
+        updated_at = getattr(row, 'updated_at', None)
+        parts.append(updated_at.isoformat() if updated_at else '')
+    # The city name is rendered with the area, and City has no updated_at
+    parts.append(str(lease.rental_property.area or ''))
+    parts.append(str(LEASE_PDF_TEMPLATE_VERSION))
+    message = ':'.join(parts)
+    return hmac.new(settings.SECRET_KEY.encode('utf-8'), message.encode('utf-8'), hashlib.sha256).hexdigest()[:32]
+
+
+def lease_pdf_directory(lease_id):
+    return str(lease_id)
+
+
+def lease_pdf_path(lease):
+    return posixpath.join(lease_pdf_directory(lease.pk), f'{lease_pdf_digest(lease)}.pdf')
+
+
+def render_lease_pdf_bytes(lease):
+    html = render_to_string('leases/lease_pdf.html', {'lease': lease})
+    return _get_html_class()(string=html).write_pdf()
+
+
+def _prune_stale_versions(lease, current_path):
+    directory = lease_pdf_directory(lease.pk)
+    try:
+        _dirs, files = lease_pdf_storage.listdir(directory)
+    except FileNotFoundError:
+        return
+
+    for name in files:
+        path = posixpath.join(directory, name)
+        if path != current_path:
+            lease_pdf_storage.delete(path)
+
+
+def store_lease_pdf(lease, pdf_bytes):
+    path = lease_pdf_path(lease)
+    if not lease_pdf_storage.exists(path):
+        lease_pdf_storage.save(path, ContentFile(pdf_bytes))
+    _prune_stale_versions(lease, path)
+    return path
+
+
+def render_and_store_lease_pdf(lease):
+    path = lease_pdf_path(lease)
+    if lease_pdf_storage.exists(path):
+        return path
+    return store_lease_pdf(lease, render_lease_pdf_bytes(lease))
+
+
+def get_lease_pdf(lease):
+    """
+    Return (file, source) for the current version of the lease PDF.
+
+    Stored renders are served as-is. On a miss the PDF is rendered on the
+    bounded render pool so at most LEASE_PDF_RENDER_WORKERS renders run in
+    this process, then stored for the next download.
+    """
+    path = lease_pdf_path(lease)
+    if lease_pdf_storage.exists(path):
+        return lease_pdf_storage.open(path, 'rb'), 'stored'
+
+    future = _get_render_pool().submit(render_lease_pdf_bytes, lease)
+    pdf_bytes = future.result(timeout=getattr(settings, 'LEASE_PDF_RENDER_TIMEOUT', 60))
+    try:
+        store_lease_pdf(lease, pdf_bytes)
+    except Exception:
+        logger.warning('Rendered lease %s PDF but could not store it.', lease.pk, exc_info=True)
+    return ContentFile(pdf_bytes), 'rendered'
+
+
+def get_lease_for_pdf(lease_id, user=None):
+    qs = LeaseAgreement.objects.select_related(*LEASE_PDF_SELECT_RELATED)
+    if user is None or user.is_staff:
+        return qs.get(pk=lease_id)
+    return qs.get(Q(tenant__user=user) | Q(landlord=user), pk=lease_id)
+
+
+def queue_lease_pdf_render(lease_id):
+    if not getattr(settings, 'LEASE_PDF_AUTO_RENDER', False):
+        return
+
+    from .tasks import render_lease_pdf
+
+    render_lease_pdf.delay(lease_id)
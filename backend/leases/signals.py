@@ -0,0 +1,12 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import LeaseAgreement
+from .pdf import queue_lease_pdf_render
+
+
+@receiver(post_save, sender=LeaseAgreement)
+def queue_lease_pdf_for_render(sender, instance, **kwargs):
+    lease_id = instance.pk
+    transaction.on_commit(lambda: queue_lease_pdf_render(lease_id))
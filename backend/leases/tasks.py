@@ -141,6 +141,21 @@ def auto_expire_leases():
         status='active',
         end_date__lt=today,
         auto_renewal=False,
-    ).update(status='expired')
+    ).update(status='expired', updated_at=timezone.now())
 
     logger.info('Auto-expired %d leases', expired)
+
+
+@shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=True, retry_jitter=True, retry_kwargs={'max_retries': 3})
+def render_lease_pdf(self, lease_id):
+    """Render the current version of a lease PDF into lease PDF storage."""
+    from .models import LeaseAgreement
+    from .pdf import get_lease_for_pdf, render_and_store_lease_pdf
+
+    try:
+        lease = get_lease_for_pdf(lease_id)
+    except LeaseAgreement.DoesNotExist:
+        return {'status': 'missing', 'lease_id': lease_id}
+
+    path = render_and_store_lease_pdf(lease)
+    return {'status': 'completed', 'lease_id': lease_id, 'path': path}
@@ -1,3 +1,104 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import date
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from agents.models import AgentProfile
+from locations.models import Area, City, Country, Region
+from properties.models import Property, PropertyStatus, PropertyType
+from tenants.models import TenantProfile
+from .models import LeaseAgreement
+from .pdf import lease_pdf_path, lease_pdf_storage
+
+User = get_user_model()
+
+
+class LeasePDFTests(TestCase):
+    def setUp(self):
+        self.pdf_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.pdf_root, ignore_errors=True)
+        settings_override = override_settings(LEASE_PDF_ROOT=self.pdf_root, LEASE_PDF_AUTO_RENDER=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.landlord = User.objects.create_user(
+            username='landlord', email='landlord@example.com', password='testpass123',
+            phone_number='+237600000200', user_type='agent',
+        )
+        tenant_user = User.objects.create_user(
+            username='tenant', email='tenant@example.com', password='testpass123',
+            phone_number='+237600000201', user_type='tenant',
+        )
+        agent_profile = AgentProfile.objects.create(user=self.landlord, bio='Agent')
+        country = Country.objects.create(name='Cameroon', code='CM')
+        region = Region.objects.create(name='Littoral', code='littoral', country=country)
+        city = City.objects.create(name='Douala', region=region)
+        area = Area.objects.create(name='Akwa', city=city)
+        rental_property = Property.objects.create(
+            title='Lease Property',
+            description='Lease PDF property',
+            property_type=PropertyType.objects.create(name='Apartment', category='residential'),
+            status=PropertyStatus.objects.create(name='available'),
+            listing_type='rent',
+            price=100000,
+            area=area,
+            agent=agent_profile,
+        )
+        self.lease = LeaseAgreement.objects.create(
+            rental_property=rental_property,
+            tenant=TenantProfile.objects.create(user=tenant_user),
+            landlord=self.landlord,
+            start_date=date(2026, 1, 1),
+            end_date=date(2026, 12, 31),
+            rent_amount=100000,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.landlord)
+        self.url = reverse('lease-pdf', kwargs={'pk': self.lease.pk})
+
+    @patch('leases.pdf.render_lease_pdf_bytes', return_value=b'%PDF-1.7 test')
+    def test_second_download_is_served_from_storage(self, render):
+        first = self.client.get(self.url)
+        second = self.client.get(self.url)
+
+        self.assertEqual(first['X-Property237-PDF-Source'], 'rendered')
+        self.assertEqual(second['X-Property237-PDF-Source'], 'stored')
+        self.assertEqual(b''.join(second.streaming_content), b'%PDF-1.7 test')
+        self.assertEqual(render.call_count, 1)
+
+    @patch('leases.pdf.render_lease_pdf_bytes', return_value=b'%PDF-1.7 test')
+    def test_lease_change_uses_new_key_and_prunes_old_pdf(self, render):
+        self.client.get(self.url)
+        old_path = lease_pdf_path(self.lease)
+
+        self.lease.terms = 'Updated terms'
+        self.lease.save()
+        self.client.get(self.url)
+
+        self.assertNotEqual(lease_pdf_path(self.lease), old_path)
+        self.assertFalse(lease_pdf_storage.exists(old_path))
+        self.assertEqual(render.call_count, 2)
+
+    @patch('leases.pdf.render_lease_pdf_bytes', return_value=b'%PDF-1.7 test')
+    def test_expiry_and_related_edits_use_new_key(self, render):
+        from .tasks import auto_expire_leases
+
+        LeaseAgreement.objects.filter(pk=self.lease.pk).update(status='active', end_date=date(2026, 1, 31))
+        self.client.get(self.url)
+        active_path = lease_pdf_path(LeaseAgreement.objects.get(pk=self.lease.pk))
+
+        auto_expire_leases()
+        expired_path = lease_pdf_path(LeaseAgreement.objects.get(pk=self.lease.pk))
+        self.assertNotEqual(expired_path, active_path)
+        # A status change alone, as other bulk updates may do, is a new version too
+        LeaseAgreement.objects.filter(pk=self.lease.pk).update(status='terminated', updated_at=self.lease.updated_at)
+        self.assertNotEqual(lease_pdf_path(LeaseAgreement.objects.get(pk=self.lease.pk)), expired_path)
+
+        self.landlord.first_name = 'Renamed'
+        self.landlord.save()
+        self.assertNotEqual(lease_pdf_path(self.lease), active_path)
@@ -2,9 +2,9 @@ from rest_framework import viewsets, permissions, filters
 from rest_framework.decorators import api_view, permission_classes as perm_classes
 from rest_framework.permissions import IsAuthenticated
 from django.db.models import Q
-from django.http import HttpResponse
-from django.template.loader import render_to_string
+from django.http import FileResponse, HttpResponse
 from .models import LeaseAgreement, RentSchedule
+from .pdf import get_lease_for_pdf, get_lease_pdf
 from .serializers import LeaseAgreementSerializer, RentScheduleSerializer
 
 
@@ -46,27 +46,15 @@ class RentScheduleViewSet(viewsets.ModelViewSet):
 @api_view(['GET'])
 @perm_classes([IsAuthenticated])
 def lease_pdf(request, pk):
-    """Generate and return a PDF for a lease agreement."""
+    """Return the PDF for a lease agreement, rendering it only if no stored copy exists."""
     try:
-        qs = LeaseAgreement.objects.select_related(
-            'rental_property', 'rental_property__area',
-            'tenant__user', 'landlord', 'agent__user',
-        )
-        if request.user.is_staff:
-            lease = qs.get(pk=pk)
-        else:
-            lease = qs.get(
-                Q(tenant__user=request.user) | Q(landlord=request.user),
-                pk=pk,
-            )
+        lease = get_lease_for_pdf(pk, request.user)
     except LeaseAgreement.DoesNotExist:
         return HttpResponse('Lease not found', status=404)
 
-    html = render_to_string('leases/lease_pdf.html', {'lease': lease})
-
-    from weasyprint import HTML
-    pdf = HTML(string=html).write_pdf()
+    pdf_file, source = get_lease_pdf(lease)
 
-    response = HttpResponse(pdf, content_type='application/pdf')
+    response = FileResponse(pdf_file, content_type='application/pdf')
     response['Content-Disposition'] = f'inline; filename="lease-{lease.lease_number}.pdf"'
+    response['X-Property237-PDF-Source'] = source
     return response
@@ -0,0 +1,21 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Area, City, Country, Region
+from .tree import bump_location_tree_version
+from utils.response_cache import watch_models
+
+watch_models(Country, Region, City, Area)
+
+
+@receiver(post_save, sender=Country)
+@receiver(post_save, sender=Region)
+@receiver(post_save, sender=City)
+@receiver(post_save, sender=Area)
+@receiver(post_delete, sender=Country)
+@receiver(post_delete, sender=Region)
+@receiver(post_delete, sender=City)
+@receiver(post_delete, sender=Area)
+def invalidate_location_tree(sender, **kwargs):
+    transaction.on_commit(bump_location_tree_version)
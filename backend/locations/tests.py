@@ -1,3 +1,57 @@
-from django.test import TestCase
+import json
 
-# Create your tests here.
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .models import Area, City, Country, Region
+
+
+class LocationTreeAPITests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.country = Country.objects.create(name='Cameroon', code='CM')
+        self.region = Region.objects.create(name='Littoral', code='littoral', country=self.country)
+        self.city = City.objects.create(name='Douala', region=self.region, is_major_city=True)
+        self.area = Area.objects.create(name='Bonapriso', city=self.city)
+        self.url = reverse('locations:location-tree')
+
+    def test_tree_is_served_from_cache(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(first.content)[0]['regions'][0]['cities'][0]['areas'][0]['name'], 'Bonapriso')
+
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second.content, first.content)
+
+    def test_matching_etag_returns_not_modified(self):
+        first = self.client.get(self.url)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_location_write_invalidates_tree(self):
+        first = self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Area.objects.create(name='Akwa', city=self.city)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        areas = json.loads(response.content)[0]['regions'][0]['cities'][0]['areas']
+        self.assertEqual(sorted(area['name'] for area in areas), ['Akwa', 'Bonapriso'])
+
+    def test_lazy_level_returns_children_of_parent(self):
+        response = self.client.get(self.url, {'level': 'cities', 'region': self.region.id})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [{'id': self.city.id, 'name': 'Douala', 'is_major_city': True}])
+
+    def test_lazy_level_requires_parent(self):
+        response = self.client.get(self.url, {'level': 'areas'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
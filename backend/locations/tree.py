@@ -0,0 +1,135 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+from utils.db_routing import use_replica
+
+from .models import Country
+
+LOCATION_TREE_CACHE_KEY = 'locations:tree:payload:v1'
+LOCATION_TREE_VERSION_KEY = 'locations:tree:version:v1'
+
+# Lazy mode levels and the query parameter naming their parent.
+LOCATION_TREE_LEVELS = {
+    'countries': None,
+    'regions': 'country',
+    'cities': 'region',
+    'areas': 'city',
+}
+
+
+def build_location_tree():
+    countries = Country.objects.prefetch_related(
+        'regions__cities__areas'
+    ).all()
+
+    data = []
+    for country in countries:
+        country_data = {
+            'id': country.id,
+            'name': country.name,
+            'code': country.code,
+            'regions': []
+        }
+
+        for region in country.regions.all():
+            region_data = {
+                'id': region.id,
+                'name': region.name,
+                'code': region.code,
+                'cities': []
+            }
+
+            for city in region.cities.all():
+                city_data = {
+                    'id': city.id,
+                    'name': city.name,
+                    'is_major_city': city.is_major_city,
+                    'areas': [
+                        {
+                            'id': area.id,
+                            'name': area.name,
+                            'local_name': area.local_name
+                        }
+                        for area in city.areas.all()
+                    ]
+                }
+                region_data['cities'].append(city_data)
+
+            country_data['regions'].append(region_data)
+
+        data.append(country_data)
+
+    return data
+
+
+def _shallow(node, children_key):
+    return {key: value for key, value in node.items() if key != children_key}
+
+
+def build_location_tree_levels(tree):
+    """Index the tree by parent id so lazy lookups are a single dict access."""
+    levels = {
+        'countries': {'': [_shallow(country, 'regions') for country in tree]},
+        'regions': {},
+        'cities': {},
+        'areas': {},
+    }
+
+    for country in tree:
+        levels['regions'][str(country['id'])] = [_shallow(region, 'cities') for region in country['regions']]
+        for region in country['regions']:
+            levels['cities'][str(region['id'])] = [_shallow(city, 'areas') for city in region['cities']]
+            for city in region['cities']:
+                levels['areas'][str(city['id'])] = list(city['areas'])
+
+    return levels
+
+
+def build_location_tree_payload(version):
+    tree = build_location_tree()
+    body = json.dumps(tree, cls=DjangoJSONEncoder, separators=(',', ':'))
+
+    return {
+        'version': version,
+        'etag': hashlib.md5(body.encode('utf-8')).hexdigest(),
+        'body': body,
+        'levels': build_location_tree_levels(tree),
+    }
+
+
+def get_location_tree_version():
+    version = cache.get(LOCATION_TREE_VERSION_KEY)
+    if version is None:
+        cache.add(LOCATION_TREE_VERSION_KEY, 1, timeout=None)
+        version = cache.get(LOCATION_TREE_VERSION_KEY, 1)
+    return version
+
+
+def bump_location_tree_version():
+    try:
+        cache.incr(LOCATION_TREE_VERSION_KEY)
+    except ValueError:
+        cache.add(LOCATION_TREE_VERSION_KEY, 1, timeout=None)
+    cache.delete(LOCATION_TREE_CACHE_KEY)
+
+
+def get_location_tree_payload():
+    """
+    Return the cached tree payload, rebuilding it when the version moved.
+
+    A payload built concurrently with a write is stored under the version it
+    was read with, so the next reader sees the mismatch and rebuilds.
+    """
+    version = get_location_tree_version()
+    payload = cache.get(LOCATION_TREE_CACHE_KEY)
+    if isinstance(payload, dict) and payload.get('version') == version:
+        return payload
+
+    # From the primary: a lagging replica would store old rows under the new version
+    with use_replica(False):
+        payload = build_location_tree_payload(version)
+    cache.set(LOCATION_TREE_CACHE_KEY, payload, timeout=None)
+    return payload
@@ -1,4 +1,6 @@
-from rest_framework import generics
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
@@ -7,18 +9,25 @@ from .serializers import (
     CountrySerializer, RegionSerializer, CitySerializer, AreaSerializer,
     LocationTreeSerializer, PopularLocationSerializer
 )
+from .tree import LOCATION_TREE_LEVELS, get_location_tree_payload
+from utils.response_cache import VersionedCacheMixin
 
+# Serializers nest parents (area -> city -> region -> country)
+LOCATION_CACHE_MODELS = (Country, Region, City, Area)
 
-class CountryListAPIView(generics.ListAPIView):
+
+class CountryListAPIView(VersionedCacheMixin, generics.ListAPIView):
     """List all countries"""
     permission_classes = [AllowAny]
+    cache_models = LOCATION_CACHE_MODELS
     queryset = Country.objects.all()
     serializer_class = CountrySerializer
 
 
-class RegionListAPIView(generics.ListAPIView):
+class RegionListAPIView(VersionedCacheMixin, generics.ListAPIView):
     """List regions, optionally filtered by country"""
     permission_classes = [AllowAny]
+    cache_models = LOCATION_CACHE_MODELS
     queryset = Region.objects.select_related('country').all()
     serializer_class = RegionSerializer
 
@@ -30,9 +39,10 @@ class RegionListAPIView(generics.ListAPIView):
         return queryset
 
 
-class CityListAPIView(generics.ListAPIView):
+class CityListAPIView(VersionedCacheMixin, generics.ListAPIView):
     """List cities, optionally filtered by region"""
     permission_classes = [AllowAny]
+    cache_models = LOCATION_CACHE_MODELS
     queryset = City.objects.select_related('region__country').all()
     serializer_class = CitySerializer
 
@@ -44,9 +54,10 @@ class CityListAPIView(generics.ListAPIView):
         return queryset.order_by('-is_major_city', 'name')
 
 
-class AreaListAPIView(generics.ListAPIView):
+class AreaListAPIView(VersionedCacheMixin, generics.ListAPIView):
     """List areas, optionally filtered by city"""
     permission_classes = [AllowAny]
+    cache_models = LOCATION_CACHE_MODELS
     queryset = Area.objects.select_related('city__region__country').all()
     serializer_class = AreaSerializer
 
@@ -61,53 +72,46 @@ class AreaListAPIView(generics.ListAPIView):
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def location_tree(request):
-    """Get complete location hierarchy for dropdowns"""
-    countries = Country.objects.prefetch_related(
-        'regions__cities__areas'
-    ).all()
-
-    data = []
-    for country in countries:
-        country_data = {
-            'id': country.id,
-            'name': country.name,
-            'code': country.code,
-            'regions': []
-        }
-
-        for region in country.regions.all():
-            region_data = {
-                'id': region.id,
-                'name': region.name,
-                'code': region.code,
-                'cities': []
-            }
-
-            for city in region.cities.all():
-                city_data = {
-                    'id': city.id,
-                    'name': city.name,
-                    'is_major_city': city.is_major_city,
-                    'areas': [
-                        {
-                            'id': area.id,
-                            'name': area.name,
-                            'local_name': area.local_name
-                        }
-                        for area in city.areas.all()
-                    ]
-                }
-                region_data['cities'].append(city_data)
-
-            country_data['regions'].append(region_data)
-
-        data.append(country_data)
-
-    return Response(data)
+    """
+    Get complete location hierarchy for dropdowns.
+
+    Pass ``level`` (countries, regions, cities or areas) together with the
+    parent id (``country``, ``region`` or ``city``) to load one level at a time.
+    """
+    payload = get_location_tree_payload()
+    level = request.query_params.get('level')
+
+    if level:
+        if level not in LOCATION_TREE_LEVELS:
+            return Response(
+                {'error': f"level must be one of: {', '.join(LOCATION_TREE_LEVELS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        parent_param = LOCATION_TREE_LEVELS[level]
+        parent_id = request.query_params.get(parent_param, '') if parent_param else ''
+        if parent_param and not parent_id:
+            return Response({'error': f'{parent_param} is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        etag = f'"{payload["etag"]}-{level}-{parent_id}"'
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        response = Response(payload['levels'][level].get(parent_id, []))
+    else:
+        etag = f'"{payload["etag"]}"'
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        response = HttpResponse(payload['body'], content_type='application/json')
+
+    response['ETag'] = etag
+    response['Cache-Control'] = 'public, max-age=0, must-revalidate'
+    return response
 
 
 class PopularLocationListAPIView(generics.ListAPIView):
     """List popular locations"""
     permission_classes = [AllowAny]
-    queryset = PopularLocation.objects.select_related('area__city__region').all()
+    queryset = PopularLocation.objects.select_related('area__city__region__country').all()
     serializer_class = PopularLocationSerializer
\ No newline at end of file
@@ -0,0 +1,33 @@
+"""
+Push spooled ImageKit uploads that never reached the CDN
+
+Uploads whose push exhausted its retries, overflowed the upload backlog or
+was cut off by a restart stay in IMAGEKIT_SPOOL_ROOT and are served from
+there. Each web process pushes them again once per
+IMAGEKIT_SPOOL_RECONCILE_AGE; run this on the web host to push them by
+hand, e.g. after an ImageKit outage.
+"""
+from django.core.management.base import BaseCommand
+
+from utils.imagekit_storage import push_spooled_upload, reconcile_spool
+
+
+class Command(BaseCommand):
+    help = 'Push spooled ImageKit uploads left behind by failed or lost pushes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age', type=int, default=None,
+                            help='Only files spooled at least this many seconds ago (default IMAGEKIT_SPOOL_RECONCILE_AGE)')
+
+    def handle(self, *args, **options):
+        failed = []
+
+        def push(remote_path):
+            try:
+                push_spooled_upload(remote_path)
+            except Exception as exc:
+                failed.append(remote_path)
+                self.stderr.write(f'{remote_path}: {exc}')
+
+        count = reconcile_spool(options['min_age'], push=push)
+        self.stdout.write(self.style.SUCCESS(f'Pushed {count - len(failed)} of {count} spooled uploads'))
@@ -1,7 +1,10 @@
+import logging
+
 from django.db import models
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
 
 
 class MediaCategory(models.Model):
@@ -82,6 +85,10 @@ class PropertyImage(models.Model):
     is_primary = models.BooleanField(default=False)
     is_featured = models.BooleanField(default=False)
     order = models.PositiveIntegerField(default=0)
+    # Resized copies written by media.tasks.generate_property_image_variants:
+    # {'source': name, 'width': .., 'height': .., 'webp': {'640': name}, 'jpeg': {...}}
+    variants = models.JSONField(default=dict, blank=True)
+    blurhash = models.CharField(max_length=64, blank=True)
     uploaded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -96,9 +103,6 @@ class PropertyImage(models.Model):
         return f"{self.property.title} - {self.get_image_type_display()}"
 
     def save(self, *args, **kwargs):
-        import logging
-        logger = logging.getLogger(__name__)
-
         # Ensure only one primary image per property
         if self.is_primary:
             PropertyImage.objects.filter(
@@ -108,11 +112,20 @@ class PropertyImage(models.Model):
 
         super().save(*args, **kwargs)
 
-        # Log the saved image URL
         if self.image:
-            logger.info(f"PropertyImage saved - ID: {self.pk}, URL: {self.image.url}")
-            logger.info(f"  Image name: {self.image.name}")
-            logger.info(f"  Image path: {getattr(self.image, 'path', 'N/A')}")
+            logger.debug("PropertyImage saved - ID: %s, name: %s", self.pk, self.image.name)
+
+    def variant_url(self, width, extension='webp'):
+        """URL of the best stored variant for `width`, falling back to the original."""
+        from .variants import pick_variant
+
+        if not self.image:
+            return None
+        if self.variants.get('source') == self.image.name:
+            name = pick_variant(self.variants, width, extension)
+            if name:
+                return self.image.storage.url(name)
+        return self.image.url
 
 
 class PropertyVideo(models.Model):
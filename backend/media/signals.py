@@ -1,9 +1,11 @@
+from django.db import transaction
 from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from properties.search_index import queue_property_upsert
 
 from .models import PropertyImage
+from .variants import delete_variants, queue_variant_generation
 
 
 @receiver(post_save, sender=PropertyImage)
@@ -15,10 +17,29 @@ def queue_property_image_sync(sender, instance, **kwargs):
     )
 
 
+@receiver(post_save, sender=PropertyImage)
+def queue_property_image_variants(sender, instance, update_fields=None, **kwargs):
+    if not instance.image:
+        return
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    if instance.variants.get('source') == instance.image.name:
+        return
+
+    image_id = instance.pk
+    transaction.on_commit(lambda: queue_variant_generation(image_id))
+
+
 @receiver(post_delete, sender=PropertyImage)
 def queue_property_image_delete_sync(sender, instance, **kwargs):
     queue_property_upsert(
         property_id=instance.property_id,
         property_slug=instance.property.slug,
         reason='property_image_deleted',
-    )
\ No newline at end of file
+    )
+
+
+@receiver(post_delete, sender=PropertyImage)
+def delete_property_image_variants(sender, instance, **kwargs):
+    if instance.variants and instance.image:
+        delete_variants(instance.image.storage, instance.variants)
@@ -0,0 +1,39 @@
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=True, retry_jitter=True, retry_kwargs={'max_retries': 3})
+def generate_property_image_variants(self, image_id):
+    """Write resized WebP/JPEG copies and a blurhash for one PropertyImage."""
+    from .models import PropertyImage
+    from .variants import build_variants, delete_variants
+
+    try:
+        image = PropertyImage.objects.get(pk=image_id)
+    except PropertyImage.DoesNotExist:
+        return {'status': 'missing', 'image_id': image_id}
+
+    if not image.image:
+        return {'status': 'skipped', 'image_id': image_id}
+
+    previous = image.variants
+    variants, blurhash = build_variants(image.image)
+
+    # Queryset update: no post_save, so the variant run is not re-queued
+    updated = PropertyImage.objects.filter(pk=image_id, image=image.image.name).update(
+        variants=variants,
+        blurhash=blurhash,
+    )
+    if not updated:
+        # The image was replaced while rendering; its own task handles the new file
+        delete_variants(image.image.storage, variants)
+        return {'status': 'stale', 'image_id': image_id}
+
+    if previous and previous.get('source') != image.image.name:
+        delete_variants(image.image.storage, previous)
+
+    logger.info('Generated %s variants for PropertyImage %s', sum(len(variants[ext]) for ext in ('webp', 'jpeg')), image_id)
+    return {'status': 'completed', 'image_id': image_id}
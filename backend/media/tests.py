@@ -1,3 +1,214 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+from datetime import date
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from PIL import Image
+
+from agents.models import AgentProfile
+from locations.models import Area, City, Country, Region
+from properties.models import Property, PropertyStatus, PropertyType
+from properties.serializers import PropertyListSerializer
+
+from utils import imagekit_storage
+from utils.imagekit_storage import ImageKitStorage, ImageKitUploader, MultipartFileBody, spool_path_for
+
+from .models import PropertyImage
+from .tasks import generate_property_image_variants
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_jpeg(width=800, height=600):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (40, 120, 200)).save(buffer, 'JPEG')
+    return SimpleUploadedFile('house.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT,
+    PROPERTY_IMAGE_VARIANT_WIDTHS=(320, 640, 1280),
+    PROPERTY_IMAGE_THUMBNAIL_WIDTH=640,
+    PROPERTY_IMAGE_VARIANTS_AUTO_DISPATCH=False,
+)
+class PropertyImageVariantTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        user = User.objects.create_user(
+            username='variants', email='variants@example.com', password='testpass123',
+            user_type='agent', phone_number='+237600000301',
+        )
+        agent = AgentProfile.objects.create(
+            user=user, license_number='VAR123', license_expiry=date(2030, 12, 31),
+            years_experience='1-3', specialization='residential', agency_name='Variant Agency',
+        )
+        country = Country.objects.create(name='Cameroon', code='CM')
+        region = Region.objects.create(name='Centre', code='centre', country=country)
+        city = City.objects.create(name='Yaoundé', region=region)
+        self.property = Property.objects.create(
+            title='Variant House',
+            property_type=PropertyType.objects.create(name='Studio', category='studio'),
+            status=PropertyStatus.objects.create(name='available'),
+            listing_type='rent', price=150000, currency='XAF',
+            area=Area.objects.create(name='Bastos', city=city),
+            agent=agent, description='Variant test property',
+        )
+        self.image = PropertyImage.objects.create(property=self.property, image=make_jpeg(), is_primary=True)
+
+    def test_variants_written_beside_original_without_upscaling(self):
+        generate_property_image_variants(self.image.pk)
+        self.image.refresh_from_db()
+
+        storage = self.image.image.storage
+        self.assertEqual(self.image.variants['source'], self.image.image.name)
+        self.assertEqual(sorted(self.image.variants['webp']), ['320', '640'])
+        self.assertEqual(sorted(self.image.variants['jpeg']), ['320', '640'])
+        for name in self.image.variants['webp'].values():
+            self.assertTrue(storage.exists(name))
+            self.assertTrue(name.startswith('property_images/'))
+        self.assertEqual(len(self.image.blurhash), 28)
+
+    def test_listing_payload_carries_only_primary_thumbnail(self):
+        PropertyImage.objects.create(property=self.property, image=make_jpeg(), order=1)
+        generate_property_image_variants(self.image.pk)
+
+        queryset = Property.objects.select_related(
+            'property_type', 'status', 'area__city__region__country',
+        ).prefetch_related('images')
+        with self.assertNumQueries(2):
+            data = PropertyListSerializer(queryset, many=True).data[0]
+
+        self.assertEqual(len(data['images']), 1)
+        self.assertTrue(data['primary_image'].endswith('_w640.webp'))
+        self.assertEqual(data['images'][0]['thumbnail_url'], data['primary_image'])
+        self.assertTrue(data['primary_image_blurhash'])
+
+
+IMAGEKIT_ENV = {
+    'IMAGEKIT_URL_ENDPOINT': 'https://ik.imagekit.io/property237',
+    'IMAGEKIT_PRIVATE_KEY': 'private_test',
+    'IMAGEKIT_PUBLIC_KEY': 'public_test',
+}
+
+
+class ImageKitStorageTests(SimpleTestCase):
+    def setUp(self):
+        self.spool_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.spool_root, ignore_errors=True)
+        for override in (
+            override_settings(IMAGEKIT_SPOOL_ROOT=self.spool_root, IMAGEKIT_UPLOAD_ASYNC=True),
+            patch.dict(os.environ, IMAGEKIT_ENV),
+            patch.object(imagekit_storage, '_uploader', None),
+            patch.object(imagekit_storage, '_in_flight', set()),
+            patch.object(imagekit_storage, '_last_reconcile', None),
+            patch('utils.imagekit_storage.time.sleep'),
+        ):
+            override.__enter__()
+            self.addCleanup(override.__exit__, None, None, None)
+        self.storage = ImageKitStorage()
+
+    def _save(self, data=b'jpeg bytes'):
+        with patch.object(imagekit_storage, '_get_pool') as get_pool:
+            name = self.storage.save('property_images/house.jpg', ContentFile(data))
+        get_pool.return_value.submit.assert_any_call(imagekit_storage._push_with_retries, name)
+        return name
+
+    def test_multipart_body_streams_fields_and_file(self):
+        path = os.path.join(self.spool_root, 'upload.jpg')
+        with open(path, 'wb') as upload:
+            upload.write(os.urandom(200 * 1024))
+
+        body = MultipartFileBody({'fileName': 'upload.jpg', 'folder': 'property_images'}, 'file', 'upload.jpg', path)
+        chunks = list(iter(lambda: body.read(4096), b''))
+        body.close()
+
+        data = b''.join(chunks)
+        self.assertEqual(len(data), len(body))
+        self.assertLessEqual(max(map(len, chunks)), 4096)
+        self.assertIn(b'name="fileName"\r\n\r\nupload.jpg\r\n', data)
+        self.assertIn(b'filename="upload.jpg"', data)
+        with open(path, 'rb') as upload:
+            self.assertIn(upload.read(), data)
+        self.assertTrue(data.endswith(f'--{body.boundary}--\r\n'.encode()))
+        self.assertTrue(body.content_type.endswith(body.boundary))
+
+    def test_spooled_upload_is_served_locally_until_the_push_is_confirmed(self):
+        name = self._save()
+
+        self.assertRegex(name, r'^property_images/house_[0-9a-f]{8}\.jpg$')
+        self.assertTrue(os.path.exists(spool_path_for(name)))
+        self.assertEqual(self.storage.url(name), f'/api/media/pending/{name}')
+        self.assertEqual(b''.join(self.client.get(self.storage.url(name)).streaming_content), b'jpeg bytes')
+        # Another process (the variant task) reads the spooled copy too
+        with ImageKitStorage().open(name) as spooled:
+            self.assertEqual(spooled.read(), b'jpeg bytes')
+
+        with patch.object(ImageKitUploader, 'push') as push:
+            imagekit_storage._push_with_retries(name)
+
+        push.assert_called_once_with(spool_path_for(name), 'property_images', name.split('/')[1])
+        self.assertFalse(os.path.exists(spool_path_for(name)))
+        self.assertEqual(self.storage.url(name), f'https://ik.imagekit.io/property237/{name}')
+        self.assertRedirects(self.client.get(f'/api/media/pending/{name}'), self.storage.url(name),
+                             fetch_redirect_response=False)
+
+    @override_settings(IMAGEKIT_UPLOAD_RETRIES=2)
+    def test_failed_push_is_retried_and_left_for_reconcile(self):
+        name = self._save()
+
+        with patch.object(ImageKitUploader, 'push', side_effect=[ValueError('503'), None]) as push:
+            imagekit_storage._push_with_retries(name)
+        self.assertEqual(push.call_count, 2)
+        self.assertFalse(os.path.exists(spool_path_for(name)))
+
+        name = self._save()
+        with patch.object(ImageKitUploader, 'push', side_effect=ValueError('503')) as push, \
+                self.assertLogs('utils.imagekit_storage', 'ERROR'):
+            imagekit_storage._push_with_retries(name)
+        self.assertEqual(push.call_count, 3)
+        self.assertTrue(os.path.exists(spool_path_for(name)))
+        self.assertTrue(self.storage.url(name).startswith('/api/media/pending/'))
+        self.assertEqual(imagekit_storage._in_flight, set())
+
+        with patch.object(ImageKitUploader, 'push') as push:
+            call_command('reconcile_imagekit_spool', '--min-age', '3600', stdout=io.StringIO())
+            push.assert_not_called()
+            call_command('reconcile_imagekit_spool', '--min-age', '0', stdout=io.StringIO())
+        push.assert_called_once()
+        self.assertFalse(os.path.exists(spool_path_for(name)))
+
+    def test_missing_spool_copy_is_an_error(self):
+        with patch.object(ImageKitUploader, 'push') as push, self.assertLogs('utils.imagekit_storage', 'ERROR'):
+            with self.assertRaises(FileNotFoundError):
+                imagekit_storage.push_spooled_upload('property_images/gone.jpg')
+        push.assert_not_called()
+
+    @override_settings(IMAGEKIT_UPLOAD_WORKERS=1, IMAGEKIT_UPLOAD_BACKLOG=1, IMAGEKIT_SPOOL_RECONCILE_AGE=900)
+    def test_backlog_is_bounded_and_reconcile_runs_once_per_interval(self):
+        with patch.object(imagekit_storage, '_get_pool') as get_pool:
+            self.assertTrue(imagekit_storage.queue_spooled_upload('property_images/a.jpg'))
+            self.assertTrue(imagekit_storage.queue_spooled_upload('property_images/a.jpg'))
+            self.assertTrue(imagekit_storage.queue_spooled_upload('property_images/b.jpg'))
+            with self.assertLogs('utils.imagekit_storage', 'WARNING'):
+                self.assertFalse(imagekit_storage.queue_spooled_upload('property_images/c.jpg'))
+            self.assertTrue(imagekit_storage.reconcile_spool_if_due())
+            self.assertFalse(imagekit_storage.reconcile_spool_if_due())
+        self.assertEqual(get_pool.return_value.submit.call_count, 3)
+
+    def test_spool_paths_stay_inside_the_spool_root(self):
+        self.assertIsNone(spool_path_for('../etc/passwd'))
+        self.assertIsNone(spool_path_for('.incoming/tmp123'))
+        self.assertEqual(self.client.get('/api/media/pending/../../etc/passwd').status_code, 404)
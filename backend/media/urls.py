@@ -8,4 +8,6 @@ urlpatterns = [
     path('upload/', views.MediaFileUploadAPIView.as_view(), name='media-upload'),
     path('property/<int:property_id>/', views.MediaFileListAPIView.as_view(), name='media-list'),
     path('<int:file_id>/delete/', views.delete_media_file, name='media-delete'),
+    # ImageKit uploads until their push is confirmed (utils.imagekit_storage)
+    path('pending/<path:path>', views.pending_upload, name='pending-upload'),
 ]
\ No newline at end of file
@@ -0,0 +1,191 @@
+"""
+Responsive derivatives for PropertyImage
+
+Each uploaded image gets WebP and JPEG copies at fixed widths, written
+next to the original through the image field's own storage (local disk
+or ImageKit), plus a blurhash placeholder for the listing card.
+"""
+import io
+import logging
+import math
+import posixpath
+import urllib.request
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+_BASE83 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+
+
+def get_variant_widths():
+    return tuple(getattr(settings, 'PROPERTY_IMAGE_VARIANT_WIDTHS', (320, 640, 1280)))
+
+
+def variant_name(original_name, width, extension):
+    """property_images/house.jpg -> property_images/house_w640.webp"""
+    root, _ext = posixpath.splitext(original_name)
+    return f'{root}_w{width}.{extension}'
+
+
+def read_original(field_file):
+    storage = field_file.storage
+    try:
+        with storage.open(field_file.name, 'rb') as original:
+            return original.read()
+    except (NotImplementedError, AttributeError):
+        # Remote storages without _open (ImageKit): fetch the public URL instead
+        with urllib.request.urlopen(field_file.url, timeout=30) as response:
+            return response.read()
+
+
+def build_variants(field_file):
+    """
+    Render and store every variant for field_file.
+    Returns the metadata dict kept on PropertyImage.variants.
+    """
+    storage = field_file.storage
+    source = Image.open(io.BytesIO(read_original(field_file)))
+    source = ImageOps.exif_transpose(source).convert('RGB')
+    original_width, original_height = source.size
+
+    variants = {
+        'source': field_file.name,
+        'width': original_width,
+        'height': original_height,
+    }
+    for extension in VARIANT_FORMATS:
+        variants[extension] = {}
+
+    for width in get_variant_widths():
+        # Never upscale; the original is served when no variant is wide enough
+        if width >= original_width:
+            continue
+
+        height = max(1, round(original_height * width / original_width))
+        resized = source.resize((width, height), Image.LANCZOS)
+
+        for extension, (pil_format, options) in VARIANT_FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(buffer, pil_format, **options)
+            name = variant_name(field_file.name, width, extension)
+            if storage.exists(name):
+                storage.delete(name)
+            variants[extension][str(width)] = storage.save(name, ContentFile(buffer.getvalue()))
+
+    return variants, blurhash_encode(source)
+
+
+def queue_variant_generation(image_id):
+    if not getattr(settings, 'PROPERTY_IMAGE_VARIANTS_AUTO_DISPATCH', False):
+        return
+
+    from .tasks import generate_property_image_variants
+
+    generate_property_image_variants.delay(image_id)
+
+
+def delete_variants(storage, variants):
+    for extension in VARIANT_FORMATS:
+        for name in (variants or {}).get(extension, {}).values():
+            try:
+                storage.delete(name)
+            except Exception:
+                logger.warning('Could not delete image variant %s', name, exc_info=True)
+
+
+def pick_variant(variants, width, extension='webp'):
+    """Stored name of the smallest variant at least `width` wide (or the widest available)."""
+    available = sorted(
+        (int(size), name)
+        for size, name in (variants or {}).get(extension, {}).items()
+    )
+    if not available:
+        return None
+    for size, name in available:
+        if size >= width:
+            return name
+    return available[-1][1]
+
+
+# Blurhash (https://blurha.sh) encoder, small enough to keep dependency-free
+
+def _encode83(value, length):
+    return ''.join(
+        _BASE83[(value // 83 ** (length - index)) % 83]
+        for index in range(1, length + 1)
+    )
+
+
+def _srgb_to_linear(value):
+    value = value / 255
+    if value <= 0.04045:
+        return value / 12.92
+    return ((value + 0.055) / 1.055) ** 2.4
+
+
+def _linear_to_srgb(value):
+    value = max(0.0, min(1.0, value))
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def _sign_pow(value, exponent):
+    return math.copysign(abs(value) ** exponent, value)
+
+
+def blurhash_encode(image, x_components=4, y_components=3):
+    sample = image.convert('RGB')
+    sample.thumbnail((32, 32))
+    width, height = sample.size
+    pixels = [tuple(_srgb_to_linear(channel) for channel in pixel) for pixel in sample.getdata()]
+
+    factors = []
+    for j in range(y_components):
+        for i in range(x_components):
+            normalisation = 1 if i == 0 and j == 0 else 2
+            red = green = blue = 0.0
+            for y in range(height):
+                cos_y = math.cos(math.pi * j * y / height)
+                row = pixels[y * width:(y + 1) * width]
+                for x, (r, g, b) in enumerate(row):
+                    basis = normalisation * math.cos(math.pi * i * x / width) * cos_y
+                    red += basis * r
+                    green += basis * g
+                    blue += basis * b
+            scale = 1 / (width * height)
+            factors.append((red * scale, green * scale, blue * scale))
+
+    dc, ac = factors[0], factors[1:]
+    result = _encode83((x_components - 1) + (y_components - 1) * 9, 1)
+
+    if ac:
+        actual_max = max(abs(component) for factor in ac for component in factor)
+        quantised_max = max(0, min(82, int(math.floor(actual_max * 166 - 0.5))))
+        max_value = (quantised_max + 1) / 166
+        result += _encode83(quantised_max, 1)
+    else:
+        max_value = 1
+        result += _encode83(0, 1)
+
+    result += _encode83(
+        (_linear_to_srgb(dc[0]) << 16) + (_linear_to_srgb(dc[1]) << 8) + _linear_to_srgb(dc[2]),
+        4,
+    )
+
+    for factor in ac:
+        quantised = [
+            max(0, min(18, int(math.floor(_sign_pow(component / max_value, 0.5) * 9 + 9.5))))
+            for component in factor
+        ]
+        result += _encode83(quantised[0] * 19 * 19 + quantised[1] * 19 + quantised[2], 2)
+
+    return result
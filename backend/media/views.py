@@ -1,8 +1,17 @@
+import mimetypes
+
+from django.http import FileResponse, Http404
+from django.shortcuts import redirect
+from django.views.decorators.http import require_GET
 from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.exceptions import PermissionDenied
+from tariffplans.quotas import QuotaExceeded, consume_photo, release_photo
+from django.conf import settings
+from utils.imagekit_storage import cdn_url, reconcile_spool_if_due, spool_path_for
 from .models import MediaFile
 from .serializers import MediaFileSerializer
 
@@ -16,29 +25,22 @@ class MediaFileUploadAPIView(generics.CreateAPIView):
 
     def perform_create(self, serializer):
         user = self.request.user
-        file_type = self.request.data.get('file_type', 'image')
-
-        # Subscription enforcement for photo uploads
-        if file_type == 'image' and user.user_type == 'agent':
-            from tariffplans.models import UserSubscription
-            active_sub = UserSubscription.objects.filter(
-                user=user, status__in=['active', 'trial'],
-            ).select_related('plan').first()
+        property_id = self.request.data.get('property')
+        counts_as_photo = self.request.data.get('file_type', 'image') == 'image' and bool(property_id)
 
-            if active_sub and active_sub.is_active:
-                property_id = self.request.data.get('property')
-                if property_id:
-                    current_photos = MediaFile.objects.filter(
-                        property_id=property_id, file_type='image', is_active=True,
-                    ).count()
-                    if current_photos >= active_sub.plan.max_photos_per_property:
-                        from rest_framework.exceptions import PermissionDenied
-                        raise PermissionDenied(
-                            f"Your plan allows {active_sub.plan.max_photos_per_property} photos per property. "
-                            f"Please upgrade to add more."
-                        )
+        # Subscription enforcement for photo uploads: one atomic counter bump
+        if counts_as_photo:
+            try:
+                consume_photo(user.pk, property_id)
+            except QuotaExceeded as e:
+                raise PermissionDenied(str(e))
 
-        serializer.save(uploaded_by=user)
+        try:
+            serializer.save(uploaded_by=user)
+        except Exception:
+            if counts_as_photo:
+                release_photo(property_id)
+            raise
 
 
 class MediaFileListAPIView(generics.ListAPIView):
@@ -63,11 +65,31 @@ def delete_media_file(request, file_id):
             id=file_id,
             uploaded_by=request.user
         )
+        was_counted = media_file.is_active and media_file.file_type == 'image'
         media_file.is_active = False
         media_file.save()
+        if was_counted:
+            release_photo(media_file.property_id)
         return Response({'message': 'File deleted successfully'})
     except MediaFile.DoesNotExist:
         return Response(
             {'error': 'File not found or permission denied'},
             status=status.HTTP_404_NOT_FOUND
-        )
\ No newline at end of file
+        )
+
+
+@require_GET
+def pending_upload(request, path):
+    """Spooled copy of an upload ImageKit has not confirmed yet; the CDN once it has"""
+    spool_path = spool_path_for(path)
+    if spool_path is None:
+        raise Http404
+    try:
+        spooled = open(spool_path, 'rb')
+    except FileNotFoundError:
+        return redirect(cdn_url(path))
+    if getattr(settings, 'IMAGEKIT_UPLOAD_ASYNC', True):
+        reconcile_spool_if_due()  # Still pending: make sure a push of it is under way
+    response = FileResponse(spooled, content_type=mimetypes.guess_type(path)[0] or 'application/octet-stream')
+    response['Cache-Control'] = 'no-store'
+    return response
@@ -91,3 +91,13 @@ def run_listing_auto_checks(property_id):
         )
 
     logger.info('Auto-checks completed for property %d', property_id)
+
+
+@shared_task(ignore_result=True)
+def run_listing_auto_checks_batch(property_ids):
+    """Auto-checks for a bulk import, in one task instead of one per listing."""
+    for property_id in property_ids:
+        try:
+            run_listing_auto_checks(property_id)
+        except Exception:
+            logger.exception('Auto-checks failed for imported property %s', property_id)
@@ -0,0 +1,160 @@
+"""
+Escrow deadline timers
+
+Two deadlines move an escrow without anyone loading it:
+
+- expires_at: an escrow still created/awaiting_payment expires;
+- release_deadline: funds still held are released to the seller.
+
+Due escrows are read from the (status, expires_at) and (status,
+release_deadline) indexes and claimed in batches with SELECT ... FOR UPDATE
+SKIP LOCKED, so the beat sweep, the timer process and a user acting on the
+same escrow never transition it twice: a locked row is skipped and seen
+again on the next pass. Each batch writes its EscrowEvent rows and the
+buyer/seller notifications with bulk_create; the notifications are
+scheduled for now and sent by process_scheduled_notifications.
+
+run_escrow_timers() is the minute-level sweep run by Celery beat.
+EscrowTimers keeps deadlines due within ESCROW_TIMER_LOOKAHEAD_SECONDS on
+an in-memory TimingWheel (the run_escrow_timers command), so an escrow
+changes state within a tick of its deadline.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+
+from notifications.models import Notification
+from utils.timing_wheel import TimingWheel
+
+from .models import Escrow, EscrowEvent
+
+logger = logging.getLogger(__name__)
+
+DEADLINES = {
+    'expire': {
+        'statuses': ('created', 'awaiting_payment'),
+        'field': 'expires_at',
+        'status': 'expired',
+        'subject': 'Escrow expired',
+        'message': 'Escrow {escrow_id} expired: payment was not received before the deadline.',
+    },
+    'release': {
+        'statuses': ('held',),
+        'field': 'release_deadline',
+        'status': 'released',
+        'subject': 'Escrow funds released',
+        'message': 'The funds of escrow {escrow_id} were released to the seller after the release deadline.',
+    },
+}
+
+
+def _batch_size():
+    return getattr(settings, 'ESCROW_TIMER_BATCH_SIZE', 500)
+
+
+def due_escrows(kind, now):
+    deadline = DEADLINES[kind]
+    return Escrow.objects.filter(status__in=deadline['statuses'], **{f"{deadline['field']}__lte": now})
+
+
+def apply_deadline(kind, now=None, ids=None):
+    """
+    Move every escrow past its `kind` deadline (restricted to ids if given);
+    returns how many were moved. Rows locked by another transaction are left
+    for the next pass.
+    """
+    now = now or timezone.now()
+    deadline = DEADLINES[kind]
+    due = due_escrows(kind, now)
+    if ids is not None:
+        due = due.filter(pk__in=ids)
+    content_type = ContentType.objects.get_for_model(Escrow)
+    changes = {'status': deadline['status']}
+    if kind == 'release':
+        changes['released_at'] = now
+
+    moved = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                due.select_for_update(skip_locked=True).order_by(deadline['field'])
+                .values('pk', 'escrow_id', 'buyer_id', 'seller_id', 'status', deadline['field'])[:_batch_size()]
+            )
+            if not rows:
+                break
+            due.filter(pk__in=[row['pk'] for row in rows]).update(**changes)
+            EscrowEvent.objects.bulk_create([
+                EscrowEvent(
+                    escrow_id=row['pk'], event_type=deadline['status'],
+                    description=deadline['message'].format(escrow_id=row['escrow_id']),
+                    metadata={
+                        'from_status': row['status'],
+                        'deadline': row[deadline['field']].isoformat(),
+                        'source': 'timer',
+                    },
+                )
+                for row in rows
+            ])
+            Notification.objects.bulk_create([
+                Notification(
+                    recipient_id=recipient_id, notification_type='email', subject=deadline['subject'],
+                    message=deadline['message'].format(escrow_id=row['escrow_id']),
+                    priority='high', status='pending', scheduled_at=now,
+                    content_type=content_type, object_id=row['pk'],
+                )
+                for row in rows for recipient_id in (row['buyer_id'], row['seller_id'])
+            ])
+        moved += len(rows)
+    return moved
+
+
+def run_escrow_timers(now=None):
+    """One sweep over both deadlines; returns counts per transition."""
+    now = now or timezone.now()
+    return {
+        'expired': apply_deadline('expire', now),
+        'released': apply_deadline('release', now),
+    }
+
+
+def upcoming_deadlines(until):
+    """((kind, escrow pk), deadline) of open escrows due by `until`, overdue ones included."""
+    for kind, deadline in DEADLINES.items():
+        for pk, when in due_escrows(kind, until).values_list('pk', deadline['field']):
+            yield (kind, pk), when
+
+
+class EscrowTimers:
+    """
+    Wheel of the deadlines due within `lookahead` seconds, refilled from
+    the database every `refresh` seconds so new and rescheduled escrows are
+    picked up. Stale entries are harmless: apply_deadline() re-checks the
+    status and deadline of every id it is given.
+    """
+
+    def __init__(self, tick=None, lookahead=None, refresh=None, now=None):
+        tick = tick or getattr(settings, 'ESCROW_TIMER_TICK_SECONDS', 1.0)
+        self.lookahead = lookahead or getattr(settings, 'ESCROW_TIMER_LOOKAHEAD_SECONDS', 120)
+        self.refresh_every = refresh or getattr(settings, 'ESCROW_TIMER_REFRESH_SECONDS', 10)
+        self.wheel = TimingWheel(tick=tick, slots=int(self.lookahead / tick) + 1, now=now)
+        self._next_refresh = None
+
+    def refresh(self, now):
+        until = now + timedelta(seconds=self.lookahead)
+        for key, deadline in upcoming_deadlines(until):
+            self.wheel.schedule(key, deadline.timestamp())
+        self._next_refresh = now + timedelta(seconds=self.refresh_every)
+
+    def poll(self, now=None):
+        """Refill the wheel when due and apply the deadlines that passed; returns counts per kind."""
+        now = now or timezone.now()
+        if self._next_refresh is None or now >= self._next_refresh:
+            self.refresh(now)
+        ids = {}
+        for kind, pk in self.wheel.advance(now.timestamp()):
+            ids.setdefault(kind, []).append(pk)
+        return {kind: apply_deadline(kind, now, ids=pks) for kind, pks in ids.items()}
@@ -0,0 +1 @@
+# Make directory a Python package
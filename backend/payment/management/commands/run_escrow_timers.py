@@ -0,0 +1,40 @@
+"""
+Escrow deadline timer process
+
+Polls an in-memory timing wheel (payment.escrow_timers.EscrowTimers) every
+tick, so escrows expire or auto-release within about a second of their
+deadline. The minute-level beat sweep (payment.tasks.run_escrow_timers)
+still covers every escrow when this process is not running.
+"""
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from payment.escrow_timers import EscrowTimers
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Expire and auto-release escrows within a tick of their deadline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tick', type=float, help='Seconds between polls (ESCROW_TIMER_TICK_SECONDS)')
+        parser.add_argument('--lookahead', type=int, help='Seconds of deadlines kept in memory')
+        parser.add_argument('--refresh', type=int, help='Seconds between database refills')
+
+    def handle(self, *args, **options):
+        timers = EscrowTimers(tick=options['tick'], lookahead=options['lookahead'], refresh=options['refresh'])
+        self.stdout.write(f'Escrow timers running (tick {timers.wheel.tick}s, lookahead {timers.lookahead}s)')
+        while True:
+            close_old_connections()
+            try:
+                counts = timers.poll()
+            except Exception:
+                logger.exception('Escrow timer poll failed')
+            else:
+                if any(counts.values()):
+                    logger.info('Escrow timers: %s', counts)
+            time.sleep(timers.wheel.tick)
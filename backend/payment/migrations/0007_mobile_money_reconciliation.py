@@ -0,0 +1,33 @@
+# Generated by Django 5.2.12 on 2026-10-19 16:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ad', '0004_advertisement_ad_advertis_status_dbceec_idx_and_more'),
+        ('leases', '0002_leaseagreement_leases_leas_landlor_8f51d3_idx_and_more'),
+        ('maintenance', '0002_serviceprovider_maintenance_provide_9736d8_idx_and_more'),
+        ('payment', '0006_escrow_timers'),
+        ('tariffplans', '0004_subscription_lifecycle'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='next_status_check_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='status_checks',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['status', 'next_status_check_at'], name='payment_tra_status_c2af9e_idx'),
+        ),
+    ]
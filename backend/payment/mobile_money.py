@@ -0,0 +1,142 @@
+"""
+MTN Mobile Money collection client
+
+One pooled requests.Session per client: connections to the provider are
+reused across calls and threads (up to MOMO_POOL_SIZE), and GET calls
+are retried with exponential backoff on connection errors, 429 and 5xx
+responses. The request-to-pay POST is never retried: the provider may
+have accepted it and prompted the payer. When its outcome is unknown,
+MobileMoneyOutcomeUnknown tells callers to leave the payment pending for
+reconciliation to settle. Requires MOMO_API_BASE_URL, MOMO_SUBSCRIPTION_KEY,
+MOMO_API_USER and MOMO_API_KEY; without them is_configured() is False
+and payments are simulated (development).
+"""
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Provider status -> Transaction/CreditTransaction status
+STATUS_MAP = {
+    'SUCCESSFUL': 'completed',
+    'FAILED': 'failed',
+    'REJECTED': 'failed',
+    'TIMEOUT': 'failed',
+    'PENDING': 'pending',
+}
+
+
+class MobileMoneyError(Exception):
+    pass
+
+
+class MobileMoneyOutcomeUnknown(MobileMoneyError):
+    """The collection request may have reached the provider; its status will tell."""
+
+
+def is_configured():
+    return bool(getattr(settings, 'MOMO_API_BASE_URL', '') and getattr(settings, 'MOMO_SUBSCRIPTION_KEY', ''))
+
+
+class MobileMoneyClient:
+    def __init__(self, base_url=None, subscription_key=None, api_user=None, api_key=None,
+                 target_environment=None, pool_size=None, timeout=None, retries=3):
+        self.base_url = (base_url or settings.MOMO_API_BASE_URL).rstrip('/')
+        self.subscription_key = subscription_key or settings.MOMO_SUBSCRIPTION_KEY
+        self.api_user = api_user or settings.MOMO_API_USER
+        self.api_key = api_key or settings.MOMO_API_KEY
+        self.target_environment = target_environment or settings.MOMO_TARGET_ENVIRONMENT
+        self.timeout = timeout or getattr(settings, 'MOMO_TIMEOUT_SECONDS', 10)
+        pool_size = pool_size or getattr(settings, 'MOMO_POOL_SIZE', 8)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            pool_block=True,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(['GET']),
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            ),
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['Ocp-Apim-Subscription-Key'] = self.subscription_key
+
+        self._token = None
+        self._token_expires = 0
+        self._token_lock = threading.Lock()
+
+    def close(self):
+        self.session.close()
+
+    def _access_token(self):
+        with self._token_lock:
+            if self._token is None or time.monotonic() >= self._token_expires:
+                response = self.session.post(
+                    f'{self.base_url}/collection/token/', auth=(self.api_user, self.api_key), timeout=self.timeout,
+                )
+                if response.status_code != 200:
+                    raise MobileMoneyError(f'Token request failed with HTTP {response.status_code}')
+                payload = response.json()
+                self._token = payload['access_token']
+                # Refresh a minute early
+                self._token_expires = time.monotonic() + int(payload.get('expires_in', 3600)) - 60
+            return self._token
+
+    def _headers(self, **extra):
+        return {
+            'Authorization': f'Bearer {self._access_token()}',
+            'X-Target-Environment': self.target_environment,
+            **extra,
+        }
+
+    def request_to_pay(self, reference, amount, currency, phone_number, message=''):
+        """
+        Ask the payer to approve a collection; `reference` (a UUID) identifies it from now on.
+        Raises MobileMoneyOutcomeUnknown when the request may have been accepted anyway.
+        """
+        headers = self._headers(**{'X-Reference-Id': reference})
+        try:
+            response = self.session.post(
+                f'{self.base_url}/collection/v1_0/requesttopay',
+                headers=headers,
+                json={
+                    'amount': str(amount),
+                    'currency': currency,
+                    'externalId': reference,
+                    'payer': {'partyIdType': 'MSISDN', 'partyId': phone_number.lstrip('+')},
+                    'payerMessage': message,
+                    'payeeNote': message,
+                },
+                timeout=self.timeout,
+            )
+        except requests.RequestException as exc:
+            raise MobileMoneyOutcomeUnknown(f'Request to pay did not complete: {exc}') from exc
+        # 409: a collection with this reference already exists, i.e. an earlier attempt was accepted
+        if response.status_code in (200, 202, 409):
+            return
+        if response.status_code == 429 or response.status_code >= 500:
+            raise MobileMoneyOutcomeUnknown(f'Request to pay returned HTTP {response.status_code}')
+        raise MobileMoneyError(f'Request to pay failed with HTTP {response.status_code}')
+
+    def payment_status(self, reference):
+        """(status, provider payload); status is 'completed', 'failed' or 'pending'."""
+        response = self.session.get(
+            f'{self.base_url}/collection/v1_0/requesttopay/{reference}',
+            headers=self._headers(),
+            timeout=self.timeout,
+        )
+        if response.status_code == 404:
+            return 'failed', {'status': 'NOT_FOUND'}
+        if response.status_code != 200:
+            raise MobileMoneyError(f'Status request failed with HTTP {response.status_code}')
+        payload = response.json()
+        return STATUS_MAP.get(str(payload.get('status', '')).upper(), 'pending'), payload
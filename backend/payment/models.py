@@ -151,6 +151,9 @@ class Transaction(models.Model):
         help_text="Phone number for mobile money transactions"
     )
     momo_transaction_id = models.CharField(max_length=100, blank=True)
+    # Provider status polling while pending (payment.reconciliation)
+    status_checks = models.PositiveSmallIntegerField(default=0)
+    next_status_check_at = models.DateTimeField(null=True, blank=True)
 
     # Related Objects
     escrow = models.ForeignKey(
@@ -221,6 +224,7 @@ class Transaction(models.Model):
             models.Index(fields=['phone_number']),
             models.Index(fields=['status']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['status', 'next_status_check_at']),
         ]
 
     def __str__(self):
@@ -496,6 +500,7 @@ class Escrow(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['status', 'expires_at']),
+            models.Index(fields=['status', 'release_deadline']),
             models.Index(fields=['buyer', 'status']),
             models.Index(fields=['seller', 'status']),
         ]
@@ -543,7 +548,8 @@ class EscrowEvent(models.Model):
     escrow = models.ForeignKey('payment.Escrow', on_delete=models.CASCADE, related_name='events')
     event_type = models.CharField(max_length=20, choices=EVENT_TYPES)
     description = models.TextField()
-    created_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Null for events written by the deadline timers (payment.escrow_timers)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     metadata = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
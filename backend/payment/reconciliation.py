@@ -0,0 +1,212 @@
+"""
+Mobile money reconciliation
+
+Pending mobile-money payments are settled from the provider's status in
+the background instead of when the client calls verify:
+
+- credit purchases started by credits.views.initiate_momo_payment;
+- payment.Transaction rows paid with an MTN MoMo payment method.
+
+Due rows are read in batches of MOMO_RECONCILE_BATCH_SIZE from the
+(status, next_status_check_at) indexes and their statuses are fetched by
+at most MOMO_RECONCILE_CONCURRENCY threads over one pooled
+MobileMoneyClient per process. Settlement only applies to rows that are
+still pending, so the beat sweep, a verify-triggered check and a retried
+task can overlap without crediting a payment twice. Rows still pending
+are checked again after MOMO_RECONCILE_BACKOFF_SECONDS, doubling per check
+up to MOMO_RECONCILE_MAX_BACKOFF_SECONDS, and fail after
+MOMO_RECONCILE_TIMEOUT_HOURS. Payers get an in-app notification with the
+result.
+"""
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+
+from credits.models import CreditTransaction
+from credits.services import CreditService
+from notifications.models import Notification
+
+from . import mobile_money
+from .models import Transaction
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The process-wide client, so every check reuses its connection pool."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = mobile_money.MobileMoneyClient()
+        return _client
+
+
+class CreditPurchases:
+    name = 'credit'
+    model = CreditTransaction
+
+    def pending(self):
+        return CreditTransaction.objects.filter(
+            status=CreditTransaction.STATUS_PENDING, transaction_type=CreditTransaction.PURCHASE,
+        ).exclude(payment_reference='')
+
+    def reference(self, row):
+        return row.payment_reference
+
+    def settle(self, row, status, payload, now):
+        if status == 'completed':
+            return CreditService.complete_purchase(row.pk, payload)
+        return CreditService.fail_purchase(row.pk, payload)
+
+    def notice(self, row, status):
+        if status == 'completed':
+            return 'Payment received', f'Your payment was received and {row.amount:,.0f} credits were added to your balance.'
+        return 'Payment failed', 'Your mobile money payment for credits did not go through. No money was taken.'
+
+
+class PaymentTransactions:
+    name = 'transaction'
+    model = Transaction
+    PENDING_STATUSES = ('pending', 'processing')
+
+    def pending(self):
+        return Transaction.objects.filter(
+            status__in=self.PENDING_STATUSES, payment_method__gateway_type='mtn_momo',
+        ).exclude(momo_transaction_id='')
+
+    def reference(self, row):
+        return row.momo_transaction_id
+
+    def settle(self, row, status, payload, now):
+        return Transaction.objects.filter(pk=row.pk, status__in=self.PENDING_STATUSES).update(
+            status=status, processed_at=now, gateway_response=payload, next_status_check_at=None,
+        ) == 1
+
+    def notice(self, row, status):
+        if status == 'completed':
+            return 'Payment completed', f'Your payment {row.transaction_id} of {row.total_amount:,.0f} was completed.'
+        return 'Payment failed', f'Your mobile money payment {row.transaction_id} did not go through.'
+
+
+SOURCES = {source.name: source for source in (CreditPurchases(), PaymentTransactions())}
+
+
+def _fetch_statuses(client, references):
+    """[(status, payload)] in order; (None, None) when the provider could not be asked."""
+    def fetch(reference):
+        try:
+            return client.payment_status(reference)
+        except (mobile_money.MobileMoneyError, requests.RequestException, ValueError) as exc:
+            logger.warning('Mobile money status check of %s failed: %s', reference, exc)
+            return None, None
+
+    workers = max(1, min(getattr(settings, 'MOMO_RECONCILE_CONCURRENCY', 8), len(references)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fetch, references))
+
+
+def _next_check(now, checks):
+    base = getattr(settings, 'MOMO_RECONCILE_BACKOFF_SECONDS', 30)
+    ceiling = getattr(settings, 'MOMO_RECONCILE_MAX_BACKOFF_SECONDS', 1800)
+    return now + timedelta(seconds=min(base * 2 ** checks, ceiling))
+
+
+def reconcile_rows(source, rows, client, now):
+    """Check and settle rows of one source; returns {'completed', 'failed', 'pending'} counts."""
+    counts = {'completed': 0, 'failed': 0, 'pending': 0}
+    timeout = timedelta(hours=getattr(settings, 'MOMO_RECONCILE_TIMEOUT_HOURS', 24))
+    still_pending = []
+    notices = []
+    for row, (status, payload) in zip(rows, _fetch_statuses(client, [source.reference(row) for row in rows])):
+        if status in (None, 'pending') and row.created_at <= now - timeout:
+            status, payload = 'failed', {'status': 'TIMEOUT', 'provider': payload}
+        if status in ('completed', 'failed'):
+            if source.settle(row, status, payload, now):
+                counts[status] += 1
+                subject, message = source.notice(row, status)
+                notices.append(Notification(
+                    recipient_id=row.user_id, notification_type='in_app', subject=subject, message=message,
+                    priority='high', extra_data={'payment': source.name, 'id': str(row.pk), 'status': status},
+                ))
+            continue
+        row.status_checks += 1
+        row.next_status_check_at = _next_check(now, row.status_checks)
+        still_pending.append(row)
+
+    source.model.objects.bulk_update(still_pending, ['status_checks', 'next_status_check_at'])
+    Notification.objects.bulk_create(notices)
+    counts['pending'] = len(still_pending)
+    return counts
+
+
+def reconcile_mobile_money(now=None, client=None):
+    """
+    Check every due pending payment once. Returns outcome counts; does
+    nothing when no provider is configured (payments are simulated).
+    """
+    counts = {'completed': 0, 'failed': 0, 'pending': 0}
+    if client is None:
+        if not mobile_money.is_configured():
+            return counts
+        client = get_client()
+    now = now or timezone.now()
+    batch_size = getattr(settings, 'MOMO_RECONCILE_BATCH_SIZE', 100)
+
+    for source in SOURCES.values():
+        due = source.pending().filter(next_status_check_at__lte=now).order_by('next_status_check_at')
+        # Checked rows leave the due set: settled, or rescheduled after now
+        while True:
+            rows = list(due[:batch_size])
+            if not rows:
+                break
+            for outcome, count in reconcile_rows(source, rows, client, now).items():
+                counts[outcome] += count
+    return counts
+
+
+def reconcile_payment(source_name, pk, client=None):
+    """Check one pending payment now, ignoring its backoff; returns its status."""
+    source = SOURCES[source_name]
+    row = source.pending().filter(pk=pk).first()
+    if row is not None:
+        if client is None:
+            if not mobile_money.is_configured():
+                return row.status
+            client = get_client()
+        reconcile_rows(source, [row], client, timezone.now())
+    return source.model.objects.filter(pk=pk).values_list('status', flat=True).first()
+
+
+def start_momo_collection(txn):
+    """
+    Give a new mobile-money Transaction its provider reference and ask the
+    payer to approve it. Returns False when the provider refused; when the
+    outcome is unknown the row stays pending for reconciliation.
+    """
+    txn.momo_transaction_id = str(uuid.uuid4())
+    txn.next_status_check_at = timezone.now()
+    txn.save(update_fields=['momo_transaction_id', 'next_status_check_at'])
+    if not mobile_money.is_configured():
+        return True
+    try:
+        get_client().request_to_pay(
+            txn.momo_transaction_id, txn.total_amount, txn.currency.code, txn.phone_number,
+            txn.description or txn.get_transaction_type_display(),
+        )
+    except mobile_money.MobileMoneyOutcomeUnknown as exc:
+        logger.warning('Mobile money collection of %s may not have reached the provider: %s', txn.transaction_id, exc)
+    except (mobile_money.MobileMoneyError, requests.RequestException) as exc:
+        logger.warning('Mobile money collection of %s failed: %s', txn.transaction_id, exc)
+        Transaction.objects.filter(pk=txn.pk).update(status='failed', next_status_check_at=None)
+        txn.status = 'failed'
+        return False
+    return True
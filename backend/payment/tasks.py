@@ -0,0 +1,32 @@
+from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def run_escrow_timers():
+    """Expire unpaid escrows and auto-release held ones past their deadlines."""
+    from .escrow_timers import run_escrow_timers as sweep
+
+    counts = sweep()
+    if any(counts.values()):
+        logger.info('Escrow timer sweep: %s', counts)
+
+
+@shared_task(ignore_result=True)
+def reconcile_mobile_money_payments():
+    """Settle pending mobile-money payments from the provider's status."""
+    from .reconciliation import reconcile_mobile_money
+
+    counts = reconcile_mobile_money()
+    if counts['completed'] or counts['failed']:
+        logger.info('Mobile money reconciliation: %s', counts)
+
+
+@shared_task(ignore_result=True)
+def reconcile_mobile_money_payment(source_name, pk):
+    """Check one payment right away (the payer asked to verify it)."""
+    from .reconciliation import reconcile_payment
+
+    reconcile_payment(source_name, pk)
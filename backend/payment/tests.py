@@ -1,3 +1,313 @@
-from django.test import TestCase
+import json
+import threading
+import uuid
+from datetime import timedelta
+from unittest.mock import patch
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from credits.models import CreditBalance, CreditPackage, CreditTransaction
+from credits.services import CreditService
+from notifications.models import Notification
+from utils.timing_wheel import TimingWheel
+
+from .escrow_timers import EscrowTimers, run_escrow_timers
+from .mobile_money import MobileMoneyClient, MobileMoneyOutcomeUnknown
+from .models import Currency, Escrow, EscrowEvent, PaymentMethod, Transaction
+from .reconciliation import reconcile_mobile_money, reconcile_payment, start_momo_collection
+
+User = get_user_model()
+
+
+class TimingWheelTests(SimpleTestCase):
+    def test_keys_fire_at_their_tick_in_deadline_order(self):
+        wheel = TimingWheel(tick=1, slots=8, now=100)
+        wheel.schedule('late', 103.5)
+        wheel.schedule('soon', 101)
+        wheel.schedule('overdue', 50)
+
+        self.assertEqual(wheel.advance(100.9), [])
+        self.assertEqual(wheel.advance(101), ['overdue', 'soon'])
+        self.assertEqual(wheel.advance(103.9), [])
+        self.assertEqual(wheel.advance(104), ['late'])
+        self.assertEqual(len(wheel), 0)
+
+    def test_reschedule_cancel_and_multiple_revolutions(self):
+        wheel = TimingWheel(tick=1, slots=4, now=0)
+        wheel.schedule('a', 2)
+        wheel.schedule('a', 10)  # moved past one revolution
+        wheel.schedule('b', 3)
+        wheel.cancel('b')
+
+        self.assertEqual(wheel.advance(6), [])
+        self.assertIn('a', wheel)
+        self.assertEqual(wheel.advance(50), ['a'])
+
+
+class EscrowTimerTests(TestCase):
+    def setUp(self):
+        self.buyer = User.objects.create_user(
+            username='buyer', email='buyer@example.com', password='testpass123', phone_number='+237600000001',
+        )
+        self.seller = User.objects.create_user(
+            username='seller', email='seller@example.com', password='testpass123', phone_number='+237600000002',
+        )
+        self.currency = Currency.objects.create(code='XAF', name='CFA Franc', symbol='FCFA', is_base_currency=True)
+        self.method = PaymentMethod.objects.create(name='MTN MoMo', code='mtn_momo', supports_escrow=True)
+        self.now = timezone.now()
+
+    def _escrow(self, status, expires_in, release_in=None):
+        return Escrow.objects.create(
+            escrow_type='deposit', status=status, buyer=self.buyer, seller=self.seller, amount=50000,
+            currency=self.currency, terms='Terms', release_conditions='Keys handed over',
+            expires_at=self.now + timedelta(seconds=expires_in),
+            release_deadline=self.now + timedelta(seconds=release_in) if release_in is not None else None,
+            payment_method=self.method,
+        )
+
+    def test_sweep_expires_unpaid_and_releases_held_escrows(self):
+        unpaid = self._escrow('awaiting_payment', -60)
+        self._escrow('created', -1)
+        future = self._escrow('created', 3600)
+        held = self._escrow('held', -60, release_in=-1)
+        disputed = self._escrow('disputed', -60, release_in=-1)
+
+        # Content type, then per deadline one locked batch (savepoint, select, update, events,
+        # notifications, release) and the empty select that ends the loop
+        with self.assertNumQueries(19):
+            counts = run_escrow_timers(self.now)
+
+        self.assertEqual(counts, {'expired': 2, 'released': 1})
+        statuses = dict(Escrow.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[unpaid.pk], 'expired')
+        self.assertEqual(statuses[future.pk], 'created')
+        self.assertEqual(statuses[held.pk], 'released')
+        self.assertEqual(statuses[disputed.pk], 'disputed')
+        held.refresh_from_db()
+        self.assertEqual(held.released_at, self.now)
+
+        event = EscrowEvent.objects.get(escrow=unpaid)
+        self.assertEqual(event.event_type, 'expired')
+        self.assertIsNone(event.created_by)
+        self.assertEqual(event.metadata['from_status'], 'awaiting_payment')
+        self.assertEqual(
+            set(Notification.objects.filter(object_id=unpaid.pk).values_list('recipient_id', flat=True)),
+            {self.buyer.pk, self.seller.pk},
+        )
+
+        self.assertEqual(run_escrow_timers(self.now), {'expired': 0, 'released': 0})
+        self.assertEqual(EscrowEvent.objects.count(), 3)
+
+    def test_wheel_applies_deadlines_due_within_lookahead(self):
+        soon = self._escrow('awaiting_payment', 5)
+        paid = self._escrow('awaiting_payment', 5)
+        later = self._escrow('awaiting_payment', 600)
+        timers = EscrowTimers(tick=1, lookahead=60, refresh=30, now=self.now.timestamp())
+
+        self.assertEqual(timers.poll(self.now), {})
+        self.assertIn(('expire', soon.pk), timers.wheel)
+        self.assertNotIn(('expire', later.pk), timers.wheel)
+
+        # Paid before the deadline: its stale wheel entry is skipped
+        Escrow.objects.filter(pk=paid.pk).update(status='held')
+        self.assertEqual(timers.poll(self.now + timedelta(seconds=4)), {})
+        self.assertEqual(timers.poll(self.now + timedelta(seconds=6)), {'expire': 1})
+
+        soon.refresh_from_db()
+        self.assertEqual(soon.status, 'expired')
+        self.assertEqual(Escrow.objects.get(pk=paid.pk).status, 'held')
+
+
+class FakeMomoProvider(BaseHTTPRequestHandler):
+    """MTN MoMo collection API stand-in: token, request to pay and its status."""
+    statuses = {}
+    unavailable_once = set()
+    # References accepted but answered with a 503, as a gateway timing out after the provider
+    fail_after_accept = set()
+    calls = []
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, code, payload=None):
+        body = json.dumps(payload or {}).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if not self.path.endswith('/requesttopay'):
+            self.calls.append(('token', self.path))
+            return self._reply(200, {'access_token': 'fake-token', 'expires_in': 3600})
+
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        reference = self.headers.get('X-Reference-Id')
+        self.calls.append(('requesttopay', reference))
+        if reference in self.statuses:
+            return self._reply(409, {'code': 'RESOURCE_ALREADY_EXIST'})
+        self.statuses[reference] = 'PENDING'
+        if reference in self.fail_after_accept:
+            return self._reply(503)
+        self._reply(202)
+
+    def do_GET(self):
+        reference = self.path.rsplit('/', 1)[-1]
+        self.calls.append(('status', reference))
+        if self.headers.get('Authorization') != 'Bearer fake-token':
+            return self._reply(401)
+        if reference in self.unavailable_once:
+            self.unavailable_once.discard(reference)
+            return self._reply(503)
+        if reference not in self.statuses:
+            return self._reply(404)
+        self._reply(200, {'status': self.statuses[reference], 'externalId': reference})
+
+
+class MobileMoneyReconciliationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeMomoProvider)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        FakeMomoProvider.statuses = {}
+        FakeMomoProvider.unavailable_once = set()
+        FakeMomoProvider.fail_after_accept = set()
+        FakeMomoProvider.calls = []
+        self.client = MobileMoneyClient(
+            base_url=f'http://127.0.0.1:{self.server.server_port}', subscription_key='key',
+            api_user='user', api_key='secret', target_environment='sandbox', pool_size=4,
+        )
+        self.addCleanup(self.client.close)
+        self.user = User.objects.create_user(
+            username='payer', email='payer@example.com', password='testpass123', phone_number='+237600000003',
+        )
+        self.package = CreditPackage.objects.create(name='Starter', credits=100, bonus_credits=10, price=5000)
+        self.now = timezone.now() + timedelta(seconds=1)  # the next sweep
+
+    def _purchase(self, provider_status):
+        reference = str(uuid.uuid4())
+        if provider_status:
+            FakeMomoProvider.statuses[reference] = provider_status
+        return CreditService.start_purchase(self.user, self.package, 'momo', reference)
+
+    def test_settles_pending_purchases_once(self):
+        paid = self._purchase('SUCCESSFUL')
+        declined = self._purchase('FAILED')
+        waiting = self._purchase('PENDING')
+        FakeMomoProvider.unavailable_once.add(paid.payment_reference)
+        starting_balance = CreditBalance.objects.get(user=self.user).balance
+
+        counts = reconcile_mobile_money(self.now, client=self.client)
+
+        self.assertEqual(counts, {'completed': 1, 'failed': 1, 'pending': 1})
+        self.assertEqual(CreditBalance.objects.get(user=self.user).balance, starting_balance + 110)
+        statuses = dict(CreditTransaction.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[paid.pk], 'completed')
+        self.assertEqual(statuses[declined.pk], 'failed')
+        self.assertEqual(statuses[waiting.pk], 'pending')
+        waiting.refresh_from_db()
+        self.assertEqual(waiting.status_checks, 1)
+        self.assertEqual(waiting.next_status_check_at, self.now + timedelta(seconds=60))
+        self.assertEqual(
+            sorted(Notification.objects.filter(recipient=self.user).values_list('subject', flat=True)),
+            ['Payment failed', 'Payment received'],
+        )
+        # One token for all checks; the 503 was retried
+        self.assertEqual([call[0] for call in FakeMomoProvider.calls].count('token'), 1)
+        self.assertEqual([call[1] for call in FakeMomoProvider.calls].count(paid.payment_reference), 2)
+
+        # Nothing is due until the backoff passes, and settling twice credits nothing
+        self.assertEqual(reconcile_mobile_money(self.now, client=self.client), {'completed': 0, 'failed': 0, 'pending': 0})
+        self.assertFalse(CreditService.complete_purchase(paid.pk))
+        FakeMomoProvider.statuses[waiting.payment_reference] = 'SUCCESSFUL'
+        self.assertEqual(reconcile_payment('credit', waiting.pk, client=self.client), 'completed')
+        self.assertEqual(CreditBalance.objects.get(user=self.user).balance, starting_balance + 220)
+
+    def test_settles_transactions_and_times_out_stale_payments(self):
+        currency = Currency.objects.create(code='XAF', name='CFA Franc', symbol='FCFA', is_base_currency=True)
+        method = PaymentMethod.objects.create(name='MTN MoMo', code='mtn_momo', gateway_type='mtn_momo')
+        paid = Transaction.objects.create(
+            user=self.user, transaction_type='rent_payment', amount=50000, currency=currency,
+            payment_method=method, phone_number='+237600000003', momo_transaction_id=str(uuid.uuid4()),
+            next_status_check_at=self.now,
+        )
+        FakeMomoProvider.statuses[paid.momo_transaction_id] = 'SUCCESSFUL'
+        stale = self._purchase('PENDING')
+        CreditTransaction.objects.filter(pk=stale.pk).update(created_at=self.now - timedelta(days=2))
+
+        self.assertEqual(
+            reconcile_mobile_money(self.now, client=self.client), {'completed': 1, 'failed': 1, 'pending': 0},
+        )
+        paid.refresh_from_db()
+        self.assertEqual(paid.status, 'completed')
+        self.assertEqual(paid.gateway_response['status'], 'SUCCESSFUL')
+        self.assertEqual(CreditTransaction.objects.get(pk=stale.pk).status, 'failed')
+
+    def _calls(self, kind):
+        return [reference for call, reference in FakeMomoProvider.calls if call == kind]
+
+    def test_collection_accepted_before_a_5xx_stays_pending_and_settles(self):
+        currency = Currency.objects.create(code='XAF', name='CFA Franc', symbol='FCFA', is_base_currency=True)
+        method = PaymentMethod.objects.create(name='MTN MoMo', code='mtn_momo', gateway_type='mtn_momo')
+        txn = Transaction.objects.create(
+            user=self.user, transaction_type='rent_payment', amount=50000, currency=currency,
+            payment_method=method, phone_number='+237600000003',
+        )
+
+        with patch('payment.reconciliation.mobile_money.is_configured', return_value=True), \
+                patch('payment.reconciliation.get_client', return_value=self.client), \
+                patch('payment.reconciliation.uuid.uuid4', return_value=uuid.UUID(int=1)):
+            FakeMomoProvider.fail_after_accept.add(str(uuid.UUID(int=1)))
+            self.assertTrue(start_momo_collection(txn))
+
+        # Sent once, not retried into a 409, and left for the poller
+        self.assertEqual(self._calls('requesttopay'), [txn.momo_transaction_id])
+        txn.refresh_from_db()
+        self.assertEqual(txn.status, 'pending')
+
+        FakeMomoProvider.statuses[txn.momo_transaction_id] = 'SUCCESSFUL'
+        self.assertEqual(reconcile_mobile_money(self.now, client=self.client)['completed'], 1)
+        self.assertEqual(Transaction.objects.get(pk=txn.pk).status, 'completed')
+
+    def test_duplicate_reference_counts_as_accepted(self):
+        reference = str(uuid.uuid4())
+        self.client.request_to_pay(reference, 5000, 'XAF', '+237600000003')
+        self.client.request_to_pay(reference, 5000, 'XAF', '+237600000003')
+
+        FakeMomoProvider.fail_after_accept.add('other')
+        with self.assertRaises(MobileMoneyOutcomeUnknown):
+            self.client.request_to_pay('other', 5000, 'XAF', '+237600000003')
+        self.assertEqual(self._calls('requesttopay'), [reference, reference, 'other'])
+
+    def test_credit_purchase_stays_pending_when_the_outcome_is_unknown(self):
+        api = APIClient()
+        api.force_authenticate(self.user)
+        reference = uuid.UUID(int=2)
+        FakeMomoProvider.fail_after_accept.add(str(reference))
+
+        with patch('credits.views.mobile_money.is_configured', return_value=True), \
+                patch('credits.views.get_client', return_value=self.client), \
+                patch('credits.views.uuid.uuid4', return_value=reference):
+            response = api.post('/api/credits/payment/momo/initiate/', {
+                'package_id': str(self.package.id), 'phone_number': '+237600000003',
+            }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        purchase = CreditTransaction.objects.get(payment_reference=str(reference))
+        self.assertEqual(purchase.status, 'pending')
+        FakeMomoProvider.statuses[str(reference)] = 'SUCCESSFUL'
+        self.assertEqual(reconcile_payment('credit', purchase.pk, client=self.client), 'completed')
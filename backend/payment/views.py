@@ -8,11 +8,14 @@ from .models import (
     PaymentMethod, Currency, Transaction, PaymentAccount,
     Invoice, Refund, WalletBalance
 )
+from . import mobile_money
+from .reconciliation import start_momo_collection
 from .serializers import (
     PaymentMethodSerializer, CurrencySerializer, TransactionSerializer,
     TransactionCreateSerializer, PaymentAccountSerializer,
     InvoiceSerializer, RefundSerializer, WalletBalanceSerializer
 )
+from .tasks import reconcile_mobile_money_payment
 
 
 class PaymentMethodListAPIView(generics.ListAPIView):
@@ -62,6 +65,12 @@ class TransactionCreateAPIView(generics.CreateAPIView):
     serializer_class = TransactionCreateSerializer
     permission_classes = [IsAuthenticated]
 
+    def perform_create(self, serializer):
+        txn = serializer.save()
+        # Settled in the background by payment.reconciliation
+        if txn.payment_method.gateway_type == 'mtn_momo' and txn.phone_number:
+            start_momo_collection(txn)
+
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -70,7 +79,10 @@ def verify_transaction(request, transaction_id):
     txn = get_object_or_404(Transaction, transaction_id=transaction_id, user=request.user)
     if txn.status != 'pending':
         return Response({'error': f'Transaction is {txn.status}, cannot verify'}, status=status.HTTP_400_BAD_REQUEST)
-    # In production, verify with gateway API
+    if txn.momo_transaction_id and mobile_money.is_configured():
+        # The provider decides; the payer is notified when it settles
+        reconcile_mobile_money_payment.delay('transaction', txn.pk)
+        return Response(TransactionSerializer(txn).data, status=status.HTTP_202_ACCEPTED)
     txn.status = 'completed'
     txn.processed_at = timezone.now()
     txn.save(update_fields=['status', 'processed_at'])
@@ -0,0 +1,388 @@
+"""
+Bulk Property Import / Export
+
+CSV or JSONL rows are validated in batches against lookup dicts for
+property types, statuses and areas (one query each per import), slugs are
+allocated per batch with one query, and properties and features are
+written with bulk_create. Search indexing, the sitemap refresh, saved
+search alerts and listing auto-checks are queued once for the whole
+import instead of per row through the post_save signals.
+"""
+import csv
+import io
+import json
+import logging
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, models, transaction
+
+from locations.models import Area
+from tariffplans.quotas import QuotaExceeded, get_plan_quota, remaining_listings, reserve_listings
+
+from .models import Property, PropertyFeature, PropertyStatus, PropertyType
+from .saved_searches import NEW_LISTING, queue_saved_search_matching
+from .search_index import queue_bulk_property_upsert
+from .signals import queue_property_sitemap_refresh
+from .slugs import allocate_slugs, base_slug_for
+
+logger = logging.getLogger(__name__)
+
+FORMAT_CSV = 'csv'
+FORMAT_JSONL = 'jsonl'
+FORMATS = (FORMAT_CSV, FORMAT_JSONL)
+
+DEFAULT_BATCH_SIZE = 500
+SLUG_CONFLICT_ERROR = 'Another listing took the same slug while this batch was written; import these rows again.'
+
+# Set by the importer, never read from the file
+NON_IMPORTABLE_FIELDS = {
+    'id', 'slug', 'agent', 'created_at', 'updated_at', 'views_count',
+    'is_verified', 'verified_at', 'verified_by', 'featured',
+    'registry_status', 'title_document',
+}
+RELATED_COLUMNS = ('property_type', 'status', 'area', 'city')
+FEATURES_COLUMN = 'features'
+
+IMPORT_FIELDS = [
+    field.name for field in Property._meta.concrete_fields
+    if field.name not in NON_IMPORTABLE_FIELDS and not field.is_relation
+]
+EXPORT_COLUMNS = ['slug', 'title', 'property_type', 'status', 'area', 'city'] + [
+    name for name in IMPORT_FIELDS if name != 'title'
+] + [FEATURES_COLUMN]
+
+TRUE_VALUES = {'true', '1', 'yes', 'y', 't'}
+
+
+def detect_format(filename, explicit=None):
+    if explicit:
+        fmt = explicit.lower()
+    elif filename and filename.lower().endswith(('.jsonl', '.ndjson')):
+        fmt = FORMAT_JSONL
+    else:
+        fmt = FORMAT_CSV
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}'. Use one of: {', '.join(FORMATS)}")
+    return fmt
+
+
+def iter_rows(stream, fmt):
+    """Yield (line_number, dict) from a text stream."""
+    if fmt == FORMAT_JSONL:
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, {'__error__': f'Invalid JSON: {e}'}
+                continue
+            yield line_number, row if isinstance(row, dict) else {'__error__': 'Each line must be a JSON object'}
+    else:
+        # Header is line 1
+        for line_number, row in enumerate(csv.DictReader(stream), start=2):
+            yield line_number, row
+
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _key(value):
+    return str(value).strip().lower()
+
+
+class PropertyLookups:
+    """Name -> id dicts for the foreign keys an import row refers to."""
+
+    def __init__(self):
+        self.types = {
+            _key(name): pk for pk, name in PropertyType.objects.filter(is_active=True).values_list('pk', 'name')
+        }
+        self.statuses = {
+            _key(name): pk for pk, name in PropertyStatus.objects.values_list('pk', 'name')
+        }
+        self.area_names = {}
+        self.areas = {}
+        self.areas_by_city = {}
+        for pk, name, city_name in Area.objects.filter(is_active=True).values_list('pk', 'name', 'city__name'):
+            self.areas[pk] = name
+            self.areas_by_city[(_key(city_name), _key(name))] = pk
+            # An area name shared by several cities needs the city column
+            self.area_names[_key(name)] = None if _key(name) in self.area_names else pk
+
+    def resolve_area(self, area, city):
+        if isinstance(area, int) or (isinstance(area, str) and area.strip().isdigit()):
+            area_id = int(area)
+            return area_id if area_id in self.areas else None
+        if not _blank(city):
+            return self.areas_by_city.get((_key(city), _key(area)))
+        return self.area_names.get(_key(area))
+
+
+def parse_features(value):
+    """Features as a JSON list of objects, or 'name=value;name' text."""
+    if _blank(value):
+        return []
+    if isinstance(value, str) and value.strip().startswith('['):
+        value = json.loads(value)
+    if isinstance(value, list):
+        return [
+            {
+                'feature_name': str(item.get('feature_name', '')).strip(),
+                'feature_value': str(item.get('feature_value', '') or '').strip(),
+                'is_highlighted': bool(item.get('is_highlighted', False)),
+            }
+            for item in value if isinstance(item, dict)
+        ]
+
+    features = []
+    for part in str(value).split(';'):
+        name, _sep, feature_value = part.partition('=')
+        if name.strip():
+            features.append({'feature_name': name.strip(), 'feature_value': feature_value.strip(), 'is_highlighted': False})
+    return features
+
+
+class PropertyImporter:
+    """
+    Import rows for one agent.
+
+    Invalid rows are skipped and reported; valid rows are written batch by
+    batch. run() returns {'created', 'valid', 'skipped', 'errors', 'dry_run'}.
+    """
+
+    def __init__(self, agent, batch_size=DEFAULT_BATCH_SIZE, dry_run=False, enforce_quota=False):
+        self.agent = agent
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        # Listing slots of the agent's subscription (tariffplans.quotas)
+        self.quota_user_id = agent.user_id if enforce_quota else None
+        self.lookups = PropertyLookups()
+        self.created_ids = []
+        self.errors = []
+        self.remaining_quota = None
+        if self.quota_user_id is not None and dry_run:
+            self.remaining_quota = remaining_listings(self.quota_user_id)
+
+    def run(self, rows):
+        batch = []
+        validated = 0
+        for line_number, row in rows:
+            batch.append((line_number, row))
+            if len(batch) >= self.batch_size:
+                validated += self._process_batch(batch)
+                batch = []
+        if batch:
+            validated += self._process_batch(batch)
+
+        if self.created_ids:
+            self._after_import()
+
+        return {
+            'created': len(self.created_ids),
+            'valid': validated,
+            'skipped': len(self.errors),
+            'errors': self.errors,
+            'dry_run': self.dry_run,
+        }
+
+    def _process_batch(self, batch):
+        valid = []
+        for line_number, row in batch:
+            try:
+                valid.append((line_number, *self.build_property(row)))
+            except ValidationError as e:
+                self.errors.append({'line': line_number, 'errors': _error_dict(e)})
+
+        try:
+            if valid and not self.dry_run and self.quota_user_id is not None:
+                # Slots are reserved in the write's transaction, so a failed batch gives them back
+                with transaction.atomic():
+                    valid = self._apply_quota(valid)
+                    if valid:
+                        self._write(valid)
+                return len(valid)
+
+            valid = self._apply_quota(valid)
+            if valid and not self.dry_run:
+                self._write(valid)
+            return len(valid)
+        except IntegrityError:
+            logger.warning('Bulk import batch of %s rows lost a slug race twice', len(valid), exc_info=True)
+            for line_number, *_rest in valid:
+                self.errors.append({'line': line_number, 'errors': {'slug': [SLUG_CONFLICT_ERROR]}})
+            return 0
+
+    def _apply_quota(self, valid):
+        """The rows the plan still has room for; the rest are reported as errors."""
+        if self.quota_user_id is None:
+            return valid
+        if self.dry_run:
+            granted = len(valid) if self.remaining_quota is None else min(len(valid), self.remaining_quota)
+            if self.remaining_quota is not None:
+                self.remaining_quota -= granted
+        else:
+            granted = reserve_listings(self.quota_user_id, len(valid), description='Bulk import')
+            if granted is None:
+                granted = len(valid)
+
+        if granted < len(valid):
+            quota = get_plan_quota(self.quota_user_id)
+            message = str(QuotaExceeded(quota, 'properties', quota['limits']['properties']))
+            for line_number, *_rest in valid[granted:]:
+                self.errors.append({'line': line_number, 'errors': {'__all__': [message]}})
+        return valid[:granted]
+
+    def build_property(self, row):
+        """Validated (unsaved Property, features) for one row, or ValidationError."""
+        if '__error__' in row:
+            raise ValidationError(row['__error__'])
+
+        errors = {}
+        type_id = self.lookups.types.get(_key(row.get('property_type', '')))
+        if type_id is None:
+            errors['property_type'] = [f"Unknown property type '{row.get('property_type', '')}'."]
+        status_id = self.lookups.statuses.get(_key(row.get('status', '')))
+        if status_id is None:
+            errors['status'] = [f"Unknown status '{row.get('status', '')}'."]
+        area_id = self.lookups.resolve_area(row.get('area', ''), row.get('city'))
+        if area_id is None:
+            errors['area'] = [f"Unknown or ambiguous area '{row.get('area', '')}'; add the city column."]
+
+        values = {}
+        for name in IMPORT_FIELDS:
+            value = row.get(name)
+            if _blank(value):
+                continue  # Model default
+            if isinstance(Property._meta.get_field(name), models.BooleanField) and isinstance(value, str):
+                value = value.strip().lower() in TRUE_VALUES
+            values[name] = value.strip() if isinstance(value, str) else value
+
+        instance = Property(
+            agent=self.agent, property_type_id=type_id, status_id=status_id, area_id=area_id, **values
+        )
+        try:
+            instance.clean_fields(exclude=list(NON_IMPORTABLE_FIELDS | set(RELATED_COLUMNS)))
+        except ValidationError as e:
+            errors.update(e.message_dict)
+
+        try:
+            features = parse_features(row.get(FEATURES_COLUMN))
+        except ValueError:
+            errors[FEATURES_COLUMN] = ['Features must be a JSON list or name=value;name text.']
+            features = []
+
+        if errors:
+            raise ValidationError(errors)
+        return instance, features
+
+    def _write(self, valid):
+        """
+        Insert the batch; a slug taken by a concurrent create between the
+        allocation and the INSERT rolls back the savepoint and the batch is
+        written once more with fresh slugs. IntegrityError if that fails too.
+        """
+        bases = [
+            base_slug_for(instance.title, self.lookups.areas[instance.area_id])
+            for _line, instance, _features in valid
+        ]
+        for attempt in (1, 2):
+            try:
+                with transaction.atomic():
+                    for (_line, instance, _features), slug in zip(valid, allocate_slugs(bases)):
+                        instance.slug = slug
+
+                    properties = Property.objects.bulk_create([instance for _line, instance, _features in valid])
+                    PropertyFeature.objects.bulk_create(
+                        [
+                            PropertyFeature(property_listing=prop, **feature)
+                            for prop, (_line, _instance, features) in zip(properties, valid)
+                            for feature in features
+                        ],
+                        ignore_conflicts=True,  # Duplicate feature names in one row
+                    )
+                break
+            except IntegrityError:
+                if attempt == 2:
+                    raise
+        self.created_ids.extend(prop.pk for prop in properties)
+
+    def _after_import(self):
+        # One coalesced sync instead of a post_save signal per row
+        queue_bulk_property_upsert(self.created_ids, reason='property_imported')
+        queue_property_sitemap_refresh()
+        queue_saved_search_matching(self.created_ids, NEW_LISTING)
+
+        try:
+            from moderation.tasks import run_listing_auto_checks_batch
+            run_listing_auto_checks_batch.delay(self.created_ids)
+        except Exception:
+            logger.warning('Could not queue auto-checks for %s imported properties', len(self.created_ids), exc_info=True)
+
+
+def _error_dict(error):
+    if hasattr(error, 'error_dict'):
+        return error.message_dict
+    return {'__all__': error.messages}
+
+
+def _export_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return value
+
+
+def export_row(prop):
+    row = {
+        'slug': prop.slug,
+        'property_type': prop.property_type.name,
+        'status': prop.status.name,
+        'area': prop.area.name,
+        'city': prop.area.city.name,
+    }
+    for name in IMPORT_FIELDS:
+        row[name] = getattr(prop, name)
+    row[FEATURES_COLUMN] = [
+        {
+            'feature_name': feature.feature_name,
+            'feature_value': feature.feature_value,
+            'is_highlighted': feature.is_highlighted,
+        }
+        for feature in prop.additional_features.all()
+    ]
+    return row
+
+
+class _Echo:
+    """csv.writer target that hands the formatted line back."""
+
+    def write(self, value):
+        return value
+
+
+def iter_export(queryset, fmt, chunk_size=DEFAULT_BATCH_SIZE):
+    """Yield export lines chunk by chunk; memory stays flat however many rows."""
+    queryset = queryset.select_related('property_type', 'status', 'area__city').prefetch_related(
+        'additional_features'
+    ).order_by('pk')
+
+    if fmt == FORMAT_JSONL:
+        for prop in queryset.iterator(chunk_size=chunk_size):
+            yield json.dumps(export_row(prop), cls=DjangoJSONEncoder) + '\n'
+        return
+
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for prop in queryset.iterator(chunk_size=chunk_size):
+        row = export_row(prop)
+        row[FEATURES_COLUMN] = json.dumps(row[FEATURES_COLUMN]) if row[FEATURES_COLUMN] else ''
+        yield writer.writerow([_export_value(row[column]) for column in EXPORT_COLUMNS])
+
+
+def open_text(uploaded_file):
+    """Text stream over an uploaded or opened binary file (BOM tolerant)."""
+    return io.TextIOWrapper(uploaded_file, encoding='utf-8-sig', newline='')
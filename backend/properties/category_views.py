@@ -7,6 +7,8 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAdminUser
 from django.db.models import Q
 
+from utils.response_cache import VersionedCacheMixin
+
 from .category_models import Category, PropertyTag, PropertyState
 from .category_serializers import (
     CategorySerializer,
@@ -16,8 +18,11 @@ from .category_serializers import (
     CategoryWithFiltersSerializer
 )
 
+# Categories, tags and states embed each other through applies_to_categories
+CATEGORY_CACHE_MODELS = (Category, PropertyTag, PropertyState)
+
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CategoryViewSet(VersionedCacheMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for property categories
 
@@ -32,6 +37,7 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = CategorySerializer
     permission_classes = [AllowAny]
     lookup_field = 'slug'
+    cache_models = CATEGORY_CACHE_MODELS
 
     @action(detail=False, methods=['get'])
     def parents(self, request):
@@ -63,7 +69,7 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
 
 
-class PropertyTagViewSet(viewsets.ReadOnlyModelViewSet):
+class PropertyTagViewSet(VersionedCacheMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for property tags
 
@@ -76,6 +82,7 @@ class PropertyTagViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = PropertyTagSerializer
     permission_classes = [AllowAny]
     lookup_field = 'slug'
+    cache_models = CATEGORY_CACHE_MODELS
 
     @action(detail=False, methods=['get'], url_path='for_category/(?P<category_id>[^/.]+)')
     def for_category(self, request, category_id=None):
@@ -99,7 +106,7 @@ class PropertyTagViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
 
 
-class PropertyStateViewSet(viewsets.ReadOnlyModelViewSet):
+class PropertyStateViewSet(VersionedCacheMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for property states
 
@@ -113,6 +120,7 @@ class PropertyStateViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = PropertyStateSerializer
     permission_classes = [AllowAny]
     lookup_field = 'code'
+    cache_models = CATEGORY_CACHE_MODELS
 
     @action(detail=False, methods=['get'])
     def public(self, request):
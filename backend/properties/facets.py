@@ -0,0 +1,201 @@
+"""
+Facet counts for the property search sidebar
+
+compute_facets() counts the listings matching the current PropertyFilter
+by city, area, property type, listing type, bedroom bucket, amenity flag
+and price bin, in four grouped queries:
+
+- one row of conditional counts (total, listing types, bedroom buckets,
+  amenities) plus the price range,
+- listings per area, summed to cities in Python,
+- listings per property type,
+- one row of conditional counts over the price bins.
+
+Counts are conjunctive: every facet is counted under all active filters,
+its own included, matching what property_search returns. An invalid
+parameter drops only that filter, as PropertyFilter.qs does.
+
+get_facets() caches the result under the normalized filter values, so
+parameter order, blanks and unrelated parameters share an entry, and
+under the Property, PropertyType, Area and City versions of the response
+cache: listing saves (view counter updates aside) and lookup edits make
+old entries unreachable. Bulk queryset updates bypass the signals and
+are covered by PROPERTY_FACETS_CACHE_SECONDS.
+"""
+import functools
+import hashlib
+import math
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import Count, Max, Min, Q
+
+from locations.models import Area, City
+from utils.db_routing import use_replica
+from utils.response_cache import bump_response_cache_version, get_versions
+
+from .filters import PropertyFilter
+from .models import Property, PropertyType
+
+FACETS_KEY = 'properties:facets:{}'
+VERSION_MODELS = (Property, PropertyType, Area, City)
+MAX_AREAS = 50
+
+# (label, bedrooms_min, bedrooms_max)
+BEDROOM_BUCKETS = [
+    ('studio', 0, 0),
+    ('1', 1, 1),
+    ('2', 2, 2),
+    ('3', 3, 3),
+    ('4', 4, 4),
+    ('5+', 5, None),
+]
+AMENITY_FIELDS = [
+    'has_parking', 'has_security', 'has_pool', 'has_gym', 'has_elevator',
+    'has_generator', 'has_hot_water', 'has_ac_preinstalled',
+]
+
+
+def base_queryset():
+    return Property.objects.filter(is_active=True).exclude(status__name='draft')
+
+
+def _bedroom_q(low, high):
+    if high is None:
+        return Q(no_of_bedrooms__gte=low)
+    return Q(no_of_bedrooms__gte=low, no_of_bedrooms__lte=high)
+
+
+def _summary(queryset):
+    aggregates = {
+        'total': Count('pk'),
+        'price_min': Min('price'),
+        'price_max': Max('price'),
+    }
+    for value, _ in Property.LISTING_TYPES:
+        aggregates[f'listing_{value}'] = Count('pk', filter=Q(listing_type=value))
+    for index, (_, low, high) in enumerate(BEDROOM_BUCKETS):
+        aggregates[f'bedrooms_{index}'] = Count('pk', filter=_bedroom_q(low, high))
+    for field in AMENITY_FIELDS:
+        aggregates[field] = Count('pk', filter=Q(**{field: True}))
+    return queryset.aggregate(**aggregates)
+
+
+def _locations(queryset):
+    rows = queryset.values(
+        'area_id', 'area__name', 'area__city_id', 'area__city__name',
+    ).annotate(count=Count('pk')).order_by('-count', 'area__name')
+    areas, cities = [], {}
+    for row in rows:
+        areas.append({
+            'id': row['area_id'], 'name': row['area__name'],
+            'city': row['area__city__name'], 'count': row['count'],
+        })
+        city = cities.setdefault(row['area__city_id'], {
+            'id': row['area__city_id'], 'name': row['area__city__name'], 'count': 0,
+        })
+        city['count'] += row['count']
+    cities = sorted(cities.values(), key=lambda city: (-city['count'], city['name']))
+    return cities, areas[:MAX_AREAS]
+
+
+def _property_types(queryset):
+    rows = queryset.values('property_type_id', 'property_type__name').annotate(
+        count=Count('pk'),
+    ).order_by('-count', 'property_type__name')
+    return [{'id': row['property_type_id'], 'name': row['property_type__name'], 'count': row['count']} for row in rows]
+
+
+def price_bins(low, high, bins):
+    """Whole-unit [start, end) edges covering low..high in at most `bins` equal steps."""
+    low, high = math.floor(low), math.ceil(high)
+    width = max(1, math.ceil((high - low) / bins))
+    count = max(1, math.ceil((high - low) / width))
+    return [(low + index * width, low + (index + 1) * width) for index in range(count)]
+
+
+def _price_histogram(queryset, low, high):
+    if low is None:
+        return []
+    edges = price_bins(low, high, getattr(settings, 'PROPERTY_FACETS_PRICE_BINS', 10))
+    aggregates = {}
+    for index, (start, end) in enumerate(edges):
+        # The last bin is closed so the most expensive listing is counted
+        condition = Q(price__gte=start) if index == len(edges) - 1 else Q(price__gte=start, price__lt=end)
+        aggregates[f'bin_{index}'] = Count('pk', filter=condition)
+    counts = queryset.aggregate(**aggregates)
+    return [
+        {'price_min': start, 'price_max': end, 'count': counts[f'bin_{index}']}
+        for index, (start, end) in enumerate(edges)
+    ]
+
+
+def compute_facets(queryset):
+    queryset = queryset.order_by()
+    summary = _summary(queryset)
+    cities, areas = _locations(queryset)
+    return {
+        'count': summary['total'],
+        'facets': {
+            'city': cities,
+            'area': areas,
+            'property_type': _property_types(queryset),
+            'listing_type': [
+                {'value': value, 'label': label, 'count': summary[f'listing_{value}']}
+                for value, label in Property.LISTING_TYPES
+            ],
+            'bedrooms': [
+                {'label': label, 'bedrooms_min': low, 'bedrooms_max': high, 'count': summary[f'bedrooms_{index}']}
+                for index, (label, low, high) in enumerate(BEDROOM_BUCKETS)
+            ],
+            'amenities': [{'field': field, 'count': summary[field]} for field in AMENITY_FIELDS],
+            'price': _price_histogram(queryset, summary['price_min'], summary['price_max']),
+        },
+    }
+
+
+def _normalize(value):
+    if isinstance(value, models.Model):
+        return value.pk
+    if isinstance(value, slice):
+        return (_normalize(value.start), _normalize(value.stop))
+    if isinstance(value, Decimal):
+        return str(value.normalize())
+    return str(value)
+
+
+def filter_key(filterset):
+    """Stable text of the valid filters that are set; invalid ones are left out, as filterset.qs does."""
+    filterset.errors  # validates, keeping only the valid values in cleaned_data
+    active = []
+    for name, value in filterset.form.cleaned_data.items():
+        if value in (None, '', []):
+            continue
+        if isinstance(value, str) and filterset.filters[name].lookup_expr == 'icontains':
+            value = value.lower()
+        active.append((name, _normalize(value)))
+    return repr(sorted(active))
+
+
+def get_facets(params):
+    """Facets for the query params of a property_search request, cached."""
+    filterset = PropertyFilter(params, queryset=base_queryset())
+    normalized = filter_key(filterset)
+    identity = f'{get_versions(VERSION_MODELS)}|{normalized}'
+    key = FACETS_KEY.format(hashlib.md5(identity.encode('utf-8')).hexdigest())
+
+    facets = cache.get(key)
+    if facets is None:
+        # From the primary: a lagging replica would store old counts under the new versions
+        with use_replica(False):
+            facets = compute_facets(filterset.qs)
+        cache.set(key, facets, timeout=getattr(settings, 'PROPERTY_FACETS_CACHE_SECONDS', 300))
+    return facets
+
+
+def invalidate_property_facets():
+    """Called on listing saves and deletes; again on commit, like the response cache."""
+    bump_response_cache_version(Property)
+    transaction.on_commit(functools.partial(bump_response_cache_version, Property))
@@ -0,0 +1,50 @@
+"""
+Replay the hot API endpoints against seeded data and check them
+against tests/benchmark_budgets.json
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from tests import benchmarks
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark API latency percentiles and query counts against the committed budgets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, help='Data multiplier; defaults to the budget file scale')
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--enforce-latency', action='store_true', help='Also fail on p95 latency budgets')
+        parser.add_argument('--json', type=str, help='Write raw results to this file')
+
+    def handle(self, *args, **options):
+        budgets = benchmarks.load_budgets()
+        scale = options['scale'] or budgets['scale']
+
+        # Seeded rows are rolled back, so the current database is left as it was
+        results = {}
+        try:
+            with transaction.atomic():
+                self.stdout.write(f'Seeding benchmark data at scale {scale}...')
+                benchmarks.seed_benchmark_data(scale=scale)
+                results = benchmarks.run_benchmarks(options['iterations'], options['warmup'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        self.stdout.write(benchmarks.format_report(results, budgets))
+        if options['json']:
+            with open(options['json'], 'w', encoding='utf-8') as output:
+                json.dump({'scale': scale, 'results': results}, output, indent=2)
+
+        violations = benchmarks.check_budgets(results, budgets, enforce_latency=options['enforce_latency'])
+        if violations:
+            raise CommandError('Budget violations:\n  ' + '\n  '.join(violations))
+        self.stdout.write(self.style.SUCCESS('All endpoints within budget'))
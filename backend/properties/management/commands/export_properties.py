@@ -0,0 +1,31 @@
+"""
+Management command to stream listings out as CSV or JSONL
+"""
+from django.core.management.base import BaseCommand
+
+from properties.bulk_import import detect_format, iter_export
+from properties.models import Property
+
+
+class Command(BaseCommand):
+    help = 'Export properties as CSV or JSONL (the import_properties format)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', type=str, help='File to write; defaults to stdout')
+        parser.add_argument('--format', type=str, choices=['csv', 'jsonl'], help='Defaults to the output extension, else csv')
+        parser.add_argument('--agent', type=str, help='Only listings of the agent with this email')
+
+    def handle(self, *args, **options):
+        fmt = detect_format(options['output'], options['format'])
+        queryset = Property.objects.all()
+        if options['agent']:
+            queryset = queryset.filter(agent__user__email=options['agent'])
+
+        if not options['output']:
+            for line in iter_export(queryset, fmt):
+                self.stdout.write(line, ending='')
+            return
+
+        with open(options['output'], 'w', encoding='utf-8', newline='') as stream:
+            for line in iter_export(queryset, fmt):
+                stream.write(line)
@@ -0,0 +1,36 @@
+"""
+Management command to bulk import listings for an agent from CSV or JSONL
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from agents.models import AgentProfile
+from properties.bulk_import import DEFAULT_BATCH_SIZE, PropertyImporter, detect_format, iter_rows
+
+
+class Command(BaseCommand):
+    help = 'Bulk import properties from a CSV or JSONL file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=str, help='CSV or JSONL file to import')
+        parser.add_argument('--agent', type=str, required=True, help='Email of the agent who will own the listings')
+        parser.add_argument('--format', type=str, choices=['csv', 'jsonl'], help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Validate only; nothing is written')
+
+    def handle(self, *args, **options):
+        try:
+            agent = AgentProfile.objects.select_related('user').get(user__email=options['agent'])
+        except AgentProfile.DoesNotExist:
+            raise CommandError(f"No agent profile for {options['agent']}")
+
+        fmt = detect_format(options['path'], options['format'])
+        importer = PropertyImporter(agent, batch_size=options['batch_size'], dry_run=options['dry_run'])
+        with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+            result = importer.run(iter_rows(stream, fmt))
+
+        for error in result['errors']:
+            self.stdout.write(self.style.WARNING(f"  line {error['line']}: {error['errors']}"))
+
+        verb = 'Validated' if result['dry_run'] else 'Imported'
+        count = result['valid'] if result['dry_run'] else result['created']
+        self.stdout.write(self.style.SUCCESS(f"✓ {verb} {count} properties, skipped {result['skipped']}"))
@@ -0,0 +1,116 @@
+"""
+Profile process start-up: import time per app and boot phases
+
+Starts a fresh interpreter under "python -X importtime", times Django
+setup, URLconf loading, optional warm-up (config.warmup) and the first
+request, and groups the self import time by top-level package so slow
+imports can be traced to the app that pulls them in.
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in the child interpreter; prints {phase: seconds} as the last stdout line
+PROBE = '''
+import json, os, sys, time
+started = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+import django
+django.setup()
+timings = {'setup': time.perf_counter() - started}
+
+phase = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+timings['urlconf'] = time.perf_counter() - phase
+
+if sys.argv[2] == 'warm':
+    from config.warmup import warm_up
+    phase = time.perf_counter()
+    warm_up(close_connections=False)
+    timings['warmup'] = time.perf_counter() - phase
+
+from django.test import Client
+from config.warmup import _warmup_host
+phase = time.perf_counter()
+status = Client(HTTP_HOST=_warmup_host()).get(sys.argv[1]).status_code
+timings['first_request'] = time.perf_counter() - phase
+timings['first_request_status'] = status
+timings['total'] = time.perf_counter() - started
+print(json.dumps(timings))
+'''
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def parse_importtime(stderr):
+    """{top-level package: self microseconds}"""
+    totals = defaultdict(int)
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            totals[match.group(4).split('.')[0]] += int(match.group(1))
+    return dict(totals)
+
+
+def run_probe(path, warm):
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE, path, 'warm' if warm else 'cold'],
+        cwd=settings.BASE_DIR, env=os.environ.copy(), capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise CommandError(f'Start-up probe failed:\n{result.stderr[-2000:]}')
+    return {
+        'phases': json.loads(result.stdout.strip().splitlines()[-1]),
+        'imports_us': parse_importtime(result.stderr),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Measure import time per app and boot phase timings of a fresh process'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/properties/', help='Path of the timed first request')
+        parser.add_argument('--warm', action='store_true', help='Run config.warmup before the first request')
+        parser.add_argument('--compare', action='store_true', help='Profile a cold and a warmed process')
+        parser.add_argument('--top', type=int, default=15, help='Packages to list by import time')
+        parser.add_argument('--json', type=str, help='Write raw results to this file')
+
+    def handle(self, *args, **options):
+        modes = [False, True] if options['compare'] else [options['warm']]
+        results = {}
+        for warm in modes:
+            label = 'warm' if warm else 'cold'
+            results[label] = run_probe(options['path'], warm)
+            self._report(label, results[label], options['top'])
+
+        if options['json']:
+            with open(options['json'], 'w', encoding='utf-8') as output:
+                json.dump(results, output, indent=2)
+
+    def _report(self, label, result, top):
+        project_apps = {config.name.split('.')[0] for config in apps.get_app_configs()
+                        if config.path.startswith(str(settings.BASE_DIR)) and 'site-packages' not in config.path}
+        imports = result['imports_us']
+        total_us = sum(imports.values()) or 1
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{label} start ({result["phases"]["total"]:.2f}s)'))
+        for phase, seconds in result['phases'].items():
+            if phase not in ('total', 'first_request_status'):
+                self.stdout.write(f'  {phase:<16} {seconds * 1000:>9.1f}ms')
+        self.stdout.write(f'  first request returned HTTP {result["phases"]["first_request_status"]}')
+
+        self.stdout.write(f'  {"package":<28} {"self import":>12} {"share":>7}')
+        ranked = sorted(imports.items(), key=lambda item: item[1], reverse=True)[:top]
+        for package, micros in ranked:
+            marker = ' *' if package in project_apps else ''
+            self.stdout.write(f'  {package + marker:<28} {micros / 1000:>10.1f}ms {micros / total_us:>6.1%}')
+        project_us = sum(micros for package, micros in imports.items() if package in project_apps)
+        self.stdout.write(f'  project apps (*) total {project_us / 1000:.1f}ms of {total_us / 1000:.1f}ms\n')
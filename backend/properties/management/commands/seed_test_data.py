@@ -566,16 +566,28 @@ class Command(BaseCommand):
             },
         ]
 
-        self.properties = []
+        from properties.slugs import allocate_slugs, base_slug_for
+
         for i, data in enumerate(properties_data):
             # Assign area from seeded locations
-            area = areas[i % len(areas)]
-            data['area'] = area
+            data['area'] = areas[i % len(areas)]
 
-            prop, created = Property.objects.get_or_create(
-                title=data['title'],
-                defaults=data
-            )
+        # One lookup for existing titles and one for slugs, instead of a query loop per property
+        existing = {
+            prop.title: prop
+            for prop in Property.objects.filter(title__in=[data['title'] for data in properties_data])
+        }
+        missing = [data for data in properties_data if data['title'] not in existing]
+        slugs = allocate_slugs([base_slug_for(data['title'], data['area'].name) for data in missing])
+        for data, slug in zip(missing, slugs):
+            data['slug'] = slug
+
+        self.properties = []
+        for data in properties_data:
+            prop = existing.get(data['title'])
+            created = prop is None
+            if created:
+                prop = Property.objects.create(**data)
             self.stdout.write(f'   {"✓ Created" if created else "- Exists"}: {prop.title[:50]}...')
             self.properties.append(prop)
 
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.12 on 2026-10-19 17:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0013_propertysearchsync'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedSearch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('params', models.JSONField(blank=True, default=dict, help_text='PropertyFilter query parameters')),
+                ('alerts_enabled', models.BooleanField(default=True)),
+                ('area_key', models.PositiveBigIntegerField(default=0, editable=False)),
+                ('property_type_key', models.PositiveBigIntegerField(default=0, editable=False)),
+                ('listing_type_key', models.CharField(blank=True, editable=False, max_length=15)),
+                ('price_min', models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=12, null=True)),
+                ('price_max', models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=12, null=True)),
+                ('needs_check', models.BooleanField(default=False, editable=False, help_text='Params beyond the indexed ones, checked against the listing with PropertyFilter')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SavedSearchMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(choices=[('new_listing', 'New listing'), ('price_drop', 'Price drop')], max_length=20)),
+                ('price', models.DecimalField(decimal_places=2, help_text='Listing price when matched', max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('notified_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='savedsearch',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saved_searches', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='savedsearchmatch',
+            name='property',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saved_search_matches', to='properties.property'),
+        ),
+        migrations.AddField(
+            model_name='savedsearchmatch',
+            name='search',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='properties.savedsearch'),
+        ),
+        migrations.AddIndex(
+            model_name='savedsearch',
+            index=models.Index(fields=['area_key', 'property_type_key', 'listing_type_key'], name='properties__area_ke_10970c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='savedsearch',
+            index=models.Index(fields=['user', 'created_at'], name='properties__user_id_baae6e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='savedsearchmatch',
+            index=models.Index(fields=['notified_at', 'created_at'], name='properties__notifie_562c16_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='savedsearchmatch',
+            constraint=models.UniqueConstraint(condition=models.Q(('notified_at__isnull', True)), fields=('search', 'property'), name='unique_pending_saved_search_match'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.12 on 2026-10-19 17:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0014_saved_searches'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='propertyfavorite',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='properties__user_id_f3f13a_idx'),
+        ),
+    ]
@@ -2,7 +2,6 @@ from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth import get_user_model
 from django.utils import timezone
-from django.utils.text import slugify
 
 # Import category models
 from .category_models import Category, PropertyTag, PropertyState
@@ -376,26 +375,12 @@ class Property(models.Model):
         return None
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            base_slug = slugify(f"{self.title}-{self.area.name if self.area else 'unknown'}")
-            slug = base_slug
-            counter = 1
-            max_attempts = 100  # Prevent infinite loop
+        if self.slug:
+            super().save(*args, **kwargs)
+            return
 
-            # Ensure unique slug with safety limit
-            while Property.objects.filter(slug=slug).exists() and counter < max_attempts:
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-
-            # If we hit max attempts, use a timestamp suffix
-            if counter >= max_attempts:
-                from datetime import datetime
-                timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-                slug = f"{base_slug}-{timestamp}"
-
-            self.slug = slug
-
-        super().save(*args, **kwargs)
+        from .slugs import save_with_allocated_slug
+        save_with_allocated_slug(self, lambda: super(Property, self).save(*args, **kwargs))
 
     def clean(self):
         """
@@ -614,6 +599,87 @@ class PropertyFavorite(models.Model):
     class Meta:
         unique_together = ['user', 'property']
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of a user's favorites
+            models.Index(fields=['user', 'created_at', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.user.get_full_name()} - {self.property.title}"
+
+
+class SavedSearch(models.Model):
+    """
+    A user's saved PropertyFilter parameters, alerted on new listings and
+    price drops (properties.saved_searches). The *_key and price fields
+    index the search for the alert matcher and are derived from params on
+    save; 0 and '' mean any.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='saved_searches')
+    name = models.CharField(max_length=100)
+    params = models.JSONField(default=dict, blank=True, help_text="PropertyFilter query parameters")
+    alerts_enabled = models.BooleanField(default=True)
+
+    area_key = models.PositiveBigIntegerField(default=0, editable=False)
+    property_type_key = models.PositiveBigIntegerField(default=0, editable=False)
+    listing_type_key = models.CharField(max_length=15, blank=True, editable=False)
+    price_min = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, editable=False)
+    price_max = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, editable=False)
+    needs_check = models.BooleanField(
+        default=False, editable=False,
+        help_text="Params beyond the indexed ones, checked against the listing with PropertyFilter",
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['area_key', 'property_type_key', 'listing_type_key']),
+            models.Index(fields=['user', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.user_id})"
+
+    def save(self, *args, **kwargs):
+        from .saved_searches import INDEX_FIELDS, apply_index
+        apply_index(self)
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | set(INDEX_FIELDS)
+        super().save(*args, **kwargs)
+
+
+class SavedSearchMatch(models.Model):
+    """
+    A listing that matched a saved search, waiting for the next alert
+    digest (notified_at unset) or already sent in one.
+    """
+    REASONS = (
+        ('new_listing', 'New listing'),
+        ('price_drop', 'Price drop'),
+    )
+
+    search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name='matches')
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='saved_search_matches')
+    reason = models.CharField(max_length=20, choices=REASONS)
+    price = models.DecimalField(max_digits=12, decimal_places=2, help_text="Listing price when matched")
+    created_at = models.DateTimeField(auto_now_add=True)
+    notified_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            # One pending alert per search and listing; later changes wait for the next digest
+            models.UniqueConstraint(
+                fields=['search', 'property'], condition=models.Q(notified_at__isnull=True),
+                name='unique_pending_saved_search_match',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['notified_at', 'created_at']),
+        ]
 
     def __str__(self):
-        return f"{self.user.get_full_name()} - {self.property.title}"
\ No newline at end of file
+        return f"{self.property_id} for search {self.search_id} ({self.reason})"
@@ -0,0 +1,259 @@
+"""
+Saved searches and the listing alert matcher
+
+A SavedSearch stores PropertyFilter query parameters. Matching runs the
+other way round from search, as a percolator does: each listing that is
+published or drops its price (properties.signals, bulk import) looks up
+the searches it satisfies.
+
+- apply_index() derives the search's index keys from its params on save:
+  area, property type, listing type (0 / '' for any) and the price band
+  [price_min, price_max].
+- match_listings() fetches the candidate searches of a batch of listings
+  in one query on the (area, type, listing type) index, each key either
+  the listing's or any, then checks the price band in Python. Only
+  searches with other params (needs_check) are verified against the
+  listings with PropertyFilter, one query per such search.
+- queue_saved_search_matching() hands match_listings() to the batch
+  queue once the saving transaction commits, so listing saves never
+  wait on (or fail with) the matcher.
+- Matches wait as SavedSearchMatch rows; send_saved_search_digests()
+  turns each user's pending matches into one digest notification.
+
+The user's UserPreferences gate the alerts: property_alerts for new
+listings, price_drop_alerts for price drops.
+"""
+import functools
+import logging
+from itertools import groupby
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django_filters.filters import RangeFilter
+
+from notifications.models import Notification
+
+from .filters import PropertyFilter
+from .models import Property, PropertyStatus, SavedSearch, SavedSearchMatch
+
+logger = logging.getLogger(__name__)
+
+NEW_LISTING = 'new_listing'
+PRICE_DROP = 'price_drop'
+PREFERENCE_FIELDS = {
+    NEW_LISTING: 'property_alerts',
+    PRICE_DROP: 'price_drop_alerts',
+}
+
+INDEX_FIELDS = ['area_key', 'property_type_key', 'listing_type_key', 'price_min', 'price_max', 'needs_check']
+LOWER_PRICE_FILTERS = ('price_min', 'price__gte')
+UPPER_PRICE_FILTERS = ('price_max', 'price__lte')
+INDEXED_FILTERS = {'area_id', 'property_type', 'listing_type', 'price', 'price_range'} | set(
+    LOWER_PRICE_FILTERS + UPPER_PRICE_FILTERS
+)
+
+
+def filter_param_names():
+    """Query parameter names PropertyFilter reads."""
+    names = set()
+    for name, filter_ in PropertyFilter.base_filters.items():
+        if isinstance(filter_, RangeFilter):
+            names.update({f'{name}_min', f'{name}_max'})
+        else:
+            names.add(name)
+    return names
+
+
+def clean_params(params):
+    """(params without blanks, errors) of a PropertyFilter parameter dict."""
+    known = filter_param_names()
+    unknown = sorted(set(params) - known)
+    if unknown:
+        return None, {name: ['Unknown search parameter.'] for name in unknown}
+    cleaned = {name: str(value).strip() for name, value in params.items() if str(value).strip()}
+    filterset = PropertyFilter(cleaned, queryset=Property.objects.none())
+    if not filterset.is_valid():
+        return None, filterset.errors
+    # NumberFilter takes any number; the index key (apply_index) is an area id
+    area = filterset.form.cleaned_data.get('area_id')
+    if area is not None and (area <= 0 or area != int(area)):
+        return None, {'area_id': ['Enter a positive whole number.']}
+    return cleaned, None
+
+
+def _active_filters(params):
+    filterset = PropertyFilter(params, queryset=Property.objects.none())
+    if not filterset.is_valid():
+        return {}
+    return {name: value for name, value in filterset.form.cleaned_data.items() if value not in (None, '', [])}
+
+
+def apply_index(search):
+    """Set the index fields of `search` from its params."""
+    active = _active_filters(search.params)
+    lower = [active[name] for name in LOWER_PRICE_FILTERS if name in active]
+    upper = [active[name] for name in UPPER_PRICE_FILTERS if name in active]
+    if 'price' in active:
+        lower.append(active['price'])
+        upper.append(active['price'])
+    price_range = active.get('price_range')
+    if price_range is not None:
+        if price_range.start is not None:
+            lower.append(price_range.start)
+        if price_range.stop is not None:
+            upper.append(price_range.stop)
+
+    area = active.get('area_id')
+    property_type = active.get('property_type')
+    search.area_key = int(area) if area is not None else 0
+    search.property_type_key = property_type.pk if property_type is not None else 0
+    search.listing_type_key = active.get('listing_type', '')
+    search.price_min = max(lower) if lower else None
+    search.price_max = min(upper) if upper else None
+    search.needs_check = bool(set(active) - INDEXED_FILTERS)
+
+
+def _key_matches(search, listing):
+    return (
+        search.area_key in (0, listing['area_id'])
+        and search.property_type_key in (0, listing['property_type_id'])
+        and search.listing_type_key in ('', listing['listing_type'])
+        and (search.price_min is None or search.price_min <= listing['price'])
+        and (search.price_max is None or listing['price'] <= search.price_max)
+        and search.user_id != listing['agent__user_id']
+    )
+
+
+def match_listings(property_ids, reason):
+    """Record the saved searches matched by these listings; returns the number of matches."""
+    listings = list(
+        Property.objects.filter(pk__in=property_ids, is_active=True).exclude(status__name='draft').values(
+            'pk', 'area_id', 'property_type_id', 'listing_type', 'price', 'agent__user_id',
+        )
+    )
+    if not listings:
+        return 0
+
+    candidates = SavedSearch.objects.filter(
+        alerts_enabled=True,
+        area_key__in={0} | {listing['area_id'] for listing in listings},
+        property_type_key__in={0} | {listing['property_type_id'] for listing in listings},
+        listing_type_key__in={''} | {listing['listing_type'] for listing in listings},
+    ).exclude(**{f'user__preferences__{PREFERENCE_FIELDS[reason]}': False}).only(
+        'pk', 'user', 'params', *INDEX_FIELDS,
+    )
+
+    pairs = []
+    for search in candidates:
+        matched = [listing for listing in listings if _key_matches(search, listing)]
+        if matched and search.needs_check:
+            verified = set(
+                PropertyFilter(search.params, queryset=Property.objects.filter(pk__in=[row['pk'] for row in matched]))
+                .qs.values_list('pk', flat=True)
+            )
+            matched = [listing for listing in matched if listing['pk'] in verified]
+        pairs.extend((search, listing) for listing in matched)
+
+    SavedSearchMatch.objects.bulk_create(
+        [
+            SavedSearchMatch(search=search, property_id=listing['pk'], reason=reason, price=listing['price'])
+            for search, listing in pairs
+        ],
+        batch_size=500,
+        ignore_conflicts=True,  # Already pending for the next digest
+    )
+    return len(pairs)
+
+
+def _dispatch_matching(property_ids, reason):
+    if not getattr(settings, 'SAVED_SEARCH_AUTO_DISPATCH', False):
+        try:
+            match_listings(property_ids, reason)
+        except Exception:
+            logger.exception('Saved search matching failed for listings %s', property_ids)
+        return
+
+    from .tasks import match_saved_search_listings
+
+    try:
+        match_saved_search_listings.delay(property_ids, reason)
+    except Exception:
+        logger.exception('Could not queue saved search matching for listings %s', property_ids)
+
+
+def queue_saved_search_matching(property_ids, reason):
+    """Match the listings on the batch queue once the saving transaction commits."""
+    property_ids = list(property_ids)
+    if property_ids:
+        transaction.on_commit(functools.partial(_dispatch_matching, property_ids, reason))
+
+
+def _digest_line(match):
+    listing = match.property
+    change = 'price drop' if match.reason == PRICE_DROP else 'new'
+    return f"- {listing.title} ({change}, {match.price:,.0f} {listing.currency}) for \"{match.search.name}\""
+
+
+def send_saved_search_digests(now=None):
+    """One notification per user with pending matches; returns the number of digests."""
+    now = now or timezone.now()
+    max_listings = getattr(settings, 'SAVED_SEARCH_DIGEST_MAX_LISTINGS', 10)
+    user_ids = list(
+        SavedSearchMatch.objects.filter(notified_at__isnull=True)
+        .values_list('search__user_id', flat=True).distinct().order_by()
+    )
+
+    sent = 0
+    for offset in range(0, len(user_ids), 500):
+        chunk = user_ids[offset:offset + 500]
+        with transaction.atomic():
+            matches = list(
+                SavedSearchMatch.objects.select_for_update(of=('self',)).filter(
+                    notified_at__isnull=True, search__user_id__in=chunk,
+                ).select_related('search', 'property').order_by('search__user_id', 'created_at')
+            )
+            notifications = []
+            for user_id, user_matches in groupby(matches, key=lambda match: match.search.user_id):
+                # Listings unpublished since they matched are dropped; a listing is listed once
+                seen, lines, extra = set(), [], []
+                for match in user_matches:
+                    listing = match.property
+                    if listing.pk in seen or not listing.is_active:
+                        continue
+                    seen.add(listing.pk)
+                    extra.append({'search': match.search_id, 'property': listing.pk, 'slug': listing.slug,
+                                  'reason': match.reason})
+                    lines.append(_digest_line(match))
+                if not lines:
+                    continue
+                more = len(lines) - max_listings
+                message = '\n'.join(lines[:max_listings] + ([f'... and {more} more'] if more > 0 else []))
+                notifications.append(Notification(
+                    recipient_id=user_id, notification_type='email', status='pending', scheduled_at=now,
+                    subject=f'{len(lines)} listing{"s" if len(lines) != 1 else ""} match your saved searches',
+                    message=message, extra_data={'saved_search_matches': extra},
+                ))
+            Notification.objects.bulk_create(notifications)
+            SavedSearchMatch.objects.filter(pk__in=[match.pk for match in matches]).update(notified_at=now)
+        sent += len(notifications)
+    if sent:
+        logger.info('Sent %d saved search digests', sent)
+    return sent
+
+
+def alert_reason(listing, created, previous):
+    """NEW_LISTING, PRICE_DROP or None for a saved listing; previous is its (price, is_active, status_id) as loaded."""
+    if not listing.is_active:
+        return None
+    previous_price, was_active, previous_status_id = previous
+    if created or was_active is False:
+        return NEW_LISTING
+    if (
+        previous_status_id is not None and listing.status_id != previous_status_id
+        and PropertyStatus.objects.filter(pk=previous_status_id, name='draft').exists()
+    ):
+        return NEW_LISTING  # Published from a draft
+    if previous_price is not None and listing.price is not None and listing.price < previous_price:
+        return PRICE_DROP
+    return None
@@ -46,6 +46,12 @@ def _load_property(property_id):
     return Property.objects.select_related(*SEARCH_SELECT_RELATED).prefetch_related(*SEARCH_PREFETCH_RELATED).get(pk=property_id)
 
 
+def _load_properties(property_ids):
+    return Property.objects.filter(pk__in=property_ids).select_related(
+        *SEARCH_SELECT_RELATED
+    ).prefetch_related(*SEARCH_PREFETCH_RELATED)
+
+
 def _dispatch_event(event_id):
     if not getattr(settings, 'PROPERTY_SEARCH_AUTO_DISPATCH', False):
         return
@@ -92,6 +98,44 @@ def queue_property_upsert(property_id, property_slug, reason='property_updated')
     transaction.on_commit(_enqueue)
 
 
+def queue_bulk_property_upsert(property_ids, reason='property_imported'):
+    """
+    One coalesced upsert for many properties (bulk import).
+
+    Documents are built from a single query, events are written with one
+    bulk_create and handed to a single batch task.
+    """
+    property_ids = list(property_ids)
+    if not property_ids:
+        return
+
+    def _enqueue():
+        properties = _load_properties(property_ids)
+        PropertySearchSync.objects.filter(
+            property_id__in=property_ids,
+            action=PropertySearchSync.Action.UPSERT,
+            status=PropertySearchSync.Status.PENDING,
+        ).delete()
+
+        events = PropertySearchSync.objects.bulk_create([
+            PropertySearchSync(
+                property=property_obj,
+                property_slug=property_obj.slug,
+                action=PropertySearchSync.Action.UPSERT,
+                reason=reason,
+                payload=build_property_search_document(property_obj),
+            )
+            for property_obj in properties
+        ])
+
+        if getattr(settings, 'PROPERTY_SEARCH_AUTO_DISPATCH', False):
+            from .tasks import sync_property_search_events
+
+            sync_property_search_events.delay([event.id for event in events])
+
+    transaction.on_commit(_enqueue)
+
+
 def queue_property_delete(property_id, property_slug, reason='property_deleted'):
     def _enqueue():
         PropertySearchSync.objects.filter(
@@ -1,5 +1,10 @@
+from django.conf import settings
+from django.db.models import Manager, prefetch_related_objects
 from rest_framework import serializers
-from .models import PropertyType, PropertyStatus, Property, PropertyFeature, PropertyViewing
+from .models import (
+    PropertyType, PropertyStatus, Property, PropertyFeature, PropertyViewing, PropertyFavorite, SavedSearch,
+)
+from credits.models import PropertyView as CreditPropertyView
 from locations.serializers import AreaSerializer
 from agents.serializers import AgentProfileSerializer
 from media.models import PropertyImage
@@ -30,38 +35,134 @@ class PropertyImageSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = PropertyImage
-        fields = ['id', 'image', 'image_url', 'thumbnail_url', 'image_type', 'title', 'is_primary', 'order', 'created_at']
-        read_only_fields = ['id', 'created_at']
+        fields = [
+            'id', 'image', 'image_url', 'thumbnail_url', 'blurhash', 'image_type',
+            'title', 'is_primary', 'order', 'created_at'
+        ]
+        read_only_fields = ['id', 'blurhash', 'created_at']
+
+    def _absolute(self, url):
+        # ImageKit URLs are absolute
+        if url and url.startswith('http'):
+            return url
+
+        # For local paths, make absolute
+        if url:
+            request = self.context.get('request')
+            if request:
+                return request.build_absolute_uri(url)
+        return url
 
     def get_image_url(self, obj):
         """Get full-size image URL"""
         if obj.image:
-            url = obj.image.url
+            return self._absolute(obj.image.url)
+        return None
+
+    def get_thumbnail_url(self, obj):
+        """Card-sized WebP variant, or the original until variants are generated"""
+        if obj.image:
+            return self._absolute(obj.variant_url(settings.PROPERTY_IMAGE_THUMBNAIL_WIDTH))
+        return None
 
-            # ImageKit URLs are absolute
-            if url and url.startswith('http'):
-                return url
 
-            # For local paths, make absolute
-            if url and not url.startswith('http'):
-                request = self.context.get('request')
-                if request:
-                    return request.build_absolute_uri(url)
+# Everything PropertyListSerializer reads, loaded with the page in two queries
+LISTING_SELECT_RELATED = ('property_type', 'status', 'area__city__region__country')
+LISTING_PREFETCH_RELATED = ('images',)
 
-        return None
 
-    def get_thumbnail_url(self, obj):
-        """Get thumbnail URL - for now same as image_url, can add image processing later"""
-        return self.get_image_url(obj)
+def listing_queryset(queryset):
+    return queryset.select_related(*LISTING_SELECT_RELATED).prefetch_related(*LISTING_PREFETCH_RELATED)
+
+
+def prefetch_listing_images(properties):
+    """For listings already materialised as a list (e.g. filtered in Python)."""
+    prefetch_related_objects(properties, *LISTING_PREFETCH_RELATED)
+    return properties
+
+
+class SharedNestedField(serializers.Field):
+    """
+    Nested read-only serializer whose output is computed once per related
+    object per response: a page of listings in the same area serializes the
+    area, city, region and country once instead of once per row.
+    """
+
+    def __init__(self, serializer_class, **kwargs):
+        kwargs['read_only'] = True
+        self.serializer_class = serializer_class
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        shared = self.root.__dict__.setdefault('_shared_representations', {})
+        key = (self.serializer_class, value.pk)
+        if key not in shared:
+            shared[key] = self.serializer_class(value, context=self.context).data
+        return shared[key]
+
+
+class ListingViewerState:
+    """
+    Which listings the request user has favorited and unlocked (paid credits
+    to view, see credits.services), loaded for many listings at once: one
+    query each per batch, nothing for anonymous requests.
+    """
+
+    def __init__(self, request):
+        user = getattr(request, 'user', None)
+        self.user = user if user is not None and user.is_authenticated else None
+        self.loaded = set()
+        self.favorited = set()
+        self.unlocked = set()
+
+    def load(self, property_ids):
+        missing = set(property_ids) - self.loaded
+        if self.user is None or not missing:
+            return
+        self.loaded |= missing
+        self.favorited.update(PropertyFavorite.objects.filter(
+            user=self.user, property_id__in=missing,
+        ).values_list('property_id', flat=True))
+        self.unlocked.update(CreditPropertyView.objects.filter(
+            user=self.user, property_id__in=missing,
+        ).values_list('property_id', flat=True))
+
+    def is_favorited(self, property_id):
+        self.load([property_id])
+        return property_id in self.favorited
+
+    def is_unlocked(self, property_id):
+        self.load([property_id])
+        return property_id in self.unlocked
+
+
+class PropertyListListSerializer(serializers.ListSerializer):
+    """Loads the viewer state of the whole page before serializing its rows"""
+
+    def to_representation(self, data):
+        listings = list(data.all() if isinstance(data, Manager) else data)
+        self.child.viewer_state.load(listing.pk for listing in listings)
+        return super().to_representation(listings)
 
 
 class PropertyListSerializer(serializers.ModelSerializer):
-    """Lightweight serializer for property listings"""
-    property_type = PropertyTypeSerializer(read_only=True)
-    status = PropertyStatusSerializer(read_only=True)
-    area = AreaSerializer(read_only=True)
-    images = PropertyImageSerializer(many=True, read_only=True)
+    """
+    Lightweight serializer for property listings
+
+    Expects listing_queryset() (or prefetch_listing_images() for lists);
+    anything else costs queries per row. is_favorited and is_unlocked are
+    for the request user (false without a request), loaded for the page
+    at once when serializing many.
+    """
+    property_type = SharedNestedField(PropertyTypeSerializer)
+    status = SharedNestedField(PropertyStatusSerializer)
+    area = SharedNestedField(AreaSerializer)
+    # Listings only ship the primary image; the gallery comes with the detail view
+    images = serializers.SerializerMethodField()
     primary_image = serializers.SerializerMethodField()
+    primary_image_blurhash = serializers.SerializerMethodField()
+    is_favorited = serializers.SerializerMethodField()
+    is_unlocked = serializers.SerializerMethodField()
 
     class Meta:
         model = Property
@@ -69,30 +170,56 @@ class PropertyListSerializer(serializers.ModelSerializer):
             'id', 'title', 'property_type', 'status', 'listing_type',
             'price', 'currency', 'area', 'no_of_bedrooms', 'no_of_bathrooms',
             'created_at', 'slug', 'featured', 'images', 'primary_image',
-            'is_active', 'views_count'
+            'primary_image_blurhash', 'is_active', 'views_count',
+            'is_favorited', 'is_unlocked'
         ]
+        list_serializer_class = PropertyListListSerializer
+
+    @property
+    def viewer_state(self):
+        # Shared by every row of a response, as SharedNestedField output is
+        shared = self.root.__dict__
+        if '_listing_viewer_state' not in shared:
+            shared['_listing_viewer_state'] = ListingViewerState(self.context.get('request'))
+        return shared['_listing_viewer_state']
+
+    @property
+    def _image_serializer(self):
+        # One instance for every row; building DRF serializers is not free
+        if not hasattr(self, '_shared_image_serializer'):
+            self._shared_image_serializer = PropertyImageSerializer(context=self.context)
+        return self._shared_image_serializer
+
+    def _primary_image(self, obj):
+        if not hasattr(obj, '_listing_primary_image'):
+            # Picked from prefetched images, so no extra query per listing
+            images = list(obj.images.all())
+            primary = next((image for image in images if image.is_primary), None)
+            # Fallback to first image if no primary
+            obj._listing_primary_image = primary or (images[0] if images else None)
+        return obj._listing_primary_image
 
-    def get_primary_image(self, obj):
-        primary_image = obj.images.filter(is_primary=True).first()
+    def get_images(self, obj):
+        primary_image = self._primary_image(obj)
         if not primary_image:
-            # Fallback to first image if no primary
-            primary_image = obj.images.first()
+            return []
+        return [self._image_serializer.to_representation(primary_image)]
 
+    def get_primary_image(self, obj):
+        primary_image = self._primary_image(obj)
         if primary_image and primary_image.image:
-            url = primary_image.image.url
+            return self._image_serializer.get_thumbnail_url(primary_image)
+        return None
 
-            # AWS S3 URLs are already absolute
-            if url and url.startswith('http'):
-                return url
+    def get_primary_image_blurhash(self, obj):
+        primary_image = self._primary_image(obj)
+        return primary_image.blurhash if primary_image else ''
 
-            # For local paths, make absolute
-            if url and not url.startswith('http'):
-                request = self.context.get('request')
-                if request:
-                    return request.build_absolute_uri(url)
+    def get_is_favorited(self, obj):
+        return self.viewer_state.is_favorited(obj.pk)
 
-            return url
-        return None
+    def get_is_unlocked(self, obj):
+        return self.viewer_state.is_unlocked(obj.pk)
 
 
 class PropertyDetailSerializer(serializers.ModelSerializer):
@@ -135,23 +262,54 @@ class PropertyCreateSerializer(serializers.ModelSerializer):
         # Agent is already set by the view's perform_create method
         property_instance = super().create(validated_data)
 
-        # Create PropertyImage instances for each uploaded image
+        request = self.context.get('request')
+        uploaded_by = request.user if request else None
+
+        # Create PropertyImage instances for each uploaded image. With ImageKit
+        # storage each save only spools the file; the pushes run in parallel.
         for idx, image in enumerate(images_data):
             PropertyImage.objects.create(
                 property=property_instance,
                 image=image,
                 order=idx,
                 is_primary=(idx == 0),  # First image is primary
-                uploaded_by=self.context.get('request').user if self.context.get('request') else None
+                uploaded_by=uploaded_by
             )
 
         return property_instance
 
 
+class PropertyViewingListSerializer(serializers.ListSerializer):
+    """Loads the viewer state of the page's listings before serializing its viewings"""
+
+    def to_representation(self, data):
+        viewings = list(data.all() if isinstance(data, Manager) else data)
+        self.child.fields['property_listing'].viewer_state.load(viewing.property_listing_id for viewing in viewings)
+        return super().to_representation(viewings)
+
+
 class PropertyViewingSerializer(serializers.ModelSerializer):
     property_listing = PropertyListSerializer(read_only=True)
     viewer = serializers.StringRelatedField(read_only=True)
 
     class Meta:
         model = PropertyViewing
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+        list_serializer_class = PropertyViewingListSerializer
+
+
+class SavedSearchSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SavedSearch
+        fields = ['id', 'name', 'params', 'alerts_enabled', 'created_at', 'updated_at']
+        read_only_fields = ['created_at', 'updated_at']
+
+    def validate_params(self, value):
+        from .saved_searches import clean_params
+
+        if not isinstance(value, dict):
+            raise serializers.ValidationError('Expected an object of search parameters.')
+        params, errors = clean_params(value)
+        if errors:
+            raise serializers.ValidationError(errors)
+        return params
@@ -1,13 +1,22 @@
 from django.conf import settings
 from django.db import transaction
-from django.db.models.signals import post_delete, post_save
+from django.db.models.signals import post_delete, post_init, post_save
 from django.dispatch import receiver
 
-from .models import Property
+from locations.models import Area, City, Country, Region
+from utils.response_cache import watch_models
+
+from .category_models import Category, PropertyState, PropertyTag
+from .facets import invalidate_property_facets
+from .models import Property, PropertyStatus, PropertyType
+from .saved_searches import alert_reason, queue_saved_search_matching
 from .search_index import queue_property_delete, queue_property_upsert
+from .typeahead import bump_typeahead_version
 
 IGNORED_UPDATE_FIELDS = {'views_count', 'updated_at'}
 
+watch_models(PropertyType, PropertyStatus, Category, PropertyTag, PropertyState)
+
 
 def queue_property_sitemap_refresh():
     if not getattr(settings, 'PROPERTY_SITEMAP_AUTO_DISPATCH', False):
@@ -34,6 +43,24 @@ def queue_property_for_search_sync(sender, instance, created, update_fields=None
         reason='property_created' if created else 'property_updated',
     )
     queue_property_sitemap_refresh()
+    invalidate_property_facets()
+    transaction.on_commit(bump_typeahead_version)
+
+
+@receiver(post_init, sender=Property)
+def remember_alert_state(sender, instance, **kwargs):
+    # Read from __dict__ so deferred fields are not loaded
+    instance._alert_state = (
+        instance.__dict__.get('price'), instance.__dict__.get('is_active'), instance.__dict__.get('status_id'),
+    )
+
+
+@receiver(post_save, sender=Property)
+def queue_saved_search_alerts(sender, instance, created, **kwargs):
+    reason = alert_reason(instance, created, getattr(instance, '_alert_state', (None, None, None)))
+    instance._alert_state = (instance.price, instance.is_active, instance.status_id)
+    if reason:
+        queue_saved_search_matching([instance.pk], reason)
 
 
 @receiver(post_delete, sender=Property)
@@ -43,4 +70,18 @@ def queue_property_for_search_removal(sender, instance, **kwargs):
         property_slug=instance.slug,
         reason='property_deleted',
     )
-    queue_property_sitemap_refresh()
\ No newline at end of file
+    queue_property_sitemap_refresh()
+    invalidate_property_facets()
+    transaction.on_commit(bump_typeahead_version)
+
+
+@receiver(post_save, sender=Country)
+@receiver(post_save, sender=Region)
+@receiver(post_save, sender=City)
+@receiver(post_save, sender=Area)
+@receiver(post_delete, sender=Country)
+@receiver(post_delete, sender=Region)
+@receiver(post_delete, sender=City)
+@receiver(post_delete, sender=Area)
+def invalidate_location_typeahead(sender, **kwargs):
+    transaction.on_commit(bump_typeahead_version)
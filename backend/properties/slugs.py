@@ -0,0 +1,86 @@
+"""
+Property slug allocation
+
+Slugs are "<title>-<area>" with the lowest free "-N" suffix. Existing
+slugs for every requested base are read with one prefix query, so a batch
+of listings costs one lookup however popular the title is. Two concurrent
+creates can still pick the same suffix; save_with_allocated_slug retries
+on the unique constraint instead of checking first.
+"""
+import re
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+from .models import Property
+
+SLUG_MAX_LENGTH = Property._meta.get_field('slug').max_length
+# Room for a "-NNNNNN" suffix
+BASE_SLUG_MAX_LENGTH = SLUG_MAX_LENGTH - 10
+SLUG_RACE_RETRIES = 3
+
+
+def base_slug_for(title, area_name=None):
+    base = slugify(f"{title}-{area_name or 'unknown'}")[:BASE_SLUG_MAX_LENGTH].strip('-')
+    return base or 'property'
+
+
+def _taken_suffixes(bases):
+    """{base: set of used suffixes}, 0 meaning the bare base, from one query."""
+    query = Q()
+    for base in bases:
+        query |= Q(slug__startswith=base)
+
+    patterns = {base: re.compile(rf'^{re.escape(base)}(?:-(\d+))?$') for base in bases}
+    taken = {base: set() for base in bases}
+    for slug in Property.objects.filter(query).order_by().values_list('slug', flat=True).iterator():
+        for base, pattern in patterns.items():
+            match = pattern.match(slug)
+            if match:
+                taken[base].add(int(match.group(1) or 0))
+    return taken
+
+
+def allocate_slugs(bases):
+    """
+    Unique slugs for a list of base slugs, in order.
+
+    Repeated bases within the batch get consecutive free suffixes.
+    """
+    if not bases:
+        return []
+
+    taken = _taken_suffixes(set(bases))
+    slugs = []
+    for base in bases:
+        used = taken[base]
+        suffix = 0
+        while suffix in used:
+            suffix += 1
+        used.add(suffix)
+        slugs.append(base if suffix == 0 else f'{base}-{suffix}')
+    return slugs
+
+
+def allocate_slug(title, area_name=None):
+    return allocate_slugs([base_slug_for(title, area_name)])[0]
+
+
+def save_with_allocated_slug(instance, save):
+    """
+    Allocate instance.slug and run save(), re-allocating when a concurrent
+    insert took the same slug between the lookup and the INSERT.
+    """
+    area_name = instance.area.name if instance.area_id else None
+    for attempt in range(1, SLUG_RACE_RETRIES + 1):
+        instance.slug = allocate_slug(instance.title, area_name)
+        try:
+            with transaction.atomic():
+                save()
+            return
+        except IntegrityError:
+            lost_race = Property.objects.filter(slug=instance.slug).exists()
+            if attempt == SLUG_RACE_RETRIES or not lost_race:
+                instance.slug = ''
+                raise
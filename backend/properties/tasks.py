@@ -16,6 +16,24 @@ def sync_property_search_event(self, event_id):
     if event.status == PropertySearchSync.Status.COMPLETED:
         return {'status': 'already_completed', 'event_id': event_id}
 
+    run_search_sync_event(event)
+    return {'status': 'completed', 'event_id': event_id}
+
+
+@shared_task(ignore_result=True)
+def sync_property_search_events(event_ids):
+    """Process a coalesced batch of sync events (bulk import); failures are retried one by one."""
+    events = PropertySearchSync.objects.filter(pk__in=event_ids).exclude(
+        status=PropertySearchSync.Status.COMPLETED
+    )
+    for event in events:
+        try:
+            run_search_sync_event(event)
+        except Exception:
+            sync_property_search_event.delay(event.pk)
+
+
+def run_search_sync_event(event):
     event.status = PropertySearchSync.Status.PROCESSING
     event.last_error = ''
     event.save(update_fields=['status', 'last_error', 'updated_at'])
@@ -34,10 +52,35 @@ def sync_property_search_event(self, event_id):
     event.processed_at = timezone.now()
     event.save(update_fields=['status', 'processed_at', 'updated_at'])
 
-    return {'status': 'completed', 'event_id': event_id}
-
 
 @shared_task
 def refresh_property_sitemap_entries_cache():
+    # Listing saves dispatch this right after their commit, so it reads the primary
     payload = refresh_property_sitemap_entries_snapshot()
-    return {'status': 'completed', 'count': len(payload)}
\ No newline at end of file
+    return {'status': 'completed', 'count': len(payload)}
+
+
+@shared_task(ignore_result=True)
+def send_saved_search_digests():
+    """Batch pending saved search matches into one notification per user."""
+    from .saved_searches import send_saved_search_digests as send_digests
+
+    send_digests()
+
+
+@shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=True, retry_jitter=True, retry_kwargs={'max_retries': 3},
+             ignore_result=True)
+def match_saved_search_listings(self, property_ids, reason):
+    """Record the saved searches matched by listings just published or reduced in price."""
+    from .saved_searches import match_listings
+
+    # Matches already recorded are skipped, so a retry is safe
+    match_listings(property_ids, reason)
+
+
+@shared_task(ignore_result=True)
+def rebuild_typeahead_entries():
+    """Rebuild the shared typeahead documents after location or listing changes."""
+    from .typeahead import rebuild_typeahead_entries as rebuild_entries
+
+    rebuild_entries()
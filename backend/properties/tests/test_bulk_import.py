@@ -0,0 +1,140 @@
+import io
+import json
+from datetime import date
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from agents.models import AgentProfile
+from locations.models import Area, City, Country, Region
+from properties import bulk_import
+from properties.bulk_import import PropertyImporter, iter_rows
+from properties.models import Property, PropertyFeature, PropertySearchSync, PropertyStatus, PropertyType
+
+User = get_user_model()
+
+CSV_HEADER = 'title,description,property_type,status,listing_type,area,city,price,no_of_bedrooms,has_parking,features\n'
+
+
+class PropertyBulkImportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='importer',
+            email='importer@example.com',
+            password='testpass123',
+            user_type='agent',
+            phone_number='+237600000331',
+        )
+        self.agent_profile = AgentProfile.objects.create(
+            user=self.user,
+            license_number='IMP123',
+            license_expiry=date(2030, 12, 31),
+            years_experience='1-3',
+            specialization='residential',
+            agency_name='Import Realty',
+        )
+        country = Country.objects.create(name='Cameroon', code='CM')
+        region = Region.objects.create(name='Littoral', code='littoral', country=country)
+        self.city = City.objects.create(name='Douala', region=region)
+        self.area = Area.objects.create(name='Bonamoussadi', city=self.city)
+        PropertyType.objects.create(name='Apartment', category='residential')
+        PropertyStatus.objects.create(name='available')
+
+    def import_csv(self, body, **kwargs):
+        rows = iter_rows(io.StringIO(CSV_HEADER + body), 'csv')
+        with self.captureOnCommitCallbacks(execute=True):
+            return PropertyImporter(self.agent_profile, **kwargs).run(rows)
+
+    def test_valid_rows_are_created_and_invalid_rows_reported(self):
+        result = self.import_csv(
+            '2 Bedroom Apartment,Nice,Apartment,available,rent,Bonamoussadi,Douala,150000,2,yes,Balcony=1;Fence\n'
+            'Broken,Nice,Castle,available,rent,Bonamoussadi,Douala,150000,2,no,\n'
+            'Studio,Nice,Apartment,available,lease,Nowhere,,-5,2,no,\n'
+        )
+
+        self.assertEqual(result['created'], 1)
+        self.assertEqual([error['line'] for error in result['errors']], [3, 4])
+        self.assertIn('property_type', result['errors'][0]['errors'])
+        self.assertEqual(
+            set(result['errors'][1]['errors']),
+            {'area', 'listing_type', 'price'},
+        )
+
+        prop = Property.objects.get()
+        self.assertTrue(prop.has_parking)
+        self.assertEqual(prop.area, self.area)
+        self.assertEqual(
+            sorted(PropertyFeature.objects.values_list('feature_name', flat=True)),
+            ['Balcony', 'Fence'],
+        )
+        self.assertTrue(PropertySearchSync.objects.filter(property=prop, reason='property_imported').exists())
+
+    def test_slugs_are_unique_within_and_across_imports(self):
+        row = '2 Bedroom Apartment,Nice,Apartment,available,rent,Bonamoussadi,Douala,150000,2,no,\n'
+        self.import_csv(row)
+        self.import_csv(row * 3)
+
+        self.assertEqual(
+            sorted(Property.objects.values_list('slug', flat=True)),
+            [
+                '2-bedroom-apartment-bonamoussadi',
+                '2-bedroom-apartment-bonamoussadi-1',
+                '2-bedroom-apartment-bonamoussadi-2',
+                '2-bedroom-apartment-bonamoussadi-3',
+            ],
+        )
+
+    def test_slug_taken_during_the_write_is_allocated_again(self):
+        row = '2 Bedroom Apartment,Nice,Apartment,available,rent,Bonamoussadi,Douala,150000,2,no,\n'
+        self.import_csv(row)
+        taken = Property.objects.get().slug
+
+        # The first allocation misses the listing a concurrent create just inserted
+        with patch('properties.bulk_import.allocate_slugs', side_effect=[[taken], [f'{taken}-1']]):
+            result = self.import_csv(row)
+        self.assertEqual((result['created'], result['errors']), (1, []))
+        self.assertEqual(Property.objects.count(), 2)
+
+        with patch('properties.bulk_import.allocate_slugs', return_value=[taken]):
+            result = self.import_csv(row)
+        self.assertEqual(result['created'], 0)
+        self.assertEqual(result['errors'], [{'line': 2, 'errors': {'slug': [bulk_import.SLUG_CONFLICT_ERROR]}}])
+        self.assertEqual(Property.objects.count(), 2)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        row = 'Apartment {n},Nice,Apartment,available,rent,Bonamoussadi,Douala,150000,2,no,Fence\n'
+        rows = iter_rows(io.StringIO(CSV_HEADER + ''.join(row.format(n=n) for n in range(10))), 'csv')
+        importer = PropertyImporter(self.agent_profile)
+
+        # Slug lookup, savepoint pair, two bulk inserts
+        with self.assertNumQueries(5):
+            importer.run(rows)
+
+        self.assertEqual(Property.objects.count(), 10)
+
+    def test_import_api_and_export_round_trip(self):
+        self.client.force_authenticate(self.user)
+        upload = SimpleUploadedFile(
+            'listings.jsonl',
+            json.dumps({
+                'title': 'Villa', 'description': 'Large', 'property_type': 'apartment',
+                'status': 'available', 'listing_type': 'rent', 'area': self.area.pk, 'price': 900000,
+                'features': [{'feature_name': 'Pool', 'is_highlighted': True}],
+            }).encode('utf-8') + b'\n',
+        )
+
+        response = self.client.post(reverse('properties:property-bulk-import'), {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 1)
+
+        response = self.client.get(reverse('properties:property-bulk-export'), {'file_format': 'jsonl'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        exported = json.loads(lines[0])
+        self.assertEqual(exported['slug'], 'villa-bonamoussadi')
+        self.assertEqual(exported['city'], 'Douala')
+        self.assertEqual(exported['features'][0]['feature_name'], 'Pool')
@@ -0,0 +1,116 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from agents.models import AgentProfile
+from locations.models import Area, City, Country, Region
+from properties.facets import price_bins
+from properties.models import Property, PropertyStatus, PropertyType
+
+User = get_user_model()
+
+
+class PropertyFacetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(
+            username='facet-agent', email='facets@example.com', password='testpass123', user_type='agent',
+        )
+        agent = AgentProfile.objects.create(
+            user=user, license_number='FACET1', license_expiry=date(2030, 12, 31),
+            years_experience='1-3', specialization='residential', agency_name='Facet Agency',
+        )
+        region = Region.objects.create(
+            name='Littoral', code='littoral', country=Country.objects.create(name='Cameroon', code='CM'),
+        )
+        douala = City.objects.create(name='Douala', region=region)
+        yaounde = City.objects.create(name='Yaounde', region=region)
+        akwa = Area.objects.create(name='Akwa', city=douala)
+        bonapriso = Area.objects.create(name='Bonapriso', city=douala)
+        bastos = Area.objects.create(name='Bastos', city=yaounde)
+        studio = PropertyType.objects.create(name='Studio', category='studio')
+        villa = PropertyType.objects.create(name='Villa', category='residential')
+        available = PropertyStatus.objects.create(name='available')
+        draft = PropertyStatus.objects.create(name='draft')
+
+        listings = [
+            (akwa, studio, 'rent', 0, 50000, True),
+            (akwa, studio, 'rent', 1, 80000, False),
+            (bonapriso, villa, 'rent', 3, 300000, True),
+            (bastos, villa, 'sale', 6, 950000, False),
+        ]
+        for index, (area, kind, listing_type, bedrooms, price, parking) in enumerate(listings):
+            Property.objects.create(
+                title=f'Listing {index}', property_type=kind, status=available, listing_type=listing_type,
+                price=price, currency='XAF', area=area, agent=agent, description='Facet test',
+                no_of_bedrooms=bedrooms, has_parking=parking,
+            )
+        Property.objects.create(
+            title='Draft', property_type=studio, status=draft, listing_type='rent', price=10,
+            currency='XAF', area=bastos, agent=agent, description='Facet test',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+
+    def _facets(self, query=''):
+        response = self.api.get(f'/api/properties/search/facets/{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_counts_every_facet_in_grouped_queries(self):
+        with self.assertNumQueries(4):  # summary, areas, property types, price bins
+            data = self._facets()
+        facets = data['facets']
+
+        self.assertEqual(data['count'], 4)
+        self.assertEqual([(city['name'], city['count']) for city in facets['city']], [('Douala', 3), ('Yaounde', 1)])
+        self.assertEqual([(area['name'], area['count']) for area in facets['area']],
+                         [('Akwa', 2), ('Bastos', 1), ('Bonapriso', 1)])
+        self.assertEqual([(kind['name'], kind['count']) for kind in facets['property_type']],
+                         [('Studio', 2), ('Villa', 2)])
+        listing_types = {row['value']: row['count'] for row in facets['listing_type']}
+        self.assertEqual((listing_types['rent'], listing_types['sale']), (3, 1))
+        self.assertEqual([row['count'] for row in facets['bedrooms']], [1, 1, 0, 1, 0, 1])
+        self.assertEqual({row['field']: row['count'] for row in facets['amenities']}['has_parking'], 2)
+        self.assertEqual(sum(row['count'] for row in facets['price']), 4)
+        self.assertEqual((facets['price'][0]['price_min'], facets['price'][-1]['count']), (50000, 1))
+
+    def test_counts_follow_the_search_filters(self):
+        data = self._facets('?city=douala&listing_type=rent')
+
+        self.assertEqual(data['count'], 3)
+        self.assertEqual([city['name'] for city in data['facets']['city']], ['Douala'])
+
+    def test_invalid_parameter_drops_only_its_own_filter(self):
+        data = self._facets('?city=douala&bedrooms_min=lots')
+        with self.assertNumQueries(0):
+            self._facets('?city=douala')
+        results = self.api.get('/api/properties/search/?city=douala&bedrooms_min=lots').data
+
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(results['count'], data['count'])
+
+    def test_cache_is_keyed_by_normalized_filters_and_dropped_on_listing_changes(self):
+        self._facets('?city=Douala&bedrooms_min=1')
+        with self.assertNumQueries(0):
+            self._facets('?page=2&bedrooms_min=1.0&city=douala%20&has_pool=')
+
+        # View counter updates keep the entry, listing edits drop it
+        listing = Property.objects.get(title='Listing 0')
+        listing.views_count += 1
+        listing.save(update_fields=['views_count'])
+        with self.assertNumQueries(0):
+            self._facets('?city=douala&bedrooms_min=1')
+        Property.objects.filter(title='Listing 1').get().save()
+        with self.assertNumQueries(4):
+            self._facets('?city=douala&bedrooms_min=1')
+
+    def test_price_bins_cover_the_range_in_whole_steps(self):
+        self.assertEqual(price_bins(0, 10, 5), [(0, 2), (2, 4), (4, 6), (6, 8), (8, 10)])
+        self.assertEqual(price_bins(50000.5, 50000.5, 10), [(50000, 50001)])
+        self.assertEqual(price_bins(0, 3, 10), [(0, 1), (1, 2), (2, 3)])
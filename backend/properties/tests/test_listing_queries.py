@@ -0,0 +1,136 @@
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.test import APIClient
+
+from agents.models import AgentProfile
+from credits.models import PropertyView
+from locations.models import Area, City, Country, Region
+from media.models import PropertyImage
+from properties.models import Property, PropertyFavorite, PropertyStatus, PropertyType, PropertyViewing
+from properties.serializers import (
+    LISTING_SELECT_RELATED, PropertyListSerializer, PropertyViewingSerializer, listing_queryset,
+    prefetch_listing_images,
+)
+
+User = get_user_model()
+
+
+class ListingQueryCountTests(TestCase):
+    """Listing pages cost the same number of queries whatever their size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(
+            username='agent', email='agent@example.com', password='testpass123', user_type='agent',
+        )
+        agent = AgentProfile.objects.create(
+            user=user, license_number='LIST1', license_expiry=date(2030, 12, 31),
+            years_experience='1-3', specialization='residential', agency_name='Listing Agency',
+        )
+        region = Region.objects.create(
+            name='Littoral', code='littoral', country=Country.objects.create(name='Cameroon', code='CM'),
+        )
+        city = City.objects.create(name='Douala', region=region)
+        areas = [Area.objects.create(name=name, city=city) for name in ('Akwa', 'Bonapriso', 'Bonanjo')]
+        types = [PropertyType.objects.create(name=name, category='residential') for name in ('Studio', 'Villa')]
+        available = PropertyStatus.objects.create(name='available')
+
+        properties = [
+            Property.objects.create(
+                title=f'Listing {index}', property_type=types[index % 2], status=available,
+                listing_type='rent', price=100000 + index, currency='XAF', area=areas[index % 3],
+                agent=agent, description='Listing query test',
+            )
+            for index in range(12)
+        ]
+        cls.seeker = User.objects.create_user(
+            username='seeker', email='seeker@example.com', password='testpass123', phone_number='+237600000040',
+        )
+        cls.properties = properties
+        PropertyImage.objects.bulk_create([
+            PropertyImage(property=prop, image=f'property_images/{prop.pk}-{order}.jpg',
+                          order=order, is_primary=order == 1)
+            for prop in properties for order in range(2)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def _page_queries(self, page_size, user=None):
+        api = APIClient()
+        if user:
+            api.force_authenticate(user)
+        with patch.object(PageNumberPagination, 'page_size', page_size):
+            # count, page, images; favorites and unlocked for a signed-in user
+            with self.assertNumQueries(5 if user else 3):
+                response = api.get('/api/properties/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_list_page_queries_do_not_depend_on_page_size(self):
+        self.assertEqual(len(self._page_queries(2)), 2)
+        self.assertEqual(len(self._page_queries(12)), 12)
+
+    def test_primary_image_and_shared_nested_output(self):
+        with self.assertNumQueries(2):
+            data = PropertyListSerializer(listing_queryset(Property.objects.order_by('pk')), many=True).data
+
+        self.assertEqual(len(data), 12)
+        for row in data:
+            self.assertTrue(row['primary_image'].endswith('-1.jpg'))
+            self.assertEqual(len(row['images']), 1)
+        self.assertEqual(data[0]['area']['city']['region']['country']['code'], 'CM')
+        self.assertEqual(data[0]['area'], data[3]['area'])
+        self.assertNotEqual(data[0]['area'], data[1]['area'])
+
+    def test_viewer_state_is_loaded_once_per_page(self):
+        PropertyFavorite.objects.create(user=self.seeker, property=self.properties[0])
+        PropertyView.objects.create(user=self.seeker, property=self.properties[1])
+
+        self._page_queries(2, self.seeker)
+        rows = {row['id']: row for row in self._page_queries(12, self.seeker)}
+        self.assertEqual([pk for pk, row in rows.items() if row['is_favorited']], [self.properties[0].id])
+        self.assertEqual([pk for pk, row in rows.items() if row['is_unlocked']], [self.properties[1].id])
+        self.assertFalse(any(row['is_favorited'] for row in self._page_queries(12)))
+
+    def test_nested_listings_load_the_viewer_state_once(self):
+        PropertyFavorite.objects.create(user=self.seeker, property=self.properties[2])
+        for index, prop in enumerate(self.properties):
+            PropertyViewing.objects.create(property_listing=prop, viewer=self.seeker,
+                                           scheduled_date=timezone.now() + timedelta(days=index))
+        viewings = list(PropertyViewing.objects.select_related(
+            'viewer', *(f'property_listing__{name}' for name in LISTING_SELECT_RELATED),
+        ))
+        prefetch_listing_images([viewing.property_listing for viewing in viewings])
+        request = RequestFactory().get('/')
+        request.user = self.seeker
+
+        with self.assertNumQueries(2):  # favorites, unlocked
+            data = PropertyViewingSerializer(viewings, many=True, context={'request': request}).data
+
+        self.assertEqual([row['property_listing']['id'] for row in data if row['property_listing']['is_favorited']],
+                         [self.properties[2].id])
+
+    def test_favorites_are_keyset_paginated(self):
+        for prop in self.properties[:5]:
+            PropertyFavorite.objects.create(user=self.seeker, property=prop)
+        api = APIClient()
+        api.force_authenticate(self.seeker)
+
+        titles, url = [], '/api/properties/favorites/'
+        with patch('properties.views.FavoritesCursorPagination.page_size', 2):
+            while url:
+                with self.assertNumQueries(4):  # page, images, favorites, unlocked
+                    response = api.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(all(row['is_favorited'] for row in response.data['results']))
+                titles += [row['title'] for row in response.data['results']]
+                url = response.data['next']
+
+        self.assertEqual(titles, [f'Listing {index}' for index in range(4, -1, -1)])
@@ -0,0 +1,160 @@
+from datetime import date
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from agents.models import AgentProfile
+from locations.models import Area, City, Country, Region
+from notifications.models import Notification
+from properties.models import Property, PropertyStatus, PropertyType, SavedSearch, SavedSearchMatch
+from properties.saved_searches import NEW_LISTING, match_listings, send_saved_search_digests
+from properties.tasks import match_saved_search_listings
+from users.models import UserPreferences
+
+User = get_user_model()
+
+
+class SavedSearchAlertTests(TestCase):
+    def setUp(self):
+        agent_user = User.objects.create_user(
+            username='alert-agent', email='alert-agent@example.com', password='testpass123', user_type='agent',
+            phone_number='+237600000030',
+        )
+        self.agent = AgentProfile.objects.create(
+            user=agent_user, license_number='ALERT1', license_expiry=date(2030, 12, 31),
+            years_experience='1-3', specialization='residential', agency_name='Alert Agency',
+        )
+        self.seeker = User.objects.create_user(
+            username='seeker', email='seeker@example.com', password='testpass123', phone_number='+237600000031',
+        )
+        region = Region.objects.create(
+            name='Littoral', code='littoral', country=Country.objects.create(name='Cameroon', code='CM'),
+        )
+        city = City.objects.create(name='Douala', region=region)
+        self.akwa = Area.objects.create(name='Akwa', city=city)
+        self.bonapriso = Area.objects.create(name='Bonapriso', city=city)
+        self.studio = PropertyType.objects.create(name='Studio', category='studio')
+        self.status = PropertyStatus.objects.create(name='available')
+
+    def _search(self, name='Akwa rentals', user=None, **params):
+        return SavedSearch.objects.create(user=user or self.seeker, name=name, params=params)
+
+    def _listing(self, area=None, price=80000, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Property.objects.create(
+                title=fields.pop('title', 'Studio in Akwa'), property_type=self.studio,
+                status=fields.pop('status', self.status),
+                listing_type=fields.pop('listing_type', 'rent'), price=price, currency='XAF',
+                area=area or self.akwa, agent=self.agent, description='Alert test', **fields,
+            )
+
+    def test_index_keys_are_derived_from_params(self):
+        search = self._search(area_id=str(self.akwa.id), listing_type='rent', price_max='100000', price__lte='90000',
+                              property_type=str(self.studio.id))
+        self.assertEqual((search.area_key, search.property_type_key, search.listing_type_key),
+                         (self.akwa.id, self.studio.id, 'rent'))
+        self.assertEqual((search.price_min, search.price_max, search.needs_check), (None, 90000, False))
+        self.assertTrue(self._search(city='douala').needs_check)
+
+    def test_new_listings_match_through_the_index(self):
+        matching = self._search(area_id=str(self.akwa.id), listing_type='rent', price_max='100000')
+        self._search(name='Bonapriso', area_id=str(self.bonapriso.id))
+        self._search(name='Cheap', price_max='50000')
+        self._search(name='Sales', listing_type='sale')
+        checked = self._search(name='Parking', has_parking='true')
+
+        listing = self._listing()
+
+        self.assertEqual(list(SavedSearchMatch.objects.values_list('search_id', 'property_id', 'reason')),
+                         [(matching.id, listing.id, NEW_LISTING)])
+        self.assertFalse(SavedSearchMatch.objects.filter(search=checked).exists())
+
+    def test_candidates_come_from_one_query(self):
+        for index in range(20):
+            self._search(name=f'Search {index}', area_id=str(self.bonapriso.id))
+        self._search(name='Mine', area_id=str(self.akwa.id))
+        self._search(name='Parking', has_parking='true')
+        listing = self._listing(has_parking=True)
+        SavedSearchMatch.objects.all().delete()
+
+        with self.assertNumQueries(4):  # listing, candidates, PropertyFilter check, insert
+            self.assertEqual(match_listings([listing.id], NEW_LISTING), 2)
+
+    @override_settings(SAVED_SEARCH_AUTO_DISPATCH=True)
+    def test_matching_runs_on_the_batch_queue_after_commit(self):
+        search = self._search(area_id=str(self.akwa.id))
+
+        with patch.object(match_saved_search_listings, 'delay') as delay, \
+                patch('properties.saved_searches.match_listings', side_effect=AssertionError('ran in the request')):
+            listing = self._listing()
+        delay.assert_called_once_with([listing.id], NEW_LISTING)
+        self.assertFalse(SavedSearchMatch.objects.exists())
+
+        match_saved_search_listings.apply(([listing.id], NEW_LISTING))
+        self.assertEqual(SavedSearchMatch.objects.get().search, search)
+
+    def test_publishing_a_draft_alerts_as_a_new_listing(self):
+        search = self._search(area_id=str(self.akwa.id))
+        listing = self._listing(status=PropertyStatus.objects.create(name='draft'))
+        self.assertFalse(SavedSearchMatch.objects.exists())
+
+        listing = Property.objects.get(pk=listing.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            listing.status = self.status
+            listing.save()
+
+        self.assertEqual(list(SavedSearchMatch.objects.values_list('search_id', 'reason')), [(search.id, NEW_LISTING)])
+
+    def test_price_drops_respect_preferences(self):
+        search = self._search(price_max='100000')
+        listing = self._listing(price=120000)
+        self.assertFalse(SavedSearchMatch.objects.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            listing.price = 95000
+            listing.save()
+        self.assertEqual(SavedSearchMatch.objects.get(search=search).reason, 'price_drop')
+
+        SavedSearchMatch.objects.all().delete()
+        UserPreferences.objects.create(user=self.seeker, price_drop_alerts=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            listing.price = 90000
+            listing.save()
+        self.assertFalse(SavedSearchMatch.objects.exists())
+
+    def test_digest_batches_matches_per_user(self):
+        self._search(area_id=str(self.akwa.id))
+        self._search(name='Everything')
+        self._listing(title='Studio one')
+        self._listing(title='Studio two')
+
+        self.assertEqual(send_saved_search_digests(), 1)
+        notification = Notification.objects.get(recipient=self.seeker)
+        self.assertEqual(notification.subject, '2 listings match your saved searches')
+        self.assertIn('Studio two', notification.message)
+        self.assertFalse(SavedSearchMatch.objects.filter(notified_at__isnull=True).exists())
+        self.assertEqual(send_saved_search_digests(), 0)
+
+    def test_api_validates_filter_params(self):
+        api = APIClient()
+        api.force_authenticate(self.seeker)
+
+        created = api.post('/api/properties/saved-searches/', {
+            'name': 'Akwa', 'params': {'area_id': self.akwa.id, 'price_max': 100000, 'city': ''},
+        }, format='json')
+        rejected = api.post('/api/properties/saved-searches/', {
+            'name': 'Bad', 'params': {'bedrooms': 2, 'listing_type': 'castle'},
+        }, format='json')
+
+        self.assertEqual(created.status_code, 201)
+        self.assertEqual(created.data['params'], {'area_id': str(self.akwa.id), 'price_max': '100000'})
+        self.assertEqual(rejected.status_code, 400)
+        for area_id in ('-1', '0', '3.5'):
+            response = api.post('/api/properties/saved-searches/', {
+                'name': 'Bad area', 'params': {'area_id': area_id},
+            }, format='json')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('area_id', response.data['params'])
+        self.assertEqual(len(api.get('/api/properties/saved-searches/').data['results']), 1)
@@ -0,0 +1,86 @@
+from datetime import date
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from agents.models import AgentProfile
+from locations.models import Area, City, Country, Region
+from properties import slugs
+from properties.models import Property, PropertyStatus, PropertyType
+
+User = get_user_model()
+
+
+class PropertySlugAllocatorTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(
+            username='slugs',
+            email='slugs@example.com',
+            password='testpass123',
+            user_type='agent',
+            phone_number='+237600000341',
+        )
+        self.agent_profile = AgentProfile.objects.create(
+            user=user,
+            license_number='SLUG123',
+            license_expiry=date(2030, 12, 31),
+            years_experience='1-3',
+            specialization='residential',
+            agency_name='Slug Realty',
+        )
+        country = Country.objects.create(name='Cameroon', code='CM')
+        region = Region.objects.create(name='Littoral', code='littoral', country=country)
+        city = City.objects.create(name='Douala', region=region)
+        self.area = Area.objects.create(name='Bonamoussadi', city=city)
+        self.property_type = PropertyType.objects.create(name='Apartment', category='residential')
+        self.property_status = PropertyStatus.objects.create(name='available')
+
+    def create_property(self, title='2 bedroom apartment'):
+        return Property.objects.create(
+            title=title,
+            description='Slug test property',
+            property_type=self.property_type,
+            status=self.property_status,
+            listing_type='rent',
+            price=150000,
+            area=self.area,
+            agent=self.agent_profile,
+        )
+
+    def test_lowest_free_suffix_is_used(self):
+        first = self.create_property()
+        second = self.create_property()
+        third = self.create_property()
+        second.delete()
+
+        self.assertEqual(first.slug, '2-bedroom-apartment-bonamoussadi')
+        self.assertEqual(third.slug, '2-bedroom-apartment-bonamoussadi-2')
+        self.assertEqual(self.create_property().slug, '2-bedroom-apartment-bonamoussadi-1')
+
+    def test_slug_lookup_is_one_query_however_many_collisions(self):
+        for _ in range(5):
+            self.create_property()
+
+        with self.assertNumQueries(1):
+            slug = slugs.allocate_slug('2 bedroom apartment', 'Bonamoussadi')
+
+        self.assertEqual(slug, '2-bedroom-apartment-bonamoussadi-5')
+
+    def test_unique_race_is_retried(self):
+        self.create_property()
+        real_taken = slugs._taken_suffixes
+        calls = []
+
+        def stale_first_read(bases):
+            calls.append(bases)
+            if len(calls) == 1:
+                # A concurrent insert the first lookup did not see yet
+                return {base: set() for base in bases}
+            return real_taken(bases)
+
+        with patch.object(slugs, '_taken_suffixes', side_effect=stale_first_read):
+            prop = self.create_property()
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(prop.slug, '2-bedroom-apartment-bonamoussadi-1')
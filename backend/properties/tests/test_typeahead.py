@@ -0,0 +1,125 @@
+from datetime import date
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from agents.models import AgentProfile
+from locations.models import Area, City, Country, Region
+from properties.models import Property, PropertyStatus, PropertyType
+from properties.tasks import rebuild_typeahead_entries
+from properties.typeahead import TYPEAHEAD_REBUILD_LOCK_KEY, clear_local_typeahead, get_typeahead
+from utils.typeahead import TypeaheadIndex, fold
+
+User = get_user_model()
+
+
+class TypeaheadIndexTests(TestCase):
+    def test_fold_strips_accents_case_and_punctuation(self):
+        self.assertEqual(fold("Ngaoundéré"), 'ngaoundere')
+        self.assertEqual(fold("Rue de l'HÔPITAL"), 'rue de l hopital')
+        self.assertEqual(fold('Cœur-de-ville'), 'coeur de ville')
+
+    def test_every_word_is_a_prefix_and_order_is_kept(self):
+        index = TypeaheadIndex([
+            ('bonapriso', 'Bonapriso'), ('bonanjo', 'Bonanjo'), ('akwa', 'Akwa Nord'), ('villa', 'Villa à Bonanjo'),
+        ])
+        self.assertEqual(index.search('BON'), ['bonapriso', 'bonanjo', 'villa'])
+        self.assertEqual(index.search('bonanjo vil'), ['villa'])
+        self.assertEqual(index.search('bon', limit=1), ['bonapriso'])
+        self.assertEqual(index.search('nord akw'), ['akwa'])
+        self.assertEqual(index.search('bon', accept=lambda document: document != 'bonapriso'), ['bonanjo', 'villa'])
+        self.assertEqual(index.search('  '), [])
+
+    def test_fuzzy_index_tolerates_typos(self):
+        index = TypeaheadIndex([('yaounde', 'Yaoundé'), ('douala', 'Douala')], fuzzy=True)
+        self.assertEqual(index.search('yaonde'), ['yaounde'])
+        self.assertEqual(TypeaheadIndex([('douala', 'Douala')]).search('doula'), [])
+
+
+@override_settings(TYPEAHEAD_REFRESH_SECONDS=0)
+class PropertyTypeaheadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_typeahead()
+        user = User.objects.create_user(
+            username='typeahead-agent', email='typeahead@example.com', password='testpass123', user_type='agent',
+        )
+        agent = AgentProfile.objects.create(
+            user=user, license_number='TYPE1', license_expiry=date(2030, 12, 31),
+            years_experience='1-3', specialization='residential', agency_name='Typeahead Agency',
+        )
+        country = Country.objects.create(name='Cameroon', code='CM')
+        centre = Region.objects.create(name='Centre', code='centre', country=country)
+        self.yaounde = City.objects.create(name='Yaoundé', region=centre, is_major_city=True)
+        self.bastos = Area.objects.create(name='Bastos', city=self.yaounde, local_name='Quartier des Ambassades')
+        self.property_type = PropertyType.objects.create(name='Villa', category='residential')
+        self.status = PropertyStatus.objects.create(name='available')
+        self.agent = agent
+        self.api = APIClient()
+
+    def _listing(self, title):
+        return Property.objects.create(
+            title=title, property_type=self.property_type, status=self.status, listing_type='rent',
+            price=100000, currency='XAF', area=self.bastos, agent=self.agent, description='Typeahead test',
+        )
+
+    def _lookup(self, query, **params):
+        response = self.api.get('/api/properties/typeahead/', {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_locations_and_titles_match_without_accents(self):
+        self._listing('Villa meublée à Bastos')
+
+        data = self._lookup('yaou')
+        self.assertEqual(data['locations'][0], {
+            'type': 'city', 'id': self.yaounde.id, 'label': 'Yaoundé', 'context': 'Centre',
+        })
+        self.assertEqual([row['label'] for row in self._lookup('ambassades')['locations']], ['Bastos'])
+        self.assertEqual([row['label'] for row in self._lookup('MEUBLEE')['properties']], ['Villa meublée à Bastos'])
+        self.assertEqual(self._lookup('bast', types='property')['locations'], [])
+
+    def test_lookups_are_served_from_memory_until_a_change(self):
+        get_typeahead()
+        with self.assertNumQueries(0):
+            self._lookup('bas')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._listing('Studio neuf à Bastos')
+        self.assertEqual([row['label'] for row in self._lookup('studio neu')['properties']], ['Studio neuf à Bastos'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Area.objects.create(name='Bonapriso', city=self.yaounde)
+        self.assertEqual([row['label'] for row in self._lookup('bona')['locations']], ['Bonapriso'])
+
+    @override_settings(TYPEAHEAD_AUTO_DISPATCH=True)
+    def test_changes_queue_one_rebuild_and_keep_serving_the_old_entries(self):
+        self._listing('Villa meublée à Bastos')
+        get_typeahead()
+
+        with patch.object(rebuild_typeahead_entries, 'apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                self._listing('Studio neuf à Bastos')
+            with self.captureOnCommitCallbacks(execute=True):
+                self._listing('Duplex neuf à Bastos')
+            with self.assertNumQueries(0):
+                self.assertEqual(self._lookup('neuf')['properties'], [])
+        self.assertEqual(apply_async.call_count, 1)
+
+        # A builder holding the lock makes the task queue another run
+        cache.add(TYPEAHEAD_REBUILD_LOCK_KEY, 1)
+        with patch.object(rebuild_typeahead_entries, 'apply_async') as apply_async:
+            rebuild_typeahead_entries.apply()
+        self.assertEqual(apply_async.call_count, 1)
+        cache.delete(TYPEAHEAD_REBUILD_LOCK_KEY)
+
+        rebuild_typeahead_entries.apply()
+        self.assertEqual([row['label'] for row in self._lookup('neuf')['properties']],
+                         ['Duplex neuf à Bastos', 'Studio neuf à Bastos'])
+
+    def test_rejects_unknown_types(self):
+        response = self.api.get('/api/properties/typeahead/', {'q': 'bas', 'types': 'street'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,199 @@
+"""
+Typeahead over location names and listing titles
+
+Two utils.typeahead indexes answer keystroke lookups from memory:
+locations (Country, Region, City and Area names, Area local names too,
+with typo-tolerant trigram matching) and the titles of published
+listings (prefix only). Results come best first: major cities, other
+cities, areas, regions and countries; featured then newest listings.
+
+The documents are built from the database and shared through the cache,
+as the location tree is (locations.tree). Location and listing signals
+bump the version and queue rebuild_typeahead_entries on the default
+queue, at most once per TYPEAHEAD_REBUILD_DELAY_SECONDS; a cache lock
+keeps a single builder at a time, and the previous documents are served
+until the new ones are stored. Each process rebuilds its index from the
+shared documents once they moved, at most once per
+TYPEAHEAD_REFRESH_SECONDS, and serves the previous index meanwhile.
+Without TYPEAHEAD_AUTO_DISPATCH (development) the documents are rebuilt
+in the process instead.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from locations.models import Area, City, Country, Region
+from utils.db_routing import use_replica
+from utils.typeahead import TypeaheadIndex
+
+from .models import Property
+
+TYPEAHEAD_ENTRIES_KEY = 'properties:typeahead:entries:v1'
+TYPEAHEAD_VERSION_KEY = 'properties:typeahead:version:v1'
+TYPEAHEAD_REBUILD_QUEUED_KEY = 'properties:typeahead:rebuild-queued:v1'
+TYPEAHEAD_REBUILD_LOCK_KEY = 'properties:typeahead:rebuild-lock:v1'
+
+LOCATION_TYPES = ('city', 'area', 'region', 'country')
+TYPEAHEAD_TYPES = LOCATION_TYPES + ('property',)
+
+_current = None
+_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+def _location(kind, pk, label, context, text=None):
+    return {'type': kind, 'id': pk, 'label': label, 'context': context}, text or label
+
+
+def build_location_entries():
+    cities = City.objects.filter(is_active=True).select_related('region').order_by('-is_major_city', 'name')
+    areas = Area.objects.filter(is_active=True, city__is_active=True).select_related('city__region').order_by(
+        '-city__is_major_city', 'name',
+    )
+    regions = Region.objects.filter(is_active=True).select_related('country').order_by('name')
+    entries = [_location('city', city.id, city.name, city.region.name) for city in cities]
+    entries += [
+        _location('area', area.id, area.name, area.city.name, f'{area.name} {area.local_name}')
+        for area in areas
+    ]
+    entries += [_location('region', region.id, region.name, region.country.name) for region in regions]
+    entries += [
+        _location('country', country.id, country.name, '')
+        for country in Country.objects.filter(is_active=True).order_by('name')
+    ]
+    return entries
+
+
+def build_property_entries():
+    listings = Property.objects.filter(is_active=True).exclude(status__name='draft').order_by(
+        '-featured', '-created_at',
+    ).values_list('id', 'slug', 'title', 'area__name', 'area__city__name')
+    return [
+        ({'type': 'property', 'id': pk, 'slug': slug, 'label': title, 'context': f'{area}, {city}'}, title)
+        for pk, slug, title, area, city in listings
+    ]
+
+
+def get_typeahead_version():
+    version = cache.get(TYPEAHEAD_VERSION_KEY)
+    if version is None:
+        cache.add(TYPEAHEAD_VERSION_KEY, 1, timeout=None)
+        version = cache.get(TYPEAHEAD_VERSION_KEY, 1)
+    return version
+
+
+def bump_typeahead_version():
+    try:
+        cache.incr(TYPEAHEAD_VERSION_KEY)
+    except ValueError:
+        cache.add(TYPEAHEAD_VERSION_KEY, 1, timeout=None)
+    queue_typeahead_rebuild()
+
+
+def build_typeahead_entries():
+    """Store the documents of the current version; None when another builder holds the lock."""
+    lock_timeout = getattr(settings, 'TYPEAHEAD_REBUILD_LOCK_SECONDS', 300)
+    if not cache.add(TYPEAHEAD_REBUILD_LOCK_KEY, 1, timeout=lock_timeout):
+        return None
+    try:
+        # From the primary even in a request: the documents are stored under the version read here
+        with use_replica(False):
+            entries = {
+                'version': get_typeahead_version(),
+                'locations': build_location_entries(),
+                'properties': build_property_entries(),
+            }
+        cache.set(TYPEAHEAD_ENTRIES_KEY, entries, timeout=None)
+    finally:
+        cache.delete(TYPEAHEAD_REBUILD_LOCK_KEY)
+    return entries
+
+
+def queue_typeahead_rebuild():
+    """Queue one rebuild for the changes of the next few seconds; returns the documents when built here."""
+    if not getattr(settings, 'TYPEAHEAD_AUTO_DISPATCH', False):
+        return build_typeahead_entries()
+
+    delay = getattr(settings, 'TYPEAHEAD_REBUILD_DELAY_SECONDS', 10)
+    # Expires on its own should the task be lost
+    if not cache.add(TYPEAHEAD_REBUILD_QUEUED_KEY, 1, timeout=delay + 300):
+        return None
+
+    from .tasks import rebuild_typeahead_entries
+
+    try:
+        rebuild_typeahead_entries.apply_async(countdown=delay)
+    except Exception:
+        cache.delete(TYPEAHEAD_REBUILD_QUEUED_KEY)
+        logger.exception('Could not queue the typeahead rebuild; the previous entries stay in use')
+    return None
+
+
+def rebuild_typeahead_entries():
+    """Run by the debounced task; queues another run if the version moved meanwhile."""
+    # Changes from here on queue a run of their own
+    cache.delete(TYPEAHEAD_REBUILD_QUEUED_KEY)
+    entries = build_typeahead_entries()
+    if entries is None or entries['version'] != get_typeahead_version():
+        queue_typeahead_rebuild()
+
+
+def get_typeahead_entries():
+    """The shared documents; while a rebuild is pending, those of the previous version."""
+    entries = cache.get(TYPEAHEAD_ENTRIES_KEY)
+    if isinstance(entries, dict):
+        if entries.get('version') != get_typeahead_version():
+            entries = queue_typeahead_rebuild() or entries
+        return entries
+
+    # Cold cache: one process builds them, the others serve an empty index until it is done
+    return build_typeahead_entries() or {'version': None, 'locations': [], 'properties': []}
+
+
+class Typeahead:
+    def __init__(self, entries):
+        self.version = entries['version']
+        self.built_at = time.monotonic()
+        self.locations = TypeaheadIndex(entries['locations'], fuzzy=True)
+        self.properties = TypeaheadIndex(entries['properties'])
+
+    def lookup(self, query, limit=8, types=TYPEAHEAD_TYPES):
+        location_types = set(types) & set(LOCATION_TYPES)
+        locations = []
+        if location_types:
+            accept = None if location_types == set(LOCATION_TYPES) else (
+                lambda document: document['type'] in location_types
+            )
+            locations = self.locations.search(query, limit, accept)
+        properties = self.properties.search(query, limit) if 'property' in types else []
+        return {'locations': locations, 'properties': properties}
+
+
+def get_typeahead():
+    """This process's index, rebuilt when the shared version moved and the index is old enough."""
+    global _current
+    current = _current
+    if current is not None and current.version is not None:
+        if current.version == get_typeahead_version():
+            return current
+        if time.monotonic() - current.built_at < getattr(settings, 'TYPEAHEAD_REFRESH_SECONDS', 30):
+            return current
+
+    with _lock:
+        if _current is current:
+            entries = get_typeahead_entries()
+            if current is not None and current.version is not None and entries['version'] == current.version:
+                # The shared documents have not been rebuilt yet
+                current.built_at = time.monotonic()
+            else:
+                _current = Typeahead(entries)
+        return _current
+
+
+def clear_local_typeahead():
+    global _current
+    _current = None
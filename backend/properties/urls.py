@@ -12,6 +12,8 @@ urlpatterns = [
 
     # Agent's properties
     path('my-properties/', views.my_properties_list, name='my-properties'),
+    path('import/', views.bulk_import_properties, name='property-bulk-import'),
+    path('export/', views.bulk_export_properties, name='property-bulk-export'),
 
     # Admin utilities
     path('admin/seed/', views_admin.seed_database, name='admin-seed'),
@@ -20,6 +22,8 @@ urlpatterns = [
 
     # Property metadata and search BEFORE slug route
     path('search/', views.property_search, name='property-search'),
+    path('search/facets/', views.property_search_facets, name='property-search-facets'),
+    path('typeahead/', views.property_typeahead, name='property-typeahead'),
     path('search/sync-status/', views.property_search_sync_status, name='property-search-sync-status'),
     path('sitemap/entries/', views.PropertySitemapEntriesAPIView.as_view(), name='property-sitemap-entries'),
     path('nearby/', views.proximity_search, name='proximity-search'),
@@ -33,6 +37,10 @@ urlpatterns = [
     path('favorites/', views.favorites_list, name='favorites-list'),
     path('<slug:slug>/favorite/', views.toggle_favorite, name='toggle-favorite'),
 
+    # Saved searches and alerts
+    path('saved-searches/', views.SavedSearchListCreateAPIView.as_view(), name='saved-search-list'),
+    path('saved-searches/<int:pk>/', views.SavedSearchDetailAPIView.as_view(), name='saved-search-detail'),
+
     # Moderation (admin)
     path('moderation/pending/', views.pending_properties, name='pending-properties'),
     path('moderation/<int:pk>/approve/', views.approve_property, name='approve-property'),
@@ -1,22 +1,42 @@
+import logging
+import math
+
 from rest_framework import generics, filters, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly, AllowAny
 from rest_framework.exceptions import PermissionDenied
+from rest_framework.pagination import CursorPagination
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
-from django.db.models import Count, Q
+from django.db import transaction
+from django.db.models import Count, F, FloatField, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import ACos, Coalesce, Cos, Radians, Sin
+from django.utils import timezone
 from utils.permissions import IsAgentOrReadOnly, IsOwnerOrReadOnly
+from utils.response_cache import VersionedCacheMixin
+from users.permissions import get_request_agent_profile
 from agents.models import AgentProfile
-from .models import Property, PropertyType, PropertyStatus, PropertyViewing, PropertyFavorite, PropertySearchSync
+from ad.models import PromotedProperty
+from analytics.models import PropertyViewEvent
+from moderation.tasks import run_listing_auto_checks
+from tariffplans.quotas import QuotaExceeded, consume_listing
+from .models import (
+    Property, PropertyType, PropertyStatus, PropertyViewing, PropertyFavorite, PropertySearchSync, SavedSearch,
+)
+from .facets import get_facets
 from .sitemap_entries import get_property_sitemap_entries_payload
+from .typeahead import TYPEAHEAD_TYPES, get_typeahead
 from .serializers import (
     PropertyListSerializer, PropertyDetailSerializer, PropertyCreateSerializer,
     PropertyTypeSerializer, PropertyStatusSerializer, PropertyViewingSerializer,
-    PropertySitemapEntrySerializer,
+    PropertySitemapEntrySerializer, SavedSearchSerializer, LISTING_PREFETCH_RELATED, LISTING_SELECT_RELATED,
+    listing_queryset, prefetch_listing_images,
 )
 from .filters import PropertyFilter
 
+logger = logging.getLogger(__name__)
+
 
 class PropertyListCreateAPIView(generics.ListCreateAPIView):
     """
@@ -31,14 +51,9 @@ class PropertyListCreateAPIView(generics.ListCreateAPIView):
     ordering = ['-created_at']
 
     def get_queryset(self):
-        from django.db.models import Subquery, OuterRef, IntegerField, Value
-        from django.db.models.functions import Coalesce
-        from django.utils import timezone
-
         now = timezone.now()
 
         # Subquery: max priority_score of active promotions for each property
-        from ad.models import PromotedProperty
         active_promo = PromotedProperty.objects.filter(
             property_listing=OuterRef('pk'),
             is_active=True,
@@ -46,13 +61,11 @@ class PropertyListCreateAPIView(generics.ListCreateAPIView):
             end_date__gte=now,
         ).order_by('-priority_score').values('priority_score')[:1]
 
-        return Property.objects.filter(
+        return listing_queryset(Property.objects.filter(
             is_active=True
         ).exclude(
             status__name='draft'
-        ).select_related(
-            'property_type', 'status', 'area__city__region', 'agent__user'
-        ).prefetch_related('additional_features').annotate(
+        )).annotate(
             promo_score=Coalesce(
                 Subquery(active_promo, output_field=IntegerField()),
                 Value(0),
@@ -66,17 +79,14 @@ class PropertyListCreateAPIView(generics.ListCreateAPIView):
 
     def perform_create(self, serializer):
         # Ensure only agents can create properties
-        import logging
-        logger = logging.getLogger(__name__)
-
         logger.info(f"User creating property: {self.request.user.email}, type: {self.request.user.user_type}")
 
         if self.request.user.user_type == 'agent':
             # Try to get agent profile, create if doesn't exist
-            try:
-                agent_profile = self.request.user.agents_profile
+            agent_profile = get_request_agent_profile(self.request)
+            if agent_profile is not None:
                 logger.info(f"Found existing agent profile: {agent_profile.id}")
-            except AgentProfile.DoesNotExist:
+            else:
                 logger.info("Creating new agent profile")
                 agent_profile = AgentProfile.objects.create(
                     user=self.request.user,
@@ -87,36 +97,21 @@ class PropertyListCreateAPIView(generics.ListCreateAPIView):
                 )
                 logger.info(f"Created agent profile: {agent_profile.id}")
 
-            # Subscription enforcement: check property limit
-            from tariffplans.models import UserSubscription
-            active_sub = UserSubscription.objects.filter(
-                user=self.request.user,
-                status__in=['active', 'trial'],
-            ).select_related('plan').first()
-
-            if active_sub and active_sub.is_active:
-                current_count = Property.objects.filter(agent=agent_profile, is_active=True).count()
-                if current_count >= active_sub.plan.max_properties:
-                    raise PermissionDenied(
-                        f"Your {active_sub.plan.name} plan allows {active_sub.plan.max_properties} properties. "
-                        f"You have {current_count}. Please upgrade your plan."
-                    )
-
             try:
-                instance = serializer.save(agent=agent_profile)
+                # Subscription enforcement: the listing slot is taken in the
+                # save's transaction, so a failed save gives it back
+                with transaction.atomic():
+                    consume_listing(self.request.user.pk, description=serializer.validated_data.get('title', ''))
+                    instance = serializer.save(agent=agent_profile)
                 logger.info("Property saved successfully")
 
-                # Track subscription usage
-                if active_sub and active_sub.is_active:
-                    active_sub.properties_used += 1
-                    active_sub.save(update_fields=['properties_used'])
-
                 # Run auto-checks asynchronously
                 try:
-                    from moderation.tasks import run_listing_auto_checks
                     run_listing_auto_checks.delay(instance.id)
                 except Exception:
                     pass
+            except QuotaExceeded as e:
+                raise PermissionDenied(str(e))
             except Exception as e:
                 logger.error(f"Error saving property: {str(e)}", exc_info=True)
                 raise
@@ -137,7 +132,7 @@ class PropertyDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
 
     def get_queryset(self):
         queryset = Property.objects.select_related(
-            'property_type', 'status', 'area__city__region', 'agent__user'
+            'property_type', 'status', 'area__city__region__country', 'agent__user'
         ).prefetch_related('additional_features', 'images')
 
         public_queryset = queryset.filter(is_active=True).exclude(status__name='draft')
@@ -149,10 +144,7 @@ class PropertyDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
         if user.is_staff or getattr(user, 'user_type', None) == 'admin':
             return queryset
 
-        try:
-            agent_profile = user.agents_profile
-        except AgentProfile.DoesNotExist:
-            agent_profile = None
+        agent_profile = get_request_agent_profile(self.request)
 
         if agent_profile:
             return queryset.filter(Q(pk__in=public_queryset.values('pk')) | Q(agent=agent_profile)).distinct()
@@ -166,24 +158,9 @@ class PropertyDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
         return obj
 
     def _track_view(self, prop):
-        """Record view event with deduplication (1 unique view per user/IP per hour)."""
-        from analytics.models import PropertyViewEvent, PropertyAnalytics
-        from django.utils import timezone as tz
-        import datetime
-
+        """Record a view event; analytics.tasks.rollup_property_stats turns them into daily stats."""
         request = self.request
         user = request.user if request.user.is_authenticated else None
-        ip = self._get_client_ip(request)
-        one_hour_ago = tz.now() - datetime.timedelta(hours=1)
-
-        # Deduplicate: check if same user/IP viewed this property in the last hour
-        recent_qs = PropertyViewEvent.objects.filter(
-            property=prop, viewed_at__gte=one_hour_ago,
-        )
-        if user:
-            is_duplicate = recent_qs.filter(user=user).exists()
-        else:
-            is_duplicate = recent_qs.filter(ip_address=ip, user__isnull=True).exists()
 
         # Always increment total views
         prop.views_count += 1
@@ -193,19 +170,11 @@ class PropertyDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
         PropertyViewEvent.objects.create(
             property=prop,
             user=user,
-            ip_address=ip,
+            ip_address=self._get_client_ip(request),
             user_agent=request.META.get('HTTP_USER_AGENT', '')[:500],
             referrer=request.META.get('HTTP_REFERER', '')[:200],
         )
 
-        # Update PropertyAnalytics
-        analytics, _ = PropertyAnalytics.objects.get_or_create(property=prop)
-        analytics.total_views += 1
-        analytics.this_month_views += 1
-        if not is_duplicate:
-            analytics.unique_views += 1
-        analytics.save(update_fields=['total_views', 'unique_views', 'this_month_views'])
-
     @staticmethod
     def _get_client_ip(request):
         xff = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -224,9 +193,6 @@ class PropertyDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
 
     def perform_destroy(self, instance):
         # Only property owner or admin can delete
-        import logging
-        logger = logging.getLogger(__name__)
-
         logger.info(f"Delete attempt - User: {self.request.user}, Property: {instance.title}")
         logger.info(f"Property agent: {instance.agent}, Agent user: {instance.agent.user if instance.agent else 'No agent'}")
         logger.info(f"Is staff: {self.request.user.is_staff}")
@@ -248,33 +214,66 @@ class PropertyDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
 @permission_classes([AllowAny])
 def property_search(request):
     """Advanced property search with multiple filters"""
-    properties = Property.objects.filter(is_active=True).exclude(status__name='draft').select_related(
-        'property_type', 'status', 'area__city__region', 'agent__user'
-    ).prefetch_related('images')
+    properties = listing_queryset(Property.objects.filter(is_active=True).exclude(status__name='draft'))
 
-    # Apply filters
-    filterset = PropertyFilter(request.GET, queryset=properties)
-    if filterset.is_valid():
-        properties = filterset.qs
+    # Apply the valid filters; an invalid parameter drops only its own filter
+    properties = PropertyFilter(request.GET, queryset=properties).qs
 
     # Serialize results
-    serializer = PropertyListSerializer(properties, many=True)
+    serializer = PropertyListSerializer(properties, many=True, context={'request': request})
     return Response({
         'count': properties.count(),
         'results': serializer.data
     })
 
 
-class PropertyTypeListAPIView(generics.ListAPIView):
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def property_search_facets(request):
+    """
+    Facet counts for the search sidebar under the same filters as property_search:
+    city, area, property type, listing type, bedroom buckets, amenities and price bins
+    """
+    return Response(get_facets(request.GET))
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def property_typeahead(request):
+    """
+    Autocomplete locations and listing titles, accent- and case-insensitive
+    Query params: q, limit (default 8, max 20), types (comma separated: city, area, region, country, property)
+    """
+    try:
+        limit = min(max(int(request.query_params.get('limit', 8)), 1), 20)
+    except ValueError:
+        return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+
+    types = request.query_params.get('types')
+    types = [kind.strip() for kind in types.split(',') if kind.strip()] if types else TYPEAHEAD_TYPES
+    unknown = set(types) - set(TYPEAHEAD_TYPES)
+    if unknown:
+        return Response(
+            {'error': f"types must be among: {', '.join(TYPEAHEAD_TYPES)}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    query = request.query_params.get('q', '')
+    return Response({'query': query, **get_typeahead().lookup(query, limit, types)})
+
+
+class PropertyTypeListAPIView(VersionedCacheMixin, generics.ListAPIView):
     """List all active property types"""
     permission_classes = [AllowAny]
+    cache_models = (PropertyType,)
     queryset = PropertyType.objects.filter(is_active=True)
     serializer_class = PropertyTypeSerializer
 
 
-class PropertyStatusListAPIView(generics.ListAPIView):
+class PropertyStatusListAPIView(VersionedCacheMixin, generics.ListAPIView):
     """List all active property statuses"""
     permission_classes = [AllowAny]
+    cache_models = (PropertyStatus,)
     queryset = PropertyStatus.objects.filter(is_active=True)
     serializer_class = PropertyStatusSerializer
 
@@ -318,9 +317,6 @@ def my_properties_list(request):
     Returns ALL properties created by the authenticated agent (including drafts, inactive, etc.)
     This is different from the public API which only shows published/available properties
     """
-    import logging
-    logger = logging.getLogger(__name__)
-
     try:
         logger.info(f"Fetching properties for user: {request.user.email}")
 
@@ -329,11 +325,9 @@ def my_properties_list(request):
         logger.info(f"Found agent profile: {agent_profile.id}")
 
         # Get all properties owned by this agent (both active and inactive)
-        properties = Property.objects.filter(
+        properties = listing_queryset(Property.objects.filter(
             agent=agent_profile
-        ).select_related(
-            'property_type', 'status', 'area__city__region'
-        ).prefetch_related('images').order_by('-created_at')
+        )).order_by('-created_at')
 
         logger.info(f"Found {properties.count()} properties")
 
@@ -370,19 +364,47 @@ def my_properties_list(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class FavoritesCursorPagination(CursorPagination):
+    """Keyset pages over the (user, created_at) index, newest favorite first"""
+    ordering = ('-created_at', '-id')
+    page_size = 20
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def favorites_list(request):
-    """Get user's favorite properties"""
-    fav_ids = PropertyFavorite.objects.filter(
-        user=request.user
-    ).values_list('property_id', flat=True)
-
-    properties = Property.objects.filter(id__in=fav_ids, is_active=True).exclude(status__name='draft').select_related(
-        'property_type', 'status', 'area__city__region', 'agent__user'
-    ).prefetch_related('images')
-    serializer = PropertyListSerializer(properties, many=True)
-    return Response(serializer.data)
+    """Get user's favorite properties, most recently favorited first"""
+    favorites = PropertyFavorite.objects.filter(
+        user=request.user, property__is_active=True
+    ).exclude(
+        property__status__name='draft'
+    ).select_related(*(f'property__{related}' for related in LISTING_SELECT_RELATED))
+
+    paginator = FavoritesCursorPagination()
+    page = paginator.paginate_queryset(favorites, request)
+    properties = prefetch_listing_images([favorite.property for favorite in page])
+    serializer = PropertyListSerializer(properties, many=True, context={'request': request})
+    return paginator.get_paginated_response(serializer.data)
+
+
+class SavedSearchListCreateAPIView(generics.ListCreateAPIView):
+    """The user's saved searches; new listings and price drops matching them are sent as digests"""
+    serializer_class = SavedSearchSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return SavedSearch.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+
+class SavedSearchDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+    serializer_class = SavedSearchSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return SavedSearch.objects.filter(user=self.request.user)
 
 
 @api_view(['GET'])
@@ -409,6 +431,69 @@ def property_search_sync_status(request):
     })
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_import_properties(request):
+    """
+    Import listings from an uploaded CSV or JSONL file (agents only)
+    Form fields: file, file_format (optional, from the file extension), dry_run
+    """
+    from .bulk_import import PropertyImporter, detect_format, iter_rows, open_text
+
+    agent_profile = get_request_agent_profile(request)
+    if request.user.user_type != 'agent' or agent_profile is None:
+        raise PermissionDenied("Only agents can import properties")
+
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({'error': 'Upload a CSV or JSONL file as "file".'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        fmt = detect_format(upload.name, request.data.get('file_format'))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    dry_run = str(request.data.get('dry_run', '')).lower() in ['true', '1', 'yes']
+    importer = PropertyImporter(agent_profile, dry_run=dry_run, enforce_quota=True)
+    result = importer.run(iter_rows(open_text(upload.file), fmt))
+
+    response_status = status.HTTP_201_CREATED if result['created'] else status.HTTP_200_OK
+    return Response(result, status=response_status)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def bulk_export_properties(request):
+    """
+    Stream listings as CSV or JSONL (?file_format=csv|jsonl; ?format is taken by DRF)
+    Agents export their own listings; admins export everything.
+    PropertyFilter query params narrow the export.
+    """
+    from django.http import StreamingHttpResponse
+    from .bulk_import import FORMAT_JSONL, detect_format, iter_export
+
+    try:
+        fmt = detect_format(None, request.query_params.get('file_format', 'csv'))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    queryset = Property.objects.all()
+    if request.user.user_type != 'admin' and not request.user.is_staff:
+        agent_profile = get_request_agent_profile(request)
+        if agent_profile is None:
+            raise PermissionDenied("Only agents can export properties")
+        queryset = queryset.filter(agent=agent_profile)
+
+    queryset = PropertyFilter(request.query_params, queryset=queryset, request=request).qs
+
+    response = StreamingHttpResponse(
+        iter_export(queryset, fmt),
+        content_type='application/x-ndjson' if fmt == FORMAT_JSONL else 'text/csv',
+    )
+    response['Content-Disposition'] = f'attachment; filename="properties.{fmt}"'
+    return response
+
+
 @api_view(['POST', 'DELETE'])
 @permission_classes([IsAuthenticated])
 def toggle_favorite(request, slug):
@@ -440,9 +525,7 @@ def pending_properties(request):
     """List properties pending moderation (admin only)"""
     if request.user.user_type != 'admin':
         return Response({'error': 'Admin only'}, status=status.HTTP_403_FORBIDDEN)
-    properties = Property.objects.filter(is_active=False).select_related(
-        'property_type', 'status', 'area__city__region', 'agent__user'
-    ).order_by('-created_at')
+    properties = listing_queryset(Property.objects.filter(is_active=False)).order_by('-created_at')
     serializer = PropertyListSerializer(properties, many=True, context={'request': request})
     return Response(serializer.data)
 
@@ -516,10 +599,6 @@ def proximity_search(request):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
-    from django.db.models import F, FloatField, Value
-    from django.db.models.functions import Cos, Sin, ACos, Radians
-    import math
-
     # Haversine via Django ORM expressions
     # distance = 6371 * acos(cos(radians(lat)) * cos(radians(prop_lat)) *
     #            cos(radians(prop_lng) - radians(lng)) +
@@ -545,7 +624,7 @@ def proximity_search(request):
     lng_rad = math.radians(lng)
 
     # Process direct-coordinate properties
-    for prop in qs_direct.select_related('property_type', 'status', 'area__city__region', 'agent__user'):
+    for prop in qs_direct.select_related(*LISTING_SELECT_RELATED):
         p_lat = float(prop.latitude)
         p_lng = float(prop.longitude)
         dist = _haversine(lat, lng, p_lat, p_lng)
@@ -553,7 +632,7 @@ def proximity_search(request):
             results.append((dist, prop))
 
     # Process area-coordinate properties
-    for prop in qs_area.select_related('property_type', 'status', 'area__city__region', 'agent__user'):
+    for prop in qs_area.select_related(*LISTING_SELECT_RELATED):
         p_lat = float(prop.area.latitude)
         p_lng = float(prop.area.longitude)
         dist = _haversine(lat, lng, p_lat, p_lng)
@@ -563,8 +642,8 @@ def proximity_search(request):
     # Sort by distance
     results.sort(key=lambda x: x[0])
 
-    # Serialize
-    properties = [r[1] for r in results]
+    # Serialize; images are fetched for the in-radius results only
+    properties = prefetch_listing_images([r[1] for r in results])
     serializer = PropertyListSerializer(properties, many=True, context={'request': request})
 
     # Attach distance to each result
@@ -583,7 +662,6 @@ def proximity_search(request):
 
 def _haversine(lat1, lon1, lat2, lon2):
     """Calculate distance in km between two points using Haversine formula."""
-    import math
     R = 6371  # Earth's radius in km
     dlat = math.radians(lat2 - lat1)
     dlon = math.radians(lon2 - lon1)
@@ -611,7 +689,9 @@ def similar_properties(request, slug):
     ).exclude(
         status__name='draft'
     ).select_related(
-        'property_type', 'status', 'area__city__region', 'agent__user'
+        *LISTING_SELECT_RELATED
+    ).prefetch_related(
+        *LISTING_PREFETCH_RELATED
     ).order_by('-created_at')[:10]
 
     serializer = PropertyListSerializer(similar, many=True, context={'request': request})
@@ -5,22 +5,25 @@ set -e  # Exit on error
 echo "==== Running migrations ===="
 python manage.py migrate --noinput
 
-# Collect static files
-echo "==== Collecting static files ===="
-python manage.py collectstatic --noinput
+# Static files are collected at build time (render.yaml buildCommand, Dockerfile.prod)
 
-# Seed property types and statuses (idempotent - won't duplicate)
-echo "==== Seeding property types and statuses ===="
-python manage.py populate_property_data || echo "Warning: Failed to populate property data"
+# Seeders are idempotent but each boots Django again; set SEED_ON_START=false
+# once the database has been seeded to cut them from every restart
+if [ "${SEED_ON_START:-true}" = "true" ]; then
+    # Seed property types and statuses (idempotent - won't duplicate)
+    echo "==== Seeding property types and statuses ===="
+    python manage.py populate_property_data || echo "Warning: Failed to populate property data"
 
-# Seed Cameroon locations (idempotent - won't duplicate)
-echo "==== Seeding Cameroon locations ===="
-python manage.py populate_cameroon_locations || echo "Warning: Failed to populate locations"
+    # Seed Cameroon locations (idempotent - won't duplicate)
+    echo "==== Seeding Cameroon locations ===="
+    python manage.py populate_cameroon_locations || echo "Warning: Failed to populate locations"
 
-# Fix property status (make all properties active by default)
-echo "==== Fixing property availability status ===="
-python manage.py fix_property_status || echo "Warning: Failed to fix property status"
+    # Fix property status (make all properties active by default)
+    echo "==== Fixing property availability status ===="
+    python manage.py fix_property_status || echo "Warning: Failed to fix property status"
+fi
 
-# Start Gunicorn
+# Start Gunicorn; --preload imports and warms the app once (config.warmup)
+# before forking, so workers share the loaded code and start warm
 echo "==== Starting Gunicorn ===="
-exec gunicorn config.wsgi:application --bind 0.0.0.0:$PORT --workers 3 --timeout 120
+exec gunicorn config.wsgi:application --bind 0.0.0.0:$PORT --workers 3 --timeout 120 --preload
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TariffplansConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tariffplans'
+
+    def ready(self):
+        import tariffplans.signals  # noqa: F401
@@ -0,0 +1,186 @@
+"""
+Subscription lifecycle sweeper
+
+Moves subscriptions through their lifecycle with set-based UPDATEs on the
+indexed (status, end_date) and (status, trial_end_date) columns, so the
+stored status can be trusted everywhere (tariffplans.quotas) instead of
+recomputing end dates per request:
+
+- trials past trial_end_date become active (auto_renew) or expire;
+- auto-renewing subscriptions whose plan was retired are downgraded to
+  the category's free plan, with PlanUpgrade history written in bulk;
+- auto-renewing subscriptions past end_date start their next period;
+- the rest past end_date expire;
+- renewal/expiry notices for periods ending within
+  SUBSCRIPTION_RENEWAL_NOTICE_DAYS are created in bulk as scheduled
+  notifications, which process_scheduled_notifications dispatches.
+
+Rows are handled in primary-key batches of SUBSCRIPTION_SWEEP_BATCH_SIZE.
+A subscription more than one period overdue advances one period per sweep.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from notifications.models import Notification
+
+from .models import PlanUpgrade, TariffPlan, UserSubscription
+from .quotas import invalidate_plan_quota
+
+DAYS_PER_MONTH = 30
+
+
+def _batch_size():
+    return getattr(settings, 'SUBSCRIPTION_SWEEP_BATCH_SIZE', 1000)
+
+
+def _batches(queryset, *fields):
+    """Lists of value dicts (pk first) in primary-key order, without OFFSET."""
+    last_pk = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last_pk).order_by('pk').values('pk', *fields)[:_batch_size()])
+        if not rows:
+            return
+        yield rows
+        last_pk = rows[-1]['pk']
+
+
+def _period(billing_cycle):
+    return timedelta(days=TariffPlan.BILLING_CYCLE_MONTHS.get(billing_cycle, 1) * DAYS_PER_MONTH)
+
+
+def end_trials(now):
+    due = UserSubscription.objects.filter(status='trial', trial_end_date__lte=now)
+    converted = expired = 0
+    for rows in _batches(due, 'user_id', 'auto_renew'):
+        renewing = [row['pk'] for row in rows if row['auto_renew']]
+        lapsing = [row['pk'] for row in rows if not row['auto_renew']]
+        with transaction.atomic():
+            converted += due.filter(pk__in=renewing).update(status='active', updated_at=now)
+            expired += due.filter(pk__in=lapsing).update(status='expired', updated_at=now)
+        invalidate_plan_quota(*{row['user_id'] for row in rows if not row['auto_renew']})
+    return converted, expired
+
+
+def _free_plans(category_ids):
+    fallback = {}
+    for plan in TariffPlan.objects.filter(
+        category_id__in=category_ids, plan_type='free', is_active=True,
+    ).order_by('display_order', 'pk'):
+        fallback.setdefault(plan.category_id, plan.pk)
+    return fallback
+
+
+def downgrade_retired_plans(now):
+    due = UserSubscription.objects.filter(
+        status='active', auto_renew=True, end_date__lte=now, plan__is_active=False,
+    )
+    downgraded = expired = 0
+    for rows in _batches(due, 'user_id', 'plan_id', 'plan__category_id'):
+        fallback = _free_plans({row['plan__category_id'] for row in rows})
+        by_target = {}
+        for row in rows:
+            by_target.setdefault(fallback.get(row['plan__category_id']), []).append(row)
+
+        with transaction.atomic():
+            for target_plan_id, group in by_target.items():
+                ids = [row['pk'] for row in group]
+                if target_plan_id is None:
+                    expired += due.filter(pk__in=ids).update(status='expired', updated_at=now)
+                    continue
+                downgraded += due.filter(pk__in=ids).update(plan_id=target_plan_id, updated_at=now)
+                PlanUpgrade.objects.bulk_create([
+                    PlanUpgrade(
+                        user_id=row['user_id'], from_plan_id=row['plan_id'], to_plan_id=target_plan_id,
+                        change_type='downgrade', effective_date=now,
+                        reason='Plan retired; renewed on the free plan',
+                    )
+                    for row in group
+                ])
+        invalidate_plan_quota(*{row['user_id'] for row in rows})
+    return downgraded, expired
+
+
+def renew_due(now):
+    due = UserSubscription.objects.filter(
+        status='active', auto_renew=True, end_date__lte=now, plan__is_active=True,
+    )
+    renewed = 0
+    for rows in _batches(due, 'billing_cycle'):
+        by_cycle = {}
+        for row in rows:
+            by_cycle.setdefault(row['billing_cycle'], []).append(row['pk'])
+        with transaction.atomic():
+            for billing_cycle, ids in by_cycle.items():
+                period = _period(billing_cycle)
+                renewed += due.filter(pk__in=ids).update(
+                    start_date=F('end_date'),
+                    end_date=F('end_date') + period,
+                    next_billing_date=F('end_date') + period,
+                    api_calls_used=0,
+                    renewal_notified_at=None,
+                    updated_at=now,
+                )
+    return renewed
+
+
+def expire_lapsed(now):
+    due = UserSubscription.objects.filter(status='active', auto_renew=False, end_date__lte=now)
+    expired = 0
+    for rows in _batches(due, 'user_id'):
+        expired += due.filter(pk__in=[row['pk'] for row in rows]).update(status='expired', updated_at=now)
+        invalidate_plan_quota(*{row['user_id'] for row in rows})
+    return expired
+
+
+def queue_renewal_notices(now):
+    notice_days = getattr(settings, 'SUBSCRIPTION_RENEWAL_NOTICE_DAYS', 3)
+    due = UserSubscription.objects.filter(
+        status__in=['active', 'trial'],
+        end_date__gt=now,
+        end_date__lte=now + timedelta(days=notice_days),
+        renewal_notified_at__isnull=True,
+    )
+    content_type = ContentType.objects.get_for_model(UserSubscription)
+    queued = 0
+    for rows in _batches(due, 'user_id', 'auto_renew', 'end_date', 'plan__name'):
+        notices = []
+        for row in rows:
+            ends = row['end_date'].strftime('%B %d, %Y')
+            if row['auto_renew']:
+                subject = 'Your subscription renews soon'
+                message = f"Your {row['plan__name']} subscription renews on {ends}."
+            else:
+                subject = 'Your subscription is ending'
+                message = (
+                    f"Your {row['plan__name']} subscription ends on {ends}. "
+                    f"Turn on auto-renew or choose a plan to keep your plan benefits."
+                )
+            notices.append(Notification(
+                recipient_id=row['user_id'], notification_type='email', subject=subject, message=message,
+                priority='normal', status='pending', scheduled_at=now,
+                content_type=content_type, object_id=row['pk'],
+            ))
+        with transaction.atomic():
+            Notification.objects.bulk_create(notices)
+            queued += due.filter(pk__in=[row['pk'] for row in rows]).update(renewal_notified_at=now)
+    return queued
+
+
+def run_subscription_lifecycle(now=None):
+    """One sweep over every lifecycle step; returns counts per step."""
+    now = now or timezone.now()
+    trials_converted, trials_expired = end_trials(now)
+    downgraded, retired_expired = downgrade_retired_plans(now)
+    return {
+        'trials_converted': trials_converted,
+        'trials_expired': trials_expired,
+        'downgraded': downgraded,
+        'renewed': renew_due(now),
+        'expired': expire_lapsed(now) + retired_expired,
+        'notices_queued': queue_renewal_notices(now),
+    }
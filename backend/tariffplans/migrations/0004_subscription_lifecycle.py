@@ -0,0 +1,24 @@
+# Generated by Django 5.2.12 on 2026-10-19 16:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tariffplans', '0003_usersubscription_tariffplans_user_id_15a306_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usersubscription',
+            name='renewal_notified_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='usersubscription',
+            index=models.Index(fields=['status', 'trial_end_date'], name='tariffplans_status_285a26_idx'),
+        ),
+    ]
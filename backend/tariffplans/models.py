@@ -44,6 +44,11 @@ class TariffPlan(models.Model):
         ('annual', 'Annual'),
         ('lifetime', 'Lifetime'),
     )
+    # Period length; a month is counted as 30 days
+    BILLING_CYCLE_MONTHS = {
+        'monthly': 1, 'quarterly': 3, 'semi_annual': 6,
+        'annual': 12, 'lifetime': 1200,
+    }
 
     PLAN_TYPES = (
         ('free', 'Free'),
@@ -220,6 +225,8 @@ class UserSubscription(models.Model):
     auto_renew = models.BooleanField(default=True)
     cancelled_at = models.DateTimeField(blank=True, null=True)
     cancellation_reason = models.TextField(blank=True)
+    # Set when the renewal/expiry notice for the current period is queued
+    renewal_notified_at = models.DateTimeField(blank=True, null=True)
 
     # Usage tracking
     properties_used = models.PositiveIntegerField(default=0)
@@ -235,6 +242,7 @@ class UserSubscription(models.Model):
         indexes = [
             models.Index(fields=['user', 'status']),
             models.Index(fields=['status', 'end_date']),
+            models.Index(fields=['status', 'trial_end_date']),
         ]
 
     def __str__(self):
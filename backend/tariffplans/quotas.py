@@ -0,0 +1,219 @@
+"""
+Subscription quotas for listing and photo limits
+
+A user's active subscription and its plan limits are cached, so checking a
+quota costs one atomic operation:
+
+- listings: a conditional F() update on UserSubscription.properties_used,
+  which only succeeds while the counter is below the plan limit, so two
+  concurrent creates can never both take the last slot;
+- photos per property: a cache counter seeded from the database and
+  bumped with incr, given back when the upload fails or is deleted.
+
+Counters can drift (deactivated listings, deletes outside these helpers),
+so reconcile_subscription_usage() recounts them nightly, and a denied
+listing is recounted once before the user is told to upgrade.
+Users without an active subscription are not limited. The stored status
+is trusted: tariffplans.lifecycle expires and renews subscriptions.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F
+
+from media.models import MediaFile
+from properties.models import Property
+
+from .models import SubscriptionUsage, UserSubscription
+
+PLAN_QUOTA_KEY = 'quota:plan:{}'
+PHOTO_COUNTER_KEY = 'quota:photos:{}'
+
+ACTIVE_STATUSES = ('active', 'trial')
+
+
+class QuotaExceeded(Exception):
+    def __init__(self, quota, resource, limit):
+        self.resource = resource
+        self.limit = limit
+        noun = 'properties' if resource == 'properties' else 'photos per property'
+        super().__init__(f"Your {quota['plan_name']} plan allows {limit} {noun}. Please upgrade your plan.")
+
+
+def _load_plan_quota(user_id):
+    subscription = UserSubscription.objects.filter(
+        user_id=user_id, status__in=ACTIVE_STATUSES,
+    ).select_related('plan').first()
+    if subscription is None:
+        return {'subscription_id': None}
+    return {
+        'subscription_id': subscription.pk,
+        'plan_name': subscription.plan.name,
+        'limits': {
+            'properties': subscription.plan.max_properties,
+            'photos': subscription.plan.max_photos_per_property,
+        },
+    }
+
+
+def get_plan_quota(user_id):
+    """Cached {'subscription_id', 'plan_name', 'limits'}, or None when the user is not limited."""
+    key = PLAN_QUOTA_KEY.format(user_id)
+    quota = cache.get(key)
+    if quota is None:
+        quota = _load_plan_quota(user_id)
+        cache.set(key, quota, timeout=getattr(settings, 'QUOTA_CACHE_TIMEOUT', 300))
+    return quota if quota['subscription_id'] else None
+
+
+def invalidate_plan_quota(*user_ids):
+    cache.delete_many([PLAN_QUOTA_KEY.format(user_id) for user_id in user_ids])
+
+
+def _take_listings(quota, amount):
+    limit = quota['limits']['properties']
+    return UserSubscription.objects.filter(
+        pk=quota['subscription_id'], properties_used__lte=limit - amount,
+    ).update(properties_used=F('properties_used') + amount) == 1
+
+
+def _record_listing_usage(quota, amount, description):
+    SubscriptionUsage.objects.create(
+        subscription_id=quota['subscription_id'], usage_type='property_created',
+        quantity=amount, description=description,
+    )
+
+
+def consume_listing(user_id, description=''):
+    """Take one listing slot or raise QuotaExceeded. Call inside the create's transaction."""
+    quota = get_plan_quota(user_id)
+    if quota is None:
+        return
+    if not _take_listings(quota, 1):
+        # The counter may be stale; recount once before refusing
+        reconcile_subscription(quota['subscription_id'])
+        if not _take_listings(quota, 1):
+            raise QuotaExceeded(quota, 'properties', quota['limits']['properties'])
+    _record_listing_usage(quota, 1, description)
+
+
+def reserve_listings(user_id, amount, description=''):
+    """Take up to `amount` listing slots; returns how many were granted (None when unlimited)."""
+    quota = get_plan_quota(user_id)
+    if quota is None:
+        return None
+    granted = amount
+    reconciled = False
+    while granted > 0 and not _take_listings(quota, granted):
+        if not reconciled:
+            reconcile_subscription(quota['subscription_id'])
+            reconciled = True
+        used = UserSubscription.objects.filter(pk=quota['subscription_id']).values_list(
+            'properties_used', flat=True,
+        ).first() or 0
+        granted = min(granted - 1, quota['limits']['properties'] - used)
+    granted = max(granted, 0)
+    if granted:
+        _record_listing_usage(quota, granted, description)
+    return granted
+
+
+def remaining_listings(user_id):
+    """Free listing slots, None when unlimited. Advisory only (dry runs)."""
+    quota = get_plan_quota(user_id)
+    if quota is None:
+        return None
+    used = UserSubscription.objects.filter(pk=quota['subscription_id']).values_list(
+        'properties_used', flat=True,
+    ).first() or 0
+    return max(quota['limits']['properties'] - used, 0)
+
+
+def release_listing(user_id, amount=1):
+    quota = get_plan_quota(user_id)
+    if quota is None:
+        return
+    UserSubscription.objects.filter(
+        pk=quota['subscription_id'], properties_used__gte=amount,
+    ).update(properties_used=F('properties_used') - amount)
+
+
+def _active_photo_count(property_id):
+    return MediaFile.objects.filter(property_id=property_id, file_type='image', is_active=True).count()
+
+
+def _bump_photo_counter(property_id, delta):
+    key = PHOTO_COUNTER_KEY.format(property_id)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        if delta < 0:
+            return None  # Not counted yet; the next upload seeds it from the database
+        cache.add(key, _active_photo_count(property_id), timeout=getattr(settings, 'QUOTA_COUNTER_TIMEOUT', 60 * 60 * 24))
+        return cache.incr(key, delta)
+
+
+def consume_photo(user_id, property_id):
+    """
+    Count one image upload for property_id, raising QuotaExceeded over the
+    plan's per-property limit. Uploads by unlimited users are counted too,
+    so the counter stays right for everyone.
+    """
+    used = _bump_photo_counter(property_id, 1)
+    quota = get_plan_quota(user_id)
+    if quota is not None and used > quota['limits']['photos']:
+        _bump_photo_counter(property_id, -1)
+        raise QuotaExceeded(quota, 'photos', quota['limits']['photos'])
+
+
+def release_photo(property_id):
+    _bump_photo_counter(property_id, -1)
+
+
+def reconcile_subscription(subscription_id):
+    reconcile_subscription_usage(UserSubscription.objects.filter(pk=subscription_id))
+
+
+def reconcile_subscription_usage(subscriptions=None, chunk_size=500):
+    """
+    Reset usage counters of active subscriptions from the listings and
+    photos that actually exist. Returns the number of subscriptions updated.
+    """
+    if subscriptions is None:
+        subscriptions = UserSubscription.objects.filter(status__in=ACTIVE_STATUSES)
+    subscriptions = subscriptions.only('pk', 'user_id', 'properties_used', 'photos_used').order_by('pk')
+
+    updated = 0
+    chunk = []
+    for subscription in subscriptions.iterator(chunk_size=chunk_size):
+        chunk.append(subscription)
+        if len(chunk) >= chunk_size:
+            updated += _reconcile_chunk(chunk)
+            chunk = []
+    if chunk:
+        updated += _reconcile_chunk(chunk)
+    return updated
+
+
+def _reconcile_chunk(subscriptions):
+    user_ids = {subscription.user_id for subscription in subscriptions}
+    listings = dict(
+        Property.objects.filter(agent__user_id__in=user_ids, is_active=True)
+        .values('agent__user_id').annotate(count=Count('pk')).values_list('agent__user_id', 'count')
+    )
+    photos = dict(
+        MediaFile.objects.filter(
+            property__agent__user_id__in=user_ids, file_type='image', is_active=True,
+        ).values('property__agent__user_id').annotate(count=Count('pk'))
+        .values_list('property__agent__user_id', 'count')
+    )
+
+    changed = []
+    for subscription in subscriptions:
+        counts = (listings.get(subscription.user_id, 0), photos.get(subscription.user_id, 0))
+        if (subscription.properties_used, subscription.photos_used) != counts:
+            subscription.properties_used, subscription.photos_used = counts
+            changed.append(subscription)
+    with transaction.atomic():
+        UserSubscription.objects.bulk_update(changed, ['properties_used', 'photos_used'])
+    return len(changed)
@@ -0,0 +1,50 @@
+"""
+Tariff plan signals
+Invalidate cached public plan listings on catalogue writes, and keep the
+cached quotas (tariffplans.quotas) in step with subscriptions, plans,
+listings and photos.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from media.models import MediaFile
+from properties.models import Property
+from utils.response_cache import watch_models
+
+from .models import PlanFeature, PlanFeatureValue, TariffCategory, TariffPlan, UserSubscription
+from .quotas import invalidate_plan_quota, release_listing, release_photo
+
+watch_models(TariffPlan, TariffCategory, PlanFeature, PlanFeatureValue)
+
+
+def _invalidate_now_and_on_commit(*user_ids):
+    invalidate_plan_quota(*user_ids)
+    transaction.on_commit(lambda: invalidate_plan_quota(*user_ids))
+
+
+@receiver(post_save, sender=UserSubscription)
+@receiver(post_delete, sender=UserSubscription)
+def invalidate_subscriber_quota(sender, instance, **kwargs):
+    _invalidate_now_and_on_commit(instance.user_id)
+
+
+@receiver(post_save, sender=TariffPlan)
+def invalidate_plan_subscriber_quotas(sender, instance, created, **kwargs):
+    if created:
+        return
+    user_ids = list(UserSubscription.objects.filter(plan=instance).values_list('user_id', flat=True).distinct())
+    if user_ids:
+        _invalidate_now_and_on_commit(*user_ids)
+
+
+@receiver(post_delete, sender=Property)
+def release_deleted_listing(sender, instance, **kwargs):
+    if instance.is_active and instance.agent_id:
+        release_listing(instance.agent.user_id)
+
+
+@receiver(post_delete, sender=MediaFile)
+def release_deleted_photo(sender, instance, **kwargs):
+    if instance.is_active and instance.file_type == 'image':
+        release_photo(instance.property_id)
@@ -0,0 +1,22 @@
+from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def reconcile_subscription_usage():
+    """Recount listing and photo usage of active subscriptions (quota counters drift)."""
+    from .quotas import reconcile_subscription_usage as reconcile
+
+    updated = reconcile()
+    logger.info('Reconciled usage counters of %d subscriptions', updated)
+
+
+@shared_task(ignore_result=True)
+def run_subscription_lifecycle():
+    """Expire, renew and downgrade subscriptions and queue renewal notices."""
+    from .lifecycle import run_subscription_lifecycle as sweep
+
+    counts = sweep()
+    logger.info('Subscription lifecycle sweep: %s', counts)
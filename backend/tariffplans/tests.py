@@ -1,3 +1,228 @@
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from agents.models import AgentProfile
+from locations.models import Area, City, Country, Region
+from media.models import MediaFile
+from properties.models import Property, PropertyStatus, PropertyType
+
+from notifications.models import Notification
+
+from .lifecycle import run_subscription_lifecycle
+from .models import PlanUpgrade, SubscriptionUsage, TariffCategory, TariffPlan, UserSubscription
+from .quotas import (
+    QuotaExceeded, consume_listing, consume_photo, get_plan_quota, reconcile_subscription_usage, release_photo,
+    reserve_listings,
+)
+
+User = get_user_model()
+
+
+class SubscriptionQuotaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='quota-agent', email='quota@example.com', password='testpass123', user_type='agent',
+        )
+        self.agent = AgentProfile.objects.create(
+            user=self.user, license_number='QUOTA1', license_expiry=date(2030, 12, 31),
+            years_experience='1-3', specialization='residential', agency_name='Quota Agency',
+        )
+        category = TariffCategory.objects.create(name='Agents', target_audience='agents')
+        self.plan = TariffPlan.objects.create(
+            name='Starter', slug='starter', description='Starter plan', category=category, plan_type='basic',
+            price=1000, currency='XAF', billing_cycle='monthly', max_properties=2, max_photos_per_property=2,
+        )
+        self.subscription = UserSubscription.objects.create(
+            user=self.user, plan=self.plan, status='active', start_date=timezone.now(),
+            end_date=timezone.now() + timedelta(days=30), amount_paid=1000, currency='XAF', billing_cycle='monthly',
+        )
+
+        region = Region.objects.create(
+            name='Centre', code='centre', country=Country.objects.create(name='Cameroon', code='CM'),
+        )
+        self.area = Area.objects.create(name='Bastos', city=City.objects.create(name='Yaounde', region=region))
+        self.property_type = PropertyType.objects.create(name='Studio', category='studio')
+        self.status = PropertyStatus.objects.create(name='available')
+
+    def _property(self, title='Listing'):
+        return Property.objects.create(
+            title=title, property_type=self.property_type, status=self.status, listing_type='rent',
+            price=100000, currency='XAF', area=self.area, agent=self.agent, description='Quota test',
+        )
+
+    def test_plan_limits_are_cached(self):
+        get_plan_quota(self.user.pk)
+        with self.assertNumQueries(0):
+            quota = get_plan_quota(self.user.pk)
+        self.assertEqual(quota['limits'], {'properties': 2, 'photos': 2})
+
+    def test_listing_slots_are_taken_atomically_up_to_the_limit(self):
+        get_plan_quota(self.user.pk)
+        with self.assertNumQueries(2):  # conditional update, usage log
+            consume_listing(self.user.pk)
+        consume_listing(self.user.pk)
+        self._property('One')
+        self._property('Two')
+
+        with self.assertRaises(QuotaExceeded):
+            consume_listing(self.user.pk)
+        self.subscription.refresh_from_db()
+        self.assertEqual(self.subscription.properties_used, 2)
+        self.assertEqual(SubscriptionUsage.objects.filter(subscription=self.subscription).count(), 2)
+
+    def test_stale_counter_is_recounted_before_refusing(self):
+        UserSubscription.objects.filter(pk=self.subscription.pk).update(properties_used=2)
+        consume_listing(self.user.pk)
+        self.subscription.refresh_from_db()
+        self.assertEqual(self.subscription.properties_used, 1)
+
+    def test_bulk_reservation_grants_the_remaining_slots(self):
+        self._property()
+        UserSubscription.objects.filter(pk=self.subscription.pk).update(properties_used=1)
+        self.assertEqual(reserve_listings(self.user.pk, 5), 1)
+        self._property('Imported')
+        self.assertEqual(reserve_listings(self.user.pk, 5), 0)
+
+    def test_deleting_a_listing_frees_its_slot(self):
+        consume_listing(self.user.pk)
+        self._property().delete()
+        self.subscription.refresh_from_db()
+        self.assertEqual(self.subscription.properties_used, 0)
+
+    def test_plan_change_reaches_cached_quota(self):
+        get_plan_quota(self.user.pk)
+        self.plan.max_properties = 5
+        self.plan.save()
+        self.assertEqual(get_plan_quota(self.user.pk)['limits']['properties'], 5)
+
+    def test_photo_counter_limits_uploads_per_property(self):
+        prop = self._property()
+        MediaFile.objects.create(property=prop, file='media_files/a.jpg', file_type='image')
+
+        consume_photo(self.user.pk, prop.pk)
+        with self.assertRaises(QuotaExceeded):
+            consume_photo(self.user.pk, prop.pk)
+        release_photo(prop.pk)
+        consume_photo(self.user.pk, prop.pk)
+
+    def test_unsubscribed_users_are_not_limited(self):
+        self.subscription.status = 'cancelled'
+        self.subscription.save()
+        for _ in range(3):
+            consume_listing(self.user.pk)
+        self.assertIsNone(get_plan_quota(self.user.pk))
+
+    def test_reconcile_resets_counters_from_data(self):
+        prop = self._property()
+        MediaFile.objects.create(property=prop, file='media_files/a.jpg', file_type='image')
+        UserSubscription.objects.filter(pk=self.subscription.pk).update(properties_used=7, photos_used=0)
+
+        self.assertEqual(reconcile_subscription_usage(), 1)
+        self.subscription.refresh_from_db()
+        self.assertEqual((self.subscription.properties_used, self.subscription.photos_used), (1, 1))
+
+    def test_create_endpoint_refuses_over_quota(self):
+        self._property('One')
+        self._property('Two')
+        UserSubscription.objects.filter(pk=self.subscription.pk).update(properties_used=2)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post('/api/properties/', {
+            'title': 'Three', 'property_type': self.property_type.pk, 'status': self.status.pk,
+            'listing_type': 'rent', 'price': 100000, 'currency': 'XAF', 'area': self.area.pk,
+            'description': 'Over quota',
+        }, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertIn('Starter plan allows 2 properties', str(response.data))
+
+
+class SubscriptionLifecycleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+        self.category = TariffCategory.objects.create(name='Agents', target_audience='agents')
+        self.plan = self._plan('Pro', 'premium', 5000)
+        self.free = self._plan('Free', 'free', 0)
+
+    def _plan(self, name, plan_type, price):
+        return TariffPlan.objects.create(
+            name=name, slug=name.lower(), description=name, category=self.category, plan_type=plan_type,
+            price=price, currency='XAF', billing_cycle='monthly',
+        )
+
+    def _subscription(self, email, status='active', ends_in_days=-1, auto_renew=True, **extra):
+        user = User.objects.create_user(
+            username=email, email=email, password='testpass123', user_type='agent',
+            phone_number=f'+23760000{User.objects.count():04d}',
+        )
+        return UserSubscription.objects.create(
+            user=user, plan=extra.pop('plan', self.plan), status=status,
+            start_date=self.now - timedelta(days=30), end_date=self.now + timedelta(days=ends_in_days),
+            amount_paid=5000, currency='XAF', billing_cycle='monthly', auto_renew=auto_renew, **extra,
+        )
+
+    def test_sweep_moves_each_subscription_to_its_next_state(self):
+        renewing = self._subscription('renew@example.com', api_calls_used=9)
+        lapsing = self._subscription('lapse@example.com', auto_renew=False)
+        trial_ended = self._subscription(
+            'trial@example.com', status='trial', ends_in_days=20, auto_renew=False,
+            trial_end_date=self.now - timedelta(hours=1),
+        )
+        trial_converting = self._subscription(
+            'convert@example.com', status='trial', ends_in_days=20, trial_end_date=self.now - timedelta(hours=1),
+        )
+        current = self._subscription('current@example.com', ends_in_days=20)
+
+        counts = run_subscription_lifecycle(self.now)
+
+        self.assertEqual(counts['renewed'], 1)
+        self.assertEqual(counts['expired'], 1)
+        self.assertEqual((counts['trials_converted'], counts['trials_expired']), (1, 1))
+        for subscription in (renewing, lapsing, trial_ended, trial_converting, current):
+            subscription.refresh_from_db()
+        self.assertEqual(renewing.status, 'active')
+        self.assertEqual(renewing.end_date, self.now + timedelta(days=29))
+        self.assertEqual(renewing.api_calls_used, 0)
+        self.assertEqual(lapsing.status, 'expired')
+        self.assertEqual(trial_ended.status, 'expired')
+        self.assertEqual(trial_converting.status, 'active')
+        self.assertEqual(current.status, 'active')
+
+    def test_retired_plans_are_downgraded_with_history(self):
+        subscription = self._subscription('retired@example.com')
+        self.plan.is_active = False
+        self.plan.save()
+
+        counts = run_subscription_lifecycle(self.now)
+
+        subscription.refresh_from_db()
+        self.assertEqual(counts['downgraded'], 1)
+        self.assertEqual(subscription.plan, self.free)
+        self.assertGreater(subscription.end_date, self.now)
+        upgrade = PlanUpgrade.objects.get(user=subscription.user)
+        self.assertEqual((upgrade.from_plan, upgrade.to_plan, upgrade.change_type), (self.plan, self.free, 'downgrade'))
+
+    def test_renewal_notices_are_queued_once_per_period(self):
+        subscription = self._subscription('soon@example.com', ends_in_days=2)
+        self._subscription('later@example.com', ends_in_days=20)
+
+        self.assertEqual(run_subscription_lifecycle(self.now)['notices_queued'], 1)
+        self.assertEqual(run_subscription_lifecycle(self.now)['notices_queued'], 0)
+        notice = Notification.objects.get()
+        self.assertEqual(notice.recipient, subscription.user)
+        self.assertEqual(notice.status, 'pending')
+        self.assertIsNotNone(notice.scheduled_at)
+
+    def test_expired_subscription_no_longer_limits_quota(self):
+        subscription = self._subscription('quota@example.com', auto_renew=False)
+        self.assertIsNotNone(get_plan_quota(subscription.user_id))
+
+        run_subscription_lifecycle(self.now)
 
-# Create your tests here.
+        self.assertIsNone(get_plan_quota(subscription.user_id))
@@ -5,8 +5,9 @@ from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from datetime import timedelta
+from utils.response_cache import VersionedCacheMixin, cache_versioned_response
 from .models import (
-    TariffCategory, TariffPlan, PlanFeature,
+    TariffCategory, TariffPlan, PlanFeature, PlanFeatureValue,
     UserSubscription, SubscriptionUsage, PlanUpgrade
 )
 from .serializers import (
@@ -23,10 +24,11 @@ class TariffCategoryListAPIView(generics.ListAPIView):
     queryset = TariffCategory.objects.filter(is_active=True).order_by('display_order')
 
 
-class TariffPlanListAPIView(generics.ListAPIView):
+class TariffPlanListAPIView(VersionedCacheMixin, generics.ListAPIView):
     """List active tariff plans"""
     serializer_class = TariffPlanListSerializer
     permission_classes = [AllowAny]
+    cache_models = (TariffPlan, TariffCategory)
 
     def get_queryset(self):
         qs = TariffPlan.objects.filter(
@@ -106,11 +108,7 @@ def subscribe(request):
         )
 
     # Calculate dates
-    cycle_months = {
-        'monthly': 1, 'quarterly': 3, 'semi_annual': 6,
-        'annual': 12, 'lifetime': 1200,
-    }
-    months = cycle_months.get(data['billing_cycle'], 1)
+    months = TariffPlan.BILLING_CYCLE_MONTHS.get(data['billing_cycle'], 1)
     now = timezone.now()
     end_date = now + timedelta(days=months * 30)
 
@@ -215,6 +213,7 @@ class PlanUpgradeHistoryAPIView(generics.ListAPIView):
         ).select_related('from_plan', 'to_plan').order_by('-requested_at')
 
 
+@cache_versioned_response(TariffPlan, TariffCategory, PlanFeature, PlanFeatureValue)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def compare_plans(request):
@@ -225,5 +224,6 @@ def compare_plans(request):
         plans = TariffPlan.objects.filter(id__in=ids, is_active=True)
     else:
         plans = TariffPlan.objects.filter(is_active=True, is_public=True).order_by('display_order')
+    plans = plans.select_related('category').prefetch_related('feature_values__feature')
 
     return Response(TariffPlanSerializer(plans, many=True).data)
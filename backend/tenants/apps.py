@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class TenantsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tenants'
-    verbose_name = 'Tenant Management'
\ No newline at end of file
+    verbose_name = 'Tenant Management'
+
+    def ready(self):
+        import tenants.signals  # noqa: F401
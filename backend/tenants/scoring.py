@@ -2,11 +2,34 @@
 Tenant Credit Scoring Algorithm
 Calculates a score (0-850) based on payment history, verification,
 documents, lease compliance, and profile completeness.
+
+Scores are computed in bulk by calculate_all_tenant_scores (grouped
+aggregates, one pass per chunk of tenants) and cached per tenant, so the
+credit score endpoint is normally a cache lookup.
 """
-from decimal import Decimal
-from django.db.models import Count, Q, Sum
+from django.core.cache import cache
+from django.db.models import Count, Q
 from django.utils import timezone
 
+from .models import TenantProfile
+
+TENANT_SCORE_CACHE_KEY = 'tenants:credit-score:v1:{profile_id}'
+TENANT_SCORE_CACHE_TIMEOUT = 60 * 60 * 24 * 2  # Outlives the nightly batch run
+
+MAX_SCORE = 850
+
+DOCUMENT_FIELDS = (
+    'government_id_upload', 'id_document_front', 'id_document_back',
+    'employment_certificate', 'income_statement', 'bank_statement',
+    'taxpayer_card',
+)
+PROFILE_FIELDS = (
+    'employment_status', 'monthly_income_range', 'emergency_contact_name',
+    'emergency_contact_phone', 'employer_name', 'national_id_number',
+    'passport_number', 'guarantor_name', 'date_of_birth',
+)
+BAD_TERMINATION_REASONS = ('non_payment', 'breach')
+
 
 def calculate_tenant_score(tenant_profile):
     """
@@ -21,55 +44,139 @@ def calculate_tenant_score(tenant_profile):
 
     Returns dict with total score and component breakdown.
     """
-    user = tenant_profile.user
-    scores = {}
+    profile_id = tenant_profile.pk
+    payments = _payment_aggregates([profile_id]).get(profile_id, {})
+    leases = _lease_aggregates([profile_id]).get(profile_id, {})
 
-    # 1. Payment history (340 pts)
-    scores['payment_history'] = _score_payment_history(tenant_profile, user)
+    result = build_score(tenant_profile, tenant_profile.user, payments, leases)
 
-    # 2. Verification status (170 pts)
-    scores['verification'] = _score_verification(tenant_profile, user)
+    # Persist to model
+    tenant_profile.credit_score = result['total']
+    tenant_profile.save(update_fields=['credit_score'])
+    cache.set(tenant_score_cache_key(profile_id), result, timeout=TENANT_SCORE_CACHE_TIMEOUT)
 
-    # 3. Document uploads (127 pts)
-    scores['documents'] = _score_documents(tenant_profile)
+    return result
 
-    # 4. Lease compliance (128 pts)
-    scores['lease_compliance'] = _score_lease_compliance(tenant_profile)
 
-    # 5. Profile completeness (85 pts)
-    scores['profile_completeness'] = _score_profile(tenant_profile)
+def calculate_all_tenant_scores(profile_ids=None, chunk_size=500):
+    """
+    Score many tenants with two grouped aggregate queries per chunk.
 
-    total = sum(scores.values())
-    total = min(total, 850)
+    Only changed credit_score values are written (bulk_update) and every
+    breakdown is cached with one set_many per chunk. Returns the number of
+    tenants scored.
+    """
+    queryset = TenantProfile.objects.order_by('pk')
+    if profile_ids is not None:
+        queryset = queryset.filter(pk__in=profile_ids)
+    all_ids = list(queryset.values_list('pk', flat=True))
+
+    scored = 0
+    for start in range(0, len(all_ids), chunk_size):
+        chunk_ids = all_ids[start:start + chunk_size]
+        profiles = TenantProfile.objects.filter(pk__in=chunk_ids).select_related('user').only(
+            'pk', 'credit_score', 'is_verified', *DOCUMENT_FIELDS, *PROFILE_FIELDS,
+            'user__is_email_verified', 'user__is_phone_verified', 'user__is_kyc_verified',
+        )
+        payments = _payment_aggregates(chunk_ids)
+        leases = _lease_aggregates(chunk_ids)
+
+        changed = []
+        cached = {}
+        for profile in profiles:
+            result = build_score(profile, profile.user, payments.get(profile.pk, {}), leases.get(profile.pk, {}))
+            cached[tenant_score_cache_key(profile.pk)] = result
+            if profile.credit_score != result['total']:
+                profile.credit_score = result['total']
+                changed.append(profile)
+
+        TenantProfile.objects.bulk_update(changed, ['credit_score'])
+        cache.set_many(cached, timeout=TENANT_SCORE_CACHE_TIMEOUT)
+        scored += len(cached)
+
+    return scored
+
+
+def get_tenant_score(tenant_profile):
+    """Cached breakdown for a tenant, computing it only on a cache miss."""
+    result = cache.get(tenant_score_cache_key(tenant_profile.pk))
+    if result is not None:
+        return result
+    return calculate_tenant_score(tenant_profile)
+
+
+def tenant_score_cache_key(profile_id):
+    return TENANT_SCORE_CACHE_KEY.format(profile_id=profile_id)
+
+
+def invalidate_tenant_score(profile_id):
+    cache.delete(tenant_score_cache_key(profile_id))
+
+
+def build_score(profile, user, payments, leases):
+    scores = {
+        # 1. Payment history (340 pts)
+        'payment_history': _score_payment_history(**payments),
+        # 2. Verification status (170 pts)
+        'verification': _score_verification(profile, user),
+        # 3. Document uploads (127 pts)
+        'documents': _score_documents(profile),
+        # 4. Lease compliance (128 pts)
+        'lease_compliance': _score_lease_compliance(**leases),
+        # 5. Profile completeness (85 pts)
+        'profile_completeness': _score_profile(profile),
+    }
 
-    # Persist to model
-    tenant_profile.credit_score = total
-    tenant_profile.save(update_fields=['credit_score'])
+    total = min(sum(scores.values()), MAX_SCORE)
 
     return {
         'total': total,
-        'max': 850,
+        'max': MAX_SCORE,
         'grade': _grade(total),
         'components': scores,
     }
 
 
-def _score_payment_history(profile, user):
-    """Score based on RentSchedule payment records."""
+def _payment_aggregates(profile_ids):
+    """RentSchedule counts per tenant profile, in one grouped query."""
     from leases.models import RentSchedule
 
-    schedules = RentSchedule.objects.filter(
-        lease__tenant=profile,
+    rows = RentSchedule.objects.filter(
+        lease__tenant_id__in=profile_ids,
         due_date__lte=timezone.now().date(),
+    ).values('lease__tenant_id').annotate(
+        total=Count('id'),
+        paid_on_time=Count('id', filter=Q(is_paid=True, late_fee_applied=0)),
+        paid_late=Count('id', filter=Q(is_paid=True, late_fee_applied__gt=0)),
+        unpaid=Count('id', filter=Q(is_paid=False)),
     )
-    total = schedules.count()
+    return {
+        row.pop('lease__tenant_id'): row
+        for row in rows
+    }
+
+
+def _lease_aggregates(profile_ids):
+    """Lease counts per tenant profile, in one grouped query."""
+    from leases.models import LeaseAgreement
+
+    rows = LeaseAgreement.objects.filter(
+        tenant_id__in=profile_ids,
+    ).values('tenant_id').annotate(
+        total=Count('id'),
+        bad_terminations=Count('id', filter=Q(termination_reason__in=BAD_TERMINATION_REASONS)),
+    )
+    return {
+        row.pop('tenant_id'): row
+        for row in rows
+    }
+
+
+def _score_payment_history(total=0, paid_on_time=0, paid_late=0, unpaid=0):
+    """Score based on RentSchedule payment records."""
     if total == 0:
         return 170  # No history → neutral (half credit)
 
-    paid_on_time = schedules.filter(is_paid=True, late_fee_applied=False).count()
-    paid_late = schedules.filter(is_paid=True, late_fee_applied=True).count()
-    unpaid = schedules.filter(is_paid=False).count()
-
     ratio = (paid_on_time + paid_late * 0.5) / total
     penalty = min(unpaid * 30, 170)  # Each unpaid = -30, cap at 170
     score = int(340 * ratio) - penalty
@@ -92,28 +199,16 @@ def _score_verification(profile, user):
 
 def _score_documents(profile):
     """Score based on uploaded documents."""
-    doc_fields = [
-        'government_id_upload', 'id_document_front', 'id_document_back',
-        'employment_certificate', 'income_statement', 'bank_statement',
-        'taxpayer_card',
-    ]
-    uploaded = sum(1 for f in doc_fields if getattr(profile, f, None))
+    uploaded = sum(1 for f in DOCUMENT_FIELDS if getattr(profile, f, None))
     # Each doc worth ~18 pts
-    return min(int(127 * uploaded / len(doc_fields)), 127)
+    return min(int(127 * uploaded / len(DOCUMENT_FIELDS)), 127)
 
 
-def _score_lease_compliance(profile):
+def _score_lease_compliance(total=0, bad_terminations=0):
     """Score based on lease termination reasons."""
-    from leases.models import LeaseAgreement
-
-    leases = LeaseAgreement.objects.filter(tenant=profile)
-    total = leases.count()
     if total == 0:
         return 64  # Neutral
 
-    bad_terminations = leases.filter(
-        termination_reason__in=['non_payment', 'breach'],
-    ).count()
     good = total - bad_terminations
     ratio = good / total
     return int(128 * ratio)
@@ -77,17 +77,18 @@ class TenantApplicationSerializer(serializers.ModelSerializer):
     property_id = serializers.IntegerField(write_only=True, required=True)
     tenant_name = serializers.CharField(source='tenant.user.get_full_name', read_only=True)
     tenant_email = serializers.EmailField(source='tenant.user.email', read_only=True)
+    tenant_credit_score = serializers.IntegerField(source='tenant.credit_score', read_only=True)
 
     class Meta:
         model = TenantApplication
         fields = [
-            'id', 'tenant', 'tenant_name', 'tenant_email', 'property_id',
+            'id', 'tenant', 'tenant_name', 'tenant_email', 'tenant_credit_score', 'property_id',
             'property_title', 'property_location', 'property_price', 'property_image',
             'status', 'desired_move_in_date', 'lease_duration_months', 'offered_rent',
             'additional_occupants', 'special_requests', 'cover_letter',
             'review_notes', 'review_date', 'created_at', 'updated_at', 'submitted_at'
         ]
-        read_only_fields = ['id', 'tenant', 'tenant_name', 'tenant_email', 'status',
+        read_only_fields = ['id', 'tenant', 'tenant_name', 'tenant_email', 'tenant_credit_score', 'status',
                            'review_notes', 'review_date', 'created_at', 'updated_at',
                            'submitted_at', 'property_title', 'property_location',
                            'property_price', 'property_image']
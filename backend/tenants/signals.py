@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from leases.models import LeaseAgreement, RentSchedule
+from .models import TenantProfile
+from .scoring import invalidate_tenant_score
+
+# Saves that only write the score back must not queue another scoring run
+IGNORED_UPDATE_FIELDS = {'credit_score', 'updated_at'}
+# User fields read by the score's verification component
+USER_SCORE_FIELDS = {'is_email_verified', 'is_phone_verified', 'is_kyc_verified'}
+
+
+def queue_tenant_score_refresh(profile_id):
+    """Drop the cached breakdown and, when enabled, rescore the tenant in the background."""
+    def _dispatch():
+        invalidate_tenant_score(profile_id)
+        if not getattr(settings, 'TENANT_SCORE_AUTO_REFRESH', False):
+            return
+
+        from .tasks import refresh_tenant_credit_scores
+
+        refresh_tenant_credit_scores.delay([profile_id])
+
+    transaction.on_commit(_dispatch)
+
+
+@receiver(post_save, sender=TenantProfile)
+def queue_profile_score_refresh(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and {str(field) for field in update_fields} <= IGNORED_UPDATE_FIELDS:
+        return
+    queue_tenant_score_refresh(instance.pk)
+
+
+@receiver(post_save, sender=LeaseAgreement)
+@receiver(post_delete, sender=LeaseAgreement)
+def queue_lease_score_refresh(sender, instance, **kwargs):
+    queue_tenant_score_refresh(instance.tenant_id)
+
+
+@receiver(post_save, sender=RentSchedule)
+@receiver(post_delete, sender=RentSchedule)
+def queue_rent_schedule_score_refresh(sender, instance, **kwargs):
+    try:
+        tenant_id = instance.lease.tenant_id
+    except LeaseAgreement.DoesNotExist:
+        return
+    queue_tenant_score_refresh(tenant_id)
+
+
+@receiver(post_save, sender=get_user_model())
+def queue_user_score_refresh(sender, instance, created=False, update_fields=None, **kwargs):
+    # Logins save last_login only; new users have no tenant profile yet
+    if created or (update_fields is not None and not {str(field) for field in update_fields} & USER_SCORE_FIELDS):
+        return
+    profile_id = TenantProfile.objects.filter(user_id=instance.pk).values_list('pk', flat=True).first()
+    if profile_id is not None:
+        queue_tenant_score_refresh(profile_id)
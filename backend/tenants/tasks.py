@@ -0,0 +1,21 @@
+from celery import shared_task
+import logging
+
+from utils.db_routing import use_replica
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def refresh_tenant_credit_scores(profile_ids=None, replica=False):
+    """
+    Recompute and cache credit scores for the given tenants, or for all tenants.
+
+    Signals dispatch this right after a write, so it reads the primary; only
+    the nightly beat run passes replica=True.
+    """
+    from .scoring import calculate_all_tenant_scores
+
+    with use_replica(replica):
+        scored = calculate_all_tenant_scores(profile_ids)
+    logger.info('Refreshed credit scores for %d tenants', scored)
@@ -0,0 +1,105 @@
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from agents.models import AgentProfile
+from leases.models import LeaseAgreement, RentSchedule
+from locations.models import Area, City, Country, Region
+from properties.models import Property, PropertyStatus, PropertyType
+from .models import TenantProfile
+from .scoring import calculate_all_tenant_scores, calculate_tenant_score, get_tenant_score
+
+User = get_user_model()
+
+
+class TenantScoringTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        landlord = User.objects.create_user(
+            username='landlord', email='landlord@example.com', password='testpass123',
+            phone_number='+237600000300', user_type='agent',
+        )
+        country = Country.objects.create(name='Cameroon', code='CM')
+        region = Region.objects.create(name='Centre', code='centre', country=country)
+        area = Area.objects.create(name='Bastos', city=City.objects.create(name='Yaoundé', region=region))
+        self.rental_property = Property.objects.create(
+            title='Scored Property',
+            description='Scoring property',
+            property_type=PropertyType.objects.create(name='Studio', category='studio'),
+            status=PropertyStatus.objects.create(name='available'),
+            listing_type='rent',
+            price=100000,
+            area=area,
+            agent=AgentProfile.objects.create(user=landlord, bio='Agent'),
+        )
+        self.landlord = landlord
+        self.profiles = []
+        for index in range(3):
+            user = User.objects.create_user(
+                username=f'tenant{index}', email=f'tenant{index}@example.com', password='testpass123',
+                phone_number=f'+23760000031{index}', user_type='tenant', is_phone_verified=bool(index),
+            )
+            profile = TenantProfile.objects.create(user=user, employer_name='Acme' if index else '')
+            lease = LeaseAgreement.objects.create(
+                rental_property=self.rental_property,
+                tenant=profile,
+                landlord=landlord,
+                start_date=date(2025, 1, 1),
+                end_date=date(2025, 12, 31),
+                rent_amount=100000,
+                termination_reason='breach' if index == 2 else '',
+            )
+            for month in range(index + 1):
+                RentSchedule.objects.create(
+                    lease=lease,
+                    due_date=date(2025, 1, 1) + timedelta(days=31 * month),
+                    amount=100000,
+                    is_paid=month != 1,
+                )
+            self.profiles.append(profile)
+
+    def test_batch_scores_match_single_tenant_scores(self):
+        expected = {profile.pk: calculate_tenant_score(profile) for profile in self.profiles}
+        cache.clear()
+        TenantProfile.objects.update(credit_score=None)
+
+        self.assertEqual(calculate_all_tenant_scores(), 3)
+
+        for profile in self.profiles:
+            profile.refresh_from_db()
+            self.assertEqual(profile.credit_score, expected[profile.pk]['total'])
+            self.assertEqual(get_tenant_score(profile), expected[profile.pk])
+
+    def test_batch_query_count_does_not_grow_with_tenants(self):
+        # ids, payments, leases, profiles, bulk update
+        with self.assertNumQueries(5):
+            calculate_all_tenant_scores()
+
+    def test_cached_score_lookup_does_not_recompute(self):
+        calculate_all_tenant_scores()
+
+        with self.assertNumQueries(0):
+            get_tenant_score(self.profiles[0])
+
+    def test_rent_schedule_change_invalidates_cached_score(self):
+        calculate_all_tenant_scores()
+        lease = self.profiles[0].leases.get()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            RentSchedule.objects.create(lease=lease, due_date=date(2025, 6, 1), amount=100000)
+
+        with self.assertNumQueries(3):
+            get_tenant_score(self.profiles[0])
+
+    def test_user_verification_invalidates_cached_score(self):
+        calculate_all_tenant_scores()
+        user = self.profiles[0].user
+        before = get_tenant_score(self.profiles[0])['components']['verification']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.is_kyc_verified = True
+            user.save()
+
+        self.assertGreater(get_tenant_score(self.profiles[0])['components']['verification'], before)
@@ -4,6 +4,7 @@ from rest_framework.response import Response
 from django.db.models import Q
 from .models import Tenant, TenantDocument, TenantApplication, TenantProfile
 from .serializers import TenantSerializer, TenantDocumentSerializer, TenantApplicationSerializer
+from users.permissions import get_request_agent_profile
 
 
 class TenantViewSet(viewsets.ModelViewSet):
@@ -56,8 +57,9 @@ class TenantApplicationViewSet(viewsets.ModelViewSet):
             return qs.all()
 
         # Agents see applications for their properties
-        if user.user_type == 'agent' and hasattr(user, 'agents_profile'):
-            return qs.filter(property__agent=user.agents_profile)
+        agent_profile = get_request_agent_profile(self.request) if user.user_type == 'agent' else None
+        if agent_profile is not None:
+            return qs.filter(property__agent=agent_profile)
 
         # Tenants see their own applications
         if hasattr(user, 'tenant_profile'):
@@ -69,14 +71,15 @@ class TenantApplicationViewSet(viewsets.ModelViewSet):
     def agent(self, request):
         """List applications for the agent's properties"""
         user = request.user
-        if user.user_type != 'agent' or not hasattr(user, 'agents_profile'):
+        agent_profile = get_request_agent_profile(request) if user.user_type == 'agent' else None
+        if agent_profile is None:
             return Response(
                 {'detail': 'Only agents can access this endpoint.'},
                 status=status.HTTP_403_FORBIDDEN
             )
 
         qs = TenantApplication.objects.filter(
-            property__agent=user.agents_profile
+            property__agent=agent_profile
         ).select_related(
             'property', 'property__area__city', 'tenant__user'
         ).prefetch_related('property__media_files').order_by('-created_at')
@@ -95,10 +98,11 @@ class TenantApplicationViewSet(viewsets.ModelViewSet):
         user = request.user
 
         # Only the property's agent or staff can update status
+        agent_profile = get_request_agent_profile(request)
         if not user.is_staff and (
             user.user_type != 'agent' or
-            not hasattr(user, 'agents_profile') or
-            application.property.agent != user.agents_profile
+            agent_profile is None or
+            application.property.agent_id != agent_profile.id
         ):
             return Response(
                 {'detail': 'You do not have permission to update this application.'},
@@ -185,7 +189,7 @@ class TenantApplicationViewSet(viewsets.ModelViewSet):
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def tenant_credit_score(request):
-    """Calculate and return the tenant's credit score."""
+    """Return the tenant's credit score, computing it only if no cached breakdown exists."""
     try:
         profile = request.user.tenant_profile
     except TenantProfile.DoesNotExist:
@@ -194,6 +198,6 @@ def tenant_credit_score(request):
             status=status.HTTP_404_NOT_FOUND,
         )
 
-    from .scoring import calculate_tenant_score
-    result = calculate_tenant_score(profile)
+    from .scoring import get_tenant_score
+    result = get_tenant_score(profile)
     return Response(result)
@@ -0,0 +1,222 @@
+"""
+API benchmark harness.
+
+Seeds the seed_test_data fixtures, multiplies listings, messages and view
+events by a configurable scale, then replays the hot endpoints while
+recording latency percentiles and SQL query counts. Results are compared
+with the committed budgets in benchmark_budgets.json: query counts are
+always enforced, latency only on request (CI machines vary too much).
+
+Used by tests/test_api_benchmarks.py and the benchmark_api command.
+"""
+import io
+import json
+import random
+import statistics
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+BUDGETS_PATH = Path(__file__).with_name('benchmark_budgets.json')
+
+ANONYMOUS = None
+ADMIN = 'admin@property237.com'
+AGENT = 'agent1@property237.com'
+TENANT = 'tenant1@property237.com'
+
+
+class Scenario:
+    def __init__(self, name, user_email, path):
+        self.name = name
+        self.user_email = user_email
+        self.path = path
+
+    def url(self, context):
+        return self.path(context) if callable(self.path) else self.path
+
+
+SCENARIOS = [
+    Scenario('property_list', ANONYMOUS, '/api/properties/'),
+    Scenario('property_search', ANONYMOUS, '/api/properties/search/?listing_type=rent'),
+    Scenario('proximity_search', TENANT, lambda ctx: (
+        f"/api/properties/nearby/?lat={ctx['lat']}&lng={ctx['lng']}&radius_km=200"
+    )),
+    Scenario('property_detail', TENANT, lambda ctx: f"/api/properties/{ctx['property_slug']}/"),
+    Scenario('chat_inbox', TENANT, '/api/chat/conversations/'),
+    Scenario('chat_poll', TENANT, lambda ctx: (
+        f"/api/chat/conversations/{ctx['conversation_id']}/poll/?since={ctx['poll_since']}"
+    )),
+    Scenario('agent_dashboard', AGENT, '/api/analytics/agent/dashboard/'),
+    Scenario('tenant_dashboard', TENANT, '/api/analytics/tenant/dashboard/'),
+    Scenario('admin_dashboard', ADMIN, '/api/analytics/admin/dashboard/'),
+    Scenario('location_tree', ANONYMOUS, '/api/locations/tree/'),
+]
+
+
+def load_budgets(path=BUDGETS_PATH):
+    with open(path, encoding='utf-8') as budgets_file:
+        return json.load(budgets_file)
+
+
+def seed_benchmark_data(scale=1, seed=237):
+    """
+    seed_test_data, then scale-1 extra copies of every listing, plus
+    messages and view events proportional to scale.
+    """
+    from analytics.models import PropertyViewEvent
+    from chat.models import Conversation, Message
+    from properties.models import Property
+    from properties.slugs import allocate_slugs, base_slug_for
+
+    call_command('seed_test_data', stdout=io.StringIO())
+    rng = random.Random(seed)
+
+    originals = list(Property.objects.select_related('area'))
+    copied_fields = [
+        field.attname for field in Property._meta.concrete_fields
+        if not field.primary_key and field.name != 'slug'
+    ]
+    copies = []
+    for copy_number in range(1, scale):
+        for prop in originals:
+            clone = Property(**{name: getattr(prop, name) for name in copied_fields})
+            clone.area = prop.area
+            clone.title = f'{prop.title} ({copy_number})'
+            clone.price = prop.price + copy_number * 1000
+            clone.views_count = rng.randint(0, 500)
+            copies.append(clone)
+    bases = [base_slug_for(clone.title, clone.area.name) for clone in copies]
+    for clone, slug in zip(copies, allocate_slugs(bases)):
+        clone.slug = slug
+    Property.objects.bulk_create(copies, batch_size=200)
+
+    now = timezone.now()
+    messages = []
+    for conversation in Conversation.objects.prefetch_related('participants'):
+        participants = list(conversation.participants.all())
+        if not participants:
+            continue
+        for index in range(10 * scale):
+            messages.append(Message(
+                conversation=conversation,
+                sender=participants[index % len(participants)],
+                content=f'Benchmark message {index}',
+                message_type='text',
+                is_read=index % 3 != 0,
+            ))
+    Message.objects.bulk_create(messages, batch_size=500)
+
+    property_ids = list(Property.objects.values_list('pk', flat=True))
+    PropertyViewEvent.objects.bulk_create([
+        PropertyViewEvent(
+            property_id=rng.choice(property_ids),
+            ip_address=f'10.0.{rng.randint(0, 255)}.{rng.randint(1, 254)}',
+            viewed_at=now - timedelta(days=rng.randint(0, 60)),
+        )
+        for _ in range(50 * scale)
+    ], batch_size=500)
+
+
+def build_context():
+    from chat.models import Conversation
+    from django.contrib.auth import get_user_model
+    from properties.models import Property
+
+    User = get_user_model()
+    prop = Property.objects.filter(is_active=True).select_related('area__city').order_by('pk').first()
+    tenant = User.objects.get(email=TENANT)
+    conversation = Conversation.objects.filter(participants=tenant).order_by('pk').first()
+    latitude = prop.effective_latitude or 4.05
+    longitude = prop.effective_longitude or 9.7
+
+    return {
+        'property_slug': prop.slug,
+        'lat': latitude,
+        'lng': longitude,
+        'conversation_id': conversation.conversation_id if conversation else '',
+        'poll_since': (timezone.now() - timedelta(days=1)).isoformat().replace('+00:00', 'Z'),
+    }
+
+
+def _percentile(samples, percent):
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def run_benchmarks(iterations=20, warmup=2, scenarios=None):
+    """{name: {'status', 'queries', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms', 'mean_ms'}}"""
+    from django.contrib.auth import get_user_model
+
+    User = get_user_model()
+    context = build_context()
+    cache.clear()
+
+    results = {}
+    for scenario in scenarios or SCENARIOS:
+        client = APIClient()
+        if scenario.user_email:
+            client.force_authenticate(User.objects.get(email=scenario.user_email))
+        url = scenario.url(context)
+
+        for _ in range(warmup):
+            client.get(url)
+
+        timings = []
+        max_queries = 0
+        status_code = None
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+            max_queries = max(max_queries, len(queries))
+            status_code = response.status_code
+
+        results[scenario.name] = {
+            'status': status_code,
+            'queries': max_queries,
+            'p50_ms': round(_percentile(timings, 50), 2),
+            'p95_ms': round(_percentile(timings, 95), 2),
+            'p99_ms': round(_percentile(timings, 99), 2),
+            'max_ms': round(max(timings), 2),
+            'mean_ms': round(statistics.fmean(timings), 2),
+        }
+    return results
+
+
+def check_budgets(results, budgets, enforce_latency=False):
+    """List of human-readable budget violations (empty when within budget)."""
+    violations = []
+    for name, result in results.items():
+        budget = budgets['endpoints'].get(name)
+        if budget is None:
+            violations.append(f'{name}: no committed budget')
+            continue
+        if result['status'] >= 400:
+            violations.append(f"{name}: HTTP {result['status']}")
+        if result['queries'] > budget['max_queries']:
+            violations.append(f"{name}: {result['queries']} queries > budget {budget['max_queries']}")
+        if enforce_latency and result['p95_ms'] > budget['p95_ms']:
+            violations.append(f"{name}: p95 {result['p95_ms']}ms > budget {budget['p95_ms']}ms")
+    return violations
+
+
+def format_report(results, budgets):
+    header = f"{'endpoint':<20} {'status':>6} {'queries':>8} {'budget':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'p95 budget':>11}"
+    lines = [header, '-' * len(header)]
+    for name, result in results.items():
+        budget = budgets['endpoints'].get(name, {})
+        lines.append(
+            f"{name:<20} {result['status']:>6} {result['queries']:>8} {budget.get('max_queries', '-'):>7} "
+            f"{result['p50_ms']:>7.1f}ms {result['p95_ms']:>7.1f}ms {result['p99_ms']:>7.1f}ms "
+            f"{budget.get('p95_ms', '-'):>9}ms"
+        )
+    return '\n'.join(lines)
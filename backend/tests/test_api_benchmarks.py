@@ -0,0 +1,32 @@
+"""
+Query budgets for the hot API endpoints.
+Fails when an endpoint needs more SQL than tests/benchmark_budgets.json
+allows, or when its query count grows with the amount of data (N+1).
+"""
+from django.test import TestCase
+
+from tests import benchmarks
+
+
+class APIQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.budgets = benchmarks.load_budgets()
+        benchmarks.seed_benchmark_data(scale=cls.budgets['scale'])
+
+    def test_endpoints_stay_within_query_budgets(self):
+        results = benchmarks.run_benchmarks(iterations=2, warmup=1)
+
+        self.assertEqual(set(results), set(self.budgets['endpoints']))
+        self.assertEqual(benchmarks.check_budgets(results, self.budgets), [])
+
+    def test_query_counts_do_not_grow_with_data(self):
+        before = benchmarks.run_benchmarks(iterations=1, warmup=1)
+        benchmarks.seed_benchmark_data(scale=2, seed=1)
+        after = benchmarks.run_benchmarks(iterations=1, warmup=1)
+
+        for name, budget in self.budgets['endpoints'].items():
+            if budget['grows_with_data']:
+                continue
+            with self.subTest(endpoint=name):
+                self.assertEqual(after[name]['queries'], before[name]['queries'])
@@ -0,0 +1,153 @@
+"""
+Tests for read-replica routing (utils.db_routing).
+
+Replica aliases are only named here, never queried, so the routing runs
+against the plain SQLite test database. For a manual end-to-end check,
+point DATABASE_REPLICA_URLS at the development database file
+(sqlite:////abs/path/db.sqlite3) and watch the replica1 connection.
+"""
+from unittest.mock import patch
+
+import jwt
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from config.celery import app
+from locations.models import Country
+from locations.tree import get_location_tree_payload
+from properties.facets import get_facets
+from properties.models import Property
+from properties.signals import queue_property_sitemap_refresh
+from properties.tasks import refresh_property_sitemap_entries_cache
+from properties.typeahead import get_typeahead_entries
+from tenants.models import TenantProfile
+from tenants.tasks import refresh_tenant_credit_scores
+from utils.response_cache import cached_response
+from utils.db_routing import PIN_COOKIE, ReplicaRouter, ReplicaRoutingMiddleware, replica_reads, use_replica
+
+router = ReplicaRouter()
+
+
+def _read_alias(request):
+    response = HttpResponse()
+    response.alias = router.db_for_read(Property)
+    response.user_alias = router.db_for_read(get_user_model())
+    return response
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.middleware = ReplicaRoutingMiddleware(_read_alias)
+
+    def _token(self, user_id):
+        return 'Bearer ' + jwt.encode({'user_id': user_id}, 'test-key', algorithm='HS256')
+
+    def test_reads_use_the_replica_only_inside_a_replica_scope(self):
+        self.assertEqual(router.db_for_read(Property), 'default')
+        with use_replica():
+            self.assertEqual(router.db_for_read(Property), 'replica1')
+            self.assertEqual(router.db_for_read(get_user_model()), 'default')
+            self.assertEqual(router.db_for_write(Property), 'default')
+        self.assertEqual(replica_reads(lambda: router.db_for_read(Property))(), 'replica1')
+
+    def test_safe_requests_read_from_the_replica(self):
+        response = self.middleware(self.factory.get('/api/properties/'))
+        self.assertEqual(response.alias, 'replica1')
+        self.assertEqual(response.user_alias, 'default')
+
+    def test_writes_pin_the_client_to_the_primary(self):
+        authorization = self._token(42)
+        response = self.middleware(self.factory.post('/api/properties/', HTTP_AUTHORIZATION=authorization))
+        self.assertEqual(response.alias, 'default')
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        # Cookie clients and token clients both read their writes from the primary
+        cookie_request = self.factory.get('/api/properties/')
+        cookie_request.COOKIES[PIN_COOKIE] = '1'
+        self.assertEqual(self.middleware(cookie_request).alias, 'default')
+        token_request = self.factory.get('/api/properties/', HTTP_AUTHORIZATION=authorization)
+        self.assertEqual(self.middleware(token_request).alias, 'default')
+
+        other_user = self.factory.get('/api/properties/', HTTP_AUTHORIZATION=self._token(7))
+        self.assertEqual(self.middleware(other_user).alias, 'replica1')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_uses_the_primary(self):
+        with use_replica():
+            self.assertEqual(router.db_for_read(Property), 'default')
+        self.assertEqual(self.middleware(self.factory.get('/api/properties/')).alias, 'default')
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], TENANT_SCORE_AUTO_REFRESH=True, PROPERTY_SITEMAP_AUTO_DISPATCH=True)
+class WriteTriggeredTaskRoutingTests(TestCase):
+    """Tasks dispatched right after a write must read that write from the primary."""
+
+    def _run_inline(self, task):
+        return patch.object(task, 'delay', side_effect=lambda *args, **kwargs: task.apply(args, kwargs))
+
+    def test_tenant_score_refresh_reads_the_primary_unless_scheduled(self):
+        aliases = []
+
+        def score(profile_ids):
+            aliases.append(router.db_for_read(TenantProfile))
+            return 0
+
+        user = get_user_model().objects.create_user(
+            username='routed-tenant', email='routed@example.com', password='testpass123', phone_number='+237600000500',
+        )
+        with patch('tenants.scoring.calculate_all_tenant_scores', side_effect=score), \
+                self._run_inline(refresh_tenant_credit_scores):
+            with self.captureOnCommitCallbacks(execute=True):
+                TenantProfile.objects.create(user=user)
+            refresh_tenant_credit_scores.apply(kwargs=app.conf.beat_schedule['refresh-tenant-credit-scores']['kwargs'])
+
+        self.assertEqual(aliases, ['default', 'replica1'])
+
+    def test_sitemap_refresh_reads_the_primary(self):
+        aliases = []
+        with patch('properties.tasks.refresh_property_sitemap_entries_snapshot',
+                   side_effect=lambda: aliases.append(router.db_for_read(Property)) or []), \
+                self._run_inline(refresh_property_sitemap_entries_cache):
+            with self.captureOnCommitCallbacks(execute=True):
+                queue_property_sitemap_refresh()
+
+        self.assertEqual(aliases, ['default'])
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class CacheRefillRoutingTests(TestCase):
+    """Versioned caches refilled inside a replica scope must read the primary."""
+
+    def setUp(self):
+        cache.clear()
+        self.aliases = []
+
+    def _record(self, model, result):
+        def read(*args, **kwargs):
+            self.aliases.append(router.db_for_read(model))
+            return result
+        return read
+
+    def test_response_cache_miss_reads_the_primary(self):
+        request = RequestFactory().get('/api/locations/countries/')
+        with use_replica():
+            cached_response(request, 'countries', (Country,), self._record(Country, JsonResponse({})))
+        self.assertEqual(self.aliases, ['default'])
+
+    def test_location_tree_facets_and_typeahead_rebuilds_read_the_primary(self):
+        with use_replica(), \
+                patch('locations.tree.build_location_tree_payload', side_effect=self._record(Country, {})), \
+                patch('properties.facets.compute_facets', side_effect=self._record(Property, {})), \
+                patch('properties.typeahead.build_location_entries', side_effect=self._record(Country, [])), \
+                patch('properties.typeahead.build_property_entries', side_effect=self._record(Property, [])):
+            get_location_tree_payload()
+            get_facets({})
+            get_typeahead_entries()
+            self.assertEqual(router.db_for_read(Property), 'replica1')
+
+        self.assertEqual(self.aliases, ['default'] * 4)
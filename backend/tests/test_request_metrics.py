@@ -0,0 +1,102 @@
+"""
+Tests for request/task metrics, the Prometheus metrics endpoint and Celery routing.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from config.celery import app as celery_app
+from utils.metrics import fingerprint_sql, registry
+
+User = get_user_model()
+
+METRICS_URL = '/api/analytics/admin/metrics/'
+
+
+@override_settings(REQUEST_METRICS_TOKEN='scrape-token', REQUEST_METRICS_FLUSH_SECONDS=0)
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        self.client = APIClient()
+        self.admin = User.objects.create_user(
+            username='metrics-admin',
+            email='metrics-admin@example.com',
+            password='StrongPass123!',
+            phone_number='+237600000361',
+            user_type='admin',
+        )
+
+    def scrape(self):
+        response = self.client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    @override_settings(REQUEST_PROFILING_SAMPLE_RATE=1.0)
+    def test_profiled_requests_report_queries_cache_and_slowest_statement(self):
+        self.client.get('/api/locations/tree/')
+        self.client.get('/api/locations/tree/')
+        self.client.get('/api/properties/')
+
+        body = self.scrape()
+        self.assertIn('http_request_duration_seconds_count{route="api/locations/tree/",method="GET"} 2', body)
+        self.assertIn('http_request_profiled_total{route="api/properties/",method="GET"} 1', body)
+        # The second tree request is served from the cached blob
+        self.assertRegex(body, r'http_request_cache_hits_total\{route="api/locations/tree/",method="GET"\} [1-9]')
+        self.assertRegex(body, r'http_request_db_queries_count\{route="api/properties/",method="GET"\} 1')
+        self.assertIn('http_request_slowest_query_seconds{route="api/properties/",method="GET",fingerprint="SELECT ', body)
+
+    @override_settings(REQUEST_PROFILING_SAMPLE_RATE=0)
+    def test_unsampled_requests_only_record_latency(self):
+        self.client.get('/api/properties/')
+
+        body = self.scrape()
+        self.assertIn('http_request_duration_seconds_count{route="api/properties/",method="GET"} 1', body)
+        self.assertNotIn('http_request_profiled_total{', body)
+
+    def test_endpoint_requires_admin_or_scrape_token(self):
+        tenant = User.objects.create_user(
+            username='metrics-tenant',
+            email='metrics-tenant@example.com',
+            password='StrongPass123!',
+            phone_number='+237600000362',
+            user_type='tenant',
+        )
+        self.assertEqual(self.client.get(METRICS_URL).status_code, 403)
+        self.assertEqual(self.client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+
+        self.client.force_login(tenant)
+        self.assertEqual(self.client.get(METRICS_URL).status_code, 403)
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(METRICS_URL).status_code, 200)
+
+    def test_fingerprint_strips_literals(self):
+        self.assertEqual(
+            fingerprint_sql("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x''y'  AND n > 10"),
+            'SELECT * FROM t WHERE id IN (...) AND name = ? AND n > ?',
+        )
+
+    def test_task_runs_are_reported_with_their_queue(self):
+        from properties.tasks import refresh_property_sitemap_entries_cache
+
+        refresh_property_sitemap_entries_cache.apply()
+
+        body = self.scrape()
+        task = 'properties.tasks.refresh_property_sitemap_entries_cache'
+        self.assertIn(f'celery_task_runs_total{{task="{task}",queue="default",state="SUCCESS"}} 1', body)
+        self.assertIn(f'celery_task_duration_seconds_count{{task="{task}",queue="default"}} 1', body)
+
+
+class CeleryRoutingTests(TestCase):
+    def route(self, task_name):
+        return celery_app.amqp.router.route({}, task_name)
+
+    def test_latency_sensitive_tasks_do_not_share_a_queue_with_nightly_jobs(self):
+        for task_name in ('notifications.tasks.notify_new_message', 'notifications.tasks.dispatch_notification'):
+            self.assertEqual(self.route(task_name)['queue'].name, 'realtime')
+        for task_name in ('analytics.tasks.aggregate_daily_analytics', 'leases.tasks.auto_expire_leases'):
+            self.assertEqual(self.route(task_name)['queue'].name, 'batch')
+
+    def test_unrouted_tasks_use_the_default_queue(self):
+        self.assertEqual(self.route('config.celery.debug_task')['queue'].name, 'default')
@@ -0,0 +1,66 @@
+"""
+Tests for the versioned response cache on public lookup endpoints.
+"""
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from locations.models import Country, Region
+from properties.category_models import Category, PropertyTag
+from properties.models import PropertyType
+from utils.response_cache import clear_local_response_cache
+
+
+class VersionedResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_response_cache()
+        self.client = APIClient()
+        PropertyType.objects.create(name='Studio', category='residential')
+
+    def test_repeat_requests_skip_the_database_until_a_write(self):
+        first = self.client.get('/api/properties/types/')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first['Cache-Control'], 'public, max-age=0, must-revalidate')
+
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/properties/types/')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PropertyType.objects.create(name='Villa', category='residential')
+
+        third = self.client.get('/api/properties/types/')
+        self.assertIn(b'Villa', third.content)
+        self.assertNotEqual(third['ETag'], first['ETag'])
+
+    def test_matching_etag_gets_not_modified(self):
+        etag = self.client.get('/api/properties/types/')['ETag']
+
+        response = self.client.get('/api/properties/types/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_query_strings_are_cached_separately(self):
+        country = Country.objects.create(name='Cameroon', code='CM')
+        Region.objects.create(name='Littoral', code='littoral', country=country)
+
+        everywhere = self.client.get('/api/locations/regions/')
+        elsewhere = self.client.get(f'/api/locations/regions/?country={country.pk + 1}')
+
+        self.assertIn(b'Littoral', everywhere.content)
+        self.assertNotIn(b'Littoral', elsewhere.content)
+
+    def test_many_to_many_changes_invalidate(self):
+        category = Category.objects.create(name='Apartment', slug='apartment')
+        tag = PropertyTag.objects.create(name='Furnished', slug='furnished')
+        before = self.client.get(f'/api/properties/tags/{tag.slug}/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.applies_to.add(category)
+
+        after = self.client.get(f'/api/properties/tags/{tag.slug}/')
+        self.assertNotEqual(before.content, after.content)
+        self.assertIn(f'"applies_to_categories":[{category.pk}]'.encode(), after.content)
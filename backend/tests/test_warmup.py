@@ -0,0 +1,33 @@
+"""
+Tests for process warm-up (config.warmup).
+"""
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from config.warmup import warm_up
+from properties.models import PropertyType
+from utils.response_cache import clear_local_response_cache
+
+
+class WarmUpTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_response_cache()
+        PropertyType.objects.create(name='Studio', category='residential')
+
+    @override_settings(WARMUP_PATHS=['/api/properties/types/'])
+    def test_warm_up_fills_the_response_cache(self):
+        timings = warm_up(close_connections=False)
+        self.assertIn('caches', timings)
+
+        with self.assertNumQueries(0):
+            response = APIClient().get('/api/properties/types/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Studio', response.content)
+
+    @override_settings(WARMUP_PATHS=['/api/no-such-endpoint/'])
+    def test_failures_are_logged_not_raised(self):
+        with self.assertLogs('config.warmup', level='WARNING'):
+            timings = warm_up(close_connections=False)
+        self.assertIn('total', timings)
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        from .permissions import get_permission_engine
+
+        # Compile ROLE_PERMISSIONS before the first request needs it
+        get_permission_engine()
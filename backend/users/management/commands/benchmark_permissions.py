@@ -0,0 +1,114 @@
+"""
+Micro-benchmark for the compiled permission engine
+Compares the old list-scanning / FK-loading checks with users.permissions
+"""
+import timeit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from agents.models import AgentAddress, AgentProfile
+from users.models import UserPreferences
+from users.permissions import check_object_permission, get_permission_engine, get_request_agent_profile
+
+User = get_user_model()
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _legacy_has_permission(user_type, permission):
+    if user_type == 'admin':
+        return True
+    user_permissions = settings.ROLE_PERMISSIONS.get(user_type, [])
+    return '*' in user_permissions or permission in user_permissions
+
+
+def _legacy_check_object_permission(user, obj):
+    if hasattr(obj, 'owner') and obj.owner == user:
+        return True
+    if hasattr(obj, 'user') and obj.user == user:
+        return True
+    return False
+
+
+def _legacy_owns_agent_object(user, obj):
+    # Pattern used by the analytics/tenant views before get_request_agent_profile
+    return hasattr(user, 'agents_profile') and obj.agent == user.agents_profile
+
+
+class Command(BaseCommand):
+    help = 'Benchmark role/object permission checks and per-request profile lookups'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=100000)
+        parser.add_argument('--lookups', type=int, default=3, help='Ownership checks per simulated request')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        lookups = options['lookups']
+        engine = get_permission_engine()
+        checks = [
+            (role, permission)
+            for role in settings.ROLE_PERMISSIONS
+            for permissions in settings.ROLE_PERMISSIONS.values()
+            for permission in permissions
+        ]
+
+        legacy = timeit.timeit(lambda: [_legacy_has_permission(r, p) for r, p in checks], number=iterations)
+        compiled = timeit.timeit(lambda: [engine.role_has_permission(r, p) for r, p in checks], number=iterations)
+        per_check = iterations * len(checks)
+        self.stdout.write('Role permission checks')
+        self.stdout.write(f'  legacy:   {legacy / per_check * 1e9:8.1f} ns/check')
+        self.stdout.write(f'  compiled: {compiled / per_check * 1e9:8.1f} ns/check')
+
+        try:
+            with transaction.atomic():
+                self._benchmark_queries(lookups)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _benchmark_queries(self, lookups):
+        user = User.objects.create_user(
+            username='permission-benchmark',
+            email='permission-benchmark@example.com',
+            password='unused-benchmark-password',
+            phone_number='+237699999999',
+        )
+        UserPreferences.objects.create(user=user)
+        profile = AgentProfile.objects.create(user=user, bio='Benchmark agent')
+        AgentAddress.objects.create(agent=profile, street='Rue 1', city='Douala', region='Littoral')
+
+        with CaptureQueriesContext(connection) as legacy_object:
+            obj = UserPreferences.objects.get(user=user)
+            _legacy_check_object_permission(user, obj)
+        with CaptureQueriesContext(connection) as compiled_object:
+            obj = UserPreferences.objects.get(user=user)
+            check_object_permission(user, obj)
+
+        factory = RequestFactory()
+        with CaptureQueriesContext(connection) as legacy_profile:
+            request_user = User.objects.get(pk=user.pk)
+            obj = AgentAddress.objects.get(agent=profile)
+            for _ in range(lookups):
+                _legacy_owns_agent_object(request_user, obj)
+        with CaptureQueriesContext(connection) as compiled_profile:
+            request = factory.get('/')
+            request.user = User.objects.get(pk=user.pk)
+            obj = AgentAddress.objects.get(agent=profile)
+            for _ in range(lookups):
+                agent_profile = get_request_agent_profile(request)
+                agent_profile is not None and obj.agent_id == agent_profile.id
+
+        self.stdout.write('Object permission check (queries, including the object fetch)')
+        self.stdout.write(f'  legacy:   {len(legacy_object)}')
+        self.stdout.write(f'  compiled: {len(compiled_object)}')
+        self.stdout.write(f'Agent ownership checks x{lookups} per request (queries, including user and object fetch)')
+        self.stdout.write(f'  legacy:   {len(legacy_profile)}')
+        self.stdout.write(f'  memoized: {len(compiled_profile)}')
@@ -2,13 +2,106 @@
 Enterprise Role-Based Permission System
 Implements fine-grained access control for microservices architecture
 """
+from functools import lru_cache
+
 from rest_framework.permissions import BasePermission
 from rest_framework.exceptions import PermissionDenied
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import FieldDoesNotExist
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 import logging
 
 logger = logging.getLogger('property237')
 
+_NO_FIELD = object()
+REQUEST_AGENT_PROFILE_ATTR = '_property237_agent_profile'
+
+
+class PermissionEngine:
+    """
+    ROLE_PERMISSIONS compiled into frozensets once per process.
+    Ownership checks compare foreign key ids so related rows are never loaded.
+    """
+
+    def __init__(self, role_permissions):
+        self.role_permissions = {
+            role: frozenset(permissions)
+            for role, permissions in role_permissions.items()
+        }
+        self.wildcard_roles = frozenset(
+            role for role, permissions in self.role_permissions.items()
+            if '*' in permissions
+        ) | {'admin'}
+
+    def role_has_permission(self, role, permission):
+        if role in self.wildcard_roles:
+            return True
+        return permission in self.role_permissions.get(role, ())
+
+    def is_related_user(self, obj, field_name, user):
+        """
+        obj.<field_name> == user, answered from the FK column when possible.
+        Returns False when obj has no such attribute.
+        """
+        related_id = _related_user_id(obj, field_name)
+        if related_id is not _NO_FIELD:
+            return related_id is not None and related_id == user.pk
+
+        # Not a model FK (properties, plain objects): fall back to attribute comparison
+        return hasattr(obj, field_name) and getattr(obj, field_name) == user
+
+
+def _related_user_id(obj, field_name):
+    try:
+        field = obj._meta.get_field(field_name)
+    except (AttributeError, FieldDoesNotExist):
+        return _NO_FIELD
+
+    if not (field.concrete and field.is_relation and (field.many_to_one or field.one_to_one)):
+        return _NO_FIELD
+
+    # A FK to another model (e.g. Property.agent -> AgentProfile) never equals a user
+    if field.related_model is not get_user_model():
+        return None
+
+    return getattr(obj, field.attname)
+
+
+@lru_cache(maxsize=1)
+def get_permission_engine():
+    return PermissionEngine(getattr(settings, 'ROLE_PERMISSIONS', {}))
+
+
+@receiver(setting_changed)
+def _reset_permission_engine(setting, **kwargs):
+    if setting == 'ROLE_PERMISSIONS':
+        get_permission_engine.cache_clear()
+
+
+def get_request_agent_profile(request):
+    """
+    Return request.user's AgentProfile or None, fetched at most once per request.
+    The result is stored on the underlying HttpRequest so DRF and Django views share it.
+    """
+    http_request = getattr(request, '_request', request)
+    if hasattr(http_request, REQUEST_AGENT_PROFILE_ATTR):
+        return getattr(http_request, REQUEST_AGENT_PROFILE_ATTR)
+
+    user = getattr(request, 'user', None)
+    profile = None
+    if user is not None and user.is_authenticated:
+        from agents.models import AgentProfile
+
+        try:
+            profile = user.agents_profile
+        except AgentProfile.DoesNotExist:
+            profile = None
+
+    setattr(http_request, REQUEST_AGENT_PROFILE_ATTR, profile)
+    return profile
+
 
 class RoleBasedPermission(BasePermission):
     """
@@ -29,14 +122,7 @@ class RoleBasedPermission(BasePermission):
 
         # Check if specific permission is required
         if required_permission:
-            user_permissions = settings.ROLE_PERMISSIONS.get(user_type, [])
-
-            # Check for wildcard permission
-            if '*' in user_permissions:
-                return True
-
-            # Check for specific permission
-            if required_permission in user_permissions:
+            if get_permission_engine().role_has_permission(user_type, required_permission):
                 return True
 
             logger.warning(
@@ -53,35 +139,37 @@ class RoleBasedPermission(BasePermission):
         if not request.user or not request.user.is_authenticated:
             return False
 
-        user_type = request.user.user_type
+        user = request.user
+        user_type = user.user_type
+        engine = get_permission_engine()
 
         # Admin has full access to all objects
         if user_type == 'admin':
             return True
 
         # Property owners can manage their own properties
-        if hasattr(obj, 'owner') and obj.owner == request.user:
+        if engine.is_related_user(obj, 'owner', user):
             return True
 
         # Realtors can manage properties they're assigned to
-        if user_type == 'realtor' and hasattr(obj, 'agent') and obj.agent == request.user:
+        if user_type == 'realtor' and engine.is_related_user(obj, 'agent', user):
             return True
 
         # Tenants can view/edit their own profile and related objects
         if user_type == 'tenant':
             # Check if object belongs to the tenant
-            if hasattr(obj, 'tenant') and obj.tenant == request.user:
+            if engine.is_related_user(obj, 'tenant', user):
                 return True
-            if hasattr(obj, 'user') and obj.user == request.user:
+            if engine.is_related_user(obj, 'user', user):
                 return True
 
         # Landlords can manage their properties and tenants
         if user_type == 'landlord':
-            if hasattr(obj, 'landlord') and obj.landlord == request.user:
+            if engine.is_related_user(obj, 'landlord', user):
                 return True
             # Can view tenant info for their properties
-            if hasattr(obj, 'related_property') and hasattr(obj.related_property, 'owner'):
-                if obj.related_property.owner == request.user:
+            if hasattr(obj, 'related_property'):
+                if engine.is_related_user(obj.related_property, 'owner', user):
                     return True
 
         return False
@@ -160,14 +248,10 @@ class ReadOnlyOrOwnerPermission(BasePermission):
             return True
 
         # Check ownership
-        if hasattr(obj, 'owner') and obj.owner == request.user:
-            return True
-
-        if hasattr(obj, 'user') and obj.user == request.user:
-            return True
-
-        if hasattr(obj, 'created_by') and obj.created_by == request.user:
-            return True
+        engine = get_permission_engine()
+        for field_name in ('owner', 'user', 'created_by'):
+            if engine.is_related_user(obj, field_name, request.user):
+                return True
 
         return False
 
@@ -235,11 +319,7 @@ def has_permission(user, permission):
     if not user or not user.is_authenticated:
         return False
 
-    if user.user_type == 'admin':
-        return True
-
-    user_permissions = settings.ROLE_PERMISSIONS.get(user.user_type, [])
-    return '*' in user_permissions or permission in user_permissions
+    return get_permission_engine().role_has_permission(user.user_type, permission)
 
 
 def check_object_permission(user, obj, action='read'):
@@ -250,19 +330,21 @@ def check_object_permission(user, obj, action='read'):
     if user.user_type == 'admin':
         return True
 
+    engine = get_permission_engine()
+
     # Owner permissions
-    if hasattr(obj, 'owner') and obj.owner == user:
+    if engine.is_related_user(obj, 'owner', user):
         return True
 
-    if hasattr(obj, 'user') and obj.user == user:
+    if engine.is_related_user(obj, 'user', user):
         return True
 
     # Read-only permissions for related objects
     if action == 'read':
-        if user.user_type == 'realtor' and hasattr(obj, 'agent') and obj.agent == user:
+        if user.user_type == 'realtor' and engine.is_related_user(obj, 'agent', user):
             return True
 
-        if user.user_type == 'tenant' and hasattr(obj, 'tenant') and obj.tenant == user:
+        if user.user_type == 'tenant' and engine.is_related_user(obj, 'tenant', user):
             return True
 
     return False
@@ -1,3 +1,58 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase, override_settings
 
-# Create your tests here.
+from agents.models import AgentAddress, AgentProfile
+from .models import UserPreferences
+from .permissions import check_object_permission, get_permission_engine, get_request_agent_profile, has_permission
+
+User = get_user_model()
+
+
+class PermissionEngineTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='perm-user',
+            email='perm@example.com',
+            password='testpass123',
+            phone_number='+237600000100',
+            user_type='tenant',
+        )
+
+    def test_role_permissions_are_compiled_to_frozensets(self):
+        engine = get_permission_engine()
+
+        self.assertIsInstance(engine.role_permissions['tenant'], frozenset)
+        self.assertTrue(has_permission(self.user, 'payments.view'))
+        self.assertFalse(has_permission(self.user, 'listings.manage'))
+
+    @override_settings(ROLE_PERMISSIONS={'tenant': ['*']})
+    def test_engine_recompiles_when_setting_changes(self):
+        self.assertTrue(has_permission(self.user, 'listings.manage'))
+
+    def test_object_permission_compares_fk_ids_without_loading(self):
+        UserPreferences.objects.create(user=self.user)
+        preferences = UserPreferences.objects.get(user=self.user)
+        other = User.objects.create_user(
+            username='other', email='other@example.com', password='testpass123', phone_number='+237600000101'
+        )
+
+        with self.assertNumQueries(0):
+            self.assertTrue(check_object_permission(self.user, preferences))
+            self.assertFalse(check_object_permission(other, preferences))
+
+    def test_fk_to_non_user_model_never_matches(self):
+        profile = AgentProfile.objects.create(user=self.user, bio='Agent')
+        address = AgentAddress.objects.create(agent=profile, street='Rue 1', city='Douala', region='Littoral')
+        # Same numeric id as the user must not count as ownership
+        self.assertFalse(get_permission_engine().is_related_user(address, 'agent', self.user))
+
+    def test_agent_profile_is_fetched_once_per_request(self):
+        AgentProfile.objects.create(user=self.user, bio='Agent')
+        request = RequestFactory().get('/')
+        request.user = User.objects.get(pk=self.user.pk)
+
+        with self.assertNumQueries(1):
+            first = get_request_agent_profile(request)
+            second = get_request_agent_profile(request)
+
+        self.assertIs(first, second)
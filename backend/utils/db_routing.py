@@ -0,0 +1,131 @@
+"""
+Read-replica routing
+
+With DATABASE_REPLICAS configured (settings: DATABASE_REPLICA_URLS),
+ReplicaRouter sends reads to a replica only inside a replica scope:
+
+- ReplicaRoutingMiddleware opens one for GET/HEAD/OPTIONS requests,
+  unless the client wrote within REPLICA_PIN_SECONDS: every write request
+  pins its client to the primary through a cookie and, for token clients
+  that drop cookies, a cache key per user, so users read their own writes;
+- replica_reads wraps Celery aggregation jobs that only need committed,
+  slightly stale data. Tasks that signals dispatch right after a write
+  read the primary; the ones beat also runs take a replica flag that only
+  the schedule sets.
+
+Code that refills a versioned cache (response cache misses, the location
+tree, facets, typeahead documents) reads the primary with
+use_replica(False) even inside a replica scope: a replica that has not
+caught up with the write that bumped the version would store old rows
+under the new version.
+
+Everything else, all writes and the user/session/token tables that
+authentication reads right after signup or login, stays on the primary.
+Without replicas the router always answers 'default'.
+"""
+import functools
+import random
+import threading
+from contextlib import contextmanager
+
+import jwt
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import cache
+
+PIN_COOKIE = 'db_primary'
+PIN_KEY = 'db:pin:user:{}'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PRIMARY_ONLY_APPS = ('sessions', 'token_blacklist')
+
+_state = threading.local()
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+@contextmanager
+def use_replica(enabled=True):
+    """Let reads in this block go to a replica (enabled=False forces the primary)."""
+    previous = getattr(_state, 'replica', False)
+    _state.replica = enabled
+    try:
+        yield
+    finally:
+        _state.replica = previous
+
+
+def replica_reads(func):
+    """Run a task's reads on a replica; its writes still go to the primary."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with use_replica():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = replica_aliases()
+        if not replicas or not getattr(_state, 'replica', False):
+            return 'default'
+        if model._meta.app_label in PRIMARY_ONLY_APPS or model._meta.label == settings.AUTH_USER_MODEL:
+            return 'default'
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+def _request_user_id(request):
+    scheme, _, token = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    if token and scheme in settings.SIMPLE_JWT.get('AUTH_HEADER_TYPES', ('Bearer',)):
+        # Only picks a database, so the signature is checked by authentication, not here
+        try:
+            claims = jwt.decode(token, options={'verify_signature': False})
+        except jwt.InvalidTokenError:
+            return None
+        return claims.get(settings.SIMPLE_JWT.get('USER_ID_CLAIM', 'user_id'))
+    session = getattr(request, 'session', None)
+    return session.get(SESSION_KEY) if session is not None else None
+
+
+def is_pinned(request):
+    if request.COOKIES.get(PIN_COOKIE):
+        return True
+    user_id = _request_user_id(request)
+    return user_id is not None and cache.get(PIN_KEY.format(user_id)) is not None
+
+
+def pin_to_primary(request, response):
+    seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+    response.set_cookie(PIN_COOKIE, '1', max_age=seconds, httponly=True, samesite='Lax')
+    user = getattr(request, 'user', None)
+    user_id = user.pk if user is not None and user.is_authenticated else _request_user_id(request)
+    if user_id is not None:
+        cache.set(PIN_KEY.format(user_id), 1, timeout=seconds)
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replica_aliases():
+            return self.get_response(request)
+
+        if request.method in SAFE_METHODS:
+            with use_replica(not is_pinned(request)):
+                return self.get_response(request)
+
+        response = self.get_response(request)
+        pin_to_primary(request, response)
+        return response
@@ -1,86 +1,400 @@
 """
 ImageKit storage backend for Django
 Handles image uploads to ImageKit.io with automatic optimization
+
+Uploads are spooled to IMAGEKIT_SPOOL_ROOT as <folder>/<file name> and
+pushed to ImageKit, with retries, by a bounded thread pool in the process
+that saved them, so a request saving several photos only pays for local
+disk writes. The spool lives on the web host: the Celery workers run on
+other hosts and never see it.
+
+The saved name is the remote path, never a CDN URL that may not resolve
+yet: until a push is confirmed and removes the spooled copy, url() points
+at the pending-upload view, which serves that copy, and _open() reads it
+in any process on the host. Copies left behind by failed pushes, a full
+backlog or a restarted process are pushed again by reconcile_spool(),
+which each process runs from its pool once per
+IMAGEKIT_SPOOL_RECONCILE_AGE, and by the reconcile_imagekit_spool command.
 """
-import os
+import atexit
+import base64
 import logging
+import os
+import posixpath
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import urllib3
+from django.conf import settings
+from django.core.files import File
 from django.core.files.storage import Storage
-from django.core.files.base import ContentFile
-from imagekitio import ImageKit
-from imagekitio.models.UploadFileRequestOptions import UploadFileRequestOptions
+from django.urls import reverse
 
 logger = logging.getLogger(__name__)
 
+IMAGEKIT_UPLOAD_API = 'https://upload.imagekit.io/api/v1/files/upload'
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Spool files being written; never pushed or reconciled
+INCOMING_DIR = '.incoming'
+
+
+class MultipartFileBody:
+    """
+    File-like multipart/form-data body that streams the file from disk.
+
+    urllib3 reads it in blocks, so the upload never holds the whole image in memory.
+    """
+
+    def __init__(self, fields, file_field, file_name, path):
+        self.boundary = uuid.uuid4().hex
+        head = b''.join(
+            self._part_header(key) + str(value).encode('utf-8') + b'\r\n'
+            for key, value in fields.items()
+        )
+        head += self._part_header(file_field, file_name)
+        self._parts = [head, None, f'\r\n--{self.boundary}--\r\n'.encode('utf-8')]
+        self._path = path
+        self._length = len(head) + os.path.getsize(path) + len(self._parts[2])
+        self._index = 0
+        self._file = None
+
+    @property
+    def content_type(self):
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    def __len__(self):
+        return self._length
+
+    def _part_header(self, name, file_name=None):
+        disposition = f'form-data; name="{name}"'
+        if file_name:
+            disposition += f'; filename="{file_name}"'
+            return f'--{self.boundary}\r\nContent-Disposition: {disposition}\r\nContent-Type: application/octet-stream\r\n\r\n'.encode('utf-8')
+        return f'--{self.boundary}\r\nContent-Disposition: {disposition}\r\n\r\n'.encode('utf-8')
+
+    def read(self, size=-1):
+        size = UPLOAD_CHUNK_SIZE if size is None or size < 0 else size
+        while self._index < len(self._parts):
+            if self._index == 1:
+                if self._file is None:
+                    self._file = open(self._path, 'rb')
+                chunk = self._file.read(size)
+                if chunk:
+                    return chunk
+                self._file.close()
+                self._index += 1
+                continue
+
+            part = self._parts[self._index]
+            self._index += 1
+            if part:
+                return part
+        return b''
+
+    def close(self):
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+
+
+def get_spool_root():
+    return getattr(settings, 'IMAGEKIT_SPOOL_ROOT', None) or os.path.join(tempfile.gettempdir(), 'imagekit_spool')
+
+
+def spool_path_for(remote_path):
+    """Spooled copy of remote_path, or None for a path outside the spool root."""
+    root = os.path.realpath(get_spool_root())
+    path = os.path.realpath(os.path.join(root, *remote_path.split('/')))
+    if not path.startswith(root + os.sep) or f'{os.sep}{INCOMING_DIR}{os.sep}' in path[len(root):]:
+        return None
+    return path
+
+
+def cdn_url(remote_path):
+    return f"{os.getenv('IMAGEKIT_URL_ENDPOINT', '').rstrip('/')}/{remote_path.lstrip('/')}"
+
+
+class ImageKitUploader:
+    """Pushes spooled files to ImageKit and reads published ones back."""
+
+    def __init__(self, private_key):
+        self._auth = base64.b64encode(f'{private_key}:'.encode('utf-8')).decode('ascii')
+        self._http = urllib3.PoolManager(
+            retries=False,
+            timeout=urllib3.Timeout(connect=10, read=getattr(settings, 'IMAGEKIT_UPLOAD_TIMEOUT', 120)),
+        )
+
+    def push(self, spool_path, folder, file_name):
+        body = MultipartFileBody(
+            {
+                'fileName': file_name,
+                'folder': folder,
+                'useUniqueFileName': 'false',
+                'tags': 'property237,auto-upload',
+            },
+            'file', file_name, spool_path,
+        )
+        try:
+            response = self._http.request(
+                'POST',
+                IMAGEKIT_UPLOAD_API,
+                body=body,
+                headers={
+                    'Authorization': f'Basic {self._auth}',
+                    'Content-Type': body.content_type,
+                    'Content-Length': str(len(body)),
+                },
+                preload_content=True,
+            )
+        finally:
+            body.close()
+
+        if response.status >= 300:
+            raise ValueError(f'ImageKit upload returned {response.status}: {response.data[:200]!r}')
+        logger.debug('Uploaded %s/%s to ImageKit', folder, file_name)
+
+    def fetch(self, url):
+        """Stream a published file back from the CDN into a spooled temp file."""
+        response = self._http.request('GET', url, preload_content=False)
+        try:
+            if response.status >= 300:
+                raise FileNotFoundError(url)
+            spooled = tempfile.SpooledTemporaryFile(max_size=5 * 1024 * 1024)
+            for chunk in response.stream(UPLOAD_CHUNK_SIZE):
+                spooled.write(chunk)
+        finally:
+            response.release_conn()
+        spooled.seek(0)
+        return spooled
+
+
+_uploader = None
+
+
+def get_uploader():
+    global _uploader
+    if _uploader is None:
+        _uploader = ImageKitUploader(os.getenv('IMAGEKIT_PRIVATE_KEY'))
+    return _uploader
+
+
+def push_spooled_upload(remote_path):
+    """
+    Push the spooled copy of remote_path and drop it once ImageKit accepted it.
+    Raises FileNotFoundError when there is no spooled copy to push.
+    """
+    spool_path = spool_path_for(remote_path)
+    if spool_path is None or not os.path.exists(spool_path):
+        logger.error('No spooled copy of %s under %s to push to ImageKit', remote_path, get_spool_root())
+        raise FileNotFoundError(remote_path)
+
+    folder, file_name = posixpath.split(remote_path)
+    get_uploader().push(spool_path, folder, file_name)
+    try:
+        os.remove(spool_path)
+    except FileNotFoundError:
+        pass  # A concurrent push (reconcile) confirmed it first
+    return True
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_in_flight = set()
+_last_reconcile = None
+
+
+def _get_pool():
+    # Created on first use, so each forked web worker gets its own threads
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMAGEKIT_UPLOAD_WORKERS', 4),
+                thread_name_prefix='imagekit-upload',
+            )
+            atexit.register(_pool.shutdown, wait=True)
+        return _pool
+
+
+def _push_with_retries(remote_path):
+    attempts = getattr(settings, 'IMAGEKIT_UPLOAD_RETRIES', 5) + 1
+    try:
+        for attempt in range(1, attempts + 1):
+            try:
+                push_spooled_upload(remote_path)
+                return
+            except FileNotFoundError:
+                return  # Logged by push_spooled_upload; nothing left to retry
+            except Exception:
+                if attempt == attempts:
+                    logger.exception('ImageKit push of %s failed %d times; it stays spooled for reconcile',
+                                     remote_path, attempts)
+                    return
+                time.sleep(min(2 ** attempt, 60))
+    finally:
+        with _pool_lock:
+            _in_flight.discard(remote_path)
+
+
+def queue_spooled_upload(remote_path):
+    """
+    Hand the push to this process's upload pool. Returns False when the
+    backlog is full; the copy stays spooled for reconcile_spool.
+    """
+    limit = getattr(settings, 'IMAGEKIT_UPLOAD_WORKERS', 4) + getattr(settings, 'IMAGEKIT_UPLOAD_BACKLOG', 100)
+    with _pool_lock:
+        if remote_path in _in_flight:
+            return True
+        if len(_in_flight) >= limit:
+            logger.warning('ImageKit upload backlog full; %s stays spooled for reconcile', remote_path)
+            return False
+        _in_flight.add(remote_path)
+    _get_pool().submit(_push_with_retries, remote_path)
+    return True
+
+
+def reconcile_spool_if_due():
+    """Run reconcile_spool in the upload pool when this process has not for IMAGEKIT_SPOOL_RECONCILE_AGE."""
+    global _last_reconcile
+    now, interval = time.monotonic(), getattr(settings, 'IMAGEKIT_SPOOL_RECONCILE_AGE', 900)
+    with _pool_lock:
+        if _last_reconcile is not None and now - _last_reconcile < interval:
+            return False
+        _last_reconcile = now
+    _get_pool().submit(reconcile_spool)
+    return True
+
+
+def spooled_uploads(min_age=0):
+    """Remote paths of spooled copies older than min_age seconds."""
+    root = get_spool_root()
+    cutoff = time.time() - min_age
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories[:] = [name for name in subdirectories if name != INCOMING_DIR]
+        for name in files:
+            path = os.path.join(directory, name)
+            try:
+                if os.path.getmtime(path) > cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            yield os.path.relpath(path, root).replace(os.sep, '/')
+
+
+def reconcile_spool(min_age=None, push=queue_spooled_upload):
+    """Push again every spooled copy older than min_age seconds; returns how many."""
+    if min_age is None:
+        min_age = getattr(settings, 'IMAGEKIT_SPOOL_RECONCILE_AGE', 900)
+    count = 0
+    for remote_path in spooled_uploads(min_age):
+        push(remote_path)
+        count += 1
+    if count:
+        logger.info('Re-pushing %d spooled ImageKit uploads', count)
+    return count
+
 
 class ImageKitStorage(Storage):
     """Custom storage backend for ImageKit.io"""
 
     def __init__(self):
-        self.imagekit = ImageKit(
-            private_key=os.getenv('IMAGEKIT_PRIVATE_KEY'),
-            public_key=os.getenv('IMAGEKIT_PUBLIC_KEY'),
-            url_endpoint=os.getenv('IMAGEKIT_URL_ENDPOINT')
-        )
         self.url_endpoint = os.getenv('IMAGEKIT_URL_ENDPOINT').rstrip('/')
+        self._imagekit = None
 
-    def _save(self, name, content):
-        """Save file to ImageKit"""
-        try:
-            # Read file content
-            file_content = content.read()
-
-            # Determine folder based on file path
-            if 'property_images' in name or 'property' in name.lower():
-                folder = "property_images"
-            elif 'profile' in name.lower():
-                folder = "profile_pics"
+    @property
+    def imagekit(self):
+        # The SDK is only needed for deletes
+        if self._imagekit is None:
+            from imagekitio import ImageKit
+
+            self._imagekit = ImageKit(
+                private_key=os.getenv('IMAGEKIT_PRIVATE_KEY'),
+                public_key=os.getenv('IMAGEKIT_PUBLIC_KEY'),
+                url_endpoint=os.getenv('IMAGEKIT_URL_ENDPOINT')
+            )
+        return self._imagekit
+
+    def _folder_for(self, name):
+        # Determine folder based on file path
+        if 'property_images' in name or 'property' in name.lower():
+            return "property_images"
+        elif 'profile' in name.lower():
+            return "profile_pics"
+        return "media"
+
+    def _spool(self, content, remote_path):
+        # Written under .incoming and moved into place, so pushes never see a partial file
+        incoming = os.path.join(get_spool_root(), INCOMING_DIR)
+        os.makedirs(incoming, exist_ok=True)
+        fd, incoming_path = tempfile.mkstemp(dir=incoming)
+        with os.fdopen(fd, 'wb') as spool:
+            if hasattr(content, 'chunks'):
+                for chunk in content.chunks():
+                    spool.write(chunk)
             else:
-                folder = "media"
+                shutil.copyfileobj(content, spool, UPLOAD_CHUNK_SIZE)
+        spool_path = spool_path_for(remote_path)
+        os.makedirs(os.path.dirname(spool_path), exist_ok=True)
+        os.replace(incoming_path, spool_path)
+        return spool_path
 
-            # Upload to ImageKit
-            logger.info(f"📤 Uploading {name} to ImageKit folder: {folder}")
+    def _save(self, name, content):
+        """Spool the file locally and queue the push to ImageKit"""
+        folder = self._folder_for(name)
+        root, ext = posixpath.splitext(posixpath.basename(name))
+        # Unique names are allocated here rather than by ImageKit, so the path is known now
+        remote_path = f'{folder}/{root}_{uuid.uuid4().hex[:8]}{ext}'
 
-            upload_options = UploadFileRequestOptions(
-                use_unique_file_name=True,
-                folder=folder,
-                tags=['property237', 'auto-upload']
-            )
+        self._spool(content, remote_path)
+        if getattr(settings, 'IMAGEKIT_UPLOAD_ASYNC', True):
+            queue_spooled_upload(remote_path)
+            reconcile_spool_if_due()
+        else:
+            push_spooled_upload(remote_path)
 
-            result = self.imagekit.upload_file(
-                file=file_content,
-                file_name=name,
-                options=upload_options
-            )
+        # Django stores the remote path; url() resolves it
+        return remote_path
 
-            # ImageKit returns the full CDN URL - use it directly
-            result_url = getattr(result, 'url', None)
-            result_file_id = getattr(result, 'file_id', None) or getattr(result, 'fileId', None)
+    def _open(self, name, mode='rb'):
+        spool_path = spool_path_for(self._remote_path(name))
+        if spool_path:
+            try:
+                return File(open(spool_path, mode), name=name)
+            except FileNotFoundError:
+                pass  # Pushed, or never spooled here
 
-            logger.info("✅ ImageKit upload successful!")
-            logger.info(f"   📎 URL: {result_url}")
-            logger.info(f"   🆔 File ID: {result_file_id}")
+        return File(get_uploader().fetch(self.cdn_url(name)), name=name)
 
-            if not result_url:
-                raise ValueError("ImageKit upload did not return a URL")
+    def _remote_path(self, name):
+        if isinstance(name, str) and name.startswith(self.url_endpoint):
+            return name[len(self.url_endpoint):].lstrip('/')
+        return name.lstrip('/')
 
-            # Return the complete ImageKit CDN URL
-            # Django will store this in the database
-            return result_url
+    def cdn_url(self, name):
+        if isinstance(name, str) and name.startswith('http'):
+            return name
+        return cdn_url(self._remote_path(name))
 
-        except Exception as e:
-            logger.error(f"❌ ImageKit upload failed for {name}: {str(e)}")
-            raise
+    def is_pending(self, name):
+        """True while the push of name has not been confirmed."""
+        spool_path = spool_path_for(self._remote_path(name))
+        return spool_path is not None and os.path.exists(spool_path)
 
     def url(self, name):
         """Return the URL for accessing the file"""
         if not name:
             return None
 
+        # Rows saved before uploads were confirmed store the CDN URL itself
         if isinstance(name, str) and name.startswith('http'):
             return name
 
-        normalized_name = name.lstrip('/') if isinstance(name, str) else name
-        return f"{self.url_endpoint}/{normalized_name}"
+        if self.is_pending(name):
+            return reverse('media:pending-upload', kwargs={'path': self._remote_path(name)})
+        return self.cdn_url(name)
 
     def exists(self, name):
         """Check if file exists (always return False to allow uploads)"""
@@ -88,10 +402,16 @@ class ImageKitStorage(Storage):
 
     def delete(self, name):
         """Delete file from ImageKit"""
+        spool_path = spool_path_for(self._remote_path(name))
+        if spool_path:
+            try:
+                os.remove(spool_path)  # Never pushed; reconcile must not push it later
+            except FileNotFoundError:
+                pass
         try:
             self.imagekit.delete_file(file_id=name)
         except Exception as e:
-            print(f"ImageKit delete error: {e}")
+            logger.warning(f"ImageKit delete error: {e}")
 
     def size(self, name):
         """Return file size"""
@@ -0,0 +1,305 @@
+"""
+Process metrics for the web and Celery workers
+
+Every API request adds to a route-level latency histogram. Sampled
+requests are also profiled: SQL queries are timed through
+connection.execute_wrapper, cache reads are counted through a wrapper
+installed on the default cache for the duration of the request, and the
+slowest statement is kept as a literal-free fingerprint. Celery tasks
+report run time, queue wait and outcome through utils.task_metrics.
+
+Each process aggregates in memory and periodically copies its snapshot
+into the shared cache, so the metrics endpoint can merge all web and
+worker processes into one Prometheus text exposition.
+"""
+import contextlib
+import os
+import re
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import connections
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+DB_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+TASK_DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 1800.0)
+
+HISTOGRAM = 'histogram'
+COUNTER = 'counter'
+MAX_GAUGE = 'gauge'
+
+ROUTE_LABELS = ('route', 'method')
+TASK_LABELS = ('task', 'queue')
+
+# name: (type, help, label names, buckets)
+METRICS = {
+    'http_request_duration_seconds': (HISTOGRAM, 'Request wall-clock time', ROUTE_LABELS, DURATION_BUCKETS),
+    'http_request_db_queries': (HISTOGRAM, 'SQL queries per profiled request', ROUTE_LABELS, QUERY_COUNT_BUCKETS),
+    'http_request_db_seconds': (HISTOGRAM, 'SQL time per profiled request', ROUTE_LABELS, DB_TIME_BUCKETS),
+    'http_request_cache_hits_total': (COUNTER, 'Cache hits in profiled requests', ROUTE_LABELS, None),
+    'http_request_cache_misses_total': (COUNTER, 'Cache misses in profiled requests', ROUTE_LABELS, None),
+    'http_request_profiled_total': (COUNTER, 'Requests profiled for SQL and cache usage', ROUTE_LABELS, None),
+    'http_request_slowest_query_seconds': (
+        MAX_GAUGE, 'Slowest SQL statement seen per route', ROUTE_LABELS + ('fingerprint',), None,
+    ),
+    'celery_task_duration_seconds': (HISTOGRAM, 'Task run time', TASK_LABELS, TASK_DURATION_BUCKETS),
+    'celery_task_queue_wait_seconds': (
+        HISTOGRAM, 'Time between publishing and a worker starting the task', TASK_LABELS, TASK_DURATION_BUCKETS,
+    ),
+    'celery_task_runs_total': (COUNTER, 'Finished task runs by outcome', TASK_LABELS + ('state',), None),
+    'celery_task_retries_total': (COUNTER, 'Task retries requested', TASK_LABELS, None),
+}
+
+WORKERS_KEY = 'metrics:workers'
+WORKER_KEY = 'metrics:worker:{}'
+WORKER_SNAPSHOT_TIMEOUT = 60 * 60 * 24
+
+FINGERPRINT_MAX_LENGTH = 200
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:\?|%s)\s*,?)+\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+_MISSING = object()
+
+
+def fingerprint_sql(sql):
+    """SQL with literals and IN lists collapsed, so equal statements group together."""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()[:FINGERPRINT_MAX_LENGTH]
+
+
+class _CountingCache:
+    """Delegating cache wrapper that counts hits and misses for one request."""
+
+    def __init__(self, backend, profile):
+        self._backend = backend
+        self._profile = profile
+
+    def __getattr__(self, name):
+        return getattr(self._backend, name)
+
+    def get(self, key, default=None, version=None):
+        value = self._backend.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self._profile.cache_misses += 1
+            return default
+        self._profile.cache_hits += 1
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        values = self._backend.get_many(keys, version=version)
+        self._profile.cache_hits += len(values)
+        self._profile.cache_misses += len(keys) - len(values)
+        return values
+
+
+class RequestProfile:
+    """SQL and cache usage of one request; also the execute_wrapper callable."""
+
+    def __init__(self):
+        self.query_count = 0
+        self.db_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_sql = ''
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.query_count += 1
+            self.db_time += elapsed
+            if elapsed > self.slowest_time:
+                self.slowest_time = elapsed
+                self.slowest_sql = sql
+
+    @property
+    def slowest_fingerprint(self):
+        return fingerprint_sql(self.slowest_sql) if self.slowest_sql else ''
+
+    @contextlib.contextmanager
+    def capture(self):
+        backend = caches['default']
+        caches['default'] = _CountingCache(backend, self)
+        try:
+            with contextlib.ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(self))
+                yield self
+        finally:
+            caches['default'] = backend
+
+
+def _series_key(name, labels):
+    return '|'.join((name, *(str(value) for value in labels)))
+
+
+class MetricsRegistry:
+    """
+    Histograms, counters and max-gauges for one process.
+
+    Series are keyed "metric|label|label..." (label order from METRICS) so
+    snapshots can be stored in the cache and merged across processes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._maxima = {}
+        self._last_flush = time.monotonic()
+
+    @property
+    def worker_id(self):
+        # Read at call time: with preload the registry is created before the fork
+        return f'{socket.gethostname()}:{os.getpid()}'
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._maxima.clear()
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][3]
+        key = _series_key(name, labels)
+        with self._lock:
+            series = self._histograms.get(key)
+            if series is None:
+                series = self._histograms[key] = [[0] * len(buckets), 0, 0]
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def increment(self, name, labels, amount=1):
+        key = _series_key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def record_max(self, name, labels, value, detail=''):
+        """Keep the largest value per series, with a detail label (e.g. the SQL fingerprint)."""
+        key = _series_key(name, labels)
+        with self._lock:
+            if value > self._maxima.get(key, (0, ''))[0]:
+                self._maxima[key] = (value, detail)
+
+    def record(self, route, method, duration, profile=None):
+        labels = (route, method)
+        self.observe('http_request_duration_seconds', labels, duration)
+        if profile is not None:
+            self.observe('http_request_db_queries', labels, profile.query_count)
+            self.observe('http_request_db_seconds', labels, profile.db_time)
+            self.increment('http_request_profiled_total', labels)
+            self.increment('http_request_cache_hits_total', labels, profile.cache_hits)
+            self.increment('http_request_cache_misses_total', labels, profile.cache_misses)
+            self.record_max('http_request_slowest_query_seconds', labels, profile.slowest_time, profile.slowest_fingerprint)
+        self.flush_if_due()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'histograms': {key: [list(s[0]), s[1], s[2]] for key, s in self._histograms.items()},
+                'counters': dict(self._counters),
+                'maxima': {key: list(value) for key, value in self._maxima.items()},
+            }
+
+    def flush_if_due(self):
+        interval = getattr(settings, 'REQUEST_METRICS_FLUSH_SECONDS', 15)
+        if time.monotonic() - self._last_flush >= interval:
+            self.flush()
+
+    def flush(self):
+        """Publish this process's snapshot to the shared cache."""
+        self._last_flush = time.monotonic()
+        try:
+            cache.set(WORKER_KEY.format(self.worker_id), self.snapshot(), timeout=WORKER_SNAPSHOT_TIMEOUT)
+            workers = cache.get(WORKERS_KEY) or []
+            if self.worker_id not in workers:
+                cache.set(WORKERS_KEY, workers + [self.worker_id], timeout=None)
+        except Exception:
+            pass  # Metrics must never fail a request or task
+
+
+registry = MetricsRegistry()
+
+
+def collect_snapshots():
+    """Snapshots of every process that flushed recently, this one up to date."""
+    workers = [worker for worker in cache.get(WORKERS_KEY) or [] if worker != registry.worker_id]
+    stored = cache.get_many([WORKER_KEY.format(worker) for worker in workers])
+    live = [worker for worker in workers if WORKER_KEY.format(worker) in stored]
+    if len(live) != len(workers):
+        cache.set(WORKERS_KEY, live + [registry.worker_id], timeout=None)
+    return list(stored.values()) + [registry.snapshot()]
+
+
+def merge_snapshots(snapshots):
+    merged = {'histograms': {}, 'counters': {}, 'maxima': {}}
+    for snapshot in snapshots:
+        for key, (buckets, total, count) in snapshot.get('histograms', {}).items():
+            series = merged['histograms'].setdefault(key, [[0] * len(buckets), 0, 0])
+            series[0] = [a + b for a, b in zip(series[0], buckets)]
+            series[1] += total
+            series[2] += count
+        for key, value in snapshot.get('counters', {}).items():
+            merged['counters'][key] = merged['counters'].get(key, 0) + value
+        for key, value in snapshot.get('maxima', {}).items():
+            if value[0] > merged['maxima'].get(key, (0, ''))[0]:
+                merged['maxima'][key] = value
+    return merged
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+def _format_bound(bound):
+    return repr(float(bound)) if not isinstance(bound, int) else str(bound)
+
+
+def _series_for(name, series, label_count):
+    prefix = name + '|'
+    for key in sorted(series):
+        if key.startswith(prefix):
+            yield key[len(prefix):].split('|', label_count - 1), series[key]
+
+
+def render_prometheus(snapshot):
+    """Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for name, (kind, help_text, label_names, buckets) in METRICS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        if kind == HISTOGRAM:
+            for values, (counts, total, count) in _series_for(name, snapshot['histograms'], len(label_names)):
+                for bound, bucket_count in zip(buckets, counts):
+                    bucket_labels = _labels(label_names + ('le',), values + [_format_bound(bound)])
+                    lines.append(f'{name}_bucket{bucket_labels} {bucket_count}')
+                lines.append(f'{name}_bucket{_labels(label_names + ("le",), values + ["+Inf"])} {count}')
+                lines.append(f'{name}_sum{_labels(label_names, values)} {total}')
+                lines.append(f'{name}_count{_labels(label_names, values)} {count}')
+        elif kind == COUNTER:
+            for values, value in _series_for(name, snapshot['counters'], len(label_names)):
+                lines.append(f'{name}{_labels(label_names, values)} {value}')
+        else:
+            # The detail is the last label; it is not part of the series key
+            for values, (value, detail) in _series_for(name, snapshot['maxima'], len(label_names) - 1):
+                lines.append(f'{name}{_labels(label_names, values + [detail])} {value}')
+    return '\n'.join(lines) + '\n'
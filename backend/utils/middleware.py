@@ -1,40 +1,76 @@
 import logging
+import random
 import time
 
+from django.conf import settings
+
+from .metrics import RequestProfile, registry
+
 logger = logging.getLogger('audit')
 
+UNMATCHED_ROUTE = '<unmatched>'
+
+
+def _route_for(request):
+    # The URL pattern, not the path, keeps label cardinality bounded
+    match = getattr(request, 'resolver_match', None)
+    return match.route if match and match.route else UNMATCHED_ROUTE
+
 
 class AuditLoggingMiddleware:
-    """Log all API requests for security auditing."""
+    """
+    Log all API requests for security auditing.
+
+    Also feeds utils.metrics: every API request is timed per route,
+    and a REQUEST_PROFILING_SAMPLE_RATE share of them is profiled for SQL
+    queries, SQL time, cache hits/misses and the slowest statement.
+    """
 
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        start_time = time.time()
-        response = self.get_response(request)
-        duration = time.time() - start_time
-
-        # Only log API requests
-        if request.path.startswith('/api/'):
-            user = getattr(request, 'user', None)
-            user_id = user.pk if user and user.is_authenticated else None
-
-            ip = request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')[0].strip()
-            if not ip:
-                ip = request.META.get('REMOTE_ADDR', '')
-
-            logger.info(
-                'api_request',
-                extra={
-                    'method': request.method,
-                    'path': request.path,
-                    'status_code': response.status_code,
-                    'user_id': user_id,
-                    'ip': ip,
-                    'duration_ms': round(duration * 1000, 2),
-                    'user_agent': request.META.get('HTTP_USER_AGENT', '')[:200],
-                },
-            )
+        if not request.path.startswith('/api/'):
+            return self.get_response(request)
+
+        profile = None
+        if random.random() < getattr(settings, 'REQUEST_PROFILING_SAMPLE_RATE', 0):
+            profile = RequestProfile()
+
+        start_time = time.perf_counter()
+        if profile is not None:
+            with profile.capture():
+                response = self.get_response(request)
+        else:
+            response = self.get_response(request)
+        duration = time.perf_counter() - start_time
+
+        registry.record(_route_for(request), request.method, duration, profile)
+
+        user = getattr(request, 'user', None)
+        user_id = user.pk if user and user.is_authenticated else None
+
+        ip = request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')[0].strip()
+        if not ip:
+            ip = request.META.get('REMOTE_ADDR', '')
+
+        extra = {
+            'method': request.method,
+            'path': request.path,
+            'status_code': response.status_code,
+            'user_id': user_id,
+            'ip': ip,
+            'duration_ms': round(duration * 1000, 2),
+            'user_agent': request.META.get('HTTP_USER_AGENT', '')[:200],
+        }
+        if profile is not None:
+            extra.update({
+                'query_count': profile.query_count,
+                'db_time_ms': round(profile.db_time * 1000, 2),
+                'cache_hits': profile.cache_hits,
+                'cache_misses': profile.cache_misses,
+                'slowest_query': profile.slowest_fingerprint,
+            })
+        logger.info('api_request', extra=extra)
 
         return response
@@ -1,5 +1,9 @@
+import logging
+
 from rest_framework import permissions
 
+logger = logging.getLogger(__name__)
+
 
 class IsAgentOrReadOnly(permissions.BasePermission):
     """
@@ -35,9 +39,6 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
             return True
 
         # Write permissions only for the owner
-        import logging
-        logger = logging.getLogger(__name__)
-
         logger.info(f"IsOwnerOrReadOnly check - User: {request.user}, Method: {request.method}")
         logger.info(f"Object type: {type(obj).__name__}")
 
@@ -0,0 +1,206 @@
+"""
+Versioned response cache for public read endpoints
+
+Each watched model has a version counter in the shared cache, bumped on
+any save, delete or many-to-many change and again once it commits.
+Cached responses are keyed by the versions of the models a view reads,
+so a write makes every dependent entry unreachable at once and nothing
+relies on TTLs.
+Rendered bodies are also kept in a small per-process LRU, so hot lookups
+cost one get_many for the versions and no serialization.
+
+Bulk queryset.update()/delete() calls bypass model signals; call
+bump_response_cache_version() after them.
+"""
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+
+from utils.db_routing import use_replica
+
+VERSION_KEY = 'response_cache:version:{}'
+RESPONSE_KEY = 'response_cache:body:{}'
+CACHE_CONTROL = 'public, max-age=0, must-revalidate'
+CACHEABLE_METHODS = ('GET', 'HEAD')
+
+_watched = set()
+_local = OrderedDict()
+_local_lock = threading.Lock()
+
+
+def _label(model):
+    return model._meta.label_lower
+
+
+def watch_models(*models):
+    """Bump the version of these models on every write. Call from AppConfig.ready()."""
+    for model in models:
+        label = _label(model)
+        post_save.connect(_invalidate, sender=model, weak=False, dispatch_uid=f'response_cache:save:{label}')
+        post_delete.connect(_invalidate, sender=model, weak=False, dispatch_uid=f'response_cache:delete:{label}')
+        for field in model._meta.many_to_many:
+            m2m_changed.connect(
+                _invalidate_m2m, sender=field.remote_field.through, weak=False,
+                dispatch_uid=f'response_cache:m2m:{label}:{field.name}',
+            )
+        _watched.add(label)
+
+
+def _bump_now_and_on_commit(*models):
+    # The early bump covers code reading its own writes inside the transaction;
+    # the on-commit bump drops anything cached from the pre-commit state meanwhile
+    bump_response_cache_version(*models)
+    transaction.on_commit(functools.partial(bump_response_cache_version, *models))
+
+
+def _invalidate(sender, **kwargs):
+    _bump_now_and_on_commit(sender)
+
+
+def _invalidate_m2m(sender, instance, model, action, **kwargs):
+    if action.startswith('post_'):
+        _bump_now_and_on_commit(type(instance), model)
+
+
+def bump_response_cache_version(*models):
+    for model in models:
+        key = VERSION_KEY.format(_label(model))
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial_version(), timeout=None)
+
+
+def _initial_version():
+    # A version evicted from the cache must not restart at a number old bodies were stored under
+    return int(time.time() * 1000)
+
+
+def get_versions(models):
+    keys = [VERSION_KEY.format(_label(model)) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return tuple(versions[key] for key in keys)
+
+
+def _local_get(key):
+    with _local_lock:
+        payload = _local.get(key)
+        if payload is not None:
+            _local.move_to_end(key)
+        return payload
+
+
+def _local_set(key, payload):
+    limit = getattr(settings, 'RESPONSE_CACHE_LOCAL_ENTRIES', 256)
+    with _local_lock:
+        _local[key] = payload
+        _local.move_to_end(key)
+        while len(_local) > limit:
+            _local.popitem(last=False)
+
+
+def clear_local_response_cache():
+    with _local_lock:
+        _local.clear()
+
+
+def _response_from_payload(request, payload):
+    not_modified = get_conditional_response(request, etag=payload['etag'])
+    if not_modified is not None:
+        response = not_modified
+    else:
+        response = HttpResponse(payload['body'], content_type=payload['content_type'])
+    response['ETag'] = payload['etag']
+    response['Cache-Control'] = CACHE_CONTROL
+    response['Vary'] = 'Accept'
+    return response
+
+
+def cached_response(request, view_name, models, respond):
+    """
+    Serve request from the cache, or call respond() and cache a 200 JSON answer.
+
+    view_name and the full path (query string included) and Accept header
+    identify the entry; the model versions make it unreachable after writes.
+    """
+    if request.method not in CACHEABLE_METHODS or not getattr(settings, 'RESPONSE_CACHE_ENABLED', True):
+        return respond()
+
+    unwatched = [_label(model) for model in models if _label(model) not in _watched]
+    if unwatched:
+        raise ImproperlyConfigured(f"Response cache models are not watched: {', '.join(unwatched)}")
+
+    versions = get_versions(models)
+    identity = f"{view_name}|{request.get_full_path()}|{request.META.get('HTTP_ACCEPT', '')}|{versions}"
+    key = RESPONSE_KEY.format(hashlib.md5(identity.encode('utf-8')).hexdigest())
+
+    payload = _local_get(key)
+    if payload is None:
+        payload = cache.get(key)
+        if payload is not None:
+            _local_set(key, payload)
+    if payload is not None:
+        return _response_from_payload(request, payload)
+
+    # A replica may not have the write that moved the version yet; an entry
+    # filled from it would be stored under the new version
+    with use_replica(False):
+        response = respond()
+    if response.status_code != 200 or getattr(response, 'streaming', False):
+        return response
+    if hasattr(response, 'render') and not response.is_rendered:
+        response.render()
+    content_type = response.get('Content-Type', '')
+    if not content_type.startswith('application/json'):
+        return response
+
+    payload = {
+        'body': response.content,
+        'content_type': content_type,
+        'etag': f'"{hashlib.md5(response.content).hexdigest()}"',
+    }
+    cache.set(key, payload, timeout=getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 60 * 60 * 24))
+    _local_set(key, payload)
+    return _response_from_payload(request, payload)
+
+
+class VersionedCacheMixin:
+    """
+    Cache GET responses of a DRF view until one of cache_models is written.
+
+    Only for public views whose output does not depend on the user.
+    """
+    cache_models = ()
+
+    def dispatch(self, request, *args, **kwargs):
+        view_name = f'{type(self).__module__}.{type(self).__qualname__}'
+        return cached_response(
+            request, view_name, self.cache_models,
+            lambda: super(VersionedCacheMixin, self).dispatch(request, *args, **kwargs),
+        )
+
+
+def cache_versioned_response(*models):
+    """VersionedCacheMixin for function views; goes above @api_view."""
+    def decorator(view):
+        view_name = f'{view.__module__}.{view.__name__}'
+
+        @functools.wraps(view)
+        def wrapped(request, *args, **kwargs):
+            return cached_response(request, view_name, models, lambda: view(request, *args, **kwargs))
+        return wrapped
+    return decorator
@@ -0,0 +1,63 @@
+"""
+Celery task metrics
+
+Signal receivers feeding utils.metrics: run time and outcome of every
+task, retries, and the queue wait measured from a publish timestamp
+stamped into the message headers. Connected by importing this module from
+config/celery.py, so both the web (publishing) and worker processes
+have them.
+"""
+import time
+
+from celery import signals
+
+from .metrics import registry
+
+PUBLISHED_AT_HEADER = 'published_at'
+
+_started = {}
+
+
+def _labels(task):
+    delivery_info = getattr(task.request, 'delivery_info', None) or {}
+    queue = delivery_info.get('routing_key')
+    if not queue:
+        # Eager and direct calls have no delivery info; fall back to the route
+        queue = (task.app.conf.task_routes or {}).get(task.name, {}).get('queue') or task.app.conf.task_default_queue
+    return task.name, queue
+
+
+def _published_at(task):
+    published_at = getattr(task.request, PUBLISHED_AT_HEADER, None)
+    if published_at is None:
+        published_at = (getattr(task.request, 'headers', None) or {}).get(PUBLISHED_AT_HEADER)
+    return published_at
+
+
+@signals.before_task_publish.connect
+def stamp_published_at(headers=None, **kwargs):
+    if headers is not None:
+        headers.setdefault(PUBLISHED_AT_HEADER, time.time())
+
+
+@signals.task_prerun.connect
+def task_started(task_id=None, task=None, **kwargs):
+    _started[task_id] = time.perf_counter()
+    published_at = _published_at(task)
+    if published_at:
+        registry.observe('celery_task_queue_wait_seconds', _labels(task), max(time.time() - float(published_at), 0))
+
+
+@signals.task_postrun.connect
+def task_finished(task_id=None, task=None, state=None, **kwargs):
+    started = _started.pop(task_id, None)
+    labels = _labels(task)
+    if started is not None:
+        registry.observe('celery_task_duration_seconds', labels, time.perf_counter() - started)
+    registry.increment('celery_task_runs_total', labels + (state or 'UNKNOWN',))
+    registry.flush_if_due()
+
+
+@signals.task_retry.connect
+def task_retried(sender=None, **kwargs):
+    registry.increment('celery_task_retries_total', _labels(sender))
@@ -0,0 +1,62 @@
+"""
+Hashed timing wheel for near-term deadlines
+
+Keys are hashed into slots of `tick` seconds by their deadline, so
+schedule() and cancel() are O(1) and advance() only visits the slots of
+the ticks that elapsed. A deadline more than one revolution ahead waits in
+its slot until its own tick comes around. Not thread-safe; meant for a
+single polling loop (payment.escrow_timers).
+"""
+import math
+import time
+
+
+class TimingWheel:
+    def __init__(self, tick=1.0, slots=256, now=None):
+        self.tick = tick
+        self._slots = [{} for _ in range(slots)]
+        self._ticks = {}  # key -> tick it is due on
+        self._current = self._tick_of(time.time() if now is None else now)
+
+    def __len__(self):
+        return len(self._ticks)
+
+    def __contains__(self, key):
+        return key in self._ticks
+
+    def _tick_of(self, timestamp):
+        return math.floor(timestamp / self.tick)
+
+    def schedule(self, key, deadline):
+        """(Re)schedule key for deadline (epoch seconds); past deadlines fire on the next advance()."""
+        self.cancel(key)
+        tick = math.ceil(deadline / self.tick)
+        self._slots[self._slot_of(tick)][key] = tick
+        self._ticks[key] = tick
+
+    def cancel(self, key):
+        tick = self._ticks.pop(key, None)
+        if tick is not None:
+            del self._slots[self._slot_of(tick)][key]
+
+    def _slot_of(self, tick):
+        # Overdue keys sit in the next tick's slot
+        return max(tick, self._current + 1) % len(self._slots)
+
+    def advance(self, now=None):
+        """Remove and return the keys due by now, earliest deadline first."""
+        target = self._tick_of(time.time() if now is None else now)
+        if target <= self._current:
+            return []
+        due = []
+        # After a long stall every slot is visited once
+        for tick in range(self._current + 1, min(target, self._current + len(self._slots)) + 1):
+            slot = self._slots[tick % len(self._slots)]
+            for key, key_tick in list(slot.items()):
+                if key_tick <= target:
+                    due.append((key_tick, key))
+                    del slot[key]
+                    del self._ticks[key]
+        self._current = target
+        due.sort(key=lambda entry: entry[0])
+        return [key for _, key in due]
@@ -0,0 +1,130 @@
+"""
+In-memory prefix and trigram index for typeahead lookups
+
+Texts are folded with fold(): accents stripped, case folded, anything
+but letters and digits turned into spaces, so "Yaoundé", "YAOUNDE" and
+"yaounde" are the same word. search() treats every query word as a word
+prefix: each is looked up by binary search in the sorted vocabulary,
+the postings of the one with the fewest matches are merged lazily in
+document order and the other words are checked per document, so the
+first `limit` matches are found without collecting every match of a
+one-letter prefix. With fuzzy=True, a query that matches no prefix
+(a typo) falls back to trigram similarity, as pg_trgm does.
+
+Documents come back in the order they were added; callers add them best
+first. An index is never modified after it is built, so threads can
+share it.
+"""
+import bisect
+import heapq
+import re
+import unicodedata
+from collections import Counter
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+_LIGATURES = str.maketrans({'œ': 'oe', 'æ': 'ae'})
+# Sorts after every folded word that starts with a given prefix
+_PREFIX_END = '{'
+
+
+def fold(text):
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return _NON_ALNUM.sub(' ', stripped.casefold().translate(_LIGATURES)).strip()
+
+
+def trigrams(words):
+    grams = set()
+    for word in words:
+        padded = f'  {word} '
+        grams.update(padded[index:index + 3] for index in range(len(padded) - 2))
+    return grams
+
+
+def _unique(positions):
+    previous = None
+    for position in positions:
+        if position != previous:
+            yield position
+            previous = position
+
+
+class TypeaheadIndex:
+    def __init__(self, items, fuzzy=False, similarity=0.3):
+        """items: (document, text) pairs, best first."""
+        self.documents = []
+        self._words = []
+        postings = {}
+        for document, text in items:
+            position = len(self.documents)
+            words = tuple(dict.fromkeys(fold(text).split()))
+            self.documents.append(document)
+            self._words.append(words)
+            for word in words:
+                postings.setdefault(word, []).append(position)
+        self._vocabulary = sorted(postings)
+        self._postings = [postings[word] for word in self._vocabulary]
+
+        self.fuzzy = fuzzy
+        self.similarity = similarity
+        self._trigrams = {}
+        self._trigram_counts = []
+        if fuzzy:
+            for position, words in enumerate(self._words):
+                grams = trigrams(words)
+                self._trigram_counts.append(len(grams))
+                for gram in grams:
+                    self._trigrams.setdefault(gram, []).append(position)
+
+    def __len__(self):
+        return len(self.documents)
+
+    def _prefix_postings(self, prefix):
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + _PREFIX_END, start)
+        return self._postings[start:end]
+
+    def _matches_all(self, position, prefixes):
+        words = self._words[position]
+        return all(any(word.startswith(prefix) for word in words) for prefix in prefixes)
+
+    def _similar_positions(self, words):
+        grams = trigrams(words)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._trigrams.get(gram, ()))
+        scored = []
+        for position, count in shared.items():
+            score = count / (len(grams) + self._trigram_counts[position] - count)
+            if score >= self.similarity:
+                scored.append((-score, position))
+        return [position for _, position in sorted(scored)]
+
+    def search(self, query, limit=10, accept=None):
+        """Documents with a word starting with every query word, or similar ones when fuzzy."""
+        words = fold(query).split()
+        if not words or limit <= 0:
+            return []
+        postings = {word: self._prefix_postings(word) for word in set(words)}
+        primary = min(postings, key=lambda word: sum(map(len, postings[word])))
+        others = [word for word in postings if word != primary]
+
+        results = []
+        for position in _unique(heapq.merge(*postings[primary])):
+            if others and not self._matches_all(position, others):
+                continue
+            document = self.documents[position]
+            if accept is None or accept(document):
+                results.append(document)
+                if len(results) == limit:
+                    return results
+        if results or not self.fuzzy or max(map(len, words)) < 3:
+            return results
+
+        for position in self._similar_positions(words):
+            document = self.documents[position]
+            if accept is None or accept(document):
+                results.append(document)
+                if len(results) == limit:
+                    break
+        return results